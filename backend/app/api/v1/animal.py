@@ -1,9 +1,12 @@
-import shutil
-from datetime import datetime
+import hashlib
+import json
 from pathlib import Path
 from typing import Optional
 
-from app.core.database import get_db
+from app.core.config import settings
+from app.core.database import get_async_db
+from app.core.exportacao import FormatoExportacao, colunas, resposta_exportacao
+from app.core.paginacao import ParametrosPaginacao, paginar
 from app.core.security import get_current_user
 from app.models.animal import Animal
 from app.models.user import User
@@ -12,25 +15,55 @@ from app.schemas.animal import (
     AnimalGenealogia,
     AnimalResponse,
     AnimalUpdate,
+    DescendenteResponse,
     FotoUploadResponse,
+    ImportacaoAnimaisResponse,
     SexoEnum,
     StatusAnimalEnum,
 )
-from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status
-from sqlalchemy.orm import Session
+from app.services.armazenamento import (
+    armazenar_upload,
+    confirmar_upload,
+    descartar_upload,
+    remover_se_orfao,
+)
+from app.services.busca import indice_animais
+from app.services.genealogia import (
+    MAX_GERACOES,
+    buscar_descendentes,
+    obter_genealogia,
+)
+from app.services.imagens import processar_foto
+from app.services.importacao_animais import (
+    PRIMEIRA_LINHA_CSV,
+    importar_animais,
+    ler_csv,
+)
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    UploadFile,
+    status,
+)
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 from sqlalchemy.sql import func
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import UploadFile as StarletteUploadFile
 
 router = APIRouter(prefix="/api/animais", tags=["Animais"])
 
-# Diretório para upload de fotos
-UPLOAD_DIR = Path("uploads/animais")
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
-
 
 @router.post("/", response_model=AnimalResponse, status_code=status.HTTP_201_CREATED)
 async def create_animal(
     animal: AnimalCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     if animal.ID_USUARIO_CADASTRO != current_user.ID:
@@ -41,10 +74,8 @@ async def create_animal(
 
     # Verificar se número de registro já existe
     if animal.NUMERO_REGISTRO:
-        existing = (
-            db.query(Animal)
-            .filter(Animal.NUMERO_REGISTRO == animal.NUMERO_REGISTRO)
-            .first()
+        existing = await db.scalar(
+            select(Animal).filter(Animal.NUMERO_REGISTRO == animal.NUMERO_REGISTRO)
         )
         if existing:
             raise HTTPException(
@@ -54,10 +85,10 @@ async def create_animal(
 
     # Verificar se chip já existe
     if animal.CHIP_IDENTIFICACAO:
-        existing = (
-            db.query(Animal)
-            .filter(Animal.CHIP_IDENTIFICACAO == animal.CHIP_IDENTIFICACAO)
-            .first()
+        existing = await db.scalar(
+            select(Animal).filter(
+                Animal.CHIP_IDENTIFICACAO == animal.CHIP_IDENTIFICACAO
+            )
         )
         if existing:
             raise HTTPException(
@@ -67,14 +98,60 @@ async def create_animal(
 
     db_animal = Animal(**animal.model_dump())
     db.add(db_animal)
-    db.commit()
-    db.refresh(db_animal)
+    await db.commit()
+    await db.refresh(db_animal)
     return db_animal
 
 
+@router.post("/importar", response_model=ImportacaoAnimaisResponse)
+async def importar_animais_lote(
+    request: Request,
+    tudo_ou_nada: bool = Query(
+        False, description="Não gravar nenhuma linha se houver algum erro"
+    ),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Importa animais de um CSV (arquivo multipart no campo `arquivo` ou corpo
+    text/csv) ou de um array JSON. Retorna os erros por linha.
+    """
+    tipo = request.headers.get("content-type", "")
+    if tipo.startswith("multipart/form-data"):
+        form = await request.form()
+        arquivo = form.get("arquivo")
+        if not isinstance(arquivo, StarletteUploadFile):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Envie o CSV no campo 'arquivo'",
+            )
+        registros = await run_in_threadpool(ler_csv, await arquivo.read())
+        primeira_linha = PRIMEIRA_LINHA_CSV
+    elif tipo.startswith("application/json"):
+        try:
+            registros = await request.json()
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="JSON inválido"
+            )
+        if not isinstance(registros, list):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Corpo deve ser um array JSON de animais",
+            )
+        primeira_linha = 1
+    else:
+        registros = await run_in_threadpool(ler_csv, await request.body())
+        primeira_linha = PRIMEIRA_LINHA_CSV
+
+    return await importar_animais(
+        db, registros, current_user.ID, primeira_linha, tudo_ou_nada
+    )
+
+
 @router.get("/", response_model=dict)
 async def list_animais(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
     nome: Optional[str] = Query(None, description="Filtrar por nome do animal"),
     sexo: Optional[SexoEnum] = Query(None, description="Filtrar por sexo"),
@@ -87,25 +164,14 @@ async def list_animais(
     limit: int = Query(10, ge=1, le=1000, description="Itens por página"),
     sort_by: Optional[str] = Query("ID", description="Coluna para ordenação"),
     order: Optional[str] = Query("asc", description="Ordem: asc ou desc"),
+    paginacao: ParametrosPaginacao = Depends(),
 ):
-    query = db.query(Animal)
-
-    # Aplicar filtros
-    if nome:
-        query = query.filter(Animal.NOME.ilike(f"%{nome}%"))
-    if sexo:
-        query = query.filter(Animal.SEXO == sexo)
-    if status:
-        query = query.filter(Animal.STATUS_ANIMAL == status)
-    if numero_registro:
-        query = query.filter(Animal.NUMERO_REGISTRO.ilike(f"%{numero_registro}%"))
-    if chip:
-        query = query.filter(Animal.CHIP_IDENTIFICACAO.ilike(f"%{chip}%"))
-
-    # Contar total de registros
-    total = query.count()
+    query = await _filtrar_animais(
+        db, select(Animal), nome, sexo, status, numero_registro, chip
+    )
 
     # Aplicar ordenação
+    ordenacao = []
     valid_sort_fields = [
         "ID",
         "NOME",
@@ -115,29 +181,82 @@ async def list_animais(
         "NUMERO_REGISTRO",
     ]
     if sort_by in valid_sort_fields:
-        order_column = getattr(Animal, sort_by)
-        if order and order.lower() == "desc":
-            query = query.order_by(order_column.desc())
-        else:
-            query = query.order_by(order_column.asc())
+        ordenacao = [
+            (getattr(Animal, sort_by), bool(order) and order.lower() == "desc")
+        ]
 
-    # Aplicar paginação
-    offset = (page - 1) * limit
-    animais = query.offset(offset).limit(limit).all()
+    # Aplicar paginação (page/limit ou cursor)
+    pagina = await paginar(db, query, ordenacao, Animal.ID, page, limit, paginacao)
 
     # Converter para Pydantic
-    animais_response = [AnimalResponse.from_orm(animal) for animal in animais]
+    animais_response = [AnimalResponse.from_orm(animal) for animal in pagina.itens]
+
+    return {"animais": animais_response, **pagina.metadados(page, limit)}
+
 
-    return {"animais": animais_response, "total": total, "page": page, "limit": limit}
+@router.get("/exportar")
+async def exportar_animais(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+    formato: FormatoExportacao = Query(FormatoExportacao.CSV),
+    nome: Optional[str] = Query(None, description="Filtrar por nome do animal"),
+    sexo: Optional[SexoEnum] = Query(None, description="Filtrar por sexo"),
+    status: Optional[StatusAnimalEnum] = Query(None, description="Filtrar por status"),
+    numero_registro: Optional[str] = Query(
+        None, description="Filtrar por número de registro"
+    ),
+    chip: Optional[str] = Query(None, description="Filtrar por chip"),
+):
+    """Exporta o plantel (com os nomes de pai e mãe) em CSV ou NDJSON"""
+    pai = aliased(Animal)
+    mae = aliased(Animal)
+    query = (
+        select(
+            *colunas(Animal),
+            pai.NOME.label("PAI_NOME"),
+            mae.NOME.label("MAE_NOME"),
+        )
+        .outerjoin(pai, Animal.ID_PAI == pai.ID)
+        .outerjoin(mae, Animal.ID_MAE == mae.ID)
+        .order_by(Animal.ID)
+    )
+    query = await _filtrar_animais(db, query, nome, sexo, status, numero_registro, chip)
+    return resposta_exportacao(query, formato, "animais")
+
+
+async def _filtrar_animais(
+    db: AsyncSession,
+    query,
+    nome: Optional[str],
+    sexo: Optional[SexoEnum],
+    status: Optional[StatusAnimalEnum],
+    numero_registro: Optional[str],
+    chip: Optional[str],
+):
+    if nome:
+        query = query.filter(await indice_animais.condicao(db, nome, "NOME"))
+    if sexo:
+        query = query.filter(Animal.SEXO == sexo)
+    if status:
+        query = query.filter(Animal.STATUS_ANIMAL == status)
+    if numero_registro:
+        query = query.filter(
+            await indice_animais.condicao(db, numero_registro, "NUMERO_REGISTRO")
+        )
+    if chip:
+        query = query.filter(
+            await indice_animais.condicao(db, chip, "CHIP_IDENTIFICACAO")
+        )
+    return query
 
 
 @router.get("/{id}", response_model=AnimalResponse)
 async def get_animal(
     id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    animal = db.query(Animal).filter(Animal.ID == id).first()
+    animal = await db.scalar(select(Animal).filter(Animal.ID == id))
     if not animal:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Animal não encontrado"
@@ -149,10 +268,10 @@ async def get_animal(
 async def update_animal(
     id: int,
     animal: AnimalUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    db_animal = db.query(Animal).filter(Animal.ID == id).first()
+    db_animal = await db.scalar(select(Animal).filter(Animal.ID == id))
     if not db_animal:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Animal não encontrado"
@@ -160,10 +279,10 @@ async def update_animal(
 
     # Verificar unicidade se alterando registro/chip
     if animal.NUMERO_REGISTRO and animal.NUMERO_REGISTRO != db_animal.NUMERO_REGISTRO:
-        existing = (
-            db.query(Animal)
-            .filter(Animal.NUMERO_REGISTRO == animal.NUMERO_REGISTRO, Animal.ID != id)
-            .first()
+        existing = await db.scalar(
+            select(Animal).filter(
+                Animal.NUMERO_REGISTRO == animal.NUMERO_REGISTRO, Animal.ID != id
+            )
         )
         if existing:
             raise HTTPException(
@@ -175,12 +294,10 @@ async def update_animal(
         animal.CHIP_IDENTIFICACAO
         and animal.CHIP_IDENTIFICACAO != db_animal.CHIP_IDENTIFICACAO
     ):
-        existing = (
-            db.query(Animal)
-            .filter(
+        existing = await db.scalar(
+            select(Animal).filter(
                 Animal.CHIP_IDENTIFICACAO == animal.CHIP_IDENTIFICACAO, Animal.ID != id
             )
-            .first()
         )
         if existing:
             raise HTTPException(
@@ -195,125 +312,214 @@ async def update_animal(
     db_animal.ID_USUARIO_ALTERACAO = current_user.ID
     db_animal.DATA_ALTERACAO = func.now()
 
-    db.commit()
-    db.refresh(db_animal)
+    await db.commit()
+    await db.refresh(db_animal)
     return db_animal
 
 
 @router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_animal(
     id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    db_animal = db.query(Animal).filter(Animal.ID == id).first()
+    db_animal = await db.scalar(select(Animal).filter(Animal.ID == id))
     if not db_animal:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Animal não encontrado"
         )
 
-    db.delete(db_animal)
-    db.commit()
+    await db.delete(db_animal)
+    await db.commit()
     return None
 
 
 @router.get("/{id}/genealogia", response_model=AnimalGenealogia)
 async def get_genealogia(
     id: int,
-    db: Session = Depends(get_db),
+    geracoes: int = Query(
+        4, ge=1, le=MAX_GERACOES, description="Gerações de ancestrais"
+    ),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    def get_animal_with_parents(animal_id):
-        if not animal_id:
-            return None
+    genealogia = await obter_genealogia(db, id, geracoes)
+    if not genealogia:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Animal não encontrado"
+        )
 
-        animal = db.query(Animal).filter(Animal.ID == animal_id).first()
-        if not animal:
-            return None
+    return genealogia
 
-        return {
-            "animal": AnimalResponse.from_orm(animal),
-            "pai": get_animal_with_parents(animal.ID_PAI),
-            "mae": get_animal_with_parents(animal.ID_MAE),
-        }
 
-    genealogia = get_animal_with_parents(id)
-    if not genealogia:
+@router.get("/{id}/descendentes", response_model=dict)
+async def get_descendentes(
+    id: int,
+    geracoes: int = Query(
+        3, ge=1, le=MAX_GERACOES, description="Gerações de descendentes"
+    ),
+    sexo: Optional[SexoEnum] = Query(None, description="Filtrar por sexo"),
+    status_animal: Optional[StatusAnimalEnum] = Query(
+        None, alias="status", description="Filtrar por status"
+    ),
+    page: int = Query(1, ge=1, description="Número da página"),
+    limit: int = Query(50, ge=1, le=500, description="Itens por página"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    animal = await db.scalar(select(Animal).filter(Animal.ID == id))
+    if not animal:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Animal não encontrado"
         )
 
-    return genealogia
+    filtros = []
+    if sexo:
+        filtros.append(Animal.SEXO == sexo)
+    if status_animal:
+        filtros.append(Animal.STATUS_ANIMAL == status_animal)
+
+    offset = (page - 1) * limit
+    descendentes, por_geracao = await buscar_descendentes(
+        db, id, geracoes, filtros, offset, limit
+    )
+    total = sum(g["total"] for g in por_geracao)
+
+    return {
+        "animal": AnimalResponse.model_validate(animal),
+        "descendentes": [
+            DescendenteResponse.model_validate(descendente).model_copy(
+                update={"GERACAO": geracao}
+            )
+            for descendente, geracao in descendentes
+        ],
+        "por_geracao": por_geracao,
+        "total": total,
+        "page": page,
+        "limit": limit,
+        "total_pages": (total + limit - 1) // limit,
+    }
 
 
 @router.post("/{id}/foto", response_model=FotoUploadResponse)
 async def upload_foto(
     id: int,
     foto: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     # Verificar se animal existe
-    animal = db.query(Animal).filter(Animal.ID == id).first()
+    animal = await db.scalar(select(Animal).filter(Animal.ID == id))
     if not animal:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Animal não encontrado"
         )
 
     # Validar tipo de arquivo
-    allowed_types = ["image/jpeg", "image/png", "image/jpg"]
+    allowed_types = ["image/jpeg", "image/png", "image/jpg", "image/webp"]
     if foto.content_type not in allowed_types:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Tipo de arquivo não permitido",
         )
 
-    # Gerar nome único
     if not foto.filename:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="O arquivo enviado não possui um nome válido",
         )
-    file_extension = foto.filename.split(".")[-1]
-    filename = f"animal_{id}_{int(datetime.now().timestamp())}.{file_extension}"
-    file_path = UPLOAD_DIR / filename
 
-    # Salvar arquivo
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(foto.file, buffer)
+    # Salvar arquivo (nome pelo hash do conteúdo) e gerar as variantes
+    arquivo = await armazenar_upload(
+        foto, ("jpg", "jpeg", "png", "webp"), settings.UPLOAD_FOTO_MAX_MB * 1024 * 1024
+    )
+    try:
+        variantes = await processar_foto(arquivo.caminho, reaproveitar=not arquivo.novo)
+    except HTTPException:
+        if arquivo.novo:
+            arquivo.caminho.unlink(missing_ok=True)
+        descartar_upload(arquivo)
+        raise
 
     # Atualizar foto do animal
-    # if animal.FOTO_PRINCIPAL is None:
-    animal.FOTO_PRINCIPAL = f"/uploads/animais/{filename}"
-    db.commit()
-
+    foto_anterior = animal.FOTO_PRINCIPAL
+    animal.FOTO_PRINCIPAL = arquivo.url
+    try:
+        await db.commit()
+        # Foto reaproveitada removida como órfã antes do commit: regravar
+        if await confirmar_upload(arquivo):
+            variantes = await processar_foto(arquivo.caminho, reaproveitar=True)
+    finally:
+        descartar_upload(arquivo)
+
+    # Após o commit: a troca já é visível para outras requisições
+    if foto_anterior and foto_anterior != arquivo.url:
+        try:
+            await remover_se_orfao(db, Path(foto_anterior.lstrip("/")))
+        except OSError:
+            pass  # Ignorar erro se arquivo não puder ser removido
+
+    diretorio_url = arquivo.url.rsplit("/", 1)[0]
     return {
-        "filename": filename,
-        "url": f"/uploads/animais/{filename}",
+        "filename": arquivo.caminho.name,
+        "url": arquivo.url,
+        "variantes": {
+            nome: f"{diretorio_url}/{nome_arquivo}"
+            for nome, nome_arquivo in variantes.items()
+        },
         "message": "Foto enviada com sucesso",
     }
 
 
 @router.get("/options/parents")
 async def get_parent_options(
-    db: Session = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
     sexo: Optional[SexoEnum] = Query(
         None, description="Filtrar por sexo para parentesco"
     ),
 ):
-    """Retorna lista de animais para seleção de pais/mães"""
-    query = db.query(Animal).filter(Animal.STATUS_ANIMAL == StatusAnimalEnum.ATIVO)
-
-    if sexo:
-        query = query.filter(Animal.SEXO == sexo)
-
-    animais = query.order_by(Animal.NOME).all()
-
-    return [
-        {
-            "value": animal.ID,
-            "label": f"{animal.NOME} ({animal.NUMERO_REGISTRO or 'S/R'})",
-        }
-        for animal in animais
-    ]
+    """
+    Retorna lista de animais para seleção de pais/mães. A lista é montada a
+    partir do índice de animais em memória e só é refeita quando ANIMAIS
+    muda; com If-None-Match igual ao ETag atual a resposta é 304.
+    """
+    etag, corpo = await indice_animais.visao(
+        db, ("opcoes_pais", sexo), _montar_opcoes_pais(sexo)
+    )
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if_none_match = request.headers.get("if-none-match", "")
+    etags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    if etag in etags or "*" in etags:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return Response(content=corpo, media_type="application/json", headers=headers)
+
+
+def _montar_opcoes_pais(sexo: Optional[SexoEnum]):
+    """Monta (ETag, corpo JSON) das opções de pais a partir do índice"""
+
+    def montar(animais):
+        selecionados = sorted(
+            (
+                animal
+                for animal in animais
+                if animal.STATUS_ANIMAL == StatusAnimalEnum.ATIVO
+                and (not sexo or animal.SEXO == sexo)
+            ),
+            key=lambda animal: (animal.NOME, animal.ID),
+        )
+        opcoes = [
+            {
+                "value": animal.ID,
+                "label": f"{animal.NOME} ({animal.NUMERO_REGISTRO or 'S/R'})",
+            }
+            for animal in selecionados
+        ]
+        corpo = json.dumps(opcoes, ensure_ascii=False).encode()
+        # ETag pelo conteúdo: igual entre processos e entre recargas
+        return f'"{hashlib.sha256(corpo).hexdigest()[:32]}"', corpo
+
+    return montar
@@ -4,7 +4,7 @@ from datetime import datetime, timedelta
 
 import pyotp
 import qrcode
-from app.core.database import get_db
+from app.core.database import get_async_db
 from app.core.security import (
     create_jwt_token,
     create_refresh_token,
@@ -34,16 +34,17 @@ from app.schemas.user import (
 )
 from app.services.email_service import EmailService
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql import func
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
 
 @router.post("/register", response_model=UserResponse)
-async def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
     # Verificar se o e-mail já existe
-    db_user = db.query(User).filter(User.EMAIL == user.EMAIL).first()
+    db_user = await db.scalar(select(User).filter(User.EMAIL == user.EMAIL))
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="E-mail já registrado"
@@ -61,20 +62,22 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
         PRIMEIRO_ACESSO="S",
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     return new_user
 
 
 @router.post("/login", response_model=LoginResponse)
-async def login(user: UserLogin, db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.EMAIL == user.EMAIL, User.ATIVO == "S").first()
+async def login(user: UserLogin, db: AsyncSession = Depends(get_async_db)):
+    db_user = await db.scalar(
+        select(User).filter(User.EMAIL == user.EMAIL, User.ATIVO == "S")
+    )
 
     if not db_user or not verify_password(user.SENHA, db_user.SENHA_HASH):
         db_user.TENTATIVAS_LOGIN += 1
         if db_user.TENTATIVAS_LOGIN >= 5:
             db_user.BLOQUEADO_ATE = datetime.utcnow() + timedelta(minutes=30)
-        db.commit()
+        await db.commit()
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Credenciais inválidas"
         )
@@ -86,13 +89,13 @@ async def login(user: UserLogin, db: Session = Depends(get_db)):
 
     db_user.DATA_ULTIMO_LOGIN = datetime.utcnow()
     db_user.TENTATIVAS_LOGIN = 0
-    db.commit()
+    await db.commit()
 
     # Verificar se MFA está configurado
-    mfa_config = (
-        db.query(MFAConfig)
-        .filter(MFAConfig.ID_USUARIO == db_user.ID, MFAConfig.ATIVO == "S")
-        .first()
+    mfa_config = await db.scalar(
+        select(MFAConfig).filter(
+            MFAConfig.ID_USUARIO == db_user.ID, MFAConfig.ATIVO == "S"
+        )
     )
 
     # token = create_jwt_token({"sub": str(db_user.ID), "perfil": db_user.PERFIL})
@@ -111,7 +114,7 @@ async def login(user: UserLogin, db: Session = Depends(get_db)):
         ATIVA="S",
     )
     db.add(sessao)
-    db.commit()
+    await db.commit()
 
     return {
         # "token": token,
@@ -124,7 +127,9 @@ async def login(user: UserLogin, db: Session = Depends(get_db)):
 
 
 @router.post("/refresh")
-async def refresh_token(data: SessaoRefreshTokenRequest, db: Session = Depends(get_db)):
+async def refresh_token(
+    data: SessaoRefreshTokenRequest, db: AsyncSession = Depends(get_async_db)
+):
     user = await validate_refresh_token(data.refresh_token, db)
 
     new_access_token = create_jwt_token({"sub": str(user.ID), "perfil": user.PERFIL})
@@ -133,21 +138,27 @@ async def refresh_token(data: SessaoRefreshTokenRequest, db: Session = Depends(g
 
 
 @router.post("/logout")
-async def logout(data: SessaoRefreshTokenRequest, db: Session = Depends(get_db)):
-    sessao = (
-        db.query(Sessao)
-        .filter(Sessao.TOKEN_SESSAO == data.refresh_token, Sessao.ATIVA == "S")
-        .first()
+async def logout(
+    data: SessaoRefreshTokenRequest, db: AsyncSession = Depends(get_async_db)
+):
+    sessao = await db.scalar(
+        select(Sessao).filter(
+            Sessao.TOKEN_SESSAO == data.refresh_token, Sessao.ATIVA == "S"
+        )
     )
     if sessao:
         sessao.ATIVA = "N"
-        db.commit()
+        await db.commit()
     return {"message": "Logout realizado com sucesso"}
 
 
 @router.post("/forgot-password")
-async def forgot_password(user: UserForgotPassword, db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.EMAIL == user.EMAIL, User.ATIVO == "S").first()
+async def forgot_password(
+    user: UserForgotPassword, db: AsyncSession = Depends(get_async_db)
+):
+    db_user = await db.scalar(
+        select(User).filter(User.EMAIL == user.EMAIL, User.ATIVO == "S")
+    )
     if not db_user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Usuário não encontrado"
@@ -156,7 +167,7 @@ async def forgot_password(user: UserForgotPassword, db: Session = Depends(get_db
     token = generate_reset_token()
     db_user.RESET_PASSWORD_TOKEN = token
     db_user.RESET_TOKEN_EXPIRA = datetime.utcnow() + timedelta(hours=1)
-    db.commit()
+    await db.commit()
 
     email_service = EmailService()
 
@@ -172,9 +183,13 @@ async def forgot_password(user: UserForgotPassword, db: Session = Depends(get_db
 
 
 @router.post("/reset-password")
-async def reset_password(data: UserResetPassword, db: Session = Depends(get_db)):
+async def reset_password(
+    data: UserResetPassword, db: AsyncSession = Depends(get_async_db)
+):
     now = datetime.utcnow()
-    db_user = db.query(User).filter(User.RESET_PASSWORD_TOKEN == data.TOKEN).first()
+    db_user = await db.scalar(
+        select(User).filter(User.RESET_PASSWORD_TOKEN == data.TOKEN)
+    )
 
     if not db_user or db_user.RESET_TOKEN_EXPIRA < now:
         raise HTTPException(
@@ -184,14 +199,14 @@ async def reset_password(data: UserResetPassword, db: Session = Depends(get_db))
     db_user.SENHA_HASH = hash_password(data.SENHA)
     db_user.RESET_PASSWORD_TOKEN = None
     db_user.RESET_TOKEN_EXPIRA = None
-    db.commit()
+    await db.commit()
 
     return {"message": "Senha redefinida com sucesso"}
 
 
 @router.post("/mfa/setup", response_model=MFASetupResponse)
-async def setup_mfa(data: MFASetupRequest, db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.ID == data.user_id).first()
+async def setup_mfa(data: MFASetupRequest, db: AsyncSession = Depends(get_async_db)):
+    db_user = await db.scalar(select(User).filter(User.ID == data.user_id))
     if not db_user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Usuário não encontrado"
@@ -215,8 +230,8 @@ async def setup_mfa(data: MFASetupRequest, db: Session = Depends(get_db)):
     qr_code_url = f"data:image/png;base64,{qr_code_base64}"
 
     # Salvar segredo no banco
-    mfa_config = (
-        db.query(MFAConfig).filter(MFAConfig.ID_USUARIO == data.user_id).first()
+    mfa_config = await db.scalar(
+        select(MFAConfig).filter(MFAConfig.ID_USUARIO == data.user_id)
     )
     if mfa_config:
         mfa_config.SEGREDO_TOTP = secret
@@ -228,24 +243,24 @@ async def setup_mfa(data: MFASetupRequest, db: Session = Depends(get_db)):
 
     db_user.MFA_ATIVO = "S"
     db_user.PRIMEIRO_ACESSO = "N"
-    db.commit()
+    await db.commit()
 
     return {"secret": secret, "qr_code_url": qr_code_url, "user": db_user}
 
 
 @router.post("/mfa/verify", response_model=MFAVerifyResponse)
-async def verify_mfa(data: MFAVerifyRequest, db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.ID == data.user_id).first()
+async def verify_mfa(data: MFAVerifyRequest, db: AsyncSession = Depends(get_async_db)):
+    db_user = await db.scalar(select(User).filter(User.ID == data.user_id))
 
     if not db_user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Usuário não encontrado"
         )
 
-    mfa_config = (
-        db.query(MFAConfig)
-        .filter(MFAConfig.ID_USUARIO == data.user_id, MFAConfig.ATIVO == "S")
-        .first()
+    mfa_config = await db.scalar(
+        select(MFAConfig).filter(
+            MFAConfig.ID_USUARIO == data.user_id, MFAConfig.ATIVO == "S"
+        )
     )
     if not mfa_config:
         raise HTTPException(
@@ -261,7 +276,7 @@ async def verify_mfa(data: MFAVerifyRequest, db: Session = Depends(get_db)):
 
     db_user.DATA_ULTIMO_LOGIN = datetime.utcnow()
     db_user.TENTATIVAS_LOGIN = 0
-    db.commit()
+    await db.commit()
 
     access_token = create_jwt_token({"sub": str(db_user.ID), "perfil": db_user.PERFIL})
     refresh_token = create_refresh_token(
@@ -279,7 +294,7 @@ async def verify_mfa(data: MFAVerifyRequest, db: Session = Depends(get_db)):
         ATIVA="S",
     )
     db.add(sessao)
-    db.commit()
+    await db.commit()
 
     return {
         "access_token": access_token,
@@ -289,15 +304,19 @@ async def verify_mfa(data: MFAVerifyRequest, db: Session = Depends(get_db)):
 
 
 @router.post("/mfa/disable", response_model=MFADisableResponse)
-async def disable_mfa(data: MFASetupRequest, db: Session = Depends(get_db)):
+async def disable_mfa(data: MFASetupRequest, db: AsyncSession = Depends(get_async_db)):
     user_id = data.user_id
-    db_user = db.query(User).filter(User.ID == user_id, User.ATIVO == "S").first()
+    db_user = await db.scalar(
+        select(User).filter(User.ID == user_id, User.ATIVO == "S")
+    )
     if not db_user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Usuário não encontrado"
         )
 
-    mfa_config = db.query(MFAConfig).filter(MFAConfig.ID_USUARIO == user_id).first()
+    mfa_config = await db.scalar(
+        select(MFAConfig).filter(MFAConfig.ID_USUARIO == user_id)
+    )
     if not mfa_config:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="MFA não configurado"
@@ -305,6 +324,6 @@ async def disable_mfa(data: MFASetupRequest, db: Session = Depends(get_db)):
 
     mfa_config.ATIVO = "N"
     db_user.MFA_ATIVO = "N"
-    db.commit()
+    await db.commit()
 
     return {"user": db_user}
@@ -2,7 +2,8 @@
 from datetime import datetime, timedelta
 from typing import List, Optional
 
-from app.core.database import get_db
+from app.core.database import get_async_db
+from app.core.paginacao import ParametrosPaginacao, paginar
 from app.core.security import get_current_user
 from app.models.animal import Animal
 from app.models.crescimento import HistoricoCrescimento
@@ -15,8 +16,10 @@ from app.schemas.crescimento import (
     CrescimentoUpdate,
     EstatisticasCrescimento,
 )
+from app.services.batch_resolver import BatchResolver
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql import desc, func
 
 router = APIRouter(prefix="/api/crescimento", tags=["Crescimento"])
@@ -27,25 +30,23 @@ router = APIRouter(prefix="/api/crescimento", tags=["Crescimento"])
 )
 async def create_crescimento(
     crescimento: CrescimentoCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     # Verificar se animal existe
-    animal = db.query(Animal).filter(Animal.ID == crescimento.ID_ANIMAL).first()
+    animal = await db.scalar(select(Animal).filter(Animal.ID == crescimento.ID_ANIMAL))
     if not animal:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Animal não encontrado"
         )
 
     # Verificar se já existe medição para a mesma data
-    existing = (
-        db.query(HistoricoCrescimento)
-        .filter(
+    existing = await db.scalar(
+        select(HistoricoCrescimento).filter(
             HistoricoCrescimento.ID_ANIMAL == crescimento.ID_ANIMAL,
             func.trunc(HistoricoCrescimento.DATA_MEDICAO)
             == crescimento.DATA_MEDICAO.date(),
         )
-        .first()
     )
 
     if existing:
@@ -62,23 +63,24 @@ async def create_crescimento(
     if crescimento.PESO:
         animal.PESO_ATUAL = crescimento.PESO
 
-    db.commit()
-    db.refresh(db_crescimento)
+    await db.commit()
+    await db.refresh(db_crescimento)
 
     return await _enrich_crescimento_response(db_crescimento, db)
 
 
 @router.get("/", response_model=dict)
 async def list_crescimentos(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
     animal_id: Optional[int] = Query(None, description="Filtrar por animal"),
     data_inicio: Optional[str] = Query(None, description="Data início (YYYY-MM-DD)"),
     data_fim: Optional[str] = Query(None, description="Data fim (YYYY-MM-DD)"),
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=100),
+    paginacao: ParametrosPaginacao = Depends(),
 ):
-    query = db.query(HistoricoCrescimento).join(Animal)
+    query = select(HistoricoCrescimento).join(Animal)
 
     if animal_id:
         query = query.filter(HistoricoCrescimento.ID_ANIMAL == animal_id)
@@ -91,37 +93,41 @@ async def list_crescimentos(
             HistoricoCrescimento.DATA_MEDICAO <= datetime.fromisoformat(data_fim)
         )
 
-    total = query.count()
-    offset = (page - 1) * limit
-    registros = (
-        query.order_by(desc(HistoricoCrescimento.DATA_MEDICAO))
-        .offset(offset)
-        .limit(limit)
-        .all()
+    pagina = await paginar(
+        db,
+        query,
+        [(HistoricoCrescimento.DATA_MEDICAO, True)],
+        HistoricoCrescimento.ID,
+        page,
+        limit,
+        paginacao,
     )
+    registros = pagina.itens
 
-    # Enriquecer com dados calculados
-    enriched_registros = []
-    for registro in registros:
-        enriched = await _enrich_crescimento_response(registro, db)
-        enriched_registros.append(enriched)
+    # Enriquecer com dados calculados (animais e medições anteriores em lote)
+    resolver = BatchResolver(db)
+    await resolver.carregar(Animal, [r.ID_ANIMAL for r in registros])
+    anteriores = await _buscar_medicoes_anteriores(registros, db)
+
+    enriched_registros = [
+        await _enrich_crescimento_response(registro, db, resolver, anteriores)
+        for registro in registros
+    ]
 
     return {
         "registros": enriched_registros,
-        "total": total,
-        "page": page,
-        "limit": limit,
+        **pagina.metadados(page, limit),
     }
 
 
 @router.get("/{id}", response_model=CrescimentoResponse)
 async def get_crescimento(
     id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    registro = (
-        db.query(HistoricoCrescimento).filter(HistoricoCrescimento.ID == id).first()
+    registro = await db.scalar(
+        select(HistoricoCrescimento).filter(HistoricoCrescimento.ID == id)
     )
     if not registro:
         raise HTTPException(
@@ -135,11 +141,11 @@ async def get_crescimento(
 async def update_crescimento(
     id: int,
     crescimento: CrescimentoUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    db_crescimento = (
-        db.query(HistoricoCrescimento).filter(HistoricoCrescimento.ID == id).first()
+    db_crescimento = await db.scalar(
+        select(HistoricoCrescimento).filter(HistoricoCrescimento.ID == id)
     )
     if not db_crescimento:
         raise HTTPException(
@@ -151,15 +157,13 @@ async def update_crescimento(
         crescimento.DATA_MEDICAO
         and crescimento.DATA_MEDICAO != db_crescimento.DATA_MEDICAO
     ):
-        existing = (
-            db.query(HistoricoCrescimento)
-            .filter(
+        existing = await db.scalar(
+            select(HistoricoCrescimento).filter(
                 HistoricoCrescimento.ID_ANIMAL == db_crescimento.ID_ANIMAL,
                 func.trunc(HistoricoCrescimento.DATA_MEDICAO)
                 == crescimento.DATA_MEDICAO.date(),
                 HistoricoCrescimento.ID != id,
             )
-            .first()
         )
 
         if existing:
@@ -173,40 +177,42 @@ async def update_crescimento(
 
     # Atualizar peso atual do animal se alterou
     if crescimento.PESO:
-        animal = db.query(Animal).filter(Animal.ID == db_crescimento.ID_ANIMAL).first()
+        animal = await db.scalar(
+            select(Animal).filter(Animal.ID == db_crescimento.ID_ANIMAL)
+        )
         if animal:
             # Verificar se esta é a medição mais recente
-            ultima_medicao = (
-                db.query(HistoricoCrescimento)
+            ultima_medicao = await db.scalar(
+                select(HistoricoCrescimento)
                 .filter(HistoricoCrescimento.ID_ANIMAL == db_crescimento.ID_ANIMAL)
                 .order_by(desc(HistoricoCrescimento.DATA_MEDICAO))
-                .first()
+                .limit(1)
             )
 
             if ultima_medicao and ultima_medicao.ID == id:
                 animal.PESO_ATUAL = crescimento.PESO
 
-    db.commit()
-    db.refresh(db_crescimento)
+    await db.commit()
+    await db.refresh(db_crescimento)
     return await _enrich_crescimento_response(db_crescimento, db)
 
 
 @router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_crescimento(
     id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    db_crescimento = (
-        db.query(HistoricoCrescimento).filter(HistoricoCrescimento.ID == id).first()
+    db_crescimento = await db.scalar(
+        select(HistoricoCrescimento).filter(HistoricoCrescimento.ID == id)
     )
     if not db_crescimento:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Registro não encontrado"
         )
 
-    db.delete(db_crescimento)
-    db.commit()
+    await db.delete(db_crescimento)
+    await db.commit()
 
 
 # === RELATÓRIOS E ESTATÍSTICAS ===
@@ -215,23 +221,31 @@ async def delete_crescimento(
 @router.get("/animal/{animal_id}/historico", response_model=List[CrescimentoDetalhado])
 async def get_historico_animal(
     animal_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Histórico detalhado de crescimento de um animal com variações"""
     # Verificar se animal existe
-    animal = db.query(Animal).filter(Animal.ID == animal_id).first()
+    animal = await db.scalar(select(Animal).filter(Animal.ID == animal_id))
     if not animal:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Animal não encontrado"
         )
 
     medicoes = (
-        db.query(HistoricoCrescimento)
-        .filter(HistoricoCrescimento.ID_ANIMAL == animal_id)
-        .order_by(HistoricoCrescimento.DATA_MEDICAO)
-        .all()
-    )
+        await db.scalars(
+            select(HistoricoCrescimento)
+            .filter(HistoricoCrescimento.ID_ANIMAL == animal_id)
+            .order_by(HistoricoCrescimento.DATA_MEDICAO)
+        )
+    ).all()
+
+    # Medições já vêm ordenadas: a anterior de cada uma é a da posição i - 1
+    resolver = BatchResolver(db)
+    resolver.registrar(animal)
+    anteriores = {
+        medicao.ID: medicoes[i - 1] for i, medicao in enumerate(medicoes) if i > 0
+    }
 
     historico = []
     for i, medicao in enumerate(medicoes):
@@ -258,7 +272,9 @@ async def get_historico_animal(
                 taxa_crescimento_dia = variacao_peso / dias_crescimento
 
         # Enriquecer medição
-        medicao_enriquecida = await _enrich_crescimento_response(medicao, db)
+        medicao_enriquecida = await _enrich_crescimento_response(
+            medicao, db, resolver, anteriores
+        )
 
         historico.append(
             CrescimentoDetalhado(
@@ -275,7 +291,7 @@ async def get_historico_animal(
 
 @router.get("/estatisticas/geral", response_model=List[EstatisticasCrescimento])
 async def get_estatisticas_gerais(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
     meses_periodo: int = Query(12, description="Período em meses para análise"),
 ):
@@ -284,21 +300,26 @@ async def get_estatisticas_gerais(
 
     # Buscar animais com medições
     animais_com_medicoes = (
-        db.query(Animal.ID, Animal.NOME).join(HistoricoCrescimento).distinct().all()
-    )
+        await db.execute(
+            select(Animal.ID, Animal.NOME).join(HistoricoCrescimento).distinct()
+        )
+    ).all()
+
+    # Medições do período de todos os animais em uma única query
+    medicoes_periodo = (
+        await db.scalars(
+            select(HistoricoCrescimento)
+            .filter(HistoricoCrescimento.DATA_MEDICAO >= data_limite)
+            .order_by(HistoricoCrescimento.ID_ANIMAL, HistoricoCrescimento.DATA_MEDICAO)
+        )
+    ).all()
+    medicoes_por_animal = {}
+    for medicao in medicoes_periodo:
+        medicoes_por_animal.setdefault(medicao.ID_ANIMAL, []).append(medicao)
 
     estatisticas = []
     for animal_id, animal_nome in animais_com_medicoes:
-        # Buscar medições do animal no período
-        medicoes = (
-            db.query(HistoricoCrescimento)
-            .filter(
-                HistoricoCrescimento.ID_ANIMAL == animal_id,
-                HistoricoCrescimento.DATA_MEDICAO >= data_limite,
-            )
-            .order_by(HistoricoCrescimento.DATA_MEDICAO)
-            .all()
-        )
+        medicoes = medicoes_por_animal.get(animal_id, [])
 
         if not medicoes:
             continue
@@ -344,12 +365,13 @@ async def get_estatisticas_gerais(
 
 @router.get("/comparacao/medidas", response_model=List[ComparacaoMedidas])
 async def get_comparacao_medidas(
-    db: Session = Depends(get_db), current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
 ):
     """Comparação das medidas atuais dos animais"""
     # Subquery para última medição de cada animal
     subq_ultima = (
-        db.query(
+        select(
             HistoricoCrescimento.ID_ANIMAL,
             func.max(HistoricoCrescimento.DATA_MEDICAO).label("ultima_data"),
         )
@@ -359,21 +381,22 @@ async def get_comparacao_medidas(
 
     # Query principal
     resultados = (
-        db.query(
-            Animal.ID,
-            Animal.NOME,
-            Animal.DATA_NASCIMENTO,
-            HistoricoCrescimento.PESO,
-            HistoricoCrescimento.ALTURA,
-        )
-        .join(HistoricoCrescimento)
-        .join(
-            subq_ultima,
-            (HistoricoCrescimento.ID_ANIMAL == subq_ultima.c.ID_ANIMAL)
-            & (HistoricoCrescimento.DATA_MEDICAO == subq_ultima.c.ultima_data),
+        await db.execute(
+            select(
+                Animal.ID,
+                Animal.NOME,
+                Animal.DATA_NASCIMENTO,
+                HistoricoCrescimento.PESO,
+                HistoricoCrescimento.ALTURA,
+            )
+            .join(HistoricoCrescimento)
+            .join(
+                subq_ultima,
+                (HistoricoCrescimento.ID_ANIMAL == subq_ultima.c.ID_ANIMAL)
+                & (HistoricoCrescimento.DATA_MEDICAO == subq_ultima.c.ultima_data),
+            )
         )
-        .all()
-    )
+    ).all()
 
     comparacoes = []
     for animal_id, nome, data_nascimento, peso, altura in resultados:
@@ -409,22 +432,64 @@ async def get_comparacao_medidas(
 # === FUNÇÃO AUXILIAR ===
 
 
+async def _buscar_medicoes_anteriores(
+    registros: List[HistoricoCrescimento], db: AsyncSession
+) -> dict:
+    """Medição anterior (PESO, DATA_MEDICAO) de cada registro, via LAG em uma query"""
+    if not registros:
+        return {}
+
+    janela = {
+        "partition_by": HistoricoCrescimento.ID_ANIMAL,
+        "order_by": HistoricoCrescimento.DATA_MEDICAO,
+    }
+    historico = (
+        select(
+            HistoricoCrescimento.ID,
+            func.lag(HistoricoCrescimento.PESO).over(**janela).label("PESO"),
+            func.lag(HistoricoCrescimento.DATA_MEDICAO)
+            .over(**janela)
+            .label("DATA_MEDICAO"),
+        )
+        .filter(HistoricoCrescimento.ID_ANIMAL.in_({r.ID_ANIMAL for r in registros}))
+        .subquery()
+    )
+
+    resultado = (
+        await db.execute(
+            select(historico).filter(
+                historico.c.ID.in_([r.ID for r in registros]),
+                historico.c.DATA_MEDICAO.isnot(None),
+            )
+        )
+    ).all()
+
+    return {row.ID: row for row in resultado}
+
+
 async def _enrich_crescimento_response(
-    crescimento: HistoricoCrescimento, db: Session
+    crescimento: HistoricoCrescimento,
+    db: AsyncSession,
+    resolver: Optional[BatchResolver] = None,
+    anteriores: Optional[dict] = None,
 ) -> CrescimentoResponse:
     """Enriquece resposta com dados calculados"""
-    animal = db.query(Animal).filter(Animal.ID == crescimento.ID_ANIMAL).first()
+    resolver = resolver or BatchResolver(db)
+    animal = await resolver.obter(Animal, crescimento.ID_ANIMAL)
 
     # Buscar medição anterior para calcular ganho
-    medicao_anterior = (
-        db.query(HistoricoCrescimento)
-        .filter(
-            HistoricoCrescimento.ID_ANIMAL == crescimento.ID_ANIMAL,
-            HistoricoCrescimento.DATA_MEDICAO < crescimento.DATA_MEDICAO,
+    if anteriores is not None:
+        medicao_anterior = anteriores.get(crescimento.ID)
+    else:
+        medicao_anterior = await db.scalar(
+            select(HistoricoCrescimento)
+            .filter(
+                HistoricoCrescimento.ID_ANIMAL == crescimento.ID_ANIMAL,
+                HistoricoCrescimento.DATA_MEDICAO < crescimento.DATA_MEDICAO,
+            )
+            .order_by(desc(HistoricoCrescimento.DATA_MEDICAO))
+            .limit(1)
         )
-        .order_by(desc(HistoricoCrescimento.DATA_MEDICAO))
-        .first()
-    )
 
     ganho_peso = None
     dias_desde_ultima = None
@@ -1,11 +1,24 @@
 from datetime import datetime, timedelta
 from typing import List, Optional
 
-from app.core.database import get_db
+from app.core.cache import CacheTTL
+from app.core.config import settings
+from app.core.database import get_async_db
 from app.core.security import get_current_user
 from app.models.animal import Animal
-from app.models.manejo import ProdutoManejo
+from app.models.custos import (
+    CategoriaCustoEnum,
+    CustoCategoriaMensal,
+    CustoProprietarioDiario,
+)
+from app.models.manejo import (
+    AnalisesSolo,
+    ManejoTerrenos,
+    MovimentacaoProdutoManejo,
+    ProdutoManejo,
+)
 from app.models.medicamento import Medicamento, MovimentacaoMedicamento
+from app.models.movimentacao import LocalizacaoAtualAnimal
 from app.models.racao import FornecimentoRacaoAnimal, ProdutoRacao
 from app.models.reproducao import Reproducao
 from app.models.saude import SaudeAnimais
@@ -22,23 +35,64 @@ from app.schemas.dashboard import (
     RelatorioAnimal,
     RelatorioTerreno,
 )
+from app.services.ocupacao import ocupacao_por_terreno
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import func
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, case, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql import desc, text
 
 router = APIRouter(prefix="/api/dashboard", tags=["Dashboard"])
 
+# Resposta do dashboard principal por (data_inicio, data_fim, proprietario).
+# Invalidada por commits nas tabelas abaixo; servida "stale" enquanto recalcula.
+dashboard_cache = CacheTTL(
+    "dashboard",
+    ttl=settings.DASHBOARD_CACHE_TTL,
+    tabelas=[
+        model.__tablename__
+        for model in (
+            Animal,
+            Terreno,
+            SaudeAnimais,
+            Medicamento,
+            MovimentacaoMedicamento,
+            ProdutoRacao,
+            FornecimentoRacaoAnimal,
+            ProdutoManejo,
+            ManejoTerrenos,
+            Reproducao,
+            CustoProprietarioDiario,
+            CustoCategoriaMensal,
+        )
+    ],
+)
+
+_NOMES_MESES = "Jan Fev Mar Abr Mai Jun Jul Ago Set Out Nov Dez".split()
+
 
 @router.get("/", response_model=DashboardResponse)
 async def get_dashboard(
     data_inicio: Optional[str] = Query(None),
     data_fim: Optional[str] = Query(None),
     proprietario: Optional[str] = Query(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Dashboard principal com KPIs, alertas e gráficos"""
+    return await dashboard_cache.obter(
+        (data_inicio, data_fim, proprietario),
+        lambda sessao: _montar_dashboard(sessao, data_inicio, data_fim, proprietario),
+        db,
+    )
+
+
+async def _montar_dashboard(
+    db: AsyncSession,
+    data_inicio: Optional[str],
+    data_fim: Optional[str],
+    proprietario: Optional[str],
+) -> DashboardResponse:
+    """Calcula o DashboardResponse completo (sem cache)"""
 
     # Filtros de data
     if data_inicio:
@@ -52,85 +106,10 @@ async def get_dashboard(
         data_fim_dt = datetime.now()
 
     # === KPIs ===
-    total_animais = (
-        db.query(func.count(Animal.ID)).filter(Animal.STATUS_ANIMAL == "ATIVO").scalar()
-    )
-    total_terrenos = (
-        db.query(func.count(Terreno.ID))
-        .filter(Terreno.STATUS_TERRENO == "DISPONIVEL")
-        .scalar()
-    )
-
-    # Animais em tratamento (com aplicações nos últimos 7 dias)
-    animais_tratamento = (
-        db.query(func.count(func.distinct(SaudeAnimais.ID_ANIMAL)))
-        .filter(
-            SaudeAnimais.PROXIMA_APLICACAO >= datetime.now().date(),
-            SaudeAnimais.PROXIMA_APLICACAO
-            <= (datetime.now() + timedelta(days=7)).date(),
-        )
-        .scalar()
-    )
-
-    # Alertas de estoque baixo
-    alertas_medicamentos = (
-        db.query(func.count(Medicamento.ID))
-        .filter(
-            Medicamento.ATIVO == "S",
-            Medicamento.ESTOQUE_ATUAL <= Medicamento.ESTOQUE_MINIMO,
-        )
-        .scalar()
-    )
-
-    alertas_racao = (
-        db.query(func.count(ProdutoRacao.ID))
-        .filter(
-            ProdutoRacao.ATIVO == "S",
-            ProdutoRacao.ESTOQUE_ATUAL <= ProdutoRacao.ESTOQUE_MINIMO,
-        )
-        .scalar()
-    )
-
-    alertas_manejo = (
-        db.query(func.count(ProdutoManejo.ID))
-        .filter(
-            ProdutoManejo.ATIVO == "S",
-            ProdutoManejo.ESTOQUE_ATUAL <= ProdutoManejo.ESTOQUE_MINIMO,
-        )
-        .scalar()
-    )
-
-    alertas_estoque_total = alertas_medicamentos + alertas_racao + alertas_manejo
-
-    # Próximas aplicações (próximos 7 dias)
-    proximas_aplicacoes = (
-        db.query(func.count(SaudeAnimais.ID))
-        .filter(
-            SaudeAnimais.PROXIMA_APLICACAO.between(
-                datetime.now().date(), (datetime.now() + timedelta(days=7)).date()
-            ),
-        )
-        .scalar()
-    )
-
-    # Gestações ativas
-    gestacoes_ativas = (
-        db.query(func.count(Reproducao.ID))
-        .filter(Reproducao.STATUS_REPRODUCAO == "ATIVO")
-        .scalar()
-    )
-
-    kpis = DashboardKPIs(
-        total_animais=total_animais or 0,
-        total_terrenos=total_terrenos or 0,
-        animais_tratamento=animais_tratamento or 0,
-        alertas_estoque=alertas_estoque_total or 0,
-        proximas_aplicacoes=proximas_aplicacoes or 0,
-        gestacoes_ativas=gestacoes_ativas or 0,
-    )
+    kpis = await _get_kpis(db)
 
     # === ALERTAS DE SAÚDE ===
-    alertas_saude = await _get_alertas_saude(db)
+    alertas_saude = await _get_alertas_saude(db, limit=10)
 
     # === ALERTAS DE ESTOQUE ===
     alertas_estoque = await _get_alertas_estoque(db)
@@ -155,222 +134,565 @@ async def get_dashboard(
     )
 
 
-@router.get("/relatorio-animal/{animal_id}", response_model=RelatorioAnimal)
-async def get_relatorio_animal(
-    animal_id: int,
-    data_inicio: Optional[str] = Query(None),
-    data_fim: Optional[str] = Query(None),
-    db: Session = Depends(get_db),
+@router.get("/alertas-saude", response_model=dict)
+async def list_alertas_saude(
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
+    tipo_registro: Optional[str] = Query(None, description="Filtrar por tipo"),
+    animal_id: Optional[int] = Query(None, description="Filtrar por animal"),
+    page: int = Query(1, ge=1, description="Página"),
+    limit: int = Query(20, ge=1, le=100, description="Itens por página"),
 ):
-    """Relatório detalhado de um animal"""
+    """Listar todos os alertas de saúde, vencidos primeiro"""
+    total = await _contar_alertas_saude(db, tipo_registro, animal_id)
+    offset = (page - 1) * limit
+    alertas = await _get_alertas_saude(
+        db,
+        limit=limit,
+        offset=offset,
+        tipo_registro=tipo_registro,
+        animal_id=animal_id,
+    )
 
-    # Filtros de data
-    data_inicio_dt = None
+    return {
+        "alertas": alertas,
+        "total": total,
+        "page": page,
+        "limit": limit,
+        "total_pages": (total + limit - 1) // limit,
+    }
+
+
+# Limite de animais por chamada do relatório em lote (por IDs)
+MAX_ANIMAIS_RELATORIO = 500
+
+
+def _periodo_relatorio(data_inicio: Optional[str], data_fim: Optional[str]):
+    """Período dos relatórios de animais (padrão: últimos 90 dias)"""
     if data_inicio:
         data_inicio_dt = datetime.strptime(data_inicio, "%Y-%m-%d")
     else:
         data_inicio_dt = datetime.now() - timedelta(days=90)
 
-    data_fim_dt = None
     if data_fim:
         data_fim_dt = datetime.strptime(data_fim, "%Y-%m-%d")
     else:
         data_fim_dt = datetime.now()
 
-    # Buscar animal
-    animal = (
-        db.query(Animal)
-        .filter(Animal.ID == animal_id, Animal.STATUS_ANIMAL == "ATIVO")
-        .first()
-    )
-    if not animal:
-        raise HTTPException(status_code=404, detail="Animal não encontrado")
+    return data_inicio_dt, data_fim_dt
 
-    # Calcular idade
-    idade_anos = None
-    if animal.DATA_NASCIMENTO:
-        idade_anos = (datetime.now().date() - animal.DATA_NASCIMENTO).days // 365
 
-    # Última vacina
-    ultima_vacina = (
-        db.query(SaudeAnimais.DATA_OCORRENCIA)
-        .filter(
-            SaudeAnimais.ID_ANIMAL == animal_id,
-            SaudeAnimais.TIPO_APLICACAO == "VACINA",
-        )
-        .order_by(desc(SaudeAnimais.DATA_OCORRENCIA))
-        .first()
-    )
-
-    # Último vermífugo
-    ultimo_vermifugo = (
-        db.query(SaudeAnimais.DATA_OCORRENCIA)
-        .filter(
-            SaudeAnimais.ID_ANIMAL == animal_id,
-            SaudeAnimais.TIPO_APLICACAO == "VERMIFUGO",
-        )
-        .order_by(desc(SaudeAnimais.DATA_OCORRENCIA))
-        .first()
-    )
-
-    # Tratamentos ativos
-    tratamentos_ativos = (
-        db.query(func.count(SaudeAnimais.ID))
-        .filter(
-            SaudeAnimais.ID_ANIMAL == animal_id,
-            SaudeAnimais.STATUS_TRATAMENTO == "ATIVO",
+async def _relatorios_animais(
+    db: AsyncSession, filtros: list, data_inicio: datetime, data_fim: datetime
+) -> List[RelatorioAnimal]:
+    """
+    Monta o relatório de todos os animais ativos que atendem `filtros` com
+    uma query agrupada por assunto (animais, saúde, custos, reprodução),
+    independente da quantidade de animais.
+    """
+    filtros = [Animal.STATUS_ANIMAL == "ATIVO", *filtros]
+    animais = (
+        await db.scalars(select(Animal).filter(*filtros).order_by(Animal.NOME))
+    ).all()
+    if not animais:
+        return []
+
+    ids_animais = select(Animal.ID).filter(*filtros).scalar_subquery()
+    agora = datetime.now()
+
+    # Saúde: última vacina, último vermífugo e tratamentos em andamento
+    # (tratamento/medicação com próxima aplicação ainda por vir)
+    saude = {
+        row.ID_ANIMAL: row
+        for row in await db.execute(
+            select(
+                SaudeAnimais.ID_ANIMAL,
+                func.max(
+                    case(
+                        (
+                            SaudeAnimais.TIPO_REGISTRO == "VACINA",
+                            SaudeAnimais.DATA_OCORRENCIA,
+                        )
+                    )
+                ).label("ultima_vacina"),
+                func.max(
+                    case(
+                        (
+                            SaudeAnimais.TIPO_REGISTRO == "VERMIFUGO",
+                            SaudeAnimais.DATA_OCORRENCIA,
+                        )
+                    )
+                ).label("ultimo_vermifugo"),
+                func.count(
+                    case(
+                        (
+                            and_(
+                                SaudeAnimais.TIPO_REGISTRO.in_(
+                                    ["TRATAMENTO", "MEDICAMENTO"]
+                                ),
+                                SaudeAnimais.PROXIMA_APLICACAO >= agora,
+                            ),
+                            SaudeAnimais.ID,
+                        )
+                    )
+                ).label("tratamentos_ativos"),
+            )
+            .filter(SaudeAnimais.ID_ANIMAL.in_(ids_animais))
+            .group_by(SaudeAnimais.ID_ANIMAL)
         )
-        .scalar()
-    )
-
-    # Custos no período (placeholder - implementar conforme necessário)
-    custo_medicamentos = (
-        db.query(
-            func.coalesce(
+    }
+
+    # Custos do período, lidos do consolidado diário
+    custos = {
+        row.ID_ANIMAL: row
+        for row in await db.execute(
+            select(
+                CustoProprietarioDiario.ID_ANIMAL,
+                func.sum(
+                    case(
+                        (
+                            CustoProprietarioDiario.CATEGORIA == "MEDICAMENTOS",
+                            CustoProprietarioDiario.VALOR,
+                        ),
+                        else_=0,
+                    )
+                ).label("medicamentos"),
                 func.sum(
-                    MovimentacaoMedicamento.PRECO_UNITARIO
-                    * MovimentacaoMedicamento.QUANTIDADE
+                    case(
+                        (
+                            CustoProprietarioDiario.CATEGORIA == "RACAO",
+                            CustoProprietarioDiario.VALOR,
+                        ),
+                        else_=0,
+                    )
+                ).label("racao"),
+            )
+            .filter(
+                CustoProprietarioDiario.ID_ANIMAL.in_(ids_animais),
+                CustoProprietarioDiario.DATA_REFERENCIA.between(
+                    data_inicio.date(), data_fim.date()
                 ),
-                0,
             )
+            .group_by(CustoProprietarioDiario.ID_ANIMAL)
         )
-        .join(
-            SaudeAnimais,
-            MovimentacaoMedicamento.ID_MEDICAMENTO == SaudeAnimais.ID_MEDICAMENTO,
-        )
-        .filter(
-            SaudeAnimais.ID_ANIMAL == animal_id,
-            SaudeAnimais.DATA_OCORRENCIA.between(data_inicio_dt, data_fim_dt),
+    }
+
+    # Reprodução: status do registro mais recente e última cobertura ativa
+    ultimos = (
+        select(
+            Reproducao.ID_EGUA,
+            Reproducao.STATUS_REPRODUCAO,
+            func.row_number()
+            .over(
+                partition_by=Reproducao.ID_EGUA,
+                order_by=desc(Reproducao.DATA_REGISTRO),
+            )
+            .label("ordem"),
+            func.max(
+                case(
+                    (
+                        Reproducao.STATUS_REPRODUCAO == "ATIVO",
+                        Reproducao.DATA_COBERTURA,
+                    )
+                )
+            )
+            .over(partition_by=Reproducao.ID_EGUA)
+            .label("ultima_cobertura"),
         )
-        .scalar()
-        or 0.0
+        .filter(Reproducao.ID_EGUA.in_(ids_animais))
+        .subquery()
     )
+    reproducao = {
+        row.ID_EGUA: row
+        for row in await db.execute(
+            select(
+                ultimos.c.ID_EGUA,
+                ultimos.c.STATUS_REPRODUCAO,
+                ultimos.c.ultima_cobertura,
+            ).filter(ultimos.c.ordem == 1)
+        )
+    }
 
-    custo_racao = (
-        db.query(
-            func.coalesce(
-                func.sum(
-                    FornecimentoRacaoAnimal.QUANTIDADE
-                    * FornecimentoRacaoAnimal.PRECO_UNITARIO
+    relatorios = []
+    for animal in animais:
+        # Calcular idade
+        idade_anos = None
+        if animal.DATA_NASCIMENTO:
+            idade_anos = (datetime.now() - animal.DATA_NASCIMENTO).days // 365
+
+        saude_animal = saude.get(animal.ID)
+        custo_animal = custos.get(animal.ID)
+        reproducao_animal = reproducao.get(animal.ID)
+
+        custo_medicamentos = (
+            float(custo_animal.medicamentos or 0) if custo_animal else 0.0
+        )
+        custo_racao = float(custo_animal.racao or 0) if custo_animal else 0.0
+        status_reproducao = (
+            reproducao_animal.STATUS_REPRODUCAO if reproducao_animal else None
+        )
+
+        relatorios.append(
+            RelatorioAnimal(
+                animal_id=animal.ID,
+                animal_nome=animal.NOME,
+                raca="",  # Cadastro de animais não possui raça
+                proprietario=animal.PROPRIETARIO or "",
+                data_nascimento=animal.DATA_NASCIMENTO,
+                idade_anos=idade_anos,
+                ultima_vacina=saude_animal.ultima_vacina if saude_animal else None,
+                ultimo_vermifugo=(
+                    saude_animal.ultimo_vermifugo if saude_animal else None
+                ),
+                tratamentos_ativos=(
+                    saude_animal.tratamentos_ativos if saude_animal else 0
+                ),
+                custo_medicamentos=round(custo_medicamentos, 2),
+                custo_racao=round(custo_racao, 2),
+                custo_total=round(custo_medicamentos + custo_racao, 2),
+                status_reproducao=(
+                    getattr(status_reproducao, "value", status_reproducao)
+                ),
+                data_ultima_cobertura=(
+                    reproducao_animal.ultima_cobertura if reproducao_animal else None
                 ),
-                0,
             )
         )
-        .filter(
-            FornecimentoRacaoAnimal.ID_ANIMAL == animal_id,
-            FornecimentoRacaoAnimal.DATA_FORNECIMENTO.between(
-                data_inicio_dt, data_fim_dt
-            ),
-            FornecimentoRacaoAnimal.STATUS_ANIMAL == "ATIVO",
-        )
-        .scalar()
-        or 0.0
+
+    return relatorios
+
+
+@router.get("/relatorio-animal/{animal_id}", response_model=RelatorioAnimal)
+async def get_relatorio_animal(
+    animal_id: int,
+    data_inicio: Optional[str] = Query(None),
+    data_fim: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Relatório detalhado de um animal"""
+    data_inicio_dt, data_fim_dt = _periodo_relatorio(data_inicio, data_fim)
+
+    relatorios = await _relatorios_animais(
+        db, [Animal.ID == animal_id], data_inicio_dt, data_fim_dt
     )
+    if not relatorios:
+        raise HTTPException(status_code=404, detail="Animal não encontrado")
 
-    # Status reprodução
-    status_reproducao = (
-        db.query(Reproducao.STATUS_REPRODUCAO)
-        .filter(
-            Reproducao.ID_EGUA == animal_id,
+    return relatorios[0]
+
+
+@router.get("/relatorio-animais", response_model=List[RelatorioAnimal])
+async def get_relatorio_animais(
+    animal_ids: Optional[List[int]] = Query(None, description="IDs dos animais"),
+    proprietario: Optional[str] = Query(None, description="Todos do proprietário"),
+    data_inicio: Optional[str] = Query(None),
+    data_fim: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Relatório de vários animais (por IDs e/ou proprietário) em lote"""
+    if not animal_ids and not proprietario:
+        raise HTTPException(
+            status_code=400, detail="Informe animal_ids ou proprietario"
         )
-        .order_by(desc(Reproducao.DATA_REGISTRO))
-        .first()
+    if animal_ids and len(animal_ids) > MAX_ANIMAIS_RELATORIO:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Máximo de {MAX_ANIMAIS_RELATORIO} animais por relatório",
+        )
+
+    data_inicio_dt, data_fim_dt = _periodo_relatorio(data_inicio, data_fim)
+
+    filtros = []
+    if animal_ids:
+        filtros.append(Animal.ID.in_(set(animal_ids)))
+    if proprietario:
+        filtros.append(Animal.PROPRIETARIO == proprietario)
+
+    return await _relatorios_animais(db, filtros, data_inicio_dt, data_fim_dt)
+
+
+async def _relatorios_terrenos(
+    db: AsyncSession, filtros: list
+) -> List[RelatorioTerreno]:
+    """
+    Monta o relatório dos terrenos que atendem `filtros` com quatro queries
+    agrupadas (terrenos, ocupação, manejo e análises de solo), independente
+    da quantidade de terrenos.
+    """
+    terrenos = (
+        await db.scalars(select(Terreno).filter(*filtros).order_by(Terreno.NOME))
+    ).all()
+    if not terrenos:
+        return []
+
+    ids_terrenos = select(Terreno.ID).filter(*filtros).scalar_subquery()
+
+    # Ocupação: animais ativos cuja localização atual é o terreno
+    ocupacao = dict(
+        (
+            await db.execute(
+                ocupacao_por_terreno(
+                    LocalizacaoAtualAnimal.ID_TERRENO.in_(ids_terrenos)
+                )
+            )
+        ).all()
     )
 
-    # Última cobertura
-    data_ultima_cobertura = (
-        db.query(Reproducao.DATA_COBERTURA)
+    # Manejo: custo informado na aplicação ou, na falta dele, o valor da
+    # saída de estoque vinculada (MOVIMENTACAO_PRODUTOS_MANEJO)
+    saidas = (
+        select(
+            MovimentacaoProdutoManejo.ID_MANEJO_TERRENO,
+            func.sum(
+                MovimentacaoProdutoManejo.QUANTIDADE
+                * MovimentacaoProdutoManejo.PRECO_UNITARIO
+            ).label("valor"),
+        )
         .filter(
-            Reproducao.ID_EGUA == animal_id, Reproducao.STATUS_REPRODUCAO == "ATIVO"
+            MovimentacaoProdutoManejo.TIPO_MOVIMENTACAO == "SAIDA",
+            MovimentacaoProdutoManejo.ID_TERRENO.in_(ids_terrenos),
         )
-        .order_by(desc(Reproducao.DATA_COBERTURA))
-        .first()
+        .group_by(MovimentacaoProdutoManejo.ID_MANEJO_TERRENO)
+        .subquery()
     )
-
-    return RelatorioAnimal(
-        animal_id=animal.ID,
-        animal_nome=animal.NOME,
-        raca=animal.RACA or "",
-        proprietario=animal.PROPRIETARIO or "",
-        data_nascimento=animal.DATA_NASCIMENTO,
-        idade_anos=idade_anos,
-        ultima_vacina=ultima_vacina[0] if ultima_vacina else None,
-        ultimo_vermifugo=ultimo_vermifugo[0] if ultimo_vermifugo else None,
-        tratamentos_ativos=tratamentos_ativos or 0,
-        custo_medicamentos=custo_medicamentos,
-        custo_racao=custo_racao,
-        custo_total=custo_medicamentos + custo_racao,
-        status_reproducao=status_reproducao[0] if status_reproducao else None,
-        data_ultima_cobertura=(
-            data_ultima_cobertura[0] if data_ultima_cobertura else None
+    custo_aplicacao = func.coalesce(
+        ManejoTerrenos.CUSTO_TOTAL,
+        case(
+            (
+                or_(
+                    ManejoTerrenos.CUSTO_PRODUTO.isnot(None),
+                    ManejoTerrenos.CUSTO_APLICACAO.isnot(None),
+                ),
+                func.coalesce(ManejoTerrenos.CUSTO_PRODUTO, 0)
+                + func.coalesce(ManejoTerrenos.CUSTO_APLICACAO, 0),
+            )
         ),
+        saidas.c.valor,
+        0,
     )
+    manejo = {
+        row.ID_TERRENO: row
+        for row in await db.execute(
+            select(
+                ManejoTerrenos.ID_TERRENO,
+                func.max(ManejoTerrenos.DATA_APLICACAO).label("ultima_aplicacao"),
+                func.count(func.distinct(ManejoTerrenos.ID_PRODUTO)).label(
+                    "produtos_aplicados"
+                ),
+                func.sum(custo_aplicacao).label("custo_manejo"),
+            )
+            .outerjoin(saidas, saidas.c.ID_MANEJO_TERRENO == ManejoTerrenos.ID)
+            .filter(ManejoTerrenos.ID_TERRENO.in_(ids_terrenos))
+            .group_by(ManejoTerrenos.ID_TERRENO)
+        )
+    }
+
+    # Solo: última coleta e pH (em água) médio das análises
+    solo = {
+        row.ID_TERRENO: row
+        for row in await db.execute(
+            select(
+                AnalisesSolo.ID_TERRENO,
+                func.max(AnalisesSolo.DATA_COLETA).label("ultima_analise"),
+                func.avg(AnalisesSolo.PH_AGUA).label("ph_medio"),
+            )
+            .filter(AnalisesSolo.ID_TERRENO.in_(ids_terrenos))
+            .group_by(AnalisesSolo.ID_TERRENO)
+        )
+    }
+
+    relatorios = []
+    for terreno in terrenos:
+        animais_atuais = ocupacao.get(terreno.ID, 0)
+        manejo_terreno = manejo.get(terreno.ID)
+        solo_terreno = solo.get(terreno.ID)
+
+        # Taxa de ocupação
+        taxa_ocupacao = None
+        if terreno.CAPACIDADE_ANIMAIS and terreno.CAPACIDADE_ANIMAIS > 0:
+            taxa_ocupacao = (animais_atuais / terreno.CAPACIDADE_ANIMAIS) * 100
+
+        ph_medio = solo_terreno.ph_medio if solo_terreno else None
+
+        relatorios.append(
+            RelatorioTerreno(
+                terreno_id=terreno.ID,
+                terreno_nome=terreno.NOME,
+                area_hectares=terreno.AREA_HECTARES or 0,
+                tipo_uso=terreno.TIPO_PASTAGEM or "",
+                animais_atuais=animais_atuais,
+                capacidade_maxima=terreno.CAPACIDADE_ANIMAIS,
+                taxa_ocupacao=taxa_ocupacao,
+                ultima_aplicacao=(
+                    manejo_terreno.ultima_aplicacao if manejo_terreno else None
+                ),
+                produtos_aplicados=(
+                    manejo_terreno.produtos_aplicados if manejo_terreno else 0
+                ),
+                custo_manejo=(
+                    round(float(manejo_terreno.custo_manejo or 0), 2)
+                    if manejo_terreno
+                    else 0.0
+                ),
+                ultima_analise=solo_terreno.ultima_analise if solo_terreno else None,
+                ph_medio=round(float(ph_medio), 2) if ph_medio is not None else None,
+            )
+        )
+
+    return relatorios
 
 
 @router.get("/relatorio-terreno/{terreno_id}", response_model=RelatorioTerreno)
 async def get_relatorio_terreno(
     terreno_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Relatório detalhado de um terreno"""
-
-    # Buscar terreno
-    terreno = (
-        db.query(Terreno).filter(Terreno.ID == terreno_id, Terreno.ATIVO == "S").first()
-    )
-    if not terreno:
+    relatorios = await _relatorios_terrenos(db, [Terreno.ID == terreno_id])
+    if not relatorios:
         raise HTTPException(status_code=404, detail="Terreno não encontrado")
 
-    # Animais atuais
-    animais_atuais = (
-        db.query(func.count(Animal.ID))
-        .filter(Animal.ID_TERRENO_ATUAL == terreno_id, Animal.STATUS_ANIMAL == "ATIVO")
-        .scalar()
+    return relatorios[0]
+
+
+@router.get("/relatorio-terrenos", response_model=List[RelatorioTerreno])
+async def get_relatorio_terrenos(
+    status: Optional[str] = Query(None, description="Filtrar por status"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Relatório de todos os terrenos em uma chamada (visão de mapa)"""
+    filtros = []
+    if status:
+        filtros.append(Terreno.STATUS_TERRENO == status)
+
+    return await _relatorios_terrenos(db, filtros)
+
+
+# === FUNÇÕES AUXILIARES ===
+
+
+def _kpis_query():
+    """SELECT único (FROM DUAL) com uma subquery escalar por KPI"""
+    hoje = datetime.now().date()
+    em_7_dias = (datetime.now() + timedelta(days=7)).date()
+
+    def _contagem(coluna, *filtros):
+        return select(func.count(coluna)).filter(*filtros).scalar_subquery()
+
+    return select(
+        _contagem(Animal.ID, Animal.STATUS_ANIMAL == "ATIVO").label("total_animais"),
+        _contagem(Terreno.ID, Terreno.STATUS_TERRENO == "DISPONIVEL").label(
+            "total_terrenos"
+        ),
+        # Animais em tratamento (com aplicações nos próximos 7 dias)
+        _contagem(
+            func.distinct(SaudeAnimais.ID_ANIMAL),
+            SaudeAnimais.PROXIMA_APLICACAO >= hoje,
+            SaudeAnimais.PROXIMA_APLICACAO <= em_7_dias,
+        ).label("animais_tratamento"),
+        # Alertas de estoque baixo
+        _contagem(
+            Medicamento.ID,
+            Medicamento.ATIVO == "S",
+            Medicamento.ESTOQUE_ATUAL <= Medicamento.ESTOQUE_MINIMO,
+        ).label("alertas_medicamentos"),
+        _contagem(
+            ProdutoRacao.ID,
+            ProdutoRacao.ATIVO == "S",
+            ProdutoRacao.ESTOQUE_ATUAL <= ProdutoRacao.ESTOQUE_MINIMO,
+        ).label("alertas_racao"),
+        _contagem(
+            ProdutoManejo.ID,
+            ProdutoManejo.ATIVO == "S",
+            ProdutoManejo.ESTOQUE_ATUAL <= ProdutoManejo.ESTOQUE_MINIMO,
+        ).label("alertas_manejo"),
+        # Próximas aplicações (próximos 7 dias)
+        _contagem(
+            SaudeAnimais.ID, SaudeAnimais.PROXIMA_APLICACAO.between(hoje, em_7_dias)
+        ).label("proximas_aplicacoes"),
+        # Gestações ativas
+        _contagem(Reproducao.ID, Reproducao.STATUS_REPRODUCAO == "ATIVO").label(
+            "gestacoes_ativas"
+        ),
     )
 
-    # Taxa de ocupação
-    taxa_ocupacao = None
-    if terreno.CAPACIDADE_ANIMAIS and terreno.CAPACIDADE_ANIMAIS > 0:
-        taxa_ocupacao = (animais_atuais / terreno.CAPACIDADE_ANIMAIS) * 100
-
-    return RelatorioTerreno(
-        terreno_id=terreno.ID,
-        terreno_nome=terreno.NOME,
-        area_hectares=terreno.AREA_HECTARES or 0,
-        tipo_uso=terreno.TIPO_USO or "",
-        animais_atuais=animais_atuais or 0,
-        capacidade_maxima=terreno.CAPACIDADE_ANIMAIS,
-        taxa_ocupacao=taxa_ocupacao,
-        ultima_aplicacao=None,  # Implementar se necessário
-        produtos_aplicados=0,  # Implementar se necessário
-        custo_manejo=0.0,  # Implementar se necessário
-        ultima_analise=None,  # Implementar se necessário
-        ph_medio=None,  # Implementar se necessário
+
+async def _get_kpis(db: AsyncSession) -> DashboardKPIs:
+    """KPIs do dashboard calculados em uma única ida ao banco"""
+    row = (await db.execute(_kpis_query())).one()
+
+    return DashboardKPIs(
+        total_animais=row.total_animais or 0,
+        total_terrenos=row.total_terrenos or 0,
+        animais_tratamento=row.animais_tratamento or 0,
+        alertas_estoque=(row.alertas_medicamentos or 0)
+        + (row.alertas_racao or 0)
+        + (row.alertas_manejo or 0),
+        proximas_aplicacoes=row.proximas_aplicacoes or 0,
+        gestacoes_ativas=row.gestacoes_ativas or 0,
     )
 
 
-# === FUNÇÕES AUXILIARES ===
+# Último agendamento (PROXIMA_APLICACAO) por animal e tipo de registro que
+# vence em até 7 dias; agendamentos substituídos por registros mais novos
+# do mesmo tipo não geram alerta.
+_ALERTAS_SAUDE_FROM = """
+    FROM ANIMAIS a
+    JOIN SAUDE_ANIMAIS s ON a.ID = s.ID_ANIMAL
+    WHERE s.PROXIMA_APLICACAO <= SYSDATE + 7
+    AND a.STATUS_ANIMAL = 'ATIVO'
+    AND (:tipo_registro IS NULL OR s.TIPO_REGISTRO = :tipo_registro)
+    AND (:animal_id IS NULL OR a.ID = :animal_id)
+    AND NOT EXISTS (
+        SELECT 1
+        FROM SAUDE_ANIMAIS r
+        WHERE r.ID_ANIMAL = s.ID_ANIMAL
+        AND r.TIPO_REGISTRO = s.TIPO_REGISTRO
+        AND r.PROXIMA_APLICACAO IS NOT NULL
+        AND (
+            r.DATA_OCORRENCIA > s.DATA_OCORRENCIA
+            OR (r.DATA_OCORRENCIA = s.DATA_OCORRENCIA AND r.ID > s.ID)
+        )
+    )
+"""
 
 
-async def _get_alertas_saude(db: Session) -> List[AlertaSaude]:
-    """Buscar alertas de saúde"""
+async def _get_alertas_saude(
+    db: AsyncSession,
+    limit: int = 10,
+    offset: int = 0,
+    tipo_registro: Optional[str] = None,
+    animal_id: Optional[int] = None,
+) -> List[AlertaSaude]:
+    """Buscar alertas de saúde (vencidos primeiro, do maior atraso ao menor)"""
     alertas = []
 
-    # Vacinas vencidas ou próximas do vencimento
+    # Ordenar pela data de vencimento coloca os mais atrasados primeiro e os
+    # próximos do vencimento depois; o limite é aplicado no banco
     query = text(
-        """
-        SELECT a.ID, a.NOME, s.PROXIMA_APLICACAO, s.TIPO_REGISTRO
-        FROM ANIMAIS a
-        JOIN SAUDE_ANIMAIS s ON a.ID = s.ID_ANIMAL
-        WHERE s.PROXIMA_APLICACAO <= SYSDATE + 7
-        AND a.STATUS_ANIMAL = 'ATIVO'
-        ORDER BY s.PROXIMA_APLICACAO
+        "SELECT a.ID, a.NOME, s.PROXIMA_APLICACAO, s.TIPO_REGISTRO"
+        + _ALERTAS_SAUDE_FROM
+        + """
+        ORDER BY s.PROXIMA_APLICACAO, a.ID, s.ID
+        OFFSET :offset ROWS FETCH NEXT :limit ROWS ONLY
     """
     )
 
-    resultado = db.execute(query).fetchall()
+    resultado = (
+        await db.execute(
+            query,
+            {
+                "tipo_registro": tipo_registro,
+                "animal_id": animal_id,
+                "offset": offset,
+                "limit": limit,
+            },
+        )
+    ).fetchall()
 
     for row in resultado:
         dias_atraso = (datetime.now().date() - row[2].date()).days if row[2] else 0
@@ -391,22 +713,34 @@ async def _get_alertas_saude(db: Session) -> List[AlertaSaude]:
             )
         )
 
-    return alertas[:10]  # Limitar a 10 alertas
+    return alertas
+
+
+async def _contar_alertas_saude(
+    db: AsyncSession,
+    tipo_registro: Optional[str] = None,
+    animal_id: Optional[int] = None,
+) -> int:
+    """Total de alertas de saúde (para paginação)"""
+    query = text("SELECT COUNT(*)" + _ALERTAS_SAUDE_FROM)
+    return await db.scalar(
+        query, {"tipo_registro": tipo_registro, "animal_id": animal_id}
+    )
 
 
-async def _get_alertas_estoque(db: Session) -> List[AlertaEstoque]:
+async def _get_alertas_estoque(db: AsyncSession) -> List[AlertaEstoque]:
     """Buscar alertas de estoque baixo"""
     alertas = []
 
     # Medicamentos
     medicamentos = (
-        db.query(Medicamento)
-        .filter(
-            Medicamento.ATIVO == "S",
-            Medicamento.ESTOQUE_ATUAL <= Medicamento.ESTOQUE_MINIMO,
+        await db.scalars(
+            select(Medicamento).filter(
+                Medicamento.ATIVO == "S",
+                Medicamento.ESTOQUE_ATUAL <= Medicamento.ESTOQUE_MINIMO,
+            )
         )
-        .all()
-    )
+    ).all()
 
     for med in medicamentos:
         status = "CRITICO" if (med.ESTOQUE_ATUAL or 0) == 0 else "BAIXO"
@@ -424,13 +758,13 @@ async def _get_alertas_estoque(db: Session) -> List[AlertaEstoque]:
 
     # Ração
     racoes = (
-        db.query(ProdutoRacao)
-        .filter(
-            ProdutoRacao.ATIVO == "S",
-            ProdutoRacao.ESTOQUE_ATUAL <= ProdutoRacao.ESTOQUE_MINIMO,
+        await db.scalars(
+            select(ProdutoRacao).filter(
+                ProdutoRacao.ATIVO == "S",
+                ProdutoRacao.ESTOQUE_ATUAL <= ProdutoRacao.ESTOQUE_MINIMO,
+            )
         )
-        .all()
-    )
+    ).all()
 
     for racao in racoes:
         status = "CRITICO" if (racao.ESTOQUE_ATUAL or 0) == 0 else "BAIXO"
@@ -450,28 +784,56 @@ async def _get_alertas_estoque(db: Session) -> List[AlertaEstoque]:
 
 
 async def _get_custos_proprietarios(
-    db: Session, data_inicio: datetime, data_fim: datetime, proprietario: Optional[str]
+    db: AsyncSession,
+    data_inicio: datetime,
+    data_fim: datetime,
+    proprietario: Optional[str],
 ) -> List[CustoProprietario]:
-    """Calcular custos por proprietário"""
+    """Calcular custos por proprietário (lidos do consolidado diário)"""
 
-    # Query simplificada - implementar cálculos reais conforme necessário
     query = text(
         """
-        SELECT 
-            a.PROPRIETARIO,
-            COUNT(a.ID) as total_animais,
-            0 as total_medicamentos,
-            0 as total_racao,
-            0 as total_manejo
-        FROM ANIMAIS a
-        WHERE a.STATUS_ANIMAL = 'ATIVO'
-        AND (:proprietario IS NULL OR a.PROPRIETARIO = :proprietario)
-        GROUP BY a.PROPRIETARIO
-        ORDER BY a.PROPRIETARIO
+        WITH animais AS (
+            SELECT a.PROPRIETARIO, COUNT(a.ID) AS total_animais
+            FROM ANIMAIS a
+            WHERE a.STATUS_ANIMAL = 'ATIVO'
+            AND (:proprietario IS NULL OR a.PROPRIETARIO = :proprietario)
+            GROUP BY a.PROPRIETARIO
+        ), custos AS (
+            SELECT c.PROPRIETARIO,
+                SUM(CASE WHEN c.CATEGORIA = 'MEDICAMENTOS' THEN c.VALOR ELSE 0 END)
+                    AS total_medicamentos,
+                SUM(CASE WHEN c.CATEGORIA = 'RACAO' THEN c.VALOR ELSE 0 END)
+                    AS total_racao,
+                SUM(CASE WHEN c.CATEGORIA = 'MANEJO' THEN c.VALOR ELSE 0 END)
+                    AS total_manejo
+            FROM CUSTOS_PROPRIETARIO_DIARIO c
+            WHERE c.DATA_REFERENCIA BETWEEN TRUNC(:data_inicio) AND TRUNC(:data_fim)
+            AND (:proprietario IS NULL OR c.PROPRIETARIO = :proprietario)
+            GROUP BY c.PROPRIETARIO
+        )
+        SELECT
+            COALESCE(an.PROPRIETARIO, cu.PROPRIETARIO) AS proprietario,
+            NVL(an.total_animais, 0) AS total_animais,
+            ROUND(NVL(cu.total_medicamentos, 0), 2) AS total_medicamentos,
+            ROUND(NVL(cu.total_racao, 0), 2) AS total_racao,
+            ROUND(NVL(cu.total_manejo, 0), 2) AS total_manejo
+        FROM animais an
+        FULL OUTER JOIN custos cu ON cu.PROPRIETARIO = an.PROPRIETARIO
+        ORDER BY 1
     """
     )
 
-    resultado = db.execute(query, {"proprietario": proprietario}).fetchall()
+    resultado = (
+        await db.execute(
+            query,
+            {
+                "proprietario": proprietario,
+                "data_inicio": data_inicio,
+                "data_fim": data_fim,
+            },
+        )
+    ).fetchall()
 
     custos = []
     for row in resultado:
@@ -497,28 +859,47 @@ async def _get_custos_proprietarios(
 
 
 async def _get_grafico_custos_mensal(
-    db: Session, data_inicio: datetime, data_fim: datetime
+    db: AsyncSession, data_inicio: datetime, data_fim: datetime
 ) -> GraficoBarras:
-    """Gráfico de custos mensais"""
+    """Gráfico de custos mensais (lido da série CUSTOS_CATEGORIA_MENSAL)"""
 
-    # Dados mock para demonstração
-    labels = ["Jan", "Fev", "Mar", "Abr", "Mai", "Jun"]
+    inicio = data_inicio.date().replace(day=1)
+    fim = data_fim.date().replace(day=1)
+
+    resultado = await db.execute(
+        select(
+            CustoCategoriaMensal.MES,
+            CustoCategoriaMensal.CATEGORIA,
+            CustoCategoriaMensal.VALOR,
+        ).filter(CustoCategoriaMensal.MES.between(inicio, fim))
+    )
+    valores = {
+        (mes.year, mes.month, categoria): valor
+        for mes, categoria, valor in resultado.all()
+    }
+
+    # Todos os meses do período, inclusive os sem lançamentos
+    meses = []
+    ano, mes = inicio.year, inicio.month
+    while (ano, mes) <= (fim.year, fim.month):
+        meses.append((ano, mes))
+        ano, mes = (ano + 1, 1) if mes == 12 else (ano, mes + 1)
+
+    labels = [f"{_NOMES_MESES[mes - 1]}/{ano % 100:02d}" for ano, mes in meses]
     datasets = [
         {
-            "label": "Medicamentos",
-            "data": [1200, 1100, 1300, 1150, 1400, 1250],
-            "backgroundColor": "#42A5F5",
-        },
-        {
-            "label": "Ração",
-            "data": [2800, 2600, 3100, 2900, 3200, 2950],
-            "backgroundColor": "#66BB6A",
-        },
-        {
-            "label": "Manejo",
-            "data": [800, 750, 900, 850, 950, 825],
-            "backgroundColor": "#FFA726",
-        },
+            "label": rotulo,
+            "data": [
+                round(valores.get((ano, mes, categoria.value)) or 0, 2)
+                for ano, mes in meses
+            ],
+            "backgroundColor": cor,
+        }
+        for categoria, rotulo, cor in (
+            (CategoriaCustoEnum.MEDICAMENTOS, "Medicamentos", "#42A5F5"),
+            (CategoriaCustoEnum.RACAO, "Ração", "#66BB6A"),
+            (CategoriaCustoEnum.MANEJO, "Manejo", "#FFA726"),
+        )
     ]
 
     return GraficoBarras(
@@ -526,7 +907,7 @@ async def _get_grafico_custos_mensal(
     )
 
 
-async def _get_grafico_distribuicao_animais(db: Session) -> GraficoPizza:
+async def _get_grafico_distribuicao_animais(db: AsyncSession) -> GraficoPizza:
     """Gráfico de distribuição de animais por proprietário"""
 
     query = text(
@@ -540,7 +921,7 @@ async def _get_grafico_distribuicao_animais(db: Session) -> GraficoPizza:
     """
     )
 
-    resultado = db.execute(query).fetchall()
+    resultado = (await db.execute(query)).fetchall()
 
     labels = [row[0] for row in resultado]
     data = [float(row[1]) for row in resultado]
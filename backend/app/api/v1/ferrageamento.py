@@ -2,7 +2,8 @@
 from datetime import datetime, timedelta
 from typing import List, Optional
 
-from app.core.database import get_db
+from app.core.database import get_async_db
+from app.core.paginacao import ParametrosPaginacao, paginar
 from app.core.security import get_current_user
 from app.models.animal import Animal
 from app.models.ferrageamento import FerrageamentoAnimais  # NOVO MODELO
@@ -18,9 +19,9 @@ from app.schemas.ferrageamento import (
     RelatorioFerrageamento,
     TipoFerrageamentoEnum,
 )
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import asc, desc, extract, func
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import asc, desc, extract, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter(prefix="/api/ferrageamento", tags=["Ferrageamento"])
 
@@ -30,12 +31,12 @@ router = APIRouter(prefix="/api/ferrageamento", tags=["Ferrageamento"])
 )
 async def create_ferrageamento(
     registro: FerrageamentoCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Criar novo registro de ferrageamento/casqueamento"""
     # Verificar se animal existe
-    animal = db.query(Animal).filter(Animal.ID == registro.ID_ANIMAL).first()
+    animal = await db.scalar(select(Animal).filter(Animal.ID == registro.ID_ANIMAL))
     if not animal:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Animal não encontrado"
@@ -76,8 +77,8 @@ async def create_ferrageamento(
     )
 
     db.add(db_registro)
-    db.commit()
-    db.refresh(db_registro)
+    await db.commit()
+    await db.refresh(db_registro)
 
     # Preparar resposta com dados do animal
     response_data = FerrageamentoResponse.model_validate(db_registro)
@@ -88,7 +89,8 @@ async def create_ferrageamento(
 
 @router.get("/", response_model=List[FerrageamentoResponse])
 async def get_ferrageamentos(
-    db: Session = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     animal_id: Optional[int] = Query(None, description="Filtrar por animal"),
     tipo_ferrageamento: Optional[TipoFerrageamentoEnum] = Query(
         None, description="Filtrar por tipo"
@@ -99,14 +101,18 @@ async def get_ferrageamentos(
     ),
     data_inicio: Optional[str] = Query(None, description="Data início (YYYY-MM-DD)"),
     data_fim: Optional[str] = Query(None, description="Data fim (YYYY-MM-DD)"),
-    limit: int = Query(50, le=100),
+    limit: int = Query(50, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(
+        None, description="Cursor da próxima página (ignora offset)"
+    ),
 ):
-    """Listar registros de ferrageamento"""
-    query = (
-        db.query(FerrageamentoAnimais, Animal.NOME)
-        .join(Animal, FerrageamentoAnimais.ID_ANIMAL == Animal.ID)
-        .order_by(desc(FerrageamentoAnimais.DATA_OCORRENCIA))
+    """
+    Listar registros de ferrageamento. O cursor da próxima página, quando
+    houver, vem no header X-Proximo-Cursor.
+    """
+    query = select(FerrageamentoAnimais, Animal.NOME).join(
+        Animal, FerrageamentoAnimais.ID_ANIMAL == Animal.ID
     )
 
     # Aplicar filtros
@@ -153,7 +159,20 @@ async def get_ferrageamentos(
                 detail="Formato de data inválido. Use YYYY-MM-DD",
             ) from e
 
-    registros = query.offset(offset).limit(limit).all()
+    pagina = await paginar(
+        db,
+        query,
+        [(FerrageamentoAnimais.DATA_OCORRENCIA, True)],
+        FerrageamentoAnimais.ID,
+        1,
+        limit,
+        ParametrosPaginacao(cursor=cursor, contar_total=False),
+        escalar=False,
+        offset=offset,
+    )
+    registros = pagina.itens
+    if pagina.proximo_cursor:
+        response.headers["X-Proximo-Cursor"] = pagina.proximo_cursor
 
     # Preparar resposta com nomes dos animais e dias para proxima avaliacao
     result = []
@@ -183,15 +202,16 @@ async def get_ferrageamentos(
 @router.get("/{registro_id}", response_model=FerrageamentoResponse)
 async def get_ferrageamento(
     registro_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Obter registro específico de ferrageamento"""
     registro = (
-        db.query(FerrageamentoAnimais, Animal.NOME)
-        .join(Animal, FerrageamentoAnimais.ID_ANIMAL == Animal.ID)
-        .filter(FerrageamentoAnimais.ID == registro_id)
-        .first()
-    )
+        await db.execute(
+            select(FerrageamentoAnimais, Animal.NOME)
+            .join(Animal, FerrageamentoAnimais.ID_ANIMAL == Animal.ID)
+            .filter(FerrageamentoAnimais.ID == registro_id)
+        )
+    ).first()
 
     if not registro:
         raise HTTPException(
@@ -209,13 +229,11 @@ async def get_ferrageamento(
 async def update_ferrageamento(
     registro_id: int,
     dados: FerrageamentoUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Atualizar registro de ferrageamento"""
-    registro = (
-        db.query(FerrageamentoAnimais)
-        .filter(FerrageamentoAnimais.ID == registro_id)
-        .first()
+    registro = await db.scalar(
+        select(FerrageamentoAnimais).filter(FerrageamentoAnimais.ID == registro_id)
     )
 
     if not registro:
@@ -231,11 +249,11 @@ async def update_ferrageamento(
             else:
                 setattr(registro, campo.upper(), valor)
 
-    db.commit()
-    db.refresh(registro)
+    await db.commit()
+    await db.refresh(registro)
 
     # Buscar nome do animal para resposta
-    animal = db.query(Animal).filter(Animal.ID == registro.ID_ANIMAL).first()
+    animal = await db.scalar(select(Animal).filter(Animal.ID == registro.ID_ANIMAL))
     response_data = FerrageamentoResponse.model_validate(registro)
     response_data.animal_nome = animal.NOME if animal else None
 
@@ -245,13 +263,11 @@ async def update_ferrageamento(
 @router.delete("/{registro_id}")
 async def delete_ferrageamento(
     registro_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Excluir registro de ferrageamento"""
-    registro = (
-        db.query(FerrageamentoAnimais)
-        .filter(FerrageamentoAnimais.ID == registro_id)
-        .first()
+    registro = await db.scalar(
+        select(FerrageamentoAnimais).filter(FerrageamentoAnimais.ID == registro_id)
     )
 
     if not registro:
@@ -259,8 +275,8 @@ async def delete_ferrageamento(
             status_code=status.HTTP_404_NOT_FOUND, detail="Registro não encontrado"
         )
 
-    db.delete(registro)
-    db.commit()
+    await db.delete(registro)
+    await db.commit()
 
     return {"message": "Registro excluído com sucesso"}
 
@@ -272,12 +288,12 @@ async def delete_ferrageamento(
 )
 async def aplicacao_rapida(
     dados: FerrageamentoRapido,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Aplicação rápida para mobile"""
     # Verificar se animal existe
-    animal = db.query(Animal).filter(Animal.ID == dados.ID_ANIMAL).first()
+    animal = await db.scalar(select(Animal).filter(Animal.ID == dados.ID_ANIMAL))
     if not animal:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Animal não encontrado"
@@ -310,8 +326,8 @@ async def aplicacao_rapida(
     )
 
     db.add(db_registro)
-    db.commit()
-    db.refresh(db_registro)
+    await db.commit()
+    await db.refresh(db_registro)
 
     response_data = FerrageamentoResponse.model_validate(db_registro)
     response_data.animal_nome = animal.NOME
@@ -321,14 +337,14 @@ async def aplicacao_rapida(
 
 @router.get("/alertas/vencimentos", response_model=List[AlertaVencimento])
 async def get_alertas_vencimento(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     dias_antecedencia: int = Query(15, description="Dias de antecedência para alerta"),
 ):
     """Obter alertas de vencimento"""
     data_limite = datetime.now() + timedelta(days=dias_antecedencia)
 
     query = (
-        db.query(FerrageamentoAnimais, Animal.NOME)
+        select(FerrageamentoAnimais, Animal.NOME)
         .join(Animal, FerrageamentoAnimais.ID_ANIMAL == Animal.ID)
         .filter(
             FerrageamentoAnimais.PROXIMA_AVALIACAO.isnot(None),
@@ -337,7 +353,7 @@ async def get_alertas_vencimento(
         .order_by(asc(FerrageamentoAnimais.PROXIMA_AVALIACAO))
     )
 
-    registros = query.all()
+    registros = (await db.execute(query)).all()
 
     alertas = []
     for registro, animal_nome in registros:
@@ -362,12 +378,12 @@ async def get_alertas_vencimento(
 
 @router.get("/estatisticas/geral", response_model=EstatisticasFerrageamento)
 async def get_estatisticas_ferrageamento(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     ano: Optional[int] = Query(None, description="Ano para estatísticas"),
     mes: Optional[int] = Query(None, description="Mês para estatísticas"),
 ):
     """Obter estatísticas gerais de ferrageamento"""
-    base_query = db.query(FerrageamentoAnimais)
+    base_query = select(FerrageamentoAnimais)
 
     if ano:
         base_query = base_query.filter(
@@ -379,54 +395,58 @@ async def get_estatisticas_ferrageamento(
         )
 
     # Estatísticas gerais
-    total_registros = base_query.count()
+    total_registros = await db.scalar(
+        select(func.count()).select_from(base_query.subquery())
+    )
 
     # Registros do mês atual
     mes_atual = datetime.now().month
     ano_atual = datetime.now().year
-    registros_mes_atual = (
-        db.query(FerrageamentoAnimais)
+    registros_mes_atual = await db.scalar(
+        select(func.count())
+        .select_from(FerrageamentoAnimais)
         .filter(
             extract("year", FerrageamentoAnimais.DATA_OCORRENCIA) == ano_atual,
             extract("month", FerrageamentoAnimais.DATA_OCORRENCIA) == mes_atual,
         )
-        .count()
     )
 
     # Custo total do mês
     custo_mes = (
-        db.query(func.sum(FerrageamentoAnimais.CUSTO))
-        .filter(
-            extract("year", FerrageamentoAnimais.DATA_OCORRENCIA) == ano_atual,
-            extract("month", FerrageamentoAnimais.DATA_OCORRENCIA) == mes_atual,
+        await db.scalar(
+            select(func.sum(FerrageamentoAnimais.CUSTO)).filter(
+                extract("year", FerrageamentoAnimais.DATA_OCORRENCIA) == ano_atual,
+                extract("month", FerrageamentoAnimais.DATA_OCORRENCIA) == mes_atual,
+            )
         )
-        .scalar()
         or 0
     )
 
     # Ferradores ativos
     ferradores_ativos = (
-        db.query(func.count(func.distinct(FerrageamentoAnimais.FERRADOR_RESPONSAVEL)))
-        .filter(FerrageamentoAnimais.FERRADOR_RESPONSAVEL.isnot(None))
-        .scalar()
+        await db.scalar(
+            select(
+                func.count(func.distinct(FerrageamentoAnimais.FERRADOR_RESPONSAVEL))
+            ).filter(FerrageamentoAnimais.FERRADOR_RESPONSAVEL.isnot(None))
+        )
         or 0
     )
 
     # Próximas avaliações (próximos 30 dias)
     data_limite = datetime.now() + timedelta(days=30)
-    proximas_avaliacoes = (
-        db.query(FerrageamentoAnimais)
+    proximas_avaliacoes = await db.scalar(
+        select(func.count())
+        .select_from(FerrageamentoAnimais)
         .filter(
             FerrageamentoAnimais.PROXIMA_AVALIACAO.between(datetime.now(), data_limite)
         )
-        .count()
     )
 
     # Animais atrasados
-    animais_atrasados = (
-        db.query(FerrageamentoAnimais)
+    animais_atrasados = await db.scalar(
+        select(func.count())
+        .select_from(FerrageamentoAnimais)
         .filter(FerrageamentoAnimais.PROXIMA_AVALIACAO < datetime.now())
-        .count()
     )
 
     # Breakdown por tipo
@@ -438,9 +458,13 @@ async def get_estatisticas_ferrageamento(
     ]
     totals_por_tipo = {}
     for tipo in tipos:
-        total = base_query.filter(
-            FerrageamentoAnimais.TIPO_FERRAGEAMENTO == tipo
-        ).count()
+        total = await db.scalar(
+            select(func.count()).select_from(
+                base_query.filter(
+                    FerrageamentoAnimais.TIPO_FERRAGEAMENTO == tipo
+                ).subquery()
+            )
+        )
         totals_por_tipo[tipo] = total
 
     return EstatisticasFerrageamento(
@@ -459,11 +483,11 @@ async def get_estatisticas_ferrageamento(
 
 @router.get("/relatorios/ferradores", response_model=List[FerradorEstatisticas])
 async def get_relatorio_ferradores(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     ano: Optional[int] = Query(None, description="Ano para relatório"),
 ):
     """Relatório de estatísticas por ferrador"""
-    base_query = db.query(FerrageamentoAnimais).filter(
+    base_query = select(FerrageamentoAnimais).filter(
         FerrageamentoAnimais.FERRADOR_RESPONSAVEL.isnot(None)
     )
 
@@ -474,16 +498,19 @@ async def get_relatorio_ferradores(
 
     # Agrupar por ferrador
     ferradores_stats = (
-        base_query.with_entities(
-            FerrageamentoAnimais.FERRADOR_RESPONSAVEL,
-            func.count(FerrageamentoAnimais.ID).label("total_atendimentos"),
-            func.sum(FerrageamentoAnimais.CUSTO).label("custo_total"),
-            func.max(FerrageamentoAnimais.DATA_OCORRENCIA).label("ultima_atividade"),
+        await db.execute(
+            base_query.with_only_columns(
+                FerrageamentoAnimais.FERRADOR_RESPONSAVEL,
+                func.count(FerrageamentoAnimais.ID).label("total_atendimentos"),
+                func.sum(FerrageamentoAnimais.CUSTO).label("custo_total"),
+                func.max(FerrageamentoAnimais.DATA_OCORRENCIA).label(
+                    "ultima_atividade"
+                ),
+            )
+            .group_by(FerrageamentoAnimais.FERRADOR_RESPONSAVEL)
+            .order_by(desc("total_atendimentos"))
         )
-        .group_by(FerrageamentoAnimais.FERRADOR_RESPONSAVEL)
-        .order_by(desc("total_atendimentos"))
-        .all()
-    )
+    ).all()
 
     resultado = []
     for stats in ferradores_stats:
@@ -500,14 +527,14 @@ async def get_relatorio_ferradores(
 
 @router.get("/relatorios/detalhado", response_model=List[RelatorioFerrageamento])
 async def get_relatorio_detalhado(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     animal_id: Optional[int] = Query(None, description="Filtrar por animal"),
     data_inicio: Optional[str] = Query(None, description="Data início (YYYY-MM-DD)"),
     data_fim: Optional[str] = Query(None, description="Data fim (YYYY-MM-DD)"),
 ):
     """Relatório detalhado de ferrageamento"""
     query = (
-        db.query(FerrageamentoAnimais, Animal.NOME)
+        select(FerrageamentoAnimais, Animal.NOME)
         .join(Animal, FerrageamentoAnimais.ID_ANIMAL == Animal.ID)
         .order_by(desc(FerrageamentoAnimais.DATA_OCORRENCIA))
     )
@@ -535,7 +562,7 @@ async def get_relatorio_detalhado(
                 detail="Formato de data inválido. Use YYYY-MM-DD",
             ) from e
 
-    registros = query.all()
+    registros = (await db.execute(query)).all()
 
     resultado = []
     for registro, animal_nome in registros:
@@ -1,10 +1,12 @@
 import os
-import shutil
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import List, Optional
 
-from app.core.database import get_db
+from app.core.config import settings
+from app.core.database import get_async_db
+from app.core.exportacao import FormatoExportacao, colunas, resposta_exportacao
+from app.core.paginacao import ParametrosPaginacao, paginar
 from app.core.security import get_current_user
 from app.models.manejo import (
     AnalisesSolo,
@@ -38,18 +40,22 @@ from app.schemas.manejo import (  # Produtos; Movimentação; Manejo; Análises;
     TipoMovimentacaoManejoEnum,
     TipoProdutoEnum,
 )
+from app.services.armazenamento import (
+    armazenar_upload,
+    confirmar_upload,
+    descartar_upload,
+    remover_se_orfao,
+)
+from app.services.batch_resolver import BatchResolver
+from app.services.busca import indice_produtos_manejo
 from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status
 from fastapi.responses import FileResponse
-from sqlalchemy import and_, or_
-from sqlalchemy.orm import Session
-from sqlalchemy.sql import desc, text
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import text
 
 router = APIRouter(prefix="/api/manejo", tags=["Manejo de Terrenos"])
 
-# Diretório para upload de laudos
-UPLOAD_DIR = Path("uploads/laudos")
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
-
 # ======================================
 # PRODUTOS MANEJO - CRUD + ESTOQUE
 # ======================================
@@ -62,15 +68,15 @@ UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 )
 async def create_produto(
     produto: ProdutoManejoCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Criar novo produto para manejo"""
     # Verificar duplicatas
-    existing = (
-        db.query(ProdutoManejo)
-        .filter(ProdutoManejo.NOME == produto.NOME, ProdutoManejo.ATIVO == "S")
-        .first()
+    existing = await db.scalar(
+        select(ProdutoManejo).filter(
+            ProdutoManejo.NOME == produto.NOME, ProdutoManejo.ATIVO == "S"
+        )
     )
 
     if existing:
@@ -81,8 +87,8 @@ async def create_produto(
 
     db_produto = ProdutoManejo(**produto.dict(), ID_USUARIO_CADASTRO=current_user.ID)
     db.add(db_produto)
-    db.commit()
-    db.refresh(db_produto)
+    await db.commit()
+    await db.refresh(db_produto)
 
     # Calcular status do estoque
     response = ProdutoManejoResponse.from_orm(db_produto)
@@ -96,7 +102,7 @@ async def create_produto(
 
 @router.get("/produtos", response_model=dict)
 async def list_produtos(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
     tipo_produto: Optional[TipoProdutoEnum] = Query(None),
     nome: Optional[str] = Query(None),
@@ -104,9 +110,10 @@ async def list_produtos(
     ativo: Optional[str] = Query("S"),
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=100),
+    paginacao: ParametrosPaginacao = Depends(),
 ):
     """Listar produtos com filtros e paginação"""
-    query = db.query(ProdutoManejo)
+    query = select(ProdutoManejo)
 
     # Filtros
     if tipo_produto:
@@ -127,9 +134,16 @@ async def list_produtos(
         )
 
     # Paginação
-    total = query.count()
-    offset = (page - 1) * limit
-    produtos = query.order_by(ProdutoManejo.NOME).offset(offset).limit(limit).all()
+    pagina = await paginar(
+        db,
+        query,
+        [(ProdutoManejo.NOME, False)],
+        ProdutoManejo.ID,
+        page,
+        limit,
+        paginacao,
+    )
+    produtos = pagina.itens
 
     # Adicionar campos calculados
     produtos_response = []
@@ -144,32 +158,29 @@ async def list_produtos(
 
     return {
         "produtos": produtos_response,
-        "total": total,
-        "page": page,
-        "limit": limit,
-        "total_pages": (total + limit - 1) // limit,
+        **pagina.metadados(page, limit),
     }
 
 
 @router.get("/produtos/autocomplete", response_model=List[ProdutoAutocomplete])
 async def autocomplete_produtos(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
     q: Optional[str] = Query(None, min_length=2),
     tipo_produto: Optional[TipoProdutoEnum] = Query(None),
     apenas_com_estoque: Optional[bool] = Query(False),
 ):
     """Autocomplete para produtos com informações de estoque"""
-    query = db.query(ProdutoManejo).filter(ProdutoManejo.ATIVO == "S")
-
-    if q:
-        query = query.filter(ProdutoManejo.NOME.ilike(f"%{q}%"))
-    if tipo_produto:
-        query = query.filter(ProdutoManejo.TIPO_PRODUTO == tipo_produto)
-    if apenas_com_estoque:
-        query = query.filter(ProdutoManejo.ESTOQUE_ATUAL > 0)
-
-    produtos = query.order_by(ProdutoManejo.NOME).limit(20).all()
+    produtos = await indice_produtos_manejo.buscar(
+        db,
+        q,
+        limite=20,
+        filtro=lambda p: (
+            p.ATIVO == "S"
+            and (not tipo_produto or p.TIPO_PRODUTO == tipo_produto)
+            and (not apenas_com_estoque or (p.ESTOQUE_ATUAL or 0) > 0)
+        ),
+    )
 
     return [
         ProdutoAutocomplete(
@@ -190,11 +201,13 @@ async def autocomplete_produtos(
 @router.get("/produtos/{produto_id}", response_model=ProdutoManejoResponse)
 async def get_produto(
     produto_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Obter produto por ID"""
-    produto = db.query(ProdutoManejo).filter(ProdutoManejo.ID == produto_id).first()
+    produto = await db.scalar(
+        select(ProdutoManejo).filter(ProdutoManejo.ID == produto_id)
+    )
     if not produto:
         raise HTTPException(status_code=404, detail="Produto não encontrado")
 
@@ -212,24 +225,24 @@ async def get_produto(
 async def update_produto(
     produto_id: int,
     produto_update: ProdutoManejoUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Atualizar produto"""
-    db_produto = db.query(ProdutoManejo).filter(ProdutoManejo.ID == produto_id).first()
+    db_produto = await db.scalar(
+        select(ProdutoManejo).filter(ProdutoManejo.ID == produto_id)
+    )
     if not db_produto:
         raise HTTPException(status_code=404, detail="Produto não encontrado")
 
     # Verificar duplicata no nome
     if produto_update.NOME and produto_update.NOME != db_produto.NOME:
-        existing = (
-            db.query(ProdutoManejo)
-            .filter(
+        existing = await db.scalar(
+            select(ProdutoManejo).filter(
                 ProdutoManejo.NOME == produto_update.NOME,
                 ProdutoManejo.ID != produto_id,
                 ProdutoManejo.ATIVO == "S",
             )
-            .first()
         )
         if existing:
             raise HTTPException(status_code=400, detail="Nome já existe")
@@ -238,8 +251,8 @@ async def update_produto(
     for field, value in produto_update.model_dump(exclude_unset=True).items():
         setattr(db_produto, field, value)
 
-    db.commit()
-    db.refresh(db_produto)
+    await db.commit()
+    await db.refresh(db_produto)
 
     response = ProdutoManejoResponse.model_validate(db_produto)
     response.status_estoque = _calcular_status_estoque(db_produto)
@@ -253,16 +266,18 @@ async def update_produto(
 @router.delete("/produtos/{produto_id}")
 async def delete_produto(
     produto_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Excluir produto (soft delete)"""
-    produto = db.query(ProdutoManejo).filter(ProdutoManejo.ID == produto_id).first()
+    produto = await db.scalar(
+        select(ProdutoManejo).filter(ProdutoManejo.ID == produto_id)
+    )
     if not produto:
         raise HTTPException(status_code=404, detail="Produto não encontrado")
 
     produto.ATIVO = "N"
-    db.commit()
+    await db.commit()
 
     return {"message": "Produto excluído com sucesso"}
 
@@ -275,15 +290,15 @@ async def delete_produto(
 @router.post("/estoque/entrada", response_model=MovimentacaoEstoqueResponse)
 async def entrada_estoque(
     entrada: EntradaEstoqueCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Registrar entrada de estoque (compra)"""
     # Verificar se produto existe
-    produto = (
-        db.query(ProdutoManejo)
-        .filter(ProdutoManejo.ID == entrada.ID_PRODUTO, ProdutoManejo.ATIVO == "S")
-        .first()
+    produto = await db.scalar(
+        select(ProdutoManejo).filter(
+            ProdutoManejo.ID == entrada.ID_PRODUTO, ProdutoManejo.ATIVO == "S"
+        )
     )
     if not produto:
         raise HTTPException(status_code=404, detail="Produto não encontrado")
@@ -294,8 +309,8 @@ async def entrada_estoque(
     )
 
     db.add(db_movimentacao)
-    db.commit()
-    db.refresh(db_movimentacao)
+    await db.commit()
+    await db.refresh(db_movimentacao)
 
     # Buscar dados relacionados
     response = MovimentacaoEstoqueResponse.from_orm(db_movimentacao)
@@ -307,15 +322,15 @@ async def entrada_estoque(
 @router.post("/estoque/saida", response_model=MovimentacaoEstoqueResponse)
 async def saida_estoque(
     saida: SaidaEstoqueCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Registrar saída de estoque"""
     # Verificar estoque disponível
-    produto = (
-        db.query(ProdutoManejo)
-        .filter(ProdutoManejo.ID == saida.ID_PRODUTO, ProdutoManejo.ATIVO == "S")
-        .first()
+    produto = await db.scalar(
+        select(ProdutoManejo).filter(
+            ProdutoManejo.ID == saida.ID_PRODUTO, ProdutoManejo.ATIVO == "S"
+        )
     )
     if not produto:
         raise HTTPException(status_code=404, detail="Produto não encontrado")
@@ -338,8 +353,8 @@ async def saida_estoque(
     )
 
     db.add(db_movimentacao)
-    db.commit()
-    db.refresh(db_movimentacao)
+    await db.commit()
+    await db.refresh(db_movimentacao)
 
     response = MovimentacaoEstoqueResponse.from_orm(db_movimentacao)
     response.produto_nome = produto.NOME
@@ -350,14 +365,14 @@ async def saida_estoque(
 @router.post("/estoque/ajuste", response_model=MovimentacaoEstoqueResponse)
 async def ajuste_estoque(
     ajuste: AjusteEstoqueCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Ajustar estoque (correção)"""
-    produto = (
-        db.query(ProdutoManejo)
-        .filter(ProdutoManejo.ID == ajuste.ID_PRODUTO, ProdutoManejo.ATIVO == "S")
-        .first()
+    produto = await db.scalar(
+        select(ProdutoManejo).filter(
+            ProdutoManejo.ID == ajuste.ID_PRODUTO, ProdutoManejo.ATIVO == "S"
+        )
     )
     if not produto:
         raise HTTPException(status_code=404, detail="Produto não encontrado")
@@ -373,8 +388,8 @@ async def ajuste_estoque(
     )
 
     db.add(db_movimentacao)
-    db.commit()
-    db.refresh(db_movimentacao)
+    await db.commit()
+    await db.refresh(db_movimentacao)
 
     response = MovimentacaoEstoqueResponse.from_orm(db_movimentacao)
     response.produto_nome = produto.NOME
@@ -384,7 +399,7 @@ async def ajuste_estoque(
 
 @router.get("/estoque/movimentacoes", response_model=dict)
 async def list_movimentacoes(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
     produto_id: Optional[int] = Query(None),
     tipo_movimentacao: Optional[TipoMovimentacaoManejoEnum] = Query(None),
@@ -392,10 +407,94 @@ async def list_movimentacoes(
     data_fim: Optional[str] = Query(None),
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=100),
+    paginacao: ParametrosPaginacao = Depends(),
 ):
     """Listar movimentações de estoque"""
-    query = db.query(MovimentacaoProdutoManejo)
+    query = _filtrar_movimentacoes(
+        select(MovimentacaoProdutoManejo),
+        produto_id,
+        tipo_movimentacao,
+        data_inicio,
+        data_fim,
+    )
+
+    # Paginação
+    pagina = await paginar(
+        db,
+        query,
+        [(MovimentacaoProdutoManejo.DATA_REGISTRO, True)],
+        MovimentacaoProdutoManejo.ID,
+        page,
+        limit,
+        paginacao,
+    )
+    movimentacoes = pagina.itens
+
+    # Adicionar dados relacionados (uma query por tabela)
+    resolver = BatchResolver(db)
+    await resolver.carregar(ProdutoManejo, [m.ID_PRODUTO for m in movimentacoes])
+    await resolver.carregar(Terreno, [m.ID_TERRENO for m in movimentacoes])
+
+    movimentacoes_response = []
+    for mov in movimentacoes:
+        response = MovimentacaoEstoqueResponse.from_orm(mov)
+
+        # Buscar produto diretamente
+        produto = await resolver.obter(ProdutoManejo, mov.ID_PRODUTO)
+        if produto:
+            response.produto_nome = produto.NOME
+            response.produto_unidade = produto.UNIDADE_MEDIDA
+        else:
+            response.produto_nome = f"Produto ID {mov.ID_PRODUTO}"
+            response.produto_unidade = ""
+
+        # Buscar terreno se existir
+        if mov.ID_TERRENO:
+            terreno = await resolver.obter(Terreno, mov.ID_TERRENO)
+            response.terreno_nome = terreno.NOME if terreno else None
+
+        movimentacoes_response.append(response)
+
+    return {
+        "movimentacoes": movimentacoes_response,
+        **pagina.metadados(page, limit),
+    }
+
+
+@router.get("/estoque/movimentacoes/exportar")
+async def exportar_movimentacoes(
+    current_user: User = Depends(get_current_user),
+    formato: FormatoExportacao = Query(FormatoExportacao.CSV),
+    produto_id: Optional[int] = Query(None),
+    tipo_movimentacao: Optional[TipoMovimentacaoManejoEnum] = Query(None),
+    data_inicio: Optional[str] = Query(None),
+    data_fim: Optional[str] = Query(None),
+):
+    """Exportar movimentações de estoque em CSV ou NDJSON"""
+    query = (
+        select(
+            *colunas(MovimentacaoProdutoManejo),
+            ProdutoManejo.NOME.label("PRODUTO_NOME"),
+            ProdutoManejo.UNIDADE_MEDIDA.label("PRODUTO_UNIDADE"),
+            Terreno.NOME.label("TERRENO_NOME"),
+        )
+        .join(ProdutoManejo, MovimentacaoProdutoManejo.ID_PRODUTO == ProdutoManejo.ID)
+        .outerjoin(Terreno, MovimentacaoProdutoManejo.ID_TERRENO == Terreno.ID)
+        .order_by(MovimentacaoProdutoManejo.DATA_REGISTRO, MovimentacaoProdutoManejo.ID)
+    )
+    query = _filtrar_movimentacoes(
+        query, produto_id, tipo_movimentacao, data_inicio, data_fim
+    )
+    return resposta_exportacao(query, formato, "movimentacoes_manejo")
 
+
+def _filtrar_movimentacoes(
+    query,
+    produto_id: Optional[int],
+    tipo_movimentacao: Optional[TipoMovimentacaoManejoEnum],
+    data_inicio: Optional[str],
+    data_fim: Optional[str],
+):
     # Converter datas se fornecidas
     data_inicio_dt = None
     data_fim_dt = None
@@ -424,47 +523,7 @@ async def list_movimentacoes(
         query = query.filter(MovimentacaoProdutoManejo.DATA_REGISTRO >= data_inicio_dt)
     if data_fim_dt:
         query = query.filter(MovimentacaoProdutoManejo.DATA_REGISTRO <= data_fim_dt)
-
-    # Paginação
-    total = query.count()
-    offset = (page - 1) * limit
-    movimentacoes = (
-        query.order_by(desc(MovimentacaoProdutoManejo.DATA_REGISTRO))
-        .offset(offset)
-        .limit(limit)
-        .all()
-    )
-
-    # Adicionar dados relacionados
-    movimentacoes_response = []
-    for mov in movimentacoes:
-        response = MovimentacaoEstoqueResponse.from_orm(mov)
-
-        # Buscar produto diretamente
-        produto = (
-            db.query(ProdutoManejo).filter(ProdutoManejo.ID == mov.ID_PRODUTO).first()
-        )
-        if produto:
-            response.produto_nome = produto.NOME
-            response.produto_unidade = produto.UNIDADE_MEDIDA
-        else:
-            response.produto_nome = f"Produto ID {mov.ID_PRODUTO}"
-            response.produto_unidade = ""
-
-        # Buscar terreno se existir
-        if mov.ID_TERRENO:
-            terreno = db.query(Terreno).filter(Terreno.ID == mov.ID_TERRENO).first()
-            response.terreno_nome = terreno.NOME if terreno else None
-
-        movimentacoes_response.append(response)
-
-    return {
-        "movimentacoes": movimentacoes_response,
-        "total": total,
-        "page": page,
-        "limit": limit,
-        "total_pages": (total + limit - 1) // limit,
-    }
+    return query
 
 
 # ======================================
@@ -474,7 +533,8 @@ async def list_movimentacoes(
 
 @router.get("/estoque/alertas", response_model=List[EstoqueBaixo])
 async def alertas_estoque(
-    db: Session = Depends(get_db), current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
 ):
     """Produtos com estoque baixo ou próximo ao vencimento"""
     # Usando a VIEW criada no Oracle
@@ -492,7 +552,7 @@ async def alertas_estoque(
     FROM VW_PRODUTOS_ESTOQUE_BAIXO
     ORDER BY STATUS_ALERTA, ESTOQUE_ATUAL
     """
-    result = db.execute(text(query)).fetchall()
+    result = (await db.execute(text(query))).fetchall()
 
     alertas = []
     for row in result:
@@ -515,7 +575,7 @@ async def alertas_estoque(
 
 @router.get("/estoque/resumo", response_model=List[MovimentacaoResumo])
 async def resumo_estoque(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
     tipo_produto: Optional[TipoProdutoEnum] = Query(None),
 ):
@@ -540,7 +600,7 @@ async def resumo_estoque(
 
     query += " ORDER BY PRODUTO_NOME"
 
-    result = db.execute(text(query), params).fetchall()
+    result = (await db.execute(text(query), params)).fetchall()
 
     resumos = []
     for row in result:
@@ -574,19 +634,19 @@ async def resumo_estoque(
 )
 async def create_analise_solo(
     analise: AnalisesSoloCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Criar análise de solo"""
     # Verificar se terreno existe
-    terreno = db.query(Terreno).filter(Terreno.ID == analise.ID_TERRENO).first()
+    terreno = await db.scalar(select(Terreno).filter(Terreno.ID == analise.ID_TERRENO))
     if not terreno:
         raise HTTPException(status_code=404, detail="Terreno não encontrado")
 
     db_analise = AnalisesSolo(**analise.dict(), ID_USUARIO_CADASTRO=current_user.ID)
     db.add(db_analise)
-    db.commit()
-    db.refresh(db_analise)
+    await db.commit()
+    await db.refresh(db_analise)
 
     response = AnalisesSoloResponse.from_orm(db_analise)
     response.terreno_nome = terreno.NOME
@@ -596,7 +656,7 @@ async def create_analise_solo(
 
 @router.get("/analises-solo", response_model=dict)
 async def list_analises_solo(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
     terreno_id: Optional[int] = Query(None),
     data_inicio: Optional[str] = Query(None),
@@ -604,9 +664,10 @@ async def list_analises_solo(
     laboratorio: Optional[str] = Query(None),
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=100),
+    paginacao: ParametrosPaginacao = Depends(),
 ):
     """Listar análises de solo"""
-    query = db.query(AnalisesSolo).join(Terreno)
+    query = select(AnalisesSolo).join(Terreno)
 
     # Converter datas se fornecidas
     data_inicio_dt = None
@@ -636,42 +697,49 @@ async def list_analises_solo(
         query = query.filter(AnalisesSolo.LABORATORIO.ilike(f"%{laboratorio}%"))
 
     # Paginação
-    total = query.count()
-    offset = (page - 1) * limit
-    analises = (
-        query.order_by(desc(AnalisesSolo.DATA_COLETA)).offset(offset).limit(limit).all()
+    pagina = await paginar(
+        db,
+        query,
+        [(AnalisesSolo.DATA_COLETA, True)],
+        AnalisesSolo.ID,
+        page,
+        limit,
+        paginacao,
     )
+    analises = pagina.itens
 
     # Adicionar dados relacionados
+    resolver = BatchResolver(db)
+    await resolver.carregar(Terreno, [a.ID_TERRENO for a in analises])
+
     analises_response = []
     for analise in analises:
         response = AnalisesSoloResponse.from_orm(analise)
-        terreno = db.query(Terreno).filter(Terreno.ID == analise.ID_TERRENO).first()
+        terreno = await resolver.obter(Terreno, analise.ID_TERRENO)
         response.terreno_nome = terreno.NOME if terreno else None
         analises_response.append(response)
 
     return {
         "analises": analises_response,
-        "total": total,
-        "page": page,
-        "limit": limit,
-        "total_pages": (total + limit - 1) // limit,
+        **pagina.metadados(page, limit),
     }
 
 
 @router.get("/analises-solo/{analise_id}", response_model=AnalisesSoloResponse)
 async def get_analise_solo(
     analise_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Obter análise de solo por ID"""
-    analise = db.query(AnalisesSolo).filter(AnalisesSolo.ID == analise_id).first()
+    analise = await db.scalar(
+        select(AnalisesSolo).filter(AnalisesSolo.ID == analise_id)
+    )
     if not analise:
         raise HTTPException(status_code=404, detail="Análise não encontrada")
 
     response = AnalisesSoloResponse.from_orm(analise)
-    terreno = db.query(Terreno).filter(Terreno.ID == analise.ID_TERRENO).first()
+    terreno = await db.scalar(select(Terreno).filter(Terreno.ID == analise.ID_TERRENO))
     response.terreno_nome = terreno.NOME if terreno else None
 
     return response
@@ -681,11 +749,13 @@ async def get_analise_solo(
 async def update_analise_solo(
     analise_id: int,
     analise_update: AnalisesSoloUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Atualizar análise de solo"""
-    db_analise = db.query(AnalisesSolo).filter(AnalisesSolo.ID == analise_id).first()
+    db_analise = await db.scalar(
+        select(AnalisesSolo).filter(AnalisesSolo.ID == analise_id)
+    )
     if not db_analise:
         raise HTTPException(status_code=404, detail="Análise não encontrada")
 
@@ -693,11 +763,13 @@ async def update_analise_solo(
     for field, value in analise_update.dict(exclude_unset=True).items():
         setattr(db_analise, field, value)
 
-    db.commit()
-    db.refresh(db_analise)
+    await db.commit()
+    await db.refresh(db_analise)
 
     response = AnalisesSoloResponse.from_orm(db_analise)
-    terreno = db.query(Terreno).filter(Terreno.ID == db_analise.ID_TERRENO).first()
+    terreno = await db.scalar(
+        select(Terreno).filter(Terreno.ID == db_analise.ID_TERRENO)
+    )
     response.terreno_nome = terreno.NOME if terreno else None
 
     return response
@@ -707,50 +779,60 @@ async def update_analise_solo(
 async def upload_laudo_analise(
     analise_id: int,
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Upload de laudo de análise de solo"""
     # Verificar se análise existe
-    analise = db.query(AnalisesSolo).filter(AnalisesSolo.ID == analise_id).first()
+    analise = await db.scalar(
+        select(AnalisesSolo).filter(AnalisesSolo.ID == analise_id)
+    )
     if not analise:
         raise HTTPException(status_code=404, detail="Análise não encontrada")
 
     # Validar tipo de arquivo
-    if not file.filename.lower().endswith((".pdf", ".jpg", ".jpeg", ".png")):
+    if not (file.filename or "").lower().endswith((".pdf", ".jpg", ".jpeg", ".png")):
         raise HTTPException(
             status_code=400, detail="Tipo de arquivo não permitido. Use PDF ou imagens."
         )
 
-    # Gerar nome único do arquivo
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"analise_{analise_id}_{timestamp}_{file.filename}"
-    file_path = UPLOAD_DIR / filename
+    # Salvar arquivo (nome pelo hash do conteúdo; uploads idênticos são
+    # gravados uma única vez)
+    arquivo = await armazenar_upload(
+        file, ("pdf", "jpg", "jpeg", "png"), settings.UPLOAD_LAUDO_MAX_MB * 1024 * 1024
+    )
 
-    # Salvar arquivo
+    # Atualizar caminho no banco
+    laudo_anterior = analise.ARQUIVO_LAUDO
+    analise.ARQUIVO_LAUDO = arquivo.caminho.as_posix()
     try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-
-        # Atualizar caminho no banco
-        analise.ARQUIVO_LAUDO = str(file_path)
-        db.commit()
-
-        return {"message": "Laudo enviado com sucesso", "arquivo": filename}
+        await db.commit()
+        # Laudo reaproveitado removido como órfão antes do commit: regravar
+        await confirmar_upload(arquivo)
+    finally:
+        descartar_upload(arquivo)
+
+    # Após o commit: a troca já é visível para outras requisições
+    if laudo_anterior and laudo_anterior != arquivo.caminho.as_posix():
+        try:
+            await remover_se_orfao(db, Path(laudo_anterior))
+        except OSError:
+            pass  # Ignorar erro se arquivo não puder ser removido
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erro ao salvar arquivo: {str(e)}")
+    return {"message": "Laudo enviado com sucesso", "arquivo": arquivo.caminho.name}
 
 
 @router.get("/analises-solo/{analise_id}/download-laudo")
 async def download_laudo_analise(
     analise_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Download do laudo de análise de solo"""
     # Verificar se análise existe
-    analise = db.query(AnalisesSolo).filter(AnalisesSolo.ID == analise_id).first()
+    analise = await db.scalar(
+        select(AnalisesSolo).filter(AnalisesSolo.ID == analise_id)
+    )
     if not analise:
         raise HTTPException(status_code=404, detail="Análise não encontrada")
 
@@ -767,7 +849,7 @@ async def download_laudo_analise(
         )
 
     # Obter informações do terreno para nome do arquivo
-    terreno = db.query(Terreno).filter(Terreno.ID == analise.ID_TERRENO).first()
+    terreno = await db.scalar(select(Terreno).filter(Terreno.ID == analise.ID_TERRENO))
     terreno_nome = terreno.NOME if terreno else f"Terreno_{analise.ID_TERRENO}"
 
     # Formatar data para nome do arquivo
@@ -799,11 +881,13 @@ async def download_laudo_analise(
 @router.get("/analises-solo/{analise_id}/laudo-info")
 async def get_laudo_info(
     analise_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Obter informações do laudo (tamanho, tipo, etc.)"""
-    analise = db.query(AnalisesSolo).filter(AnalisesSolo.ID == analise_id).first()
+    analise = await db.scalar(
+        select(AnalisesSolo).filter(AnalisesSolo.ID == analise_id)
+    )
     if not analise:
         raise HTTPException(status_code=404, detail="Análise não encontrada")
 
@@ -833,24 +917,27 @@ async def get_laudo_info(
 @router.delete("/analises-solo/{analise_id}")
 async def delete_analise_solo(
     analise_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Excluir análise de solo"""
-    analise = db.query(AnalisesSolo).filter(AnalisesSolo.ID == analise_id).first()
+    analise = await db.scalar(
+        select(AnalisesSolo).filter(AnalisesSolo.ID == analise_id)
+    )
     if not analise:
         raise HTTPException(status_code=404, detail="Análise não encontrada")
 
-    # Remover arquivo do laudo se existir
-    if analise.ARQUIVO_LAUDO and os.path.exists(analise.ARQUIVO_LAUDO):
+    laudo = analise.ARQUIVO_LAUDO
+    await db.delete(analise)
+    await db.commit()
+
+    # Remover arquivo do laudo se nenhum outro registro o utiliza
+    if laudo:
         try:
-            os.remove(analise.ARQUIVO_LAUDO)
-        except:
+            await remover_se_orfao(db, Path(laudo))
+        except OSError:
             pass  # Ignorar erro se arquivo não puder ser removido
 
-    db.delete(analise)
-    db.commit()
-
     return {"message": "Análise excluída com sucesso"}
 
 
@@ -866,19 +953,21 @@ async def delete_analise_solo(
 )
 async def create_aplicacao(
     aplicacao: ManejoTerrenosCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Registrar aplicação em terreno"""
     # Verificar se terreno e produto existem
-    terreno = db.query(Terreno).filter(Terreno.ID == aplicacao.ID_TERRENO).first()
+    terreno = await db.scalar(
+        select(Terreno).filter(Terreno.ID == aplicacao.ID_TERRENO)
+    )
     if not terreno:
         raise HTTPException(status_code=404, detail="Terreno não encontrado")
 
-    produto = (
-        db.query(ProdutoManejo)
-        .filter(ProdutoManejo.ID == aplicacao.ID_PRODUTO, ProdutoManejo.ATIVO == "S")
-        .first()
+    produto = await db.scalar(
+        select(ProdutoManejo).filter(
+            ProdutoManejo.ID == aplicacao.ID_PRODUTO, ProdutoManejo.ATIVO == "S"
+        )
     )
     if not produto:
         raise HTTPException(status_code=404, detail="Produto não encontrado")
@@ -909,8 +998,8 @@ async def create_aplicacao(
     )
 
     db.add(db_aplicacao)
-    db.commit()
-    db.refresh(db_aplicacao)
+    await db.commit()
+    await db.refresh(db_aplicacao)
 
     # O trigger criará automaticamente a movimentação de estoque
 
@@ -924,7 +1013,7 @@ async def create_aplicacao(
 
 @router.get("/aplicacoes", response_model=dict)
 async def list_aplicacoes(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
     terreno_id: Optional[int] = Query(None),
     produto_id: Optional[int] = Query(None),
@@ -933,9 +1022,10 @@ async def list_aplicacoes(
     data_fim: Optional[str] = Query(None),
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=100),
+    paginacao: ParametrosPaginacao = Depends(),
 ):
     """Listar aplicações em terrenos"""
-    query = db.query(ManejoTerrenos).join(Terreno).join(ProdutoManejo)
+    query = select(ManejoTerrenos).join(Terreno).join(ProdutoManejo)
 
     # Converter datas se fornecidas
     data_inicio_dt = None
@@ -967,26 +1057,27 @@ async def list_aplicacoes(
         query = query.filter(ManejoTerrenos.DATA_APLICACAO <= data_fim_dt)
 
     # Paginação
-    total = query.count()
-    offset = (page - 1) * limit
-    aplicacoes = (
-        query.order_by(desc(ManejoTerrenos.DATA_APLICACAO))
-        .offset(offset)
-        .limit(limit)
-        .all()
+    pagina = await paginar(
+        db,
+        query,
+        [(ManejoTerrenos.DATA_APLICACAO, True)],
+        ManejoTerrenos.ID,
+        page,
+        limit,
+        paginacao,
     )
+    aplicacoes = pagina.itens
+
+    # Adicionar dados relacionados (uma query por tabela)
+    resolver = BatchResolver(db)
+    await resolver.carregar(Terreno, [a.ID_TERRENO for a in aplicacoes])
+    await resolver.carregar(ProdutoManejo, [a.ID_PRODUTO for a in aplicacoes])
 
-    # Adicionar dados relacionados
     aplicacoes_response = []
     for aplicacao in aplicacoes:
         response = ManejoTerrenosResponse.from_orm(aplicacao)
-        # Buscar dados relacionados (join pode não carregar automaticamente)
-        terreno = db.query(Terreno).filter(Terreno.ID == aplicacao.ID_TERRENO).first()
-        produto = (
-            db.query(ProdutoManejo)
-            .filter(ProdutoManejo.ID == aplicacao.ID_PRODUTO)
-            .first()
-        )
+        terreno = await resolver.obter(Terreno, aplicacao.ID_TERRENO)
+        produto = await resolver.obter(ProdutoManejo, aplicacao.ID_PRODUTO)
         response.terreno_nome = terreno.NOME if terreno else None
         response.produto_nome = produto.NOME if produto else None
         response.produto_tipo = produto.TIPO_PRODUTO.value if produto else None
@@ -994,30 +1085,29 @@ async def list_aplicacoes(
 
     return {
         "aplicacoes": aplicacoes_response,
-        "total": total,
-        "page": page,
-        "limit": limit,
-        "total_pages": (total + limit - 1) // limit,
+        **pagina.metadados(page, limit),
     }
 
 
 @router.get("/aplicacoes/{aplicacao_id}", response_model=ManejoTerrenosResponse)
 async def get_aplicacao(
     aplicacao_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Obter aplicação por ID"""
-    aplicacao = (
-        db.query(ManejoTerrenos).filter(ManejoTerrenos.ID == aplicacao_id).first()
+    aplicacao = await db.scalar(
+        select(ManejoTerrenos).filter(ManejoTerrenos.ID == aplicacao_id)
     )
     if not aplicacao:
         raise HTTPException(status_code=404, detail="Aplicação não encontrada")
 
     response = ManejoTerrenosResponse.from_orm(aplicacao)
-    terreno = db.query(Terreno).filter(Terreno.ID == aplicacao.ID_TERRENO).first()
-    produto = (
-        db.query(ProdutoManejo).filter(ProdutoManejo.ID == aplicacao.ID_PRODUTO).first()
+    terreno = await db.scalar(
+        select(Terreno).filter(Terreno.ID == aplicacao.ID_TERRENO)
+    )
+    produto = await db.scalar(
+        select(ProdutoManejo).filter(ProdutoManejo.ID == aplicacao.ID_PRODUTO)
     )
     response.terreno_nome = terreno.NOME if terreno else None
     response.produto_nome = produto.NOME if produto else None
@@ -1030,12 +1120,12 @@ async def get_aplicacao(
 async def update_aplicacao(
     aplicacao_id: int,
     aplicacao_update: ManejoTerrenosUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Atualizar aplicação em terreno"""
-    db_aplicacao = (
-        db.query(ManejoTerrenos).filter(ManejoTerrenos.ID == aplicacao_id).first()
+    db_aplicacao = await db.scalar(
+        select(ManejoTerrenos).filter(ManejoTerrenos.ID == aplicacao_id)
     )
     if not db_aplicacao:
         raise HTTPException(status_code=404, detail="Aplicação não encontrada")
@@ -1045,10 +1135,8 @@ async def update_aplicacao(
         aplicacao_update.QUANTIDADE
         and aplicacao_update.QUANTIDADE != db_aplicacao.QUANTIDADE
     ):
-        produto = (
-            db.query(ProdutoManejo)
-            .filter(ProdutoManejo.ID == db_aplicacao.ID_PRODUTO)
-            .first()
+        produto = await db.scalar(
+            select(ProdutoManejo).filter(ProdutoManejo.ID == db_aplicacao.ID_PRODUTO)
         )
         diferenca = aplicacao_update.QUANTIDADE - db_aplicacao.QUANTIDADE
 
@@ -1102,15 +1190,15 @@ async def update_aplicacao(
     for field, value in aplicacao_update.dict(exclude_unset=True).items():
         setattr(db_aplicacao, field, value)
 
-    db.commit()
-    db.refresh(db_aplicacao)
+    await db.commit()
+    await db.refresh(db_aplicacao)
 
     response = ManejoTerrenosResponse.from_orm(db_aplicacao)
-    terreno = db.query(Terreno).filter(Terreno.ID == db_aplicacao.ID_TERRENO).first()
-    produto = (
-        db.query(ProdutoManejo)
-        .filter(ProdutoManejo.ID == db_aplicacao.ID_PRODUTO)
-        .first()
+    terreno = await db.scalar(
+        select(Terreno).filter(Terreno.ID == db_aplicacao.ID_TERRENO)
+    )
+    produto = await db.scalar(
+        select(ProdutoManejo).filter(ProdutoManejo.ID == db_aplicacao.ID_PRODUTO)
     )
     response.terreno_nome = terreno.NOME if terreno else None
     response.produto_nome = produto.NOME if produto else None
@@ -1122,19 +1210,19 @@ async def update_aplicacao(
 @router.delete("/aplicacoes/{aplicacao_id}")
 async def delete_aplicacao(
     aplicacao_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Excluir aplicação (estorna estoque)"""
-    aplicacao = (
-        db.query(ManejoTerrenos).filter(ManejoTerrenos.ID == aplicacao_id).first()
+    aplicacao = await db.scalar(
+        select(ManejoTerrenos).filter(ManejoTerrenos.ID == aplicacao_id)
     )
     if not aplicacao:
         raise HTTPException(status_code=404, detail="Aplicação não encontrada")
 
     # Estornar estoque
-    produto = (
-        db.query(ProdutoManejo).filter(ProdutoManejo.ID == aplicacao.ID_PRODUTO).first()
+    produto = await db.scalar(
+        select(ProdutoManejo).filter(ProdutoManejo.ID == aplicacao.ID_PRODUTO)
     )
     db_movimentacao = MovimentacaoProdutoManejo(
         ID_PRODUTO=aplicacao.ID_PRODUTO,
@@ -1147,8 +1235,8 @@ async def delete_aplicacao(
     db.add(db_movimentacao)
 
     # Excluir aplicação
-    db.delete(aplicacao)
-    db.commit()
+    await db.delete(aplicacao)
+    await db.commit()
 
     return {"message": "Aplicação excluída e estoque estornado com sucesso"}
 
@@ -1160,7 +1248,7 @@ async def delete_aplicacao(
 
 @router.get("/relatorios/consumo-terreno", response_model=List[ConsumoTerrenoResumo])
 async def relatorio_consumo_terreno(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
     terreno_ids: Optional[str] = Query(
         None, description="Lista de IDs de terrenos para filtrar"
@@ -1230,7 +1318,7 @@ async def relatorio_consumo_terreno(
     ORDER BY t.NOME, p.NOME, mt.TIPO_MANEJO
     """
 
-    result = db.execute(text(query), params).fetchall()
+    result = (await db.execute(text(query), params)).fetchall()
 
     consumos = []
     for row in result:
@@ -1253,7 +1341,7 @@ async def relatorio_consumo_terreno(
 
 @router.get("/relatorios/previsao-consumo", response_model=List[PrevisaoConsumo])
 async def relatorio_previsao_consumo(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
     tipo_produto: Optional[TipoProdutoEnum] = Query(None),
 ):
@@ -1292,7 +1380,7 @@ async def relatorio_previsao_consumo(
     ORDER BY p.NOME
     """
 
-    result = db.execute(text(query), params).fetchall()
+    result = (await db.execute(text(query), params)).fetchall()
 
     previsoes = []
     for row in result:
@@ -1328,7 +1416,7 @@ async def relatorio_previsao_consumo(
 
 @router.get("/relatorios/terrenos-liberacao")
 async def relatorio_terrenos_liberacao(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
     dias_futuro: int = Query(30, ge=1, le=365),
 ):
@@ -1351,7 +1439,7 @@ async def relatorio_terrenos_liberacao(
     ORDER BY mt.DATA_LIBERACAO, t.NOME
     """
 
-    result = db.execute(text(query), {"dias_futuro": dias_futuro}).fetchall()
+    result = (await db.execute(text(query), {"dias_futuro": dias_futuro})).fetchall()
 
     liberacoes = []
     for row in result:
@@ -1,7 +1,9 @@
 from datetime import datetime, timedelta
 from typing import List, Optional
 
-from app.core.database import get_db
+from app.core.database import get_async_db
+from app.core.exportacao import FormatoExportacao, colunas, resposta_exportacao
+from app.core.paginacao import ParametrosPaginacao, paginar
 from app.core.security import get_current_user
 from app.models.animal import Animal
 from app.models.medicamento import Medicamento, MovimentacaoMedicamento
@@ -22,9 +24,12 @@ from app.schemas.medicamento import (
     StatusEstoqueEnum,
     TipoMovimentacaoEnum,
 )
+from app.services.batch_resolver import BatchResolver
+from app.services.busca import indice_medicamentos
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
-from sqlalchemy.sql import desc, func
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import func
 
 router = APIRouter(prefix="/api/medicamentos", tags=["Medicamentos"])
 
@@ -36,14 +41,14 @@ router = APIRouter(prefix="/api/medicamentos", tags=["Medicamentos"])
 )
 async def create_medicamento(
     medicamento: MedicamentoCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     # Verificar duplicatas
-    existing = (
-        db.query(Medicamento)
-        .filter(Medicamento.NOME == medicamento.NOME, Medicamento.ATIVO == "S")
-        .first()
+    existing = await db.scalar(
+        select(Medicamento).filter(
+            Medicamento.NOME == medicamento.NOME, Medicamento.ATIVO == "S"
+        )
     )
 
     if existing:
@@ -54,15 +59,15 @@ async def create_medicamento(
 
     db_medicamento = Medicamento(**medicamento.dict())
     db.add(db_medicamento)
-    db.commit()
-    db.refresh(db_medicamento)
+    await db.commit()
+    await db.refresh(db_medicamento)
 
     return await _enrich_medicamento_response(db_medicamento, db)
 
 
 @router.get("/", response_model=dict)
 async def list_medicamentos(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
     nome: Optional[str] = Query(None, description="Filtrar por nome"),
     forma_farmaceutica: Optional[FormaFarmaceuticaEnum] = Query(None),
@@ -71,8 +76,9 @@ async def list_medicamentos(
     ativo: Optional[str] = Query("S", description="Filtrar por status"),
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=100),
+    paginacao: ParametrosPaginacao = Depends(),
 ):
-    query = db.query(Medicamento)
+    query = select(Medicamento)
 
     if nome:
         query = query.filter(Medicamento.NOME.ilike(f"%{nome}%"))
@@ -86,9 +92,10 @@ async def list_medicamentos(
         data_limite = datetime.now() + timedelta(days=vencimento)
         query = query.filter(Medicamento.DATA_VALIDADE <= data_limite)
 
-    total = query.count()
-    offset = (page - 1) * limit
-    medicamentos = query.order_by(Medicamento.NOME).offset(offset).limit(limit).all()
+    pagina = await paginar(
+        db, query, [(Medicamento.NOME, False)], Medicamento.ID, page, limit, paginacao
+    )
+    medicamentos = pagina.itens
 
     # Enriquecer com dados calculados
     enriched_medicamentos = []
@@ -98,19 +105,17 @@ async def list_medicamentos(
 
     return {
         "medicamentos": enriched_medicamentos,
-        "total": total,
-        "page": page,
-        "limit": limit,
+        **pagina.metadados(page, limit),
     }
 
 
 @router.get("/{id}", response_model=MedicamentoResponse)
 async def get_medicamento(
     id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    medicamento = db.query(Medicamento).filter(Medicamento.ID == id).first()
+    medicamento = await db.scalar(select(Medicamento).filter(Medicamento.ID == id))
     if not medicamento:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Medicamento não encontrado"
@@ -123,10 +128,10 @@ async def get_medicamento(
 async def update_medicamento(
     id: int,
     medicamento: MedicamentoUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    db_medicamento = db.query(Medicamento).filter(Medicamento.ID == id).first()
+    db_medicamento = await db.scalar(select(Medicamento).filter(Medicamento.ID == id))
     if not db_medicamento:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Medicamento não encontrado"
@@ -135,28 +140,28 @@ async def update_medicamento(
     for key, value in medicamento.dict(exclude_unset=True).items():
         setattr(db_medicamento, key, value)
 
-    db.commit()
-    db.refresh(db_medicamento)
+    await db.commit()
+    await db.refresh(db_medicamento)
     return await _enrich_medicamento_response(db_medicamento, db)
 
 
 @router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_medicamento(
     id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    db_medicamento = db.query(Medicamento).filter(Medicamento.ID == id).first()
+    db_medicamento = await db.scalar(select(Medicamento).filter(Medicamento.ID == id))
     if not db_medicamento:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Medicamento não encontrado"
         )
 
     # Verificar se há movimentações
-    movimentacoes = (
-        db.query(MovimentacaoMedicamento)
-        .filter(MovimentacaoMedicamento.ID_MEDICAMENTO == id)
-        .first()
+    movimentacoes = await db.scalar(
+        select(MovimentacaoMedicamento).filter(
+            MovimentacaoMedicamento.ID_MEDICAMENTO == id
+        )
     )
 
     if movimentacoes:
@@ -164,9 +169,9 @@ async def delete_medicamento(
         db_medicamento.ATIVO = "N"
     else:
         # Hard delete
-        db.delete(db_medicamento)
+        await db.delete(db_medicamento)
 
-    db.commit()
+    await db.commit()
 
 
 # === MOVIMENTAÇÕES ===
@@ -175,12 +180,12 @@ async def delete_medicamento(
 @router.post("/entrada-estoque", response_model=dict)
 async def entrada_estoque(
     entrada: EntradaEstoque,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     # Verificar se medicamento existe
-    medicamento = (
-        db.query(Medicamento).filter(Medicamento.ID == entrada.ID_MEDICAMENTO).first()
+    medicamento = await db.scalar(
+        select(Medicamento).filter(Medicamento.ID == entrada.ID_MEDICAMENTO)
     )
     if not medicamento:
         raise HTTPException(
@@ -203,8 +208,8 @@ async def entrada_estoque(
     )
 
     db.add(movimentacao)
-    db.commit()
-    db.refresh(movimentacao)
+    await db.commit()
+    await db.refresh(movimentacao)
 
     return {
         "message": "Entrada registrada com sucesso",
@@ -216,19 +221,19 @@ async def entrada_estoque(
 @router.post("/aplicar-medicamento", response_model=dict)
 async def aplicar_medicamento(
     aplicacao: AplicacaoMedicamento,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     # Verificar medicamento e animal
-    medicamento = (
-        db.query(Medicamento).filter(Medicamento.ID == aplicacao.ID_MEDICAMENTO).first()
+    medicamento = await db.scalar(
+        select(Medicamento).filter(Medicamento.ID == aplicacao.ID_MEDICAMENTO)
     )
     if not medicamento:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Medicamento não encontrado"
         )
 
-    animal = db.query(Animal).filter(Animal.ID == aplicacao.ID_ANIMAL).first()
+    animal = await db.scalar(select(Animal).filter(Animal.ID == aplicacao.ID_ANIMAL))
     if not animal:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Animal não encontrado"
@@ -267,7 +272,7 @@ async def aplicar_medicamento(
     )
 
     db.add(saude)
-    # db.flush()  # Para obter o ID
+    # await db.flush()  # Para obter o ID
 
     # Movimentação será criada automaticamente pelo trigger
     # Mas vamos criar manualmente para ter controle total
@@ -283,7 +288,7 @@ async def aplicar_medicamento(
     # )
 
     # db.add(movimentacao)
-    db.commit()
+    await db.commit()
 
     return {
         "message": "Medicamento aplicado com sucesso",
@@ -295,7 +300,7 @@ async def aplicar_medicamento(
 
 @router.get("/movimentacoes/lista", response_model=dict)
 async def list_movimentacoes(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     medicamento_id: Optional[int] = Query(None),
     animal_id: Optional[int] = Query(None),
     tipo: Optional[TipoMovimentacaoEnum] = Query(None),
@@ -303,9 +308,76 @@ async def list_movimentacoes(
     data_fim: Optional[str] = Query(None),
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=100),
+    paginacao: ParametrosPaginacao = Depends(),
+):
+    query = _filtrar_movimentacoes(
+        select(MovimentacaoMedicamento).join(Medicamento),
+        medicamento_id,
+        animal_id,
+        tipo,
+        data_inicio,
+        data_fim,
+    )
+
+    pagina = await paginar(
+        db,
+        query,
+        [(MovimentacaoMedicamento.DATA_REGISTRO, True)],
+        MovimentacaoMedicamento.ID,
+        page,
+        limit,
+        paginacao,
+    )
+    movimentacoes = pagina.itens
+
+    # Enriquecer com dados relacionados (uma query por tabela)
+    resolver = BatchResolver(db)
+    await resolver.carregar(Medicamento, [m.ID_MEDICAMENTO for m in movimentacoes])
+    await resolver.carregar(Animal, [m.ID_ANIMAL for m in movimentacoes])
+    enriched_movimentacoes = [
+        await _enrich_movimentacao_response(mov, db, resolver) for mov in movimentacoes
+    ]
+
+    return {
+        "movimentacoes": enriched_movimentacoes,
+        **pagina.metadados(page, limit),
+    }
+
+
+@router.get("/movimentacoes/exportar")
+async def exportar_movimentacoes(
+    current_user: User = Depends(get_current_user),
+    formato: FormatoExportacao = Query(FormatoExportacao.CSV),
+    medicamento_id: Optional[int] = Query(None),
+    animal_id: Optional[int] = Query(None),
+    tipo: Optional[TipoMovimentacaoEnum] = Query(None),
+    data_inicio: Optional[str] = Query(None),
+    data_fim: Optional[str] = Query(None),
 ):
-    query = db.query(MovimentacaoMedicamento).join(Medicamento)
+    query = (
+        select(
+            *colunas(MovimentacaoMedicamento),
+            Medicamento.NOME.label("MEDICAMENTO_NOME"),
+            Animal.NOME.label("ANIMAL_NOME"),
+        )
+        .join(Medicamento, MovimentacaoMedicamento.ID_MEDICAMENTO == Medicamento.ID)
+        .outerjoin(Animal, MovimentacaoMedicamento.ID_ANIMAL == Animal.ID)
+        .order_by(MovimentacaoMedicamento.DATA_REGISTRO, MovimentacaoMedicamento.ID)
+    )
+    query = _filtrar_movimentacoes(
+        query, medicamento_id, animal_id, tipo, data_inicio, data_fim
+    )
+    return resposta_exportacao(query, formato, "movimentacoes_medicamentos")
+
 
+def _filtrar_movimentacoes(
+    query,
+    medicamento_id: Optional[int],
+    animal_id: Optional[int],
+    tipo: Optional[TipoMovimentacaoEnum],
+    data_inicio: Optional[str],
+    data_fim: Optional[str],
+):
     if medicamento_id:
         query = query.filter(MovimentacaoMedicamento.ID_MEDICAMENTO == medicamento_id)
     if animal_id:
@@ -320,28 +392,7 @@ async def list_movimentacoes(
         query = query.filter(
             MovimentacaoMedicamento.DATA_REGISTRO <= datetime.fromisoformat(data_fim)
         )
-
-    total = query.count()
-    offset = (page - 1) * limit
-    movimentacoes = (
-        query.order_by(desc(MovimentacaoMedicamento.DATA_REGISTRO))
-        .offset(offset)
-        .limit(limit)
-        .all()
-    )
-
-    # Enriquecer com dados relacionados
-    enriched_movimentacoes = []
-    for mov in movimentacoes:
-        enriched = await _enrich_movimentacao_response(mov, db)
-        enriched_movimentacoes.append(enriched)
-
-    return {
-        "movimentacoes": enriched_movimentacoes,
-        "total": total,
-        "page": page,
-        "limit": limit,
-    }
+    return query
 
 
 # === RELATÓRIOS ===
@@ -349,7 +400,7 @@ async def list_movimentacoes(
 
 @router.get("/relatorio/estoque-baixo", response_model=List[EstoqueMedicamentoBaixo])
 async def get_estoque_baixo(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
     dias_vencimento: int = Query(
         30, description="Dias para considerar próximo ao vencimento"
@@ -358,14 +409,15 @@ async def get_estoque_baixo(
     data_limite = datetime.now() + timedelta(days=dias_vencimento)
 
     medicamentos = (
-        db.query(Medicamento)
-        .filter(Medicamento.ATIVO == "S")
-        .filter(
-            (Medicamento.ESTOQUE_ATUAL <= Medicamento.ESTOQUE_MINIMO)
-            | (Medicamento.DATA_VALIDADE <= data_limite)
+        await db.scalars(
+            select(Medicamento)
+            .filter(Medicamento.ATIVO == "S")
+            .filter(
+                (Medicamento.ESTOQUE_ATUAL <= Medicamento.ESTOQUE_MINIMO)
+                | (Medicamento.DATA_VALIDADE <= data_limite)
+            )
         )
-        .all()
-    )
+    ).all()
 
     resultado = []
     for med in medicamentos:
@@ -403,20 +455,20 @@ async def get_estoque_baixo(
 )
 async def get_consumo_por_animal(
     animal_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
     data_inicio: Optional[str] = Query(None),
     data_fim: Optional[str] = Query(None),
 ):
     # Verificar se animal existe
-    animal = db.query(Animal).filter(Animal.ID == animal_id).first()
+    animal = await db.scalar(select(Animal).filter(Animal.ID == animal_id))
     if not animal:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Animal não encontrado"
         )
 
     query = (
-        db.query(
+        select(
             MovimentacaoMedicamento.ID_MEDICAMENTO,
             Medicamento.NOME.label("medicamento_nome"),
             Medicamento.UNIDADE_MEDIDA,
@@ -444,10 +496,14 @@ async def get_consumo_por_animal(
             MovimentacaoMedicamento.DATA_REGISTRO <= datetime.fromisoformat(data_fim)
         )
 
-    resultados = query.group_by(
-        MovimentacaoMedicamento.ID_MEDICAMENTO,
-        Medicamento.NOME,
-        Medicamento.UNIDADE_MEDIDA,
+    resultados = (
+        await db.execute(
+            query.group_by(
+                MovimentacaoMedicamento.ID_MEDICAMENTO,
+                Medicamento.NOME,
+                Medicamento.UNIDADE_MEDIDA,
+            )
+        )
     ).all()
 
     consumos = []
@@ -474,32 +530,33 @@ async def get_consumo_por_animal(
     "/relatorio/previsao-consumo", response_model=List[PrevisaoMedicamentoConsumo]
 )
 async def get_previsao_consumo(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     dias_analise: int = Query(90, description="Dias para calcular média de consumo"),
 ):
     data_inicio = datetime.now() - timedelta(days=dias_analise)
 
     # Calcular consumo médio mensal
     consumos = (
-        db.query(
-            MovimentacaoMedicamento.ID_MEDICAMENTO,
-            Medicamento.NOME.label("medicamento_nome"),
-            Medicamento.ESTOQUE_ATUAL,
-            func.sum(MovimentacaoMedicamento.QUANTIDADE).label("total_consumo"),
-        )
-        .join(Medicamento)
-        .filter(
-            MovimentacaoMedicamento.TIPO_MOVIMENTACAO == TipoMovimentacaoEnum.SAIDA,
-            MovimentacaoMedicamento.DATA_REGISTRO >= data_inicio,
-            Medicamento.ATIVO == "S",
-        )
-        .group_by(
-            MovimentacaoMedicamento.ID_MEDICAMENTO,
-            Medicamento.NOME,
-            Medicamento.ESTOQUE_ATUAL,
+        await db.execute(
+            select(
+                MovimentacaoMedicamento.ID_MEDICAMENTO,
+                Medicamento.NOME.label("medicamento_nome"),
+                Medicamento.ESTOQUE_ATUAL,
+                func.sum(MovimentacaoMedicamento.QUANTIDADE).label("total_consumo"),
+            )
+            .join(Medicamento)
+            .filter(
+                MovimentacaoMedicamento.TIPO_MOVIMENTACAO == TipoMovimentacaoEnum.SAIDA,
+                MovimentacaoMedicamento.DATA_REGISTRO >= data_inicio,
+                Medicamento.ATIVO == "S",
+            )
+            .group_by(
+                MovimentacaoMedicamento.ID_MEDICAMENTO,
+                Medicamento.NOME,
+                Medicamento.ESTOQUE_ATUAL,
+            )
         )
-        .all()
-    )
+    ).all()
 
     previsoes = []
     for consumo in consumos:
@@ -543,11 +600,11 @@ async def get_previsao_consumo(
 
 @router.get("/relatorio/movimentacao-periodo", response_model=List[MovimentacaoEstoque])
 async def get_movimentacao_periodo(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     data_inicio: Optional[str] = Query(None),
     data_fim: Optional[str] = Query(None),
 ):
-    query = db.query(
+    query = select(
         MovimentacaoMedicamento.ID_MEDICAMENTO,
         Medicamento.NOME.label("medicamento_nome"),
         func.sum(
@@ -586,10 +643,14 @@ async def get_movimentacao_periodo(
             MovimentacaoMedicamento.DATA_REGISTRO <= datetime.fromisoformat(data_fim)
         )
 
-    resultados = query.group_by(
-        MovimentacaoMedicamento.ID_MEDICAMENTO,
-        Medicamento.NOME,
-        Medicamento.ESTOQUE_ATUAL,
+    resultados = (
+        await db.execute(
+            query.group_by(
+                MovimentacaoMedicamento.ID_MEDICAMENTO,
+                Medicamento.NOME,
+                Medicamento.ESTOQUE_ATUAL,
+            )
+        )
     ).all()
 
     movimentacoes = []
@@ -637,21 +698,16 @@ async def get_unidades_medida():
 
 @router.get("/search/autocomplete", response_model=List[dict])
 async def autocomplete_medicamentos(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     termo: str = Query(..., description="Termo para busca"),
     limit: int = Query(10, ge=1, le=1000),
 ):
     """Autocomplete para medicamentos com estoque > 0"""
-    medicamentos = (
-        db.query(Medicamento)
-        .filter(
-            Medicamento.NOME.ilike(f"%{termo}%"),
-            Medicamento.ATIVO == "S",
-            Medicamento.ESTOQUE_ATUAL > 0,
-        )
-        .order_by(Medicamento.NOME)
-        .limit(limit)
-        .all()
+    medicamentos = await indice_medicamentos.buscar(
+        db,
+        termo,
+        limite=limit,
+        filtro=lambda m: m.ATIVO == "S" and (m.ESTOQUE_ATUAL or 0) > 0,
     )
 
     return [
@@ -671,7 +727,7 @@ async def autocomplete_medicamentos(
 
 
 async def _enrich_medicamento_response(
-    medicamento: Medicamento, db: Session
+    medicamento: Medicamento, db: AsyncSession
 ) -> MedicamentoResponse:
     """Enriquece resposta do medicamento com dados calculados"""
     response_data = MedicamentoResponse.from_orm(medicamento)
@@ -702,17 +758,14 @@ async def _enrich_medicamento_response(
 
 
 async def _enrich_movimentacao_response(
-    movimentacao: MovimentacaoMedicamento, db: Session
+    movimentacao: MovimentacaoMedicamento,
+    db: AsyncSession,
+    resolver: Optional[BatchResolver] = None,
 ) -> MovimentacaoMedicamentoResponse:
     """Enriquece resposta da movimentação com dados relacionados"""
-    medicamento = (
-        db.query(Medicamento)
-        .filter(Medicamento.ID == movimentacao.ID_MEDICAMENTO)
-        .first()
-    )
-    animal = None
-    if movimentacao.ID_ANIMAL:
-        animal = db.query(Animal).filter(Animal.ID == movimentacao.ID_ANIMAL).first()
+    resolver = resolver or BatchResolver(db)
+    medicamento = await resolver.obter(Medicamento, movimentacao.ID_MEDICAMENTO)
+    animal = await resolver.obter(Animal, movimentacao.ID_ANIMAL)
 
     response_data = MovimentacaoMedicamentoResponse.from_orm(movimentacao)
     response_data.medicamento_nome = medicamento.NOME if medicamento else None
@@ -1,23 +1,35 @@
 from datetime import datetime
 from typing import List, Optional
 
-from app.core.database import get_db
+from app.core.database import get_async_db
+from app.core.exportacao import FormatoExportacao, colunas, resposta_exportacao
+from app.core.paginacao import ParametrosPaginacao, paginar
 from app.core.security import get_current_user
 from app.models.animal import Animal
-from app.models.movimentacao import MovimentacaoAnimais
+from app.models.movimentacao import LocalizacaoAtualAnimal, MovimentacaoAnimais
 from app.models.terreno import Terreno
 from app.models.user import User
 from app.schemas.movimentacao import (
+    ContatoAnimal,
+    ContatosAnimal,
+    EncontroTerreno,
     HistoricoMovimentacao,
     LocalizacaoAtual,
     MovimentacaoCreate,
+    MovimentacaoLoteCreate,
     MovimentacaoResponse,
     MovimentacaoUpdate,
+    PermanenciaAnimal,
     TipoMovimentacaoEnum,
 )
+from app.services.batch_resolver import BatchResolver, _lotes
+from app.services.historico_localizacao import indice_permanencias, sem_fuso
+from app.services.ocupacao import atualizar_localizacoes, consultar_localizacoes
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
-from sqlalchemy.sql import desc, func
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from sqlalchemy.sql import desc
 
 router = APIRouter(prefix="/api/movimentacoes", tags=["Movimentações"])
 
@@ -27,11 +39,11 @@ router = APIRouter(prefix="/api/movimentacoes", tags=["Movimentações"])
 )
 async def create_movimentacao(
     movimentacao: MovimentacaoCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     # Verificar se animal existe
-    animal = db.query(Animal).filter(Animal.ID == movimentacao.ID_ANIMAL).first()
+    animal = await db.scalar(select(Animal).filter(Animal.ID == movimentacao.ID_ANIMAL))
     if not animal:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Animal não encontrado"
@@ -39,10 +51,8 @@ async def create_movimentacao(
 
     # Validar terrenos se informados
     if movimentacao.ID_TERRENO_ORIGEM:
-        terreno_origem = (
-            db.query(Terreno)
-            .filter(Terreno.ID == movimentacao.ID_TERRENO_ORIGEM)
-            .first()
+        terreno_origem = await db.scalar(
+            select(Terreno).filter(Terreno.ID == movimentacao.ID_TERRENO_ORIGEM)
         )
         if not terreno_origem:
             raise HTTPException(
@@ -51,10 +61,8 @@ async def create_movimentacao(
             )
 
     if movimentacao.ID_TERRENO_DESTINO:
-        terreno_destino = (
-            db.query(Terreno)
-            .filter(Terreno.ID == movimentacao.ID_TERRENO_DESTINO)
-            .first()
+        terreno_destino = await db.scalar(
+            select(Terreno).filter(Terreno.ID == movimentacao.ID_TERRENO_DESTINO)
         )
         if not terreno_destino:
             raise HTTPException(
@@ -70,15 +78,107 @@ async def create_movimentacao(
 
     db_movimentacao = MovimentacaoAnimais(**movimentacao.dict())
     db.add(db_movimentacao)
-    db.commit()
-    db.refresh(db_movimentacao)
+    await db.commit()
+    await db.refresh(db_movimentacao)
 
     return await _enrich_movimentacao_response(db_movimentacao, db)
 
 
+@router.post(
+    "/lote",
+    response_model=List[MovimentacaoResponse],
+    status_code=status.HTTP_201_CREATED,
+)
+async def create_movimentacoes_lote(
+    lote: MovimentacaoLoteCreate,
+    validar_origem: bool = Query(
+        True,
+        description="Exigir que os animais estejam no terreno de origem "
+        "(desative para lançamentos retroativos)",
+    ),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Movimenta um grupo de animais (ex.: movimentações do plano de rotação).
+    Validação com número fixo de queries, um INSERT em lote e um commit.
+    """
+    ids = lote.ID_ANIMAIS
+
+    animais = []
+    for ids_lote in _lotes(ids):
+        animais.extend(
+            (await db.scalars(select(Animal).filter(Animal.ID.in_(ids_lote)))).all()
+        )
+    faltantes = sorted(set(ids) - {a.ID for a in animais})
+    if faltantes:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Animais não encontrados: {faltantes}",
+        )
+
+    ids_terrenos = {
+        t for t in (lote.ID_TERRENO_ORIGEM, lote.ID_TERRENO_DESTINO) if t is not None
+    }
+    terrenos = []
+    if ids_terrenos:
+        terrenos = (
+            await db.scalars(select(Terreno).filter(Terreno.ID.in_(ids_terrenos)))
+        ).all()
+    encontrados = {t.ID for t in terrenos}
+    if lote.ID_TERRENO_ORIGEM and lote.ID_TERRENO_ORIGEM not in encontrados:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Terreno de origem não encontrado",
+        )
+    if lote.ID_TERRENO_DESTINO and lote.ID_TERRENO_DESTINO not in encontrados:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Terreno de destino não encontrado",
+        )
+
+    if validar_origem and lote.ID_TERRENO_ORIGEM:
+        no_terreno = set()
+        for ids_lote in _lotes(ids):
+            no_terreno.update(
+                await db.scalars(
+                    select(LocalizacaoAtualAnimal.ID_ANIMAL).filter(
+                        LocalizacaoAtualAnimal.ID_ANIMAL.in_(ids_lote),
+                        LocalizacaoAtualAnimal.ID_TERRENO == lote.ID_TERRENO_ORIGEM,
+                    )
+                )
+            )
+        fora = sorted(set(ids) - no_terreno)
+        if fora:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Animais fora do terreno de origem: {fora}",
+            )
+
+    dados = lote.dict(exclude={"ID_ANIMAIS"})
+    try:
+        # INSERT em lote (executemany) não passa pelo flush: a localização
+        # atual é recalculada explicitamente na mesma transação
+        movimentacoes = (
+            await db.scalars(
+                insert(MovimentacaoAnimais).returning(MovimentacaoAnimais),
+                [{**dados, "ID_ANIMAL": id_animal} for id_animal in ids],
+            )
+        ).all()
+        await db.run_sync(atualizar_localizacoes, ids)
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+
+    resolver = BatchResolver(db)
+    resolver.registrar(*animais, *terrenos)
+    return await _enrich_movimentacoes_response(movimentacoes, db, resolver)
+
+
 @router.get("/", response_model=dict)
 async def list_movimentacoes(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     animal_id: Optional[int] = Query(None, description="Filtrar por animal"),
     tipo_movimentacao: Optional[TipoMovimentacaoEnum] = Query(
         None, description="Filtrar por tipo"
@@ -90,9 +190,80 @@ async def list_movimentacoes(
     data_fim: Optional[str] = Query(None, description="Data fim (YYYY-MM-DD)"),
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=100),
+    paginacao: ParametrosPaginacao = Depends(),
+):
+    query = _filtrar_movimentacoes(
+        select(MovimentacaoAnimais),
+        animal_id,
+        tipo_movimentacao,
+        terreno_id,
+        data_inicio,
+        data_fim,
+    )
+
+    pagina = await paginar(
+        db,
+        query,
+        [(MovimentacaoAnimais.DATA_MOVIMENTACAO, True)],
+        MovimentacaoAnimais.ID,
+        page,
+        limit,
+        paginacao,
+    )
+    movimentacoes = pagina.itens
+
+    # Enriquecer com dados relacionados
+    enriched_movimentacoes = await _enrich_movimentacoes_response(movimentacoes, db)
+
+    return {
+        "movimentacoes": enriched_movimentacoes,
+        **pagina.metadados(page, limit),
+    }
+
+
+@router.get("/exportar")
+async def exportar_movimentacoes(
+    current_user: User = Depends(get_current_user),
+    formato: FormatoExportacao = Query(FormatoExportacao.CSV),
+    animal_id: Optional[int] = Query(None, description="Filtrar por animal"),
+    tipo_movimentacao: Optional[TipoMovimentacaoEnum] = Query(
+        None, description="Filtrar por tipo"
+    ),
+    terreno_id: Optional[int] = Query(
+        None, description="Filtrar por terreno (origem ou destino)"
+    ),
+    data_inicio: Optional[str] = Query(None, description="Data início (YYYY-MM-DD)"),
+    data_fim: Optional[str] = Query(None, description="Data fim (YYYY-MM-DD)"),
 ):
-    query = db.query(MovimentacaoAnimais)
+    """Exporta o histórico de movimentações em CSV ou NDJSON"""
+    origem = aliased(Terreno)
+    destino = aliased(Terreno)
+    query = (
+        select(
+            *colunas(MovimentacaoAnimais),
+            Animal.NOME.label("ANIMAL_NOME"),
+            origem.NOME.label("TERRENO_ORIGEM_NOME"),
+            destino.NOME.label("TERRENO_DESTINO_NOME"),
+        )
+        .join(Animal, MovimentacaoAnimais.ID_ANIMAL == Animal.ID)
+        .outerjoin(origem, MovimentacaoAnimais.ID_TERRENO_ORIGEM == origem.ID)
+        .outerjoin(destino, MovimentacaoAnimais.ID_TERRENO_DESTINO == destino.ID)
+        .order_by(MovimentacaoAnimais.DATA_MOVIMENTACAO, MovimentacaoAnimais.ID)
+    )
+    query = _filtrar_movimentacoes(
+        query, animal_id, tipo_movimentacao, terreno_id, data_inicio, data_fim
+    )
+    return resposta_exportacao(query, formato, "movimentacoes")
+
 
+def _filtrar_movimentacoes(
+    query,
+    animal_id: Optional[int],
+    tipo_movimentacao: Optional[TipoMovimentacaoEnum],
+    terreno_id: Optional[int],
+    data_inicio: Optional[str],
+    data_fim: Optional[str],
+):
     if animal_id:
         query = query.filter(MovimentacaoAnimais.ID_ANIMAL == animal_id)
     if tipo_movimentacao:
@@ -110,37 +281,147 @@ async def list_movimentacoes(
         query = query.filter(
             MovimentacaoAnimais.DATA_MOVIMENTACAO <= datetime.fromisoformat(data_fim)
         )
+    return query
 
-    total = query.count()
-    offset = (page - 1) * limit
-    movimentacoes = (
-        query.order_by(desc(MovimentacaoAnimais.DATA_MOVIMENTACAO))
-        .offset(offset)
-        .limit(limit)
-        .all()
-    )
 
-    # Enriquecer com dados relacionados
-    enriched_movimentacoes = []
-    for mov in movimentacoes:
-        enriched = await _enrich_movimentacao_response(mov, db)
-        enriched_movimentacoes.append(enriched)
+# === Histórico de permanências (consultas por data) ===
 
-    return {
-        "movimentacoes": enriched_movimentacoes,
-        "total": total,
-        "page": page,
-        "limit": limit,
-    }
+
+async def _permanencias_response(permanencias, resolver: BatchResolver):
+    await resolver.carregar(Animal, [p.ID_ANIMAL for p in permanencias])
+    await resolver.carregar(Terreno, [p.ID_TERRENO for p in permanencias])
+    resultado = []
+    for p in permanencias:
+        animal = await resolver.obter(Animal, p.ID_ANIMAL)
+        terreno = await resolver.obter(Terreno, p.ID_TERRENO)
+        resultado.append(
+            PermanenciaAnimal(
+                animal_id=p.ID_ANIMAL,
+                animal_nome=animal.NOME if animal else None,
+                terreno_id=p.ID_TERRENO,
+                terreno_nome=terreno.NOME if terreno else None,
+                local_externo=p.LOCAL_EXTERNO,
+                inicio=p.inicio,
+                fim=None if p.em_aberto else p.fim,
+                id_movimentacao=p.ID_MOVIMENTACAO,
+            )
+        )
+    return resultado
+
+
+@router.get("/historico/animal/{animal_id}", response_model=PermanenciaAnimal)
+async def get_localizacao_em_data(
+    animal_id: int,
+    data: datetime = Query(..., description="Instante consultado"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Onde o animal estava no instante informado"""
+    permanencia = await indice_permanencias.localizacao_em(db, animal_id, data)
+    if not permanencia:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Localização do animal desconhecida nesta data",
+        )
+    return (await _permanencias_response([permanencia], BatchResolver(db)))[0]
+
+
+@router.get("/historico/terreno/{terreno_id}", response_model=List[PermanenciaAnimal])
+async def get_animais_terreno_em_data(
+    terreno_id: int,
+    data: datetime = Query(..., description="Instante (ou início do período)"),
+    ate: Optional[datetime] = Query(None, description="Fim do período"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Animais que estavam no terreno no instante ou em algum momento do período"""
+    data = sem_fuso(data)
+    ate = sem_fuso(ate) if ate else None
+    if ate and ate < data:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Fim do período anterior ao início",
+        )
+    permanencias = await indice_permanencias.no_terreno(db, terreno_id, data, ate)
+    return await _permanencias_response(permanencias, BatchResolver(db))
+
+
+@router.get("/historico/animal/{animal_id}/contatos", response_model=ContatosAnimal)
+async def get_contatos_animal(
+    animal_id: int,
+    inicio: datetime = Query(..., description="Início do período"),
+    fim: Optional[datetime] = Query(None, description="Fim do período (padrão: agora)"),
+    terreno_id: Optional[int] = Query(None, description="Apenas neste terreno"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Animais que dividiram terreno com o animal no período, com cada
+    sobreposição (rastreabilidade sanitária).
+    """
+    inicio = sem_fuso(inicio)
+    fim = sem_fuso(fim) if fim else datetime.now()
+    if fim <= inicio:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Fim do período deve ser posterior ao início",
+        )
+    animal = await db.scalar(select(Animal).filter(Animal.ID == animal_id))
+    if not animal:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Animal não encontrado"
+        )
+
+    encontros = await indice_permanencias.contatos(
+        db, animal_id, inicio, fim, terreno_id
+    )
+    resolver = BatchResolver(db)
+    await resolver.carregar(Animal, encontros)
+    await resolver.carregar(
+        Terreno, [t for lista in encontros.values() for t, _, _ in lista]
+    )
+
+    contatos = []
+    for id_contato, lista in encontros.items():
+        contato = await resolver.obter(Animal, id_contato)
+        horas = sum((f - i).total_seconds() for _, i, f in lista) / 3600
+        lista_encontros = []
+        for id_terreno, de, ate in sorted(lista, key=lambda e: e[1]):
+            terreno = await resolver.obter(Terreno, id_terreno)
+            lista_encontros.append(
+                EncontroTerreno(
+                    terreno_id=id_terreno,
+                    terreno_nome=terreno.NOME if terreno else None,
+                    inicio=de,
+                    fim=ate,
+                )
+            )
+        contatos.append(
+            ContatoAnimal(
+                animal_id=id_contato,
+                animal_nome=contato.NOME if contato else None,
+                horas_contato=round(horas, 1),
+                encontros=lista_encontros,
+            )
+        )
+    contatos.sort(key=lambda c: (-c.horas_contato, c.animal_id))
+
+    return ContatosAnimal(
+        animal_id=animal_id,
+        animal_nome=animal.NOME,
+        inicio=inicio,
+        fim=fim,
+        contatos=contatos,
+    )
 
 
 @router.get("/{id}", response_model=MovimentacaoResponse)
 async def get_movimentacao(
     id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    movimentacao = (
-        db.query(MovimentacaoAnimais).filter(MovimentacaoAnimais.ID == id).first()
+    movimentacao = await db.scalar(
+        select(MovimentacaoAnimais).filter(MovimentacaoAnimais.ID == id)
     )
     if not movimentacao:
         raise HTTPException(
@@ -154,11 +435,11 @@ async def get_movimentacao(
 async def update_movimentacao(
     id: int,
     movimentacao: MovimentacaoUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    db_movimentacao = (
-        db.query(MovimentacaoAnimais).filter(MovimentacaoAnimais.ID == id).first()
+    db_movimentacao = await db.scalar(
+        select(MovimentacaoAnimais).filter(MovimentacaoAnimais.ID == id)
     )
     if not db_movimentacao:
         raise HTTPException(
@@ -168,36 +449,36 @@ async def update_movimentacao(
     for key, value in movimentacao.dict(exclude_unset=True).items():
         setattr(db_movimentacao, key, value)
 
-    db.commit()
-    db.refresh(db_movimentacao)
+    await db.commit()
+    await db.refresh(db_movimentacao)
     return await _enrich_movimentacao_response(db_movimentacao, db)
 
 
 @router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_movimentacao(
     id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    db_movimentacao = (
-        db.query(MovimentacaoAnimais).filter(MovimentacaoAnimais.ID == id).first()
+    db_movimentacao = await db.scalar(
+        select(MovimentacaoAnimais).filter(MovimentacaoAnimais.ID == id)
     )
     if not db_movimentacao:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Movimentação não encontrada"
         )
 
-    db.delete(db_movimentacao)
-    db.commit()
+    await db.delete(db_movimentacao)
+    await db.commit()
 
 
 @router.get("/animal/{animal_id}/historico", response_model=HistoricoMovimentacao)
 async def get_historico_animal(
     animal_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     # Verificar se animal existe
-    animal = db.query(Animal).filter(Animal.ID == animal_id).first()
+    animal = await db.scalar(select(Animal).filter(Animal.ID == animal_id))
     if not animal:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Animal não encontrado"
@@ -205,28 +486,25 @@ async def get_historico_animal(
 
     # Buscar todas movimentações do animal
     movimentacoes = (
-        db.query(MovimentacaoAnimais)
-        .filter(MovimentacaoAnimais.ID_ANIMAL == animal_id)
-        .order_by(desc(MovimentacaoAnimais.DATA_MOVIMENTACAO))
-        .all()
-    )
+        await db.scalars(
+            select(MovimentacaoAnimais)
+            .filter(MovimentacaoAnimais.ID_ANIMAL == animal_id)
+            .order_by(desc(MovimentacaoAnimais.DATA_MOVIMENTACAO))
+        )
+    ).all()
 
     # Enriquecer dados
-    enriched_movimentacoes = []
-    for mov in movimentacoes:
-        enriched = await _enrich_movimentacao_response(mov, db)
-        enriched_movimentacoes.append(enriched)
+    resolver = BatchResolver(db)
+    enriched_movimentacoes = await _enrich_movimentacoes_response(
+        movimentacoes, db, resolver
+    )
 
     # Determinar localização atual
     localizacao_atual = "Não informado"
     if movimentacoes:
         ultima = movimentacoes[0]
         if ultima.ID_TERRENO_DESTINO:
-            terreno = (
-                db.query(Terreno)
-                .filter(Terreno.ID == ultima.ID_TERRENO_DESTINO)
-                .first()
-            )
+            terreno = await resolver.obter(Terreno, ultima.ID_TERRENO_DESTINO)
             localizacao_atual = (
                 terreno.NOME if terreno else f"Terreno #{ultima.ID_TERRENO_DESTINO}"
             )
@@ -241,74 +519,16 @@ async def get_historico_animal(
 @router.get("/relatorio/localizacoes", response_model=List[LocalizacaoAtual])
 async def get_localizacoes_atuais(
     animal_id: Optional[int] = Query(None, description="Filtrar por animal"),
-    terreno_id: Optional[int] = Query(
-        None, description="Filtrar por terreno (origem ou destino)"
-    ),
-    db: Session = Depends(get_db),
+    terreno_id: Optional[int] = Query(None, description="Filtrar por terreno atual"),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    # Buscar última movimentação de cada animal
-    subquery = (
-        db.query(
-            MovimentacaoAnimais.ID_ANIMAL,
-            func.max(MovimentacaoAnimais.DATA_MOVIMENTACAO).label("ultima_data"),
-        )
-        .group_by(MovimentacaoAnimais.ID_ANIMAL)
-        .subquery()
-    )
-
-    query = (
-        db.query(MovimentacaoAnimais, Animal.NOME)
-        .join(Animal, MovimentacaoAnimais.ID_ANIMAL == Animal.ID)
-        .join(
-            subquery,
-            (MovimentacaoAnimais.ID_ANIMAL == subquery.c.ID_ANIMAL)
-            & (MovimentacaoAnimais.DATA_MOVIMENTACAO == subquery.c.ultima_data),
-        )
-    )
-
+    filtros = []
     if animal_id:
-        query = query.filter(MovimentacaoAnimais.ID_ANIMAL == animal_id)
-
+        filtros.append(LocalizacaoAtualAnimal.ID_ANIMAL == animal_id)
     if terreno_id:
-        query = query.filter((MovimentacaoAnimais.ID_TERRENO_DESTINO == terreno_id))
-
-    ultimas_movimentacoes = query.all()
-
-    resultado = []
-    localizacao_tipo = None
-    localizacao = None
-    for mov, animal_nome in ultimas_movimentacoes:
-        terreno_atual = None
-        local_externo = None
-
-        if mov.ID_TERRENO_DESTINO:
-            terreno = (
-                db.query(Terreno).filter(Terreno.ID == mov.ID_TERRENO_DESTINO).first()
-            )
-            terreno_atual = (
-                terreno.NOME if terreno else f"Terreno #{mov.ID_TERRENO_DESTINO}"
-            )
-            localizacao_tipo = "terreno"
-            localizacao = terreno_atual
-        elif mov.DESTINO_EXTERNO:
-            local_externo = mov.DESTINO_EXTERNO
-            localizacao_tipo = "externo"
-            localizacao = local_externo
-
-        resultado.append(
-            LocalizacaoAtual(
-                animal_id=mov.ID_ANIMAL,
-                animal_nome=animal_nome,
-                terreno_atual=terreno_atual,
-                local_externo=local_externo,
-                data_ultima_movimentacao=mov.DATA_MOVIMENTACAO,
-                tipo_ultima_movimentacao=mov.TIPO_MOVIMENTACAO,
-                localizacao_tipo=localizacao_tipo,
-                localizacao=localizacao,
-            )
-        )
+        filtros.append(LocalizacaoAtualAnimal.ID_TERRENO == terreno_id)
 
-    return resultado
+    return await consultar_localizacoes(db, *filtros)
 
 
 @router.get("/options/tipos")
@@ -327,26 +547,16 @@ async def get_tipos_movimentacao():
 
 
 async def _enrich_movimentacao_response(
-    movimentacao: MovimentacaoAnimais, db: Session
+    movimentacao: MovimentacaoAnimais,
+    db: AsyncSession,
+    resolver: Optional[BatchResolver] = None,
 ) -> MovimentacaoResponse:
-    # Buscar dados relacionados
-    animal = db.query(Animal).filter(Animal.ID == movimentacao.ID_ANIMAL).first()
-    terreno_origem = None
-    terreno_destino = None
+    resolver = resolver or BatchResolver(db)
 
-    if movimentacao.ID_TERRENO_ORIGEM:
-        terreno_origem = (
-            db.query(Terreno)
-            .filter(Terreno.ID == movimentacao.ID_TERRENO_ORIGEM)
-            .first()
-        )
-
-    if movimentacao.ID_TERRENO_DESTINO:
-        terreno_destino = (
-            db.query(Terreno)
-            .filter(Terreno.ID == movimentacao.ID_TERRENO_DESTINO)
-            .first()
-        )
+    # Buscar dados relacionados
+    animal = await resolver.obter(Animal, movimentacao.ID_ANIMAL)
+    terreno_origem = await resolver.obter(Terreno, movimentacao.ID_TERRENO_ORIGEM)
+    terreno_destino = await resolver.obter(Terreno, movimentacao.ID_TERRENO_DESTINO)
 
     # Criar response com dados enriquecidos
     response_data = MovimentacaoResponse.from_orm(movimentacao)
@@ -357,3 +567,22 @@ async def _enrich_movimentacao_response(
     )
 
     return response_data
+
+
+async def _enrich_movimentacoes_response(
+    movimentacoes: List[MovimentacaoAnimais],
+    db: AsyncSession,
+    resolver: Optional[BatchResolver] = None,
+) -> List[MovimentacaoResponse]:
+    """Enriquece uma página inteira com uma query por tabela relacionada"""
+    resolver = resolver or BatchResolver(db)
+    await resolver.carregar(Animal, [m.ID_ANIMAL for m in movimentacoes])
+    await resolver.carregar(
+        Terreno,
+        [m.ID_TERRENO_ORIGEM for m in movimentacoes]
+        + [m.ID_TERRENO_DESTINO for m in movimentacoes],
+    )
+
+    return [
+        await _enrich_movimentacao_response(mov, db, resolver) for mov in movimentacoes
+    ]
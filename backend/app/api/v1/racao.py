@@ -1,7 +1,9 @@
 from datetime import datetime
 from typing import List, Optional
 
-from app.core.database import get_db
+from app.core.database import get_async_db
+from app.core.exportacao import FormatoExportacao, colunas, resposta_exportacao
+from app.core.paginacao import ParametrosPaginacao, paginar
 from app.core.security import get_current_user
 from app.models.animal import Animal
 from app.models.crescimento import HistoricoCrescimento
@@ -40,8 +42,11 @@ from app.schemas.racao import (
     TipoAlimentoEnum,
     TipoMovimentacaoRacaoEnum,
 )
+from app.services.batch_resolver import BatchResolver
+from app.services.busca import indice_produtos_racao
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql import desc, text
 
 router = APIRouter(prefix="/api/racao", tags=["Ração e Suplementos"])
@@ -58,15 +63,15 @@ router = APIRouter(prefix="/api/racao", tags=["Ração e Suplementos"])
 )
 async def create_produto_racao(
     produto: ProdutoRacaoCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Criar produto de ração/suplemento"""
     # Verificar duplicatas
-    existing = (
-        db.query(ProdutoRacao)
-        .filter(ProdutoRacao.NOME == produto.NOME, ProdutoRacao.ATIVO == "S")
-        .first()
+    existing = await db.scalar(
+        select(ProdutoRacao).filter(
+            ProdutoRacao.NOME == produto.NOME, ProdutoRacao.ATIVO == "S"
+        )
     )
 
     if existing:
@@ -77,15 +82,15 @@ async def create_produto_racao(
 
     db_produto = ProdutoRacao(**produto.dict(), ID_USUARIO_CADASTRO=current_user.ID)
     db.add(db_produto)
-    db.commit()
-    db.refresh(db_produto)
+    await db.commit()
+    await db.refresh(db_produto)
 
     return await _enrich_produto_response(db_produto, db)
 
 
 @router.get("/produtos", response_model=dict)
 async def list_produtos_racao(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
     nome: Optional[str] = Query(None, description="Filtrar por nome"),
     tipo_alimento: Optional[TipoAlimentoEnum] = Query(
@@ -95,9 +100,10 @@ async def list_produtos_racao(
     ativo: Optional[str] = Query(None, description="Filtrar por status"),
     page: int = Query(1, ge=1, description="Página"),
     limit: int = Query(20, ge=1, le=100, description="Itens por página"),
+    paginacao: ParametrosPaginacao = Depends(),
 ):
     """Listar produtos de ração"""
-    query = db.query(ProdutoRacao)
+    query = select(ProdutoRacao)
 
     # Filtros
     if nome:
@@ -110,9 +116,10 @@ async def list_produtos_racao(
         query = query.filter(ProdutoRacao.ATIVO == ativo.upper())
 
     # Paginação
-    total = query.count()
-    offset = (page - 1) * limit
-    produtos = query.order_by(ProdutoRacao.NOME).offset(offset).limit(limit).all()
+    pagina = await paginar(
+        db, query, [(ProdutoRacao.NOME, False)], ProdutoRacao.ID, page, limit, paginacao
+    )
+    produtos = pagina.itens
 
     # Enriquecer resposta
     produtos_response = []
@@ -122,24 +129,21 @@ async def list_produtos_racao(
 
     return {
         "produtos": produtos_response,
-        "total": total,
-        "page": page,
-        "limit": limit,
-        "total_pages": (total + limit - 1) // limit,
+        **pagina.metadados(page, limit),
     }
 
 
 @router.get("/produtos/{produto_id}", response_model=ProdutoRacaoResponse)
 async def get_produto_racao(
     produto_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Obter produto específico"""
-    produto = (
-        db.query(ProdutoRacao)
-        .filter(ProdutoRacao.ID == produto_id, ProdutoRacao.ATIVO == "S")
-        .first()
+    produto = await db.scalar(
+        select(ProdutoRacao).filter(
+            ProdutoRacao.ID == produto_id, ProdutoRacao.ATIVO == "S"
+        )
     )
 
     if not produto:
@@ -152,14 +156,14 @@ async def get_produto_racao(
 async def update_produto_racao(
     produto_id: int,
     produto_update: ProdutoRacaoUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Atualizar produto de ração"""
-    produto = (
-        db.query(ProdutoRacao)
-        .filter(ProdutoRacao.ID == produto_id, ProdutoRacao.ATIVO == "S")
-        .first()
+    produto = await db.scalar(
+        select(ProdutoRacao).filter(
+            ProdutoRacao.ID == produto_id, ProdutoRacao.ATIVO == "S"
+        )
     )
 
     if not produto:
@@ -167,14 +171,12 @@ async def update_produto_racao(
 
     # Verificar duplicata de nome se alterado
     if produto_update.NOME and produto_update.NOME != produto.NOME:
-        existing = (
-            db.query(ProdutoRacao)
-            .filter(
+        existing = await db.scalar(
+            select(ProdutoRacao).filter(
                 ProdutoRacao.NOME == produto_update.NOME,
                 ProdutoRacao.ID != produto_id,
                 ProdutoRacao.ATIVO == "S",
             )
-            .first()
         )
         if existing:
             raise HTTPException(
@@ -185,8 +187,8 @@ async def update_produto_racao(
     for field, value in produto_update.dict(exclude_unset=True).items():
         setattr(produto, field, value)
 
-    db.commit()
-    db.refresh(produto)
+    await db.commit()
+    await db.refresh(produto)
 
     return await _enrich_produto_response(produto, db)
 
@@ -194,21 +196,21 @@ async def update_produto_racao(
 @router.delete("/produtos/{produto_id}")
 async def delete_produto_racao(
     produto_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Inativar produto de ração"""
-    produto = (
-        db.query(ProdutoRacao)
-        .filter(ProdutoRacao.ID == produto_id, ProdutoRacao.ATIVO == "S")
-        .first()
+    produto = await db.scalar(
+        select(ProdutoRacao).filter(
+            ProdutoRacao.ID == produto_id, ProdutoRacao.ATIVO == "S"
+        )
     )
 
     if not produto:
         raise HTTPException(status_code=404, detail="Produto não encontrado")
 
     produto.ATIVO = "N"
-    db.commit()
+    await db.commit()
 
     return {"message": "Produto inativado com sucesso"}
 
@@ -225,14 +227,14 @@ async def delete_produto_racao(
 )
 async def entrada_estoque_racao(
     entrada: EntradaRacaoCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Registrar entrada de estoque (compra)"""
-    produto = (
-        db.query(ProdutoRacao)
-        .filter(ProdutoRacao.ID == entrada.ID_PRODUTO, ProdutoRacao.ATIVO == "S")
-        .first()
+    produto = await db.scalar(
+        select(ProdutoRacao).filter(
+            ProdutoRacao.ID == entrada.ID_PRODUTO, ProdutoRacao.ATIVO == "S"
+        )
     )
 
     if not produto:
@@ -242,8 +244,8 @@ async def entrada_estoque_racao(
         **entrada.dict(), ID_USUARIO_REGISTRO=current_user.ID
     )
     db.add(db_movimentacao)
-    db.commit()
-    db.refresh(db_movimentacao)
+    await db.commit()
+    await db.refresh(db_movimentacao)
 
     return await _enrich_movimentacao_response(db_movimentacao, db)
 
@@ -255,14 +257,14 @@ async def entrada_estoque_racao(
 )
 async def saida_estoque_racao(
     saida: SaidaRacaoCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Registrar saída manual de estoque"""
-    produto = (
-        db.query(ProdutoRacao)
-        .filter(ProdutoRacao.ID == saida.ID_PRODUTO, ProdutoRacao.ATIVO == "S")
-        .first()
+    produto = await db.scalar(
+        select(ProdutoRacao).filter(
+            ProdutoRacao.ID == saida.ID_PRODUTO, ProdutoRacao.ATIVO == "S"
+        )
     )
 
     if not produto:
@@ -286,8 +288,8 @@ async def saida_estoque_racao(
         ID_USUARIO_REGISTRO=current_user.ID,
     )
     db.add(db_movimentacao)
-    db.commit()
-    db.refresh(db_movimentacao)
+    await db.commit()
+    await db.refresh(db_movimentacao)
 
     return await _enrich_movimentacao_response(db_movimentacao, db)
 
@@ -299,14 +301,14 @@ async def saida_estoque_racao(
 )
 async def ajuste_estoque_racao(
     ajuste: AjusteRacaoCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Ajustar estoque para quantidade específica"""
-    produto = (
-        db.query(ProdutoRacao)
-        .filter(ProdutoRacao.ID == ajuste.ID_PRODUTO, ProdutoRacao.ATIVO == "S")
-        .first()
+    produto = await db.scalar(
+        select(ProdutoRacao).filter(
+            ProdutoRacao.ID == ajuste.ID_PRODUTO, ProdutoRacao.ATIVO == "S"
+        )
     )
 
     if not produto:
@@ -321,15 +323,15 @@ async def ajuste_estoque_racao(
         ID_USUARIO_REGISTRO=current_user.ID,
     )
     db.add(db_movimentacao)
-    db.commit()
-    db.refresh(db_movimentacao)
+    await db.commit()
+    await db.refresh(db_movimentacao)
 
     return await _enrich_movimentacao_response(db_movimentacao, db)
 
 
 @router.get("/estoque/movimentacoes", response_model=dict)
 async def list_movimentacoes_racao(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
     produto_id: Optional[int] = Query(None, description="Filtrar por produto"),
     tipo_movimentacao: Optional[TipoMovimentacaoRacaoEnum] = Query(
@@ -339,13 +341,72 @@ async def list_movimentacoes_racao(
     data_fim: Optional[str] = Query(None, description="Data fim (YYYY-MM-DD)"),
     page: int = Query(1, ge=1, description="Página"),
     limit: int = Query(20, ge=1, le=100, description="Itens por página"),
+    paginacao: ParametrosPaginacao = Depends(),
 ):
     """Listar movimentações de ração"""
-    query = db.query(MovimentacaoProdutoRacao).join(
+    query = select(MovimentacaoProdutoRacao).join(
         ProdutoRacao, MovimentacaoProdutoRacao.ID_PRODUTO == ProdutoRacao.ID
     )
+    query = _filtrar_movimentacoes_racao(
+        query, produto_id, tipo_movimentacao, data_inicio, data_fim
+    )
 
-    # Filtros
+    # Paginação
+    pagina = await paginar(
+        db,
+        query,
+        [(MovimentacaoProdutoRacao.DATA_REGISTRO, True)],
+        MovimentacaoProdutoRacao.ID,
+        page,
+        limit,
+        paginacao,
+    )
+    movimentacoes = pagina.itens
+
+    # Enriquecer resposta
+    movimentacoes_response = await _enrich_movimentacoes_response(movimentacoes, db)
+
+    return {
+        "movimentacoes": movimentacoes_response,
+        **pagina.metadados(page, limit),
+    }
+
+
+@router.get("/estoque/movimentacoes/exportar")
+async def exportar_movimentacoes_racao(
+    current_user: User = Depends(get_current_user),
+    formato: FormatoExportacao = Query(FormatoExportacao.CSV),
+    produto_id: Optional[int] = Query(None, description="Filtrar por produto"),
+    tipo_movimentacao: Optional[TipoMovimentacaoRacaoEnum] = Query(
+        None, description="Filtrar por tipo"
+    ),
+    data_inicio: Optional[str] = Query(None, description="Data início (YYYY-MM-DD)"),
+    data_fim: Optional[str] = Query(None, description="Data fim (YYYY-MM-DD)"),
+):
+    """Exportar movimentações de estoque de ração em CSV ou NDJSON"""
+    query = (
+        select(
+            *colunas(MovimentacaoProdutoRacao),
+            ProdutoRacao.NOME.label("PRODUTO_NOME"),
+            Animal.NOME.label("ANIMAL_NOME"),
+        )
+        .join(ProdutoRacao, MovimentacaoProdutoRacao.ID_PRODUTO == ProdutoRacao.ID)
+        .outerjoin(Animal, MovimentacaoProdutoRacao.ID_ANIMAL == Animal.ID)
+        .order_by(MovimentacaoProdutoRacao.DATA_REGISTRO, MovimentacaoProdutoRacao.ID)
+    )
+    query = _filtrar_movimentacoes_racao(
+        query, produto_id, tipo_movimentacao, data_inicio, data_fim
+    )
+    return resposta_exportacao(query, formato, "movimentacoes_racao")
+
+
+def _filtrar_movimentacoes_racao(
+    query,
+    produto_id: Optional[int],
+    tipo_movimentacao: Optional[TipoMovimentacaoRacaoEnum],
+    data_inicio: Optional[str],
+    data_fim: Optional[str],
+):
     if produto_id:
         query = query.filter(MovimentacaoProdutoRacao.ID_PRODUTO == produto_id)
     if tipo_movimentacao:
@@ -367,30 +428,7 @@ async def list_movimentacoes_racao(
             query = query.filter(MovimentacaoProdutoRacao.DATA_REGISTRO <= data_fim_dt)
         except ValueError:
             pass
-
-    # Paginação
-    total = query.count()
-    offset = (page - 1) * limit
-    movimentacoes = (
-        query.order_by(desc(MovimentacaoProdutoRacao.DATA_REGISTRO))
-        .offset(offset)
-        .limit(limit)
-        .all()
-    )
-
-    # Enriquecer resposta
-    movimentacoes_response = []
-    for mov in movimentacoes:
-        response = await _enrich_movimentacao_response(mov, db)
-        movimentacoes_response.append(response)
-
-    return {
-        "movimentacoes": movimentacoes_response,
-        "total": total,
-        "page": page,
-        "limit": limit,
-        "total_pages": (total + limit - 1) // limit,
-    }
+    return query
 
 
 # ======================================
@@ -405,37 +443,41 @@ async def list_movimentacoes_racao(
 )
 async def create_plano_alimentar(
     plano: PlanoAlimentarCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Criar plano alimentar para animal"""
     # Verificar se animal existe
-    animal = (
-        db.query(Animal)
-        .filter(Animal.ID == plano.ID_ANIMAL, Animal.STATUS_ANIMAL == "ATIVO")
-        .first()
+    animal = await db.scalar(
+        select(Animal).filter(
+            Animal.ID == plano.ID_ANIMAL, Animal.STATUS_ANIMAL == "ATIVO"
+        )
     )
 
     if not animal:
         raise HTTPException(status_code=404, detail="Animal não encontrado")
 
     # Inativar planos anteriores do animal
-    db.query(PlanoAlimentar).filter(
-        PlanoAlimentar.ID_ANIMAL == plano.ID_ANIMAL,
-        PlanoAlimentar.STATUS_PLANO == "ATIVO",
-    ).update({"STATUS_PLANO": "INATIVO"})
+    await db.execute(
+        update(PlanoAlimentar)
+        .filter(
+            PlanoAlimentar.ID_ANIMAL == plano.ID_ANIMAL,
+            PlanoAlimentar.STATUS_PLANO == "ATIVO",
+        )
+        .values(STATUS_PLANO="INATIVO")
+    )
 
     db_plano = PlanoAlimentar(**plano.dict(), ID_USUARIO_CADASTRO=current_user.ID)
     db.add(db_plano)
-    db.commit()
-    db.refresh(db_plano)
+    await db.commit()
+    await db.refresh(db_plano)
 
     return await _enrich_plano_response(db_plano, db)
 
 
 @router.get("/planos", response_model=dict)
 async def list_planos_alimentares(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
     animal_id: Optional[int] = Query(None, description="Filtrar por animal"),
     categoria: Optional[CategoriaNutricionalEnum] = Query(
@@ -444,9 +486,10 @@ async def list_planos_alimentares(
     status_plano: Optional[str] = Query(None, description="Filtrar planos"),
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=100),
+    paginacao: ParametrosPaginacao = Depends(),
 ):
     """Listar planos alimentares"""
-    query = db.query(PlanoAlimentar)
+    query = select(PlanoAlimentar)
 
     # Filtros
     if animal_id:
@@ -457,27 +500,23 @@ async def list_planos_alimentares(
         query = query.filter(PlanoAlimentar.STATUS_PLANO == status_plano)
 
     # Paginação
-    total = query.count()
-    offset = (page - 1) * limit
-    planos = (
-        query.order_by(desc(PlanoAlimentar.DATA_INICIO))
-        .offset(offset)
-        .limit(limit)
-        .all()
+    pagina = await paginar(
+        db,
+        query,
+        [(PlanoAlimentar.DATA_INICIO, True)],
+        PlanoAlimentar.ID,
+        page,
+        limit,
+        paginacao,
     )
+    planos = pagina.itens
 
     # Enriquecer resposta
-    planos_response = []
-    for plano in planos:
-        response = await _enrich_plano_response(plano, db)
-        planos_response.append(response)
+    planos_response = await _enrich_planos_response(planos, db)
 
     return {
         "planos": planos_response,
-        "total": total,
-        "page": page,
-        "limit": limit,
-        "total_pages": (total + limit - 1) // limit,
+        **pagina.metadados(page, limit),
     }
 
 
@@ -486,7 +525,7 @@ async def list_planos_alimentares(
 # ======================================
 @router.get("/fornecimento", response_model=dict)
 async def list_fornecimentos(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
     animal_id: Optional[int] = Query(None, description="Filtrar por animal"),
     produto_id: Optional[int] = Query(None, description="Filtrar por produto"),
@@ -494,11 +533,65 @@ async def list_fornecimentos(
     data_fim: Optional[str] = Query(None, description="Data fim (YYYY-MM-DD)"),
     page: int = Query(1, ge=1, description="Página"),
     limit: int = Query(20, ge=1, le=100, description="Itens por página"),
+    paginacao: ParametrosPaginacao = Depends(),
 ):
     """Listar fornecimentos de ração"""
-    query = db.query(FornecimentoRacaoAnimal)
+    query = _filtrar_fornecimentos(
+        select(FornecimentoRacaoAnimal), animal_id, produto_id, data_inicio, data_fim
+    )
 
-    # Filtros
+    # Paginação
+    pagina = await paginar(
+        db,
+        query,
+        [(FornecimentoRacaoAnimal.DATA_FORNECIMENTO, True)],
+        FornecimentoRacaoAnimal.ID,
+        page,
+        limit,
+        paginacao,
+    )
+    fornecimentos = pagina.itens
+
+    # Enriquecer resposta
+    fornecimentos_response = await _enrich_fornecimentos_response(fornecimentos, db)
+
+    return {
+        "fornecimentos": fornecimentos_response,
+        **pagina.metadados(page, limit),
+    }
+
+
+@router.get("/fornecimento/exportar")
+async def exportar_fornecimentos(
+    current_user: User = Depends(get_current_user),
+    formato: FormatoExportacao = Query(FormatoExportacao.CSV),
+    animal_id: Optional[int] = Query(None, description="Filtrar por animal"),
+    produto_id: Optional[int] = Query(None, description="Filtrar por produto"),
+    data_inicio: Optional[str] = Query(None, description="Data início (YYYY-MM-DD)"),
+    data_fim: Optional[str] = Query(None, description="Data fim (YYYY-MM-DD)"),
+):
+    """Exportar o histórico de fornecimentos em CSV ou NDJSON"""
+    query = (
+        select(
+            *colunas(FornecimentoRacaoAnimal),
+            Animal.NOME.label("ANIMAL_NOME"),
+            ProdutoRacao.NOME.label("PRODUTO_NOME"),
+        )
+        .join(Animal, FornecimentoRacaoAnimal.ID_ANIMAL == Animal.ID)
+        .join(ProdutoRacao, FornecimentoRacaoAnimal.ID_PRODUTO == ProdutoRacao.ID)
+        .order_by(FornecimentoRacaoAnimal.DATA_FORNECIMENTO, FornecimentoRacaoAnimal.ID)
+    )
+    query = _filtrar_fornecimentos(query, animal_id, produto_id, data_inicio, data_fim)
+    return resposta_exportacao(query, formato, "fornecimentos")
+
+
+def _filtrar_fornecimentos(
+    query,
+    animal_id: Optional[int],
+    produto_id: Optional[int],
+    data_inicio: Optional[str],
+    data_fim: Optional[str],
+):
     if animal_id:
         query = query.filter(FornecimentoRacaoAnimal.ID_ANIMAL == animal_id)
     if produto_id:
@@ -513,30 +606,7 @@ async def list_fornecimentos(
             FornecimentoRacaoAnimal.DATA_FORNECIMENTO
             <= datetime.fromisoformat(data_fim)
         )
-
-    # Paginação
-    total = query.count()
-    offset = (page - 1) * limit
-    fornecimentos = (
-        query.order_by(desc(FornecimentoRacaoAnimal.DATA_FORNECIMENTO))
-        .offset(offset)
-        .limit(limit)
-        .all()
-    )
-
-    # Enriquecer resposta
-    fornecimentos_response = []
-    for fornecimento in fornecimentos:
-        response = await _enrich_fornecimento_response(fornecimento, db)
-        fornecimentos_response.append(response)
-
-    return {
-        "fornecimentos": fornecimentos_response,
-        "total": total,
-        "page": page,
-        "limit": limit,
-        "total_pages": (total + limit - 1) // limit,
-    }
+    return query
 
 
 @router.post(
@@ -546,23 +616,23 @@ async def list_fornecimentos(
 )
 async def registrar_fornecimento(
     fornecimento: FornecimentoRacaoCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Registrar fornecimento de ração para animal"""
     # Verificar animal e produto
-    animal = (
-        db.query(Animal)
-        .filter(Animal.ID == fornecimento.ID_ANIMAL, Animal.STATUS_ANIMAL == "ATIVO")
-        .first()
+    animal = await db.scalar(
+        select(Animal).filter(
+            Animal.ID == fornecimento.ID_ANIMAL, Animal.STATUS_ANIMAL == "ATIVO"
+        )
     )
     if not animal:
         raise HTTPException(status_code=404, detail="Animal não encontrado")
 
-    produto = (
-        db.query(ProdutoRacao)
-        .filter(ProdutoRacao.ID == fornecimento.ID_PRODUTO, ProdutoRacao.ATIVO == "S")
-        .first()
+    produto = await db.scalar(
+        select(ProdutoRacao).filter(
+            ProdutoRacao.ID == fornecimento.ID_PRODUTO, ProdutoRacao.ATIVO == "S"
+        )
     )
     if not produto:
         raise HTTPException(status_code=404, detail="Produto não encontrado")
@@ -577,14 +647,14 @@ async def registrar_fornecimento(
 
     # Buscar peso atual do animal se não informado
     if not fornecimento.PESO_ANIMAL_REFERENCIA:
-        ultimo_peso = (
-            db.query(HistoricoCrescimento)
+        ultimo_peso = await db.scalar(
+            select(HistoricoCrescimento)
             .filter(
                 HistoricoCrescimento.ID_ANIMAL == fornecimento.ID_ANIMAL,
                 HistoricoCrescimento.PESO.isnot(None),
             )
             .order_by(desc(HistoricoCrescimento.DATA_MEDICAO))
-            .first()
+            .limit(1)
         )
 
         if ultimo_peso:
@@ -594,8 +664,8 @@ async def registrar_fornecimento(
         **fornecimento.dict(), ID_USUARIO_REGISTRO=current_user.ID
     )
     db.add(db_fornecimento)
-    db.commit()
-    db.refresh(db_fornecimento)
+    await db.commit()
+    await db.refresh(db_fornecimento)
 
     return await _enrich_fornecimento_response(db_fornecimento, db)
 
@@ -604,14 +674,14 @@ async def registrar_fornecimento(
 async def update_fornecimento(
     fornecimento_id: int,
     fornecimento_update: FornecimentoRacaoUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Atualizar registro de fornecimento"""
-    fornecimento = (
-        db.query(FornecimentoRacaoAnimal)
-        .filter(FornecimentoRacaoAnimal.ID == fornecimento_id)
-        .first()
+    fornecimento = await db.scalar(
+        select(FornecimentoRacaoAnimal).filter(
+            FornecimentoRacaoAnimal.ID == fornecimento_id
+        )
     )
     if not fornecimento:
         raise HTTPException(status_code=404, detail="Fornecimento não encontrado")
@@ -619,8 +689,8 @@ async def update_fornecimento(
     for field, value in fornecimento_update.dict(exclude_unset=True).items():
         setattr(fornecimento, field, value)
 
-    db.commit()
-    db.refresh(fornecimento)
+    await db.commit()
+    await db.refresh(fornecimento)
 
     return await _enrich_fornecimento_response(fornecimento, db)
 
@@ -628,23 +698,21 @@ async def update_fornecimento(
 @router.delete("/fornecimento/{fornecimento_id}")
 async def delete_fornecimento(
     fornecimento_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Excluir registro de fornecimento (estorna estoque)"""
-    fornecimento = (
-        db.query(FornecimentoRacaoAnimal)
-        .filter(FornecimentoRacaoAnimal.ID == fornecimento_id)
-        .first()
+    fornecimento = await db.scalar(
+        select(FornecimentoRacaoAnimal).filter(
+            FornecimentoRacaoAnimal.ID == fornecimento_id
+        )
     )
     if not fornecimento:
         raise HTTPException(status_code=404, detail="Fornecimento não encontrado")
 
     # Estornar estoque automaticamente
-    produto = (
-        db.query(ProdutoRacao)
-        .filter(ProdutoRacao.ID == fornecimento.ID_PRODUTO)
-        .first()
+    produto = await db.scalar(
+        select(ProdutoRacao).filter(ProdutoRacao.ID == fornecimento.ID_PRODUTO)
     )
 
     if produto:
@@ -663,8 +731,8 @@ async def delete_fornecimento(
         db.add(db_movimentacao)
 
     # Excluir fornecimento
-    db.delete(fornecimento)
-    db.commit()
+    await db.delete(fornecimento)
+    await db.commit()
 
     return {"message": "Fornecimento excluído e estoque estornado com sucesso"}
 
@@ -682,26 +750,28 @@ async def delete_fornecimento(
 async def create_item_plano(
     plano_id: int,
     item: ItemPlanoAlimentarCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Adicionar produto ao plano alimentar"""
-    plano = db.query(PlanoAlimentar).filter(PlanoAlimentar.ID == plano_id).first()
+    plano = await db.scalar(
+        select(PlanoAlimentar).filter(PlanoAlimentar.ID == plano_id)
+    )
     if not plano:
         raise HTTPException(status_code=404, detail="Plano não encontrado")
 
-    produto = (
-        db.query(ProdutoRacao)
-        .filter(ProdutoRacao.ID == item.ID_PRODUTO, ProdutoRacao.ATIVO == "S")
-        .first()
+    produto = await db.scalar(
+        select(ProdutoRacao).filter(
+            ProdutoRacao.ID == item.ID_PRODUTO, ProdutoRacao.ATIVO == "S"
+        )
     )
     if not produto:
         raise HTTPException(status_code=404, detail="Produto não encontrado")
 
     db_item = ItemPlanoAlimentar(**item.dict())
     db.add(db_item)
-    db.commit()
-    db.refresh(db_item)
+    await db.commit()
+    await db.refresh(db_item)
 
     return await _enrich_item_response(db_item, db)
 
@@ -709,33 +779,36 @@ async def create_item_plano(
 @router.get("/planos/{plano_id}/itens", response_model=List[ItemPlanoAlimentarResponse])
 async def list_itens_plano(
     plano_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Listar itens do plano alimentar"""
     itens = (
-        db.query(ItemPlanoAlimentar)
-        .filter(
-            ItemPlanoAlimentar.ID_PLANO == plano_id, ItemPlanoAlimentar.ATIVO == "S"
+        await db.scalars(
+            select(ItemPlanoAlimentar).filter(
+                ItemPlanoAlimentar.ID_PLANO == plano_id, ItemPlanoAlimentar.ATIVO == "S"
+            )
         )
-        .all()
-    )
+    ).all()
+
+    resolver = BatchResolver(db)
+    await resolver.carregar(ProdutoRacao, [item.ID_PRODUTO for item in itens])
 
-    return [await _enrich_item_response(item, db) for item in itens]
+    return [await _enrich_item_response(item, db, resolver) for item in itens]
 
 
 @router.put("/planos/itens/{item_id}", response_model=ItemPlanoAlimentarResponse)
 async def update_item_plano(
     item_id: int,
     item_update: ItemPlanoAlimentarUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Atualizar item do plano"""
-    item = (
-        db.query(ItemPlanoAlimentar)
-        .filter(ItemPlanoAlimentar.ID == item_id, ItemPlanoAlimentar.ATIVO == "S")
-        .first()
+    item = await db.scalar(
+        select(ItemPlanoAlimentar).filter(
+            ItemPlanoAlimentar.ID == item_id, ItemPlanoAlimentar.ATIVO == "S"
+        )
     )
     if not item:
         raise HTTPException(status_code=404, detail="Item não encontrado")
@@ -743,8 +816,8 @@ async def update_item_plano(
     for field, value in item_update.dict(exclude_unset=True).items():
         setattr(item, field, value)
 
-    db.commit()
-    db.refresh(item)
+    await db.commit()
+    await db.refresh(item)
 
     return await _enrich_item_response(item, db)
 
@@ -753,19 +826,21 @@ async def update_item_plano(
 async def update_plano_alimentar(
     plano_id: int,
     plano_update: PlanoAlimentarUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Atualizar plano alimentar"""
-    plano = db.query(PlanoAlimentar).filter(PlanoAlimentar.ID == plano_id).first()
+    plano = await db.scalar(
+        select(PlanoAlimentar).filter(PlanoAlimentar.ID == plano_id)
+    )
     if not plano:
         raise HTTPException(status_code=404, detail="Plano não encontrado")
 
     for field, value in plano_update.dict(exclude_unset=True).items():
         setattr(plano, field, value)
 
-    db.commit()
-    db.refresh(plano)
+    await db.commit()
+    await db.refresh(plano)
 
     return await _enrich_plano_response(plano, db)
 
@@ -773,20 +848,20 @@ async def update_plano_alimentar(
 @router.delete("/planos/itens/{item_id}")
 async def delete_item_plano(
     item_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Inativar produto de ração"""
-    item = (
-        db.query(ItemPlanoAlimentar)
-        .filter(ItemPlanoAlimentar.ID == item_id, ItemPlanoAlimentar.ATIVO == "S")
-        .first()
+    item = await db.scalar(
+        select(ItemPlanoAlimentar).filter(
+            ItemPlanoAlimentar.ID == item_id, ItemPlanoAlimentar.ATIVO == "S"
+        )
     )
     if not item:
         raise HTTPException(status_code=404, detail="Item não encontrado")
 
     item.ATIVO = "N"
-    db.commit()
+    await db.commit()
 
     return {"message": "Item inativado com sucesso"}
 
@@ -801,16 +876,13 @@ async def delete_item_plano(
 )
 async def autocomplete_produtos(
     q: Optional[str] = Query("", description="Termo de busca"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Busca produtos para autocomplete"""
-    query = db.query(ProdutoRacao).filter(ProdutoRacao.ATIVO == "S")
-
-    if q:
-        query = query.filter(ProdutoRacao.NOME.ilike(f"%{q}%"))
-
-    produtos = query.order_by(ProdutoRacao.NOME).limit(50).all()
+    produtos = await indice_produtos_racao.buscar(
+        db, q, limite=50, filtro=lambda p: p.ATIVO == "S"
+    )
 
     return [
         ProdutoRacaoAutocomplete(
@@ -835,28 +907,26 @@ async def autocomplete_produtos(
 async def calcular_necessidades_nutricionais(
     animal_id: int,
     categoria: CategoriaNutricionalEnum,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Calcular necessidades nutricionais do animal"""
-    animal = (
-        db.query(Animal)
-        .filter(Animal.ID == animal_id, Animal.STATUS_ANIMAL == "ATIVO")
-        .first()
+    animal = await db.scalar(
+        select(Animal).filter(Animal.ID == animal_id, Animal.STATUS_ANIMAL == "ATIVO")
     )
 
     if not animal:
         raise HTTPException(status_code=404, detail="Animal não encontrado")
 
     # Buscar último peso
-    ultimo_peso = (
-        db.query(HistoricoCrescimento)
+    ultimo_peso = await db.scalar(
+        select(HistoricoCrescimento)
         .filter(
             HistoricoCrescimento.ID_ANIMAL == animal_id,
             HistoricoCrescimento.PESO.isnot(None),
         )
         .order_by(desc(HistoricoCrescimento.DATA_MEDICAO))
-        .first()
+        .limit(1)
     )
 
     peso = ultimo_peso.PESO if ultimo_peso else animal.PESO_ATUAL or 500
@@ -884,7 +954,7 @@ async def calcular_necessidades_nutricionais(
 
 @router.get("/relatorios/consumo-animal", response_model=List[ConsumoAnimalResumo])
 async def relatorio_consumo_animal(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
     animal_id: Optional[int] = Query(None, description="Filtrar por animal"),
     data_inicio: Optional[str] = Query(None, description="Data início (YYYY-MM-DD)"),
@@ -933,7 +1003,7 @@ async def relatorio_consumo_animal(
         "ORDER BY a.NOME, p.NOME"
     )
 
-    result = db.execute(query, params).fetchall()
+    result = (await db.execute(query, params)).fetchall()
     return [
         ConsumoAnimalResumo(
             animal_id=row.animal_id,
@@ -952,7 +1022,8 @@ async def relatorio_consumo_animal(
 
 @router.get("/relatorios/previsao-consumo", response_model=List[PrevisaoConsumoRacao])
 async def relatorio_previsao_consumo(
-    db: Session = Depends(get_db), current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
 ):
     """Previsão de consumo baseada no histórico"""
     query = text(
@@ -984,7 +1055,7 @@ async def relatorio_previsao_consumo(
     """
     )
 
-    result = db.execute(query).fetchall()
+    result = (await db.execute(query)).fetchall()
     previsoes = []
 
     for row in result:
@@ -1016,7 +1087,8 @@ async def relatorio_previsao_consumo(
 
 @router.get("/relatorios/estoque-baixo", response_model=List[EstoqueRacaoBaixo])
 async def relatorio_estoque_baixo(
-    db: Session = Depends(get_db), current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
 ):
     """Relatório de produtos com estoque baixo ou vencimento próximo"""
     query = text(
@@ -1043,7 +1115,7 @@ async def relatorio_estoque_baixo(
     """
     )
 
-    result = db.execute(query).fetchall()
+    result = (await db.execute(query)).fetchall()
     return [
         EstoqueRacaoBaixo(
             produto_id=row.id,
@@ -1066,13 +1138,16 @@ async def relatorio_estoque_baixo(
 
 
 async def _enrich_item_response(
-    item: ItemPlanoAlimentar, db: Session
+    item: ItemPlanoAlimentar,
+    db: AsyncSession,
+    resolver: Optional[BatchResolver] = None,
 ) -> ItemPlanoAlimentarResponse:
     """Enriquecer resposta do item do plano"""
+    resolver = resolver or BatchResolver(db)
     response = ItemPlanoAlimentarResponse.from_orm(item)
 
     # Dados do produto
-    produto = db.query(ProdutoRacao).filter(ProdutoRacao.ID == item.ID_PRODUTO).first()
+    produto = await resolver.obter(ProdutoRacao, item.ID_PRODUTO)
     if produto:
         response.produto_nome = produto.NOME
         response.produto_unidade = produto.UNIDADE_MEDIDA
@@ -1084,7 +1159,7 @@ async def _enrich_item_response(
 
 
 async def _enrich_produto_response(
-    produto: ProdutoRacao, db: Session
+    produto: ProdutoRacao, db: AsyncSession
 ) -> ProdutoRacaoResponse:
     """Enriquecer resposta do produto com dados calculados"""
     response = ProdutoRacaoResponse.from_orm(produto)
@@ -1105,48 +1180,70 @@ async def _enrich_produto_response(
 
 
 async def _enrich_movimentacao_response(
-    movimentacao: MovimentacaoProdutoRacao, db: Session
+    movimentacao: MovimentacaoProdutoRacao,
+    db: AsyncSession,
+    resolver: Optional[BatchResolver] = None,
 ) -> MovimentacaoRacaoResponse:
     """Enriquecer resposta da movimentação"""
+    resolver = resolver or BatchResolver(db)
     response = MovimentacaoRacaoResponse.from_orm(movimentacao)
 
     # Dados do produto
-    produto = (
-        db.query(ProdutoRacao)
-        .filter(ProdutoRacao.ID == movimentacao.ID_PRODUTO)
-        .first()
-    )
+    produto = await resolver.obter(ProdutoRacao, movimentacao.ID_PRODUTO)
     if produto:
         response.produto_nome = produto.NOME
         response.produto_unidade = produto.UNIDADE_MEDIDA
 
     # Dados do animal se aplicável
-    if movimentacao.ID_ANIMAL:
-        animal = db.query(Animal).filter(Animal.ID == movimentacao.ID_ANIMAL).first()
-        if animal:
-            response.animal_nome = animal.NOME
+    animal = await resolver.obter(Animal, movimentacao.ID_ANIMAL)
+    if animal:
+        response.animal_nome = animal.NOME
 
     return response
 
 
+async def _enrich_movimentacoes_response(
+    movimentacoes: List[MovimentacaoProdutoRacao], db: AsyncSession
+) -> List[MovimentacaoRacaoResponse]:
+    """Enriquecer página de movimentações (uma query por tabela relacionada)"""
+    resolver = BatchResolver(db)
+    await resolver.carregar(ProdutoRacao, [m.ID_PRODUTO for m in movimentacoes])
+    await resolver.carregar(Animal, [m.ID_ANIMAL for m in movimentacoes])
+
+    return [
+        await _enrich_movimentacao_response(mov, db, resolver) for mov in movimentacoes
+    ]
+
+
 async def _enrich_plano_response(
-    plano: PlanoAlimentar, db: Session
+    plano: PlanoAlimentar,
+    db: AsyncSession,
+    resolver: Optional[BatchResolver] = None,
+    item_plano: Optional[List[ItemPlanoAlimentar]] = None,
 ) -> PlanoAlimentarResponse:
     """Enriquecer resposta do plano alimentar"""
+    resolver = resolver or BatchResolver(db)
     response = PlanoAlimentarResponse.from_orm(plano)
 
     # Dados do animal
-    animal = db.query(Animal).filter(Animal.ID == plano.ID_ANIMAL).first()
+    animal = await resolver.obter(Animal, plano.ID_ANIMAL)
     if animal:
         response.animal_nome = animal.NOME
         response.animal_numero_registro = animal.NUMERO_REGISTRO
 
     # Contar produtos do plano
-    item_plano = db.query(ItemPlanoAlimentar).filter(
-        ItemPlanoAlimentar.ID_PLANO == plano.ID, ItemPlanoAlimentar.ATIVO == "S"
-    )
+    if item_plano is None:
+        item_plano = (
+            await db.scalars(
+                select(ItemPlanoAlimentar).filter(
+                    ItemPlanoAlimentar.ID_PLANO == plano.ID,
+                    ItemPlanoAlimentar.ATIVO == "S",
+                )
+            )
+        ).all()
+        await resolver.carregar(ProdutoRacao, [i.ID_PRODUTO for i in item_plano])
 
-    total_produtos = item_plano.count()
+    total_produtos = len(item_plano)
 
     response.total_produtos = total_produtos
 
@@ -1155,11 +1252,7 @@ async def _enrich_plano_response(
     if item_plano:
         for item in item_plano:
             # Dados do produto
-            produto = (
-                db.query(ProdutoRacao)
-                .filter(ProdutoRacao.ID == item.ID_PRODUTO)
-                .first()
-            )
+            produto = await resolver.obter(ProdutoRacao, item.ID_PRODUTO)
             if produto:
                 if produto.PRECO_UNITARIO:
                     custo_diario_estimado += (
@@ -1169,24 +1262,48 @@ async def _enrich_plano_response(
     return response
 
 
+async def _enrich_planos_response(
+    planos: List[PlanoAlimentar], db: AsyncSession
+) -> List[PlanoAlimentarResponse]:
+    """Enriquecer página de planos (itens e produtos buscados em lote)"""
+    resolver = BatchResolver(db)
+    await resolver.carregar(Animal, [p.ID_ANIMAL for p in planos])
+    itens_por_plano = await resolver.agrupar(
+        ItemPlanoAlimentar,
+        ItemPlanoAlimentar.ID_PLANO,
+        [p.ID for p in planos],
+        ItemPlanoAlimentar.ATIVO == "S",
+    )
+    await resolver.carregar(
+        ProdutoRacao,
+        [i.ID_PRODUTO for itens in itens_por_plano.values() for i in itens],
+    )
+
+    return [
+        await _enrich_plano_response(
+            plano, db, resolver, itens_por_plano.get(plano.ID, [])
+        )
+        for plano in planos
+    ]
+
+
 async def _enrich_fornecimento_response(
-    fornecimento: FornecimentoRacaoAnimal, db: Session
+    fornecimento: FornecimentoRacaoAnimal,
+    db: AsyncSession,
+    resolver: Optional[BatchResolver] = None,
 ) -> FornecimentoRacaoResponse:
     """Enriquecer resposta do fornecimento"""
+    resolver = resolver or BatchResolver(db)
     response = FornecimentoRacaoResponse.from_orm(fornecimento)
 
     # Dados do animal
-    animal = db.query(Animal).filter(Animal.ID == fornecimento.ID_ANIMAL).first()
+    animal = await resolver.obter(Animal, fornecimento.ID_ANIMAL)
     if animal:
         response.animal_nome = animal.NOME
         response.animal_numero_registro = animal.NUMERO_REGISTRO
 
     # Dados do produto
-    produto = (
-        db.query(ProdutoRacao)
-        .filter(ProdutoRacao.ID == fornecimento.ID_PRODUTO)
-        .first()
-    )
+    produto = await resolver.obter(ProdutoRacao, fornecimento.ID_PRODUTO)
     if produto:
         response.produto_nome = produto.NOME
         response.produto_unidade = produto.UNIDADE_MEDIDA
@@ -1198,6 +1315,20 @@ async def _enrich_fornecimento_response(
     return response
 
 
+async def _enrich_fornecimentos_response(
+    fornecimentos: List[FornecimentoRacaoAnimal], db: AsyncSession
+) -> List[FornecimentoRacaoResponse]:
+    """Enriquecer página de fornecimentos (uma query por tabela relacionada)"""
+    resolver = BatchResolver(db)
+    await resolver.carregar(Animal, [f.ID_ANIMAL for f in fornecimentos])
+    await resolver.carregar(ProdutoRacao, [f.ID_PRODUTO for f in fornecimentos])
+
+    return [
+        await _enrich_fornecimento_response(fornecimento, db, resolver)
+        for fornecimento in fornecimentos
+    ]
+
+
 def _calcular_status_estoque(produto: ProdutoRacao) -> StatusEstoqueRacaoEnum:
     """Calcular status do estoque"""
     if produto.ESTOQUE_ATUAL <= 0:
@@ -1,15 +1,18 @@
 from datetime import datetime, timedelta
 from typing import List, Optional
 
-from app.core.database import get_db
+from app.core.database import get_async_db
+from app.core.paginacao import ParametrosPaginacao, paginar
 from app.core.security import get_current_user
 from app.models.animal import Animal
 from app.models.reproducao import Reproducao
 from app.models.user import User
 from app.schemas.reproducao import (
     CalendarioReproducao,
+    CandidatoGaranhao,
     EstatisticasReproducao,
     HistoricoEgua,
+    RankingGaranhoes,
     ReproducaoCreate,
     ReproducaoResponse,
     ReproducaoUpdate,
@@ -17,8 +20,11 @@ from app.schemas.reproducao import (
     StatusReproducaoEnum,
     TipoCoberturaEnum,
 )
+from app.services.batch_resolver import BatchResolver
+from app.services.parentesco import obter_pedigree
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql import desc
 
 router = APIRouter(prefix="/api/reproducao", tags=["Reprodução"])
@@ -29,11 +35,11 @@ router = APIRouter(prefix="/api/reproducao", tags=["Reprodução"])
 )
 async def create_reproducao(
     reproducao: ReproducaoCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     # Verificar se égua existe e é fêmea
-    egua = db.query(Animal).filter(Animal.ID == reproducao.ID_EGUA).first()
+    egua = await db.scalar(select(Animal).filter(Animal.ID == reproducao.ID_EGUA))
     if not egua:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Égua não encontrada"
@@ -46,7 +52,9 @@ async def create_reproducao(
 
     # Verificar parceiro se informado
     if reproducao.ID_PARCEIRO:
-        parceiro = db.query(Animal).filter(Animal.ID == reproducao.ID_PARCEIRO).first()
+        parceiro = await db.scalar(
+            select(Animal).filter(Animal.ID == reproducao.ID_PARCEIRO)
+        )
         if not parceiro:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Parceiro não encontrado"
@@ -59,14 +67,12 @@ async def create_reproducao(
             )
 
     # Verificar se égua não tem gestação ativa
-    gestacao_ativa = (
-        db.query(Reproducao)
-        .filter(
+    gestacao_ativa = await db.scalar(
+        select(Reproducao).filter(
             Reproducao.ID_EGUA == reproducao.ID_EGUA,
             Reproducao.STATUS_REPRODUCAO == StatusReproducaoEnum.ATIVO,
             Reproducao.RESULTADO_DIAGNOSTICO == ResultadoDiagnosticoEnum.POSITIVO,
         )
-        .first()
     )
 
     if gestacao_ativa:
@@ -84,15 +90,15 @@ async def create_reproducao(
     db_reproducao = Reproducao(**reproducao.model_dump())
 
     db.add(db_reproducao)
-    db.commit()
-    db.refresh(db_reproducao)
+    await db.commit()
+    await db.refresh(db_reproducao)
 
     return await _enrich_reproducao_response(db_reproducao, db)
 
 
 @router.get("/", response_model=dict)
 async def list_reproducoes(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     egua_id: Optional[int] = Query(None, description="Filtrar por égua"),
     parceiro_id: Optional[int] = Query(None, description="Filtrar por parceiro"),
     tipo_cobertura: Optional[TipoCoberturaEnum] = Query(
@@ -108,8 +114,9 @@ async def list_reproducoes(
     data_fim: Optional[str] = Query(None, description="Data fim (YYYY-MM-DD)"),
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=100),
+    paginacao: ParametrosPaginacao = Depends(),
 ):
-    query = db.query(Reproducao)
+    query = select(Reproducao)
 
     if egua_id:
         query = query.filter(Reproducao.ID_EGUA == egua_id)
@@ -130,36 +137,33 @@ async def list_reproducoes(
             Reproducao.DATA_COBERTURA <= datetime.fromisoformat(data_fim)
         )
 
-    total = query.count()
-    offset = (page - 1) * limit
-    reproducoes = (
-        query.order_by(desc(Reproducao.DATA_COBERTURA))
-        .offset(offset)
-        .limit(limit)
-        .all()
+    pagina = await paginar(
+        db,
+        query,
+        [(Reproducao.DATA_COBERTURA, True)],
+        Reproducao.ID,
+        page,
+        limit,
+        paginacao,
     )
+    reproducoes = pagina.itens
 
     # Enriquecer com dados relacionados
-    enriched_reproducoes = []
-    for rep in reproducoes:
-        enriched = await _enrich_reproducao_response(rep, db)
-        enriched_reproducoes.append(enriched)
+    enriched_reproducoes = await _enrich_reproducoes_response(reproducoes, db)
 
     return {
         "reproducoes": enriched_reproducoes,
-        "total": total,
-        "page": page,
-        "limit": limit,
+        **pagina.metadados(page, limit),
     }
 
 
 @router.get("/{id}", response_model=ReproducaoResponse)
 async def get_reproducao(
     id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    reproducao = db.query(Reproducao).filter(Reproducao.ID == id).first()
+    reproducao = await db.scalar(select(Reproducao).filter(Reproducao.ID == id))
     if not reproducao:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Reprodução não encontrada"
@@ -172,10 +176,10 @@ async def get_reproducao(
 async def update_reproducao(
     id: int,
     reproducao: ReproducaoUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    db_reproducao = db.query(Reproducao).filter(Reproducao.ID == id).first()
+    db_reproducao = await db.scalar(select(Reproducao).filter(Reproducao.ID == id))
     if not db_reproducao:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Reprodução não encontrada"
@@ -201,35 +205,35 @@ async def update_reproducao(
     ):
         db_reproducao.STATUS_REPRODUCAO = StatusReproducaoEnum.CONCLUIDO
 
-    db.commit()
-    db.refresh(db_reproducao)
+    await db.commit()
+    await db.refresh(db_reproducao)
     return await _enrich_reproducao_response(db_reproducao, db)
 
 
 @router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_reproducao(
     id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    db_reproducao = db.query(Reproducao).filter(Reproducao.ID == id).first()
+    db_reproducao = await db.scalar(select(Reproducao).filter(Reproducao.ID == id))
     if not db_reproducao:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Reprodução não encontrada"
         )
 
-    db.delete(db_reproducao)
-    db.commit()
+    await db.delete(db_reproducao)
+    await db.commit()
 
 
 @router.get("/egua/{egua_id}/historico", response_model=HistoricoEgua)
 async def get_historico_egua(
     egua_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     # Verificar se égua existe
-    egua = db.query(Animal).filter(Animal.ID == egua_id).first()
+    egua = await db.scalar(select(Animal).filter(Animal.ID == egua_id))
     if not egua:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Égua não encontrada"
@@ -237,17 +241,15 @@ async def get_historico_egua(
 
     # Buscar todas reproduções da égua
     reproducoes = (
-        db.query(Reproducao)
-        .filter(Reproducao.ID_EGUA == egua_id)
-        .order_by(desc(Reproducao.DATA_COBERTURA))
-        .all()
-    )
+        await db.scalars(
+            select(Reproducao)
+            .filter(Reproducao.ID_EGUA == egua_id)
+            .order_by(desc(Reproducao.DATA_COBERTURA))
+        )
+    ).all()
 
     # Enriquecer dados
-    enriched_reproducoes = []
-    for rep in reproducoes:
-        enriched = await _enrich_reproducao_response(rep, db)
-        enriched_reproducoes.append(enriched)
+    enriched_reproducoes = await _enrich_reproducoes_response(reproducoes, db)
 
     # Calcular estatísticas
     total_coberturas = len(reproducoes)
@@ -264,20 +266,78 @@ async def get_historico_egua(
     )
 
 
+@router.get("/egua/{egua_id}/garanhoes-sugeridos", response_model=RankingGaranhoes)
+async def get_garanhoes_sugeridos(
+    egua_id: int,
+    limit: int = Query(20, ge=1, le=200, description="Quantidade de candidatos"),
+    max_consanguinidade: Optional[float] = Query(
+        None, ge=0, le=1, description="Consanguinidade máxima do potro"
+    ),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Garanhões ativos ordenados pela menor consanguinidade do potro"""
+    egua = await db.scalar(select(Animal).filter(Animal.ID == egua_id))
+    if not egua:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Égua não encontrada"
+        )
+    if egua.SEXO != "F":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Animal não é uma égua"
+        )
+
+    garanhoes = (
+        await db.execute(
+            select(Animal.ID, Animal.NOME).filter(
+                Animal.SEXO == "M",
+                Animal.STATUS_ANIMAL == "ATIVO",
+                Animal.ID != egua_id,
+            )
+        )
+    ).all()
+
+    pedigree = await obter_pedigree(db)
+    coeficientes = pedigree.matriz([egua_id], [g.ID for g in garanhoes])
+
+    candidatos = [
+        CandidatoGaranhao(
+            garanhao_id=garanhao.ID,
+            garanhao_nome=garanhao.NOME,
+            consanguinidade_potro=round(coeficientes[(egua_id, garanhao.ID)], 6),
+            consanguinidade_garanhao=round(pedigree.consanguinidade(garanhao.ID), 6),
+        )
+        for garanhao in garanhoes
+    ]
+    if max_consanguinidade is not None:
+        candidatos = [
+            c for c in candidatos if c.consanguinidade_potro <= max_consanguinidade
+        ]
+    candidatos.sort(key=lambda c: (c.consanguinidade_potro, c.garanhao_nome))
+
+    return RankingGaranhoes(
+        egua_id=egua.ID,
+        egua_nome=egua.NOME,
+        consanguinidade_egua=round(pedigree.consanguinidade(egua.ID), 6),
+        total_avaliados=len(garanhoes),
+        candidatos=candidatos[:limit],
+    )
+
+
 @router.get("/relatorio/estatisticas", response_model=EstatisticasReproducao)
 async def get_estatisticas(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
     ano: Optional[int] = Query(None, description="Filtrar por ano"),
 ):
-    query = db.query(Reproducao)
+    query = select(Reproducao)
 
     if ano:
         inicio_ano = datetime(ano, 1, 1)
         fim_ano = datetime(ano, 12, 31, 23, 59, 59)
         query = query.filter(Reproducao.DATA_COBERTURA.between(inicio_ano, fim_ano))
 
-    reproducoes = query.all()
+    reproducoes = (await db.scalars(query)).all()
 
     total_coberturas = len(reproducoes)
     positivas = len(
@@ -326,7 +386,7 @@ async def get_estatisticas(
 
 @router.get("/calendario/eventos", response_model=List[CalendarioReproducao])
 async def get_calendario_eventos(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
     dias: int = Query(60, description="Próximos X dias"),
 ):
@@ -335,13 +395,16 @@ async def get_calendario_eventos(
 
     # Buscar diagnósticos pendentes (15-20 dias após cobertura)
     reproducoes_diagnostico = (
-        db.query(Reproducao, Animal.NOME)
-        .join(Animal, Reproducao.ID_EGUA == Animal.ID)
-        .filter(Reproducao.RESULTADO_DIAGNOSTICO == ResultadoDiagnosticoEnum.PENDENTE)
-        .filter(Reproducao.DATA_COBERTURA + timedelta(days=15) <= data_limite)
-        .filter(Reproducao.DATA_COBERTURA + timedelta(days=15) >= datetime.now())
-        .all()
-    )
+        await db.execute(
+            select(Reproducao, Animal.NOME)
+            .join(Animal, Reproducao.ID_EGUA == Animal.ID)
+            .filter(
+                Reproducao.RESULTADO_DIAGNOSTICO == ResultadoDiagnosticoEnum.PENDENTE
+            )
+            .filter(Reproducao.DATA_COBERTURA + timedelta(days=15) <= data_limite)
+            .filter(Reproducao.DATA_COBERTURA + timedelta(days=15) >= datetime.now())
+        )
+    ).all()
 
     for rep, egua_nome in reproducoes_diagnostico:
         data_diagnostico = rep.DATA_COBERTURA + timedelta(
@@ -360,14 +423,15 @@ async def get_calendario_eventos(
 
     # Buscar partos previstos
     partos_previstos = (
-        db.query(Reproducao, Animal.NOME)
-        .join(Animal, Reproducao.ID_EGUA == Animal.ID)
-        .filter(Reproducao.DATA_PARTO_PREVISTA.isnot(None))
-        .filter(Reproducao.DATA_PARTO_PREVISTA <= data_limite)
-        .filter(Reproducao.DATA_PARTO_PREVISTA >= datetime.now())
-        .filter(Reproducao.STATUS_REPRODUCAO == StatusReproducaoEnum.ATIVO)
-        .all()
-    )
+        await db.execute(
+            select(Reproducao, Animal.NOME)
+            .join(Animal, Reproducao.ID_EGUA == Animal.ID)
+            .filter(Reproducao.DATA_PARTO_PREVISTA.isnot(None))
+            .filter(Reproducao.DATA_PARTO_PREVISTA <= data_limite)
+            .filter(Reproducao.DATA_PARTO_PREVISTA >= datetime.now())
+            .filter(Reproducao.STATUS_REPRODUCAO == StatusReproducaoEnum.ATIVO)
+        )
+    ).all()
 
     for rep, egua_nome in partos_previstos:
         eventos.append(
@@ -418,13 +482,15 @@ async def get_status_reproducao(current_user: User = Depends(get_current_user)):
 
 
 async def _enrich_reproducao_response(
-    reproducao: Reproducao, db: Session
+    reproducao: Reproducao,
+    db: AsyncSession,
+    resolver: Optional[BatchResolver] = None,
 ) -> ReproducaoResponse:
+    resolver = resolver or BatchResolver(db)
+
     # Buscar dados relacionados
-    egua = db.query(Animal).filter(Animal.ID == reproducao.ID_EGUA).first()
-    parceiro = None
-    if reproducao.ID_PARCEIRO:
-        parceiro = db.query(Animal).filter(Animal.ID == reproducao.ID_PARCEIRO).first()
+    egua = await resolver.obter(Animal, reproducao.ID_EGUA)
+    parceiro = await resolver.obter(Animal, reproducao.ID_PARCEIRO)
 
     # Calcular dias de gestação
     dias_gestacao = None
@@ -443,3 +509,16 @@ async def _enrich_reproducao_response(
     response_data.dias_gestacao = dias_gestacao
 
     return response_data
+
+
+async def _enrich_reproducoes_response(
+    reproducoes: List[Reproducao], db: AsyncSession
+) -> List[ReproducaoResponse]:
+    """Enriquece várias reproduções buscando éguas e parceiros em uma query"""
+    resolver = BatchResolver(db)
+    await resolver.carregar(
+        Animal,
+        [r.ID_EGUA for r in reproducoes] + [r.ID_PARCEIRO for r in reproducoes],
+    )
+
+    return [await _enrich_reproducao_response(rep, db, resolver) for rep in reproducoes]
@@ -2,7 +2,9 @@
 from datetime import datetime, timedelta
 from typing import List, Optional
 
-from app.core.database import get_db
+from app.core.database import get_async_db
+from app.core.exportacao import FormatoExportacao, colunas, resposta_exportacao
+from app.core.paginacao import ParametrosPaginacao, paginar
 from app.core.security import get_current_user
 from app.models.animal import Animal
 from app.models.medicamento import (
@@ -24,8 +26,11 @@ from app.schemas.saude import (
     SaudeResponse,
     SaudeUpdate,
 )
+from app.services.batch_resolver import BatchResolver
+from app.services.busca import indice_medicamentos
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql import desc, func
 
 router = APIRouter(prefix="/api/saude", tags=["Saúde"])
@@ -35,12 +40,12 @@ router = APIRouter(prefix="/api/saude", tags=["Saúde"])
 @router.post("/", response_model=SaudeResponse, status_code=status.HTTP_201_CREATED)
 async def create_registro_saude(
     saude: SaudeCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Criar novo registro de saúde"""
     # Verificar se animal existe
-    animal = db.query(Animal).filter(Animal.ID == saude.ID_ANIMAL).first()
+    animal = await db.scalar(select(Animal).filter(Animal.ID == saude.ID_ANIMAL))
     if not animal:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Animal não encontrado"
@@ -48,8 +53,8 @@ async def create_registro_saude(
 
     # Se especificou medicamento do estoque, fazer validações
     if saude.ID_MEDICAMENTO and saude.QUANTIDADE_APLICADA:
-        medicamento = (
-            db.query(Medicamento).filter(Medicamento.ID == saude.ID_MEDICAMENTO).first()
+        medicamento = await db.scalar(
+            select(Medicamento).filter(Medicamento.ID == saude.ID_MEDICAMENTO)
         )
         if not medicamento:
             raise HTTPException(
@@ -91,7 +96,7 @@ async def create_registro_saude(
     )
 
     db.add(db_saude)
-    db.flush()  # Para obter o ID
+    await db.flush()  # Para obter o ID
 
     # Se usou medicamento do estoque, fazer movimentação
     if saude.ID_MEDICAMENTO and saude.QUANTIDADE_APLICADA:
@@ -113,8 +118,8 @@ async def create_registro_saude(
         )
         db.add(movimentacao)
 
-    db.commit()
-    db.refresh(db_saude)
+    await db.commit()
+    await db.refresh(db_saude)
 
     # Preparar resposta
     response_data = SaudeResponse.model_validate(db_saude)
@@ -127,7 +132,7 @@ async def create_registro_saude(
 
 @router.get("/", response_model=dict)
 async def get_registros_saude(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     animal_id: Optional[int] = Query(None, description="Filtrar por animal"),
     tipo_registro: Optional[TipoRegistroEnum] = Query(
         None, description="Filtrar por tipo"
@@ -136,16 +141,91 @@ async def get_registros_saude(
     data_inicio: Optional[str] = Query(None, description="Data início (YYYY-MM-DD)"),
     data_fim: Optional[str] = Query(None, description="Data fim (YYYY-MM-DD)"),
     page: int = Query(1, ge=1),
-    limit: int = Query(50, le=1000),
+    limit: int = Query(50, ge=1, le=1000),
+    paginacao: ParametrosPaginacao = Depends(),
 ):
     """Listar registros de saúde com paginação"""
+    query = select(SaudeAnimais, Animal.NOME).join(
+        Animal, SaudeAnimais.ID_ANIMAL == Animal.ID
+    )
+    query = _filtrar_registros(
+        query, animal_id, tipo_registro, veterinario, data_inicio, data_fim
+    )
+
+    # Aplicar paginação (page/limit ou cursor)
+    pagina = await paginar(
+        db,
+        query,
+        [(SaudeAnimais.DATA_OCORRENCIA, True)],
+        SaudeAnimais.ID,
+        page,
+        limit,
+        paginacao,
+        escalar=False,
+    )
+    registros = pagina.itens
+
+    resolver = BatchResolver(db)
+    await resolver.carregar(Medicamento, [r.ID_MEDICAMENTO for r, _ in registros])
+
+    # Preparar resposta com nomes dos animais e medicamentos
+    enriched_registros = []
+    for registro, animal_nome in registros:
+        response_data = SaudeResponse.model_validate(registro)
+        response_data.animal_nome = animal_nome
+
+        # Adicionar nome do medicamento se houver
+        if registro.ID_MEDICAMENTO:
+            medicamento = await resolver.obter(Medicamento, registro.ID_MEDICAMENTO)
+            if medicamento:
+                response_data.medicamento_nome = medicamento.NOME
+
+        enriched_registros.append(response_data)
+
+    # Retornar no formato esperado pelo frontend
+    return {
+        "registros": enriched_registros,
+        **pagina.metadados(page, limit),
+    }
+
+
+@router.get("/exportar")
+async def exportar_registros_saude(
+    current_user: User = Depends(get_current_user),
+    formato: FormatoExportacao = Query(FormatoExportacao.CSV),
+    animal_id: Optional[int] = Query(None, description="Filtrar por animal"),
+    tipo_registro: Optional[TipoRegistroEnum] = Query(
+        None, description="Filtrar por tipo"
+    ),
+    veterinario: Optional[str] = Query(None, description="Filtrar por veterinário"),
+    data_inicio: Optional[str] = Query(None, description="Data início (YYYY-MM-DD)"),
+    data_fim: Optional[str] = Query(None, description="Data fim (YYYY-MM-DD)"),
+):
+    """Exportar registros de saúde em CSV ou NDJSON"""
     query = (
-        db.query(SaudeAnimais, Animal.NOME)
+        select(
+            *colunas(SaudeAnimais),
+            Animal.NOME.label("ANIMAL_NOME"),
+            Medicamento.NOME.label("MEDICAMENTO_NOME"),
+        )
         .join(Animal, SaudeAnimais.ID_ANIMAL == Animal.ID)
-        .order_by(desc(SaudeAnimais.DATA_OCORRENCIA))
+        .outerjoin(Medicamento, SaudeAnimais.ID_MEDICAMENTO == Medicamento.ID)
+        .order_by(SaudeAnimais.DATA_OCORRENCIA, SaudeAnimais.ID)
+    )
+    query = _filtrar_registros(
+        query, animal_id, tipo_registro, veterinario, data_inicio, data_fim
     )
+    return resposta_exportacao(query, formato, "saude")
 
-    # Aplicar filtros
+
+def _filtrar_registros(
+    query,
+    animal_id: Optional[int],
+    tipo_registro: Optional[TipoRegistroEnum],
+    veterinario: Optional[str],
+    data_inicio: Optional[str],
+    data_fim: Optional[str],
+):
     if animal_id:
         query = query.filter(SaudeAnimais.ID_ANIMAL == animal_id)
 
@@ -176,53 +256,22 @@ async def get_registros_saude(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Formato de data inválido. Use YYYY-MM-DD",
             ) from e
-
-    # Contar total para paginação
-    total = query.count()
-
-    # Aplicar paginação
-    offset = (page - 1) * limit
-    registros = query.offset(offset).limit(limit).all()
-
-    # Preparar resposta com nomes dos animais e medicamentos
-    enriched_registros = []
-    for registro, animal_nome in registros:
-        response_data = SaudeResponse.model_validate(registro)
-        response_data.animal_nome = animal_nome
-
-        # Adicionar nome do medicamento se houver
-        if registro.ID_MEDICAMENTO:
-            medicamento = (
-                db.query(Medicamento)
-                .filter(Medicamento.ID == registro.ID_MEDICAMENTO)
-                .first()
-            )
-            if medicamento:
-                response_data.medicamento_nome = medicamento.NOME
-
-        enriched_registros.append(response_data)
-
-    # Retornar no formato esperado pelo frontend
-    return {
-        "registros": enriched_registros,
-        "total": total,
-        "page": page,
-        "limit": limit,
-    }
+    return query
 
 
 @router.get("/{registro_id}", response_model=SaudeResponse)
 async def get_registro_saude(
     registro_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Obter registro específico de saúde"""
     registro = (
-        db.query(SaudeAnimais, Animal.NOME)
-        .join(Animal, SaudeAnimais.ID_ANIMAL == Animal.ID)
-        .filter(SaudeAnimais.ID == registro_id)
-        .first()
-    )
+        await db.execute(
+            select(SaudeAnimais, Animal.NOME)
+            .join(Animal, SaudeAnimais.ID_ANIMAL == Animal.ID)
+            .filter(SaudeAnimais.ID == registro_id)
+        )
+    ).first()
 
     if not registro:
         raise HTTPException(
@@ -235,10 +284,8 @@ async def get_registro_saude(
 
     # Adicionar nome do medicamento se houver
     if saude_registro.ID_MEDICAMENTO:
-        medicamento = (
-            db.query(Medicamento)
-            .filter(Medicamento.ID == saude_registro.ID_MEDICAMENTO)
-            .first()
+        medicamento = await db.scalar(
+            select(Medicamento).filter(Medicamento.ID == saude_registro.ID_MEDICAMENTO)
         )
         if medicamento:
             response_data.medicamento_nome = medicamento.NOME
@@ -250,11 +297,13 @@ async def get_registro_saude(
 async def update_registro_saude(
     registro_id: int,
     dados: SaudeUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Atualizar registro de saúde"""
-    registro = db.query(SaudeAnimais).filter(SaudeAnimais.ID == registro_id).first()
+    registro = await db.scalar(
+        select(SaudeAnimais).filter(SaudeAnimais.ID == registro_id)
+    )
 
     if not registro:
         raise HTTPException(
@@ -269,11 +318,11 @@ async def update_registro_saude(
             else:
                 setattr(registro, campo.upper(), valor)
 
-    db.commit()
-    db.refresh(registro)
+    await db.commit()
+    await db.refresh(registro)
 
     # Buscar dados completos para resposta
-    animal = db.query(Animal).filter(Animal.ID == registro.ID_ANIMAL).first()
+    animal = await db.scalar(select(Animal).filter(Animal.ID == registro.ID_ANIMAL))
     response_data = SaudeResponse.model_validate(registro)
     response_data.animal_nome = animal.NOME if animal else None
 
@@ -283,19 +332,21 @@ async def update_registro_saude(
 @router.delete("/{registro_id}")
 async def delete_registro_saude(
     registro_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Excluir registro de saúde"""
-    registro = db.query(SaudeAnimais).filter(SaudeAnimais.ID == registro_id).first()
+    registro = await db.scalar(
+        select(SaudeAnimais).filter(SaudeAnimais.ID == registro_id)
+    )
 
     if not registro:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Registro não encontrado"
         )
 
-    db.delete(registro)
-    db.commit()
+    await db.delete(registro)
+    await db.commit()
 
     return {"message": "Registro excluído com sucesso"}
 
@@ -308,12 +359,12 @@ async def delete_registro_saude(
 )
 async def aplicacao_rapida(
     dados: AplicacaoRapida,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Aplicação rápida para mobile"""
     # Verificar se animal existe
-    animal = db.query(Animal).filter(Animal.ID == dados.ID_ANIMAL).first()
+    animal = await db.scalar(select(Animal).filter(Animal.ID == dados.ID_ANIMAL))
     if not animal:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Animal não encontrado"
@@ -322,8 +373,8 @@ async def aplicacao_rapida(
     # Validações de medicamento se informado
     medicamento = None
     if dados.ID_MEDICAMENTO:
-        medicamento = (
-            db.query(Medicamento).filter(Medicamento.ID == dados.ID_MEDICAMENTO).first()
+        medicamento = await db.scalar(
+            select(Medicamento).filter(Medicamento.ID == dados.ID_MEDICAMENTO)
         )
         if not medicamento:
             raise HTTPException(
@@ -356,7 +407,7 @@ async def aplicacao_rapida(
     )
 
     db.add(db_registro)
-    db.flush()
+    await db.flush()
 
     # Movimentação de estoque se necessário
     if dados.ID_MEDICAMENTO and dados.QUANTIDADE_APLICADA:
@@ -375,8 +426,8 @@ async def aplicacao_rapida(
         )
         db.add(movimentacao)
 
-    db.commit()
-    db.refresh(db_registro)
+    await db.commit()
+    await db.refresh(db_registro)
 
     response_data = SaudeResponse.model_validate(db_registro)
     response_data.animal_nome = animal.NOME
@@ -391,23 +442,27 @@ async def aplicacao_rapida(
 
 @router.get("/calendario/proximas-aplicacoes", response_model=List[ProximasAplicacoes])
 async def get_proximas_aplicacoes(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     dias: int = Query(365, description="Próximos X dias"),
 ):
     """Lista próximas aplicações programadas"""
     data_limite = datetime.now() + timedelta(days=dias)
 
     registros = (
-        db.query(SaudeAnimais, Animal.NOME)
-        .join(Animal)
-        .filter(
-            SaudeAnimais.PROXIMA_APLICACAO.isnot(None),
-            SaudeAnimais.PROXIMA_APLICACAO <= data_limite,
-            SaudeAnimais.PROXIMA_APLICACAO >= datetime.now(),
+        await db.execute(
+            select(SaudeAnimais, Animal.NOME)
+            .join(Animal)
+            .filter(
+                SaudeAnimais.PROXIMA_APLICACAO.isnot(None),
+                SaudeAnimais.PROXIMA_APLICACAO <= data_limite,
+                SaudeAnimais.PROXIMA_APLICACAO >= datetime.now(),
+            )
+            .order_by(SaudeAnimais.PROXIMA_APLICACAO)
         )
-        .order_by(SaudeAnimais.PROXIMA_APLICACAO)
-        .all()
-    )
+    ).all()
+
+    resolver = BatchResolver(db)
+    await resolver.carregar(Medicamento, [s.ID_MEDICAMENTO for s, _ in registros])
 
     proximas = []
     for saude, animal_nome in registros:
@@ -425,11 +480,7 @@ async def get_proximas_aplicacoes(
         medicamento_nome = None
         if saude.ID_MEDICAMENTO:
             try:
-                medicamento = (
-                    db.query(Medicamento)
-                    .filter(Medicamento.ID == saude.ID_MEDICAMENTO)
-                    .first()
-                )
+                medicamento = await resolver.obter(Medicamento, saude.ID_MEDICAMENTO)
                 medicamento_nome = medicamento.NOME if medicamento else None
             except Exception:
                 pass
@@ -458,7 +509,7 @@ async def get_proximas_aplicacoes(
 
 @router.get("/calendario/", response_model=List[CalendarioSaude])
 async def get_calendario_saude(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     data_inicio: str = Query(..., description="Data início (YYYY-MM-DD)"),
     data_fim: str = Query(..., description="Data fim (YYYY-MM-DD)"),
 ):
@@ -474,11 +525,12 @@ async def get_calendario_saude(
 
     # Buscar aplicações no período
     aplicacoes = (
-        db.query(SaudeAnimais, Animal.NOME)
-        .join(Animal, SaudeAnimais.ID_ANIMAL == Animal.ID)
-        .filter(SaudeAnimais.PROXIMA_APLICACAO.between(inicio, fim))
-        .all()
-    )
+        await db.execute(
+            select(SaudeAnimais, Animal.NOME)
+            .join(Animal, SaudeAnimais.ID_ANIMAL == Animal.ID)
+            .filter(SaudeAnimais.PROXIMA_APLICACAO.between(inicio, fim))
+        )
+    ).all()
 
     # Agrupar por data
     calendario = {}
@@ -516,7 +568,7 @@ async def get_calendario_saude(
 
 @router.get("/estatisticas/geral", response_model=EstatisticasSaude)
 async def get_estatisticas_saude(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
     ano: Optional[int] = Query(None, description="Ano para estatísticas"),
     mes: Optional[int] = Query(None, description="Mês para estatísticas"),
@@ -524,7 +576,7 @@ async def get_estatisticas_saude(
     """Obter estatísticas gerais de saúde"""
     from sqlalchemy import extract
 
-    base_query = db.query(SaudeAnimais)
+    base_query = select(SaudeAnimais)
 
     if ano:
         base_query = base_query.filter(
@@ -536,45 +588,49 @@ async def get_estatisticas_saude(
         )
 
     # Estatísticas gerais
-    total_registros = base_query.count()
+    total_registros = await db.scalar(
+        select(func.count()).select_from(base_query.subquery())
+    )
 
     # Registros do mês atual
     mes_atual = datetime.now().month
     ano_atual = datetime.now().year
-    registros_mes_atual = (
-        db.query(SaudeAnimais)
+    registros_mes_atual = await db.scalar(
+        select(func.count())
+        .select_from(SaudeAnimais)
         .filter(
             extract("year", SaudeAnimais.DATA_OCORRENCIA) == ano_atual,
             extract("month", SaudeAnimais.DATA_OCORRENCIA) == mes_atual,
         )
-        .count()
     )
 
     # Custo total do mês
     custo_mes = (
-        db.query(func.sum(SaudeAnimais.CUSTO))
-        .filter(
-            extract("year", SaudeAnimais.DATA_OCORRENCIA) == ano_atual,
-            extract("month", SaudeAnimais.DATA_OCORRENCIA) == mes_atual,
+        await db.scalar(
+            select(func.sum(SaudeAnimais.CUSTO)).filter(
+                extract("year", SaudeAnimais.DATA_OCORRENCIA) == ano_atual,
+                extract("month", SaudeAnimais.DATA_OCORRENCIA) == mes_atual,
+            )
         )
-        .scalar()
         or 0
     )
 
     # Próximas aplicações (próximos 30 dias)
     data_limite = datetime.now() + timedelta(days=30)
-    proximas_aplicacoes = (
-        db.query(SaudeAnimais)
+    proximas_aplicacoes = await db.scalar(
+        select(func.count())
+        .select_from(SaudeAnimais)
         .filter(SaudeAnimais.PROXIMA_APLICACAO.between(datetime.now(), data_limite))
-        .count()
     )
 
     # Animais em tratamento (com registros nos últimos 30 dias)
     data_limite_tratamento = datetime.now() - timedelta(days=30)
     animais_em_tratamento = (
-        db.query(func.count(func.distinct(SaudeAnimais.ID_ANIMAL)))
-        .filter(SaudeAnimais.DATA_OCORRENCIA >= data_limite_tratamento)
-        .scalar()
+        await db.scalar(
+            select(func.count(func.distinct(SaudeAnimais.ID_ANIMAL))).filter(
+                SaudeAnimais.DATA_OCORRENCIA >= data_limite_tratamento
+            )
+        )
         or 0
     )
 
@@ -582,7 +638,11 @@ async def get_estatisticas_saude(
     tipos = ["VACINA", "VERMIFUGO", "MEDICAMENTO", "EXAME", "CONSULTA"]
     totals_por_tipo = {}
     for tipo in tipos:
-        total = base_query.filter(SaudeAnimais.TIPO_REGISTRO == tipo).count()
+        total = await db.scalar(
+            select(func.count()).select_from(
+                base_query.filter(SaudeAnimais.TIPO_REGISTRO == tipo).subquery()
+            )
+        )
         totals_por_tipo[tipo] = total
 
     return EstatisticasSaude(
@@ -605,13 +665,13 @@ async def get_estatisticas_saude(
 @router.get("/historico/{animal_id}", response_model=HistoricoSaude)
 async def get_historico_saude(
     animal_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
     meses: int = Query(12, description="Período em meses para análise"),
 ):
     """Histórico completo de saúde do animal"""
     # Verificar se animal existe
-    animal = db.query(Animal).filter(Animal.ID == animal_id).first()
+    animal = await db.scalar(select(Animal).filter(Animal.ID == animal_id))
     if not animal:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Animal não encontrado"
@@ -620,14 +680,18 @@ async def get_historico_saude(
     data_limite = datetime.now() - timedelta(days=meses * 30)
 
     registros = (
-        db.query(SaudeAnimais)
-        .filter(
-            SaudeAnimais.ID_ANIMAL == animal_id,
-            SaudeAnimais.DATA_OCORRENCIA >= data_limite,
+        await db.scalars(
+            select(SaudeAnimais)
+            .filter(
+                SaudeAnimais.ID_ANIMAL == animal_id,
+                SaudeAnimais.DATA_OCORRENCIA >= data_limite,
+            )
+            .order_by(desc(SaudeAnimais.DATA_OCORRENCIA))
         )
-        .order_by(desc(SaudeAnimais.DATA_OCORRENCIA))
-        .all()
-    )
+    ).all()
+
+    resolver = BatchResolver(db)
+    await resolver.carregar(Medicamento, [r.ID_MEDICAMENTO for r in registros])
 
     # Enriquecer registros com dados relacionados
     registros_enriched = []
@@ -637,11 +701,7 @@ async def get_historico_saude(
 
         # Adicionar nome do medicamento se houver
         if registro.ID_MEDICAMENTO:
-            medicamento = (
-                db.query(Medicamento)
-                .filter(Medicamento.ID == registro.ID_MEDICAMENTO)
-                .first()
-            )
+            medicamento = await resolver.obter(Medicamento, registro.ID_MEDICAMENTO)
             if medicamento:
                 response_data.medicamento_nome = medicamento.NOME
 
@@ -657,7 +717,7 @@ async def get_historico_saude(
 
 @router.get("/relatorio/consumo-por-tipo", response_model=List[ConsumoPorTipo])
 async def get_consumo_por_tipo(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
     meses_periodo: int = Query(6, description="Período em meses para análise"),
 ):
@@ -666,16 +726,17 @@ async def get_consumo_por_tipo(
 
     # Buscar registros agrupados por tipo
     resultados = (
-        db.query(
-            SaudeAnimais.TIPO_REGISTRO,
-            func.count(SaudeAnimais.ID).label("total_registros"),
-            func.sum(SaudeAnimais.CUSTO).label("custo_total"),
+        await db.execute(
+            select(
+                SaudeAnimais.TIPO_REGISTRO,
+                func.count(SaudeAnimais.ID).label("total_registros"),
+                func.sum(SaudeAnimais.CUSTO).label("custo_total"),
+            )
+            .filter(SaudeAnimais.DATA_OCORRENCIA >= data_limite)
+            .group_by(SaudeAnimais.TIPO_REGISTRO)
+            .order_by(desc("total_registros"))
         )
-        .filter(SaudeAnimais.DATA_OCORRENCIA >= data_limite)
-        .group_by(SaudeAnimais.TIPO_REGISTRO)
-        .order_by(desc("total_registros"))
-        .all()
-    )
+    ).all()
 
     consumo_list = []
     for resultado in resultados:
@@ -694,17 +755,13 @@ async def get_consumo_por_tipo(
 
 @router.get("/medicamentos/autocomplete", response_model=List[MedicamentoAutocomplete])
 async def get_medicamentos_autocomplete(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
     query: str = Query(..., min_length=2, description="Termo de busca"),
 ):
     """Autocomplete para medicamentos ativos"""
-    medicamentos = (
-        db.query(Medicamento)
-        .filter(Medicamento.ATIVO == "S", Medicamento.NOME.ilike(f"%{query}%"))
-        .order_by(Medicamento.NOME)
-        .limit(10)
-        .all()
+    medicamentos = await indice_medicamentos.buscar(
+        db, query, limite=10, filtro=lambda m: m.ATIVO == "S"
     )
 
     result = []
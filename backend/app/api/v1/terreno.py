@@ -1,12 +1,27 @@
-from typing import Optional
+from typing import List, Optional
 
-from app.core.database import get_db
+from app.core.database import get_async_db
+from app.core.paginacao import ParametrosPaginacao, paginar
 from app.core.security import get_current_user
 from app.models.terreno import Terreno
 from app.models.user import User
-from app.schemas.terreno import TerrenoCreate, TerrenoResponse, TerrenoUpdate
+from app.schemas.movimentacao import LocalizacaoAtual
+from app.schemas.terreno import (
+    OcupacaoTerreno,
+    PlanoRotacaoRequest,
+    PlanoRotacaoResponse,
+    TerrenoCreate,
+    TerrenoProximidade,
+    TerrenoResponse,
+    TerrenoUpdate,
+)
+from app.models.movimentacao import LocalizacaoAtualAnimal
+from app.services.geoespacial import indice_terrenos
+from app.services.ocupacao import consultar_localizacoes, ocupacao_por_terreno
+from app.services.rotacao import plano_rotacao
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter(prefix="/api/terrenos", tags=["Terrenos"])
 
@@ -14,7 +29,7 @@ router = APIRouter(prefix="/api/terrenos", tags=["Terrenos"])
 @router.post("/", response_model=TerrenoResponse, status_code=status.HTTP_201_CREATED)
 async def create_terreno(
     terreno: TerrenoCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     if terreno.ID_USUARIO_CADASTRO != current_user.ID:
@@ -25,14 +40,14 @@ async def create_terreno(
 
     db_terreno = Terreno(**terreno.dict())
     db.add(db_terreno)
-    db.commit()
-    db.refresh(db_terreno)
+    await db.commit()
+    await db.refresh(db_terreno)
     return db_terreno
 
 
 @router.get("/", response_model=dict)
 async def list_terrenos(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
     nome: Optional[str] = Query(None, description="Filtrar por nome do terreno"),
     status: Optional[str] = Query(None, description="Filtrar por status do terreno"),
@@ -40,8 +55,9 @@ async def list_terrenos(
     limit: int = Query(10, ge=1, le=100, description="Itens por página"),
     sort_by: Optional[str] = Query("ID", description="Coluna para ordenação"),
     order: Optional[str] = Query("asc", description="Ordem: asc ou desc"),
+    paginacao: ParametrosPaginacao = Depends(),
 ):
-    query = db.query(Terreno)
+    query = select(Terreno)
 
     # Aplicar filtros
     if nome:
@@ -49,10 +65,8 @@ async def list_terrenos(
     if status:
         query = query.filter(Terreno.STATUS_TERRENO == status)
 
-    # Contar total de registros
-    total = query.count()
-
     # Aplicar ordenação
+    ordenacao = []
     if sort_by in [
         "ID",
         "NOME",
@@ -61,29 +75,165 @@ async def list_terrenos(
         "LATITUDE",
         "LONGITUDE",
     ]:
-        order_column = getattr(Terreno, sort_by)
-        if order.lower() == "desc":
-            query = query.order_by(order_column.desc())
-        else:
-            query = query.order_by(order_column.asc())
+        ordenacao = [(getattr(Terreno, sort_by), order.lower() == "desc")]
 
-    # Aplicar paginação
-    offset = (page - 1) * limit
-    terrenos = query.offset(offset).limit(limit).all()
+    # Aplicar paginação (page/limit ou cursor)
+    pagina = await paginar(db, query, ordenacao, Terreno.ID, page, limit, paginacao)
 
     # Converter os objetos SQLAlchemy para modelos Pydantic
-    terrenos_response = [TerrenoResponse.from_orm(terreno) for terreno in terrenos]
+    terrenos_response = [TerrenoResponse.from_orm(terreno) for terreno in pagina.itens]
+
+    return {"terrenos": terrenos_response, **pagina.metadados(page, limit)}
+
+
+# === Consultas espaciais (índice em memória) ===
+
+
+def _filtro_disponiveis(disponivel: bool, capacidade_minima: Optional[int]):
+    if not disponivel and capacidade_minima is None:
+        return None
+
+    def filtro(terreno) -> bool:
+        if disponivel and terreno.STATUS_TERRENO != "DISPONIVEL":
+            return False
+        if capacidade_minima is not None:
+            return (terreno.CAPACIDADE_ANIMAIS or 0) >= capacidade_minima
+        return True
+
+    return filtro
+
+
+@router.get("/geo/raio", response_model=List[TerrenoProximidade])
+async def terrenos_no_raio(
+    latitude: float = Query(..., ge=-90, le=90),
+    longitude: float = Query(..., ge=-180, le=180),
+    raio_m: float = Query(..., gt=0, le=100000, description="Raio em metros"),
+    disponivel: bool = Query(False, description="Apenas terrenos disponíveis"),
+    capacidade_minima: Optional[int] = Query(None, ge=0),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Terrenos a até `raio_m` metros do ponto (borda do contorno, se houver)"""
+    return await indice_terrenos.no_raio(
+        db,
+        latitude,
+        longitude,
+        raio_m,
+        _filtro_disponiveis(disponivel, capacidade_minima),
+    )
+
+
+@router.get("/geo/proximos", response_model=List[TerrenoProximidade])
+async def terrenos_mais_proximos(
+    latitude: float = Query(..., ge=-90, le=90),
+    longitude: float = Query(..., ge=-180, le=180),
+    k: int = Query(5, ge=1, le=100, description="Quantidade de terrenos"),
+    disponivel: bool = Query(False, description="Apenas terrenos disponíveis"),
+    capacidade_minima: Optional[int] = Query(None, ge=0),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Os `k` terrenos mais próximos do ponto"""
+    return await indice_terrenos.mais_proximos(
+        db,
+        latitude,
+        longitude,
+        k,
+        _filtro_disponiveis(disponivel, capacidade_minima),
+    )
+
+
+@router.get("/geo/retangulo", response_model=List[TerrenoProximidade])
+async def terrenos_no_retangulo(
+    lat_min: float = Query(..., ge=-90, le=90),
+    lat_max: float = Query(..., ge=-90, le=90),
+    lon_min: float = Query(..., ge=-180, le=180),
+    lon_max: float = Query(..., ge=-180, le=180),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Terrenos que interceptam o retângulo (ex.: área visível do mapa)"""
+    if lat_min > lat_max or lon_min > lon_max:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Retângulo inválido: mínimo maior que máximo",
+        )
+    return await indice_terrenos.no_retangulo(db, lat_min, lat_max, lon_min, lon_max)
 
-    return {"terrenos": terrenos_response, "total": total, "page": page, "limit": limit}
+
+@router.get("/geo/contendo", response_model=List[TerrenoProximidade])
+async def terrenos_contendo_ponto(
+    latitude: float = Query(..., ge=-90, le=90),
+    longitude: float = Query(..., ge=-180, le=180),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Terrenos cujo contorno contém o ponto"""
+    return await indice_terrenos.contendo(db, latitude, longitude)
+
+
+# === Ocupação (LOCALIZACAO_ATUAL_ANIMAIS) ===
+
+
+@router.get("/ocupacao", response_model=List[OcupacaoTerreno])
+async def get_ocupacao_terrenos(
+    status_terreno: Optional[str] = Query(
+        None, description="Filtrar por status do terreno"
+    ),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Animais ativos atualmente em cada terreno e taxa de ocupação (%)"""
+    query = select(Terreno).order_by(Terreno.NOME)
+    if status_terreno:
+        query = query.filter(Terreno.STATUS_TERRENO == status_terreno)
+    terrenos = (await db.scalars(query)).all()
+    contagens = dict((await db.execute(ocupacao_por_terreno())).all())
+
+    resultado = []
+    for terreno in terrenos:
+        animais = contagens.get(terreno.ID, 0)
+        resultado.append(
+            OcupacaoTerreno(
+                terreno_id=terreno.ID,
+                terreno_nome=terreno.NOME,
+                status_terreno=terreno.STATUS_TERRENO,
+                capacidade_animais=terreno.CAPACIDADE_ANIMAIS,
+                animais_atuais=animais,
+                taxa_ocupacao=(
+                    round(animais / terreno.CAPACIDADE_ANIMAIS * 100, 1)
+                    if terreno.CAPACIDADE_ANIMAIS
+                    else None
+                ),
+            )
+        )
+    return resultado
+
+
+# === Rotação de pastagem ===
+
+
+@router.post("/rotacao/plano", response_model=PlanoRotacaoResponse)
+async def planejar_rotacao(
+    parametros: PlanoRotacaoRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Plano semanal de rotação dos grupos pelos piquetes (capacidade, descanso
+    e carência de MANEJO_TERRENOS) e as movimentações para executá-lo.
+    Apenas simula: nada é gravado.
+    """
+    return await plano_rotacao(db, parametros)
 
 
 @router.get("/{id}", response_model=TerrenoResponse)
 async def get_terreno(
     id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    terreno = db.query(Terreno).filter(Terreno.ID == id).first()
+    terreno = await db.scalar(select(Terreno).filter(Terreno.ID == id))
     if not terreno:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Terreno não encontrado"
@@ -91,14 +241,31 @@ async def get_terreno(
     return terreno
 
 
+@router.get("/{id}/animais", response_model=List[LocalizacaoAtual])
+async def get_animais_terreno(
+    id: int,
+    incluir_inativos: bool = Query(
+        False, description="Incluir animais vendidos/mortos/emprestados"
+    ),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Animais cuja última movimentação tem o terreno como destino"""
+    return await consultar_localizacoes(
+        db,
+        LocalizacaoAtualAnimal.ID_TERRENO == id,
+        apenas_ativos=not incluir_inativos,
+    )
+
+
 @router.put("/{id}", response_model=TerrenoResponse)
 async def update_terreno(
     id: int,
     terreno: TerrenoUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    db_terreno = db.query(Terreno).filter(Terreno.ID == id).first()
+    db_terreno = await db.scalar(select(Terreno).filter(Terreno.ID == id))
     if not db_terreno:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Terreno não encontrado"
@@ -107,23 +274,23 @@ async def update_terreno(
     for key, value in terreno.dict(exclude_unset=True).items():
         setattr(db_terreno, key, value)
 
-    db.commit()
-    db.refresh(db_terreno)
+    await db.commit()
+    await db.refresh(db_terreno)
     return db_terreno
 
 
 @router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_terreno(
     id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    db_terreno = db.query(Terreno).filter(Terreno.ID == id).first()
+    db_terreno = await db.scalar(select(Terreno).filter(Terreno.ID == id))
     if not db_terreno:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Terreno não encontrado"
         )
 
-    db.delete(db_terreno)
-    db.commit()
+    await db.delete(db_terreno)
+    await db.commit()
     return None
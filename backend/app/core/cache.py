@@ -0,0 +1,231 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from itertools import chain
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Set,
+)
+
+from app.core.database import AsyncSessionLocal
+from sqlalchemy import event, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Entrada:
+    valor: Any
+    criado_em: float
+    versao: int
+
+
+class CacheTTL:
+    """
+    Cache em memória (por processo) com TTL e stale-while-revalidate.
+
+    - Entradas dentro do TTL são servidas direto.
+    - Entradas vencidas ou invalidadas (até `stale_max` segundos) são servidas
+      enquanto uma task em segundo plano recalcula o valor com sessão própria.
+      Com `servir_invalidadas=False` só entradas vencidas pelo TTL são
+      servidas assim; após uma invalidação a consulta aguarda o recálculo.
+    - Sem entrada utilizável o valor é calculado na hora, uma vez por chave.
+
+    Commits que alteram alguma das `tabelas` invalidam o cache (ver eventos
+    de sessão abaixo). Uma dependência pode ser restrita a colunas no formato
+    "TABELA.COLUNA": só alterações nessas colunas (ou inclusões/exclusões de
+    linhas da tabela) invalidam o cache.
+    """
+
+    def __init__(
+        self,
+        nome: str,
+        ttl: float,
+        tabelas: Iterable[str],
+        stale_max: Optional[float] = None,
+        max_entradas: int = 256,
+        servir_invalidadas: bool = True,
+    ):
+        self.nome = nome
+        self.ttl = ttl
+        self.stale_max = stale_max if stale_max is not None else ttl * 10
+        self.tabelas: Set[str] = {t.upper() for t in tabelas}
+        self.max_entradas = max_entradas
+        self.servir_invalidadas = servir_invalidadas
+        self.versao = 0
+        self._entradas: "OrderedDict[Hashable, _Entrada]" = OrderedDict()
+        self._locks: Dict[Hashable, asyncio.Lock] = {}
+        self._atualizando: Dict[Hashable, asyncio.Task] = {}
+        _caches.append(self)
+
+    def _fresca(self, entrada: _Entrada) -> bool:
+        return (
+            entrada.versao == self.versao
+            and time.monotonic() - entrada.criado_em < self.ttl
+        )
+
+    def _guardar(self, chave: Hashable, valor: Any, versao: int):
+        self._entradas[chave] = _Entrada(valor, time.monotonic(), versao)
+        self._entradas.move_to_end(chave)
+        while len(self._entradas) > self.max_entradas:
+            removida, _ = self._entradas.popitem(last=False)
+            self._locks.pop(removida, None)
+
+    async def obter(
+        self,
+        chave: Hashable,
+        calcular: Callable[[AsyncSession], Awaitable[Any]],
+        db: AsyncSession,
+    ) -> Any:
+        """Retorna o valor da chave, calculando com `calcular(db)` se necessário"""
+        entrada = self._entradas.get(chave)
+        if entrada is not None:
+            if self._fresca(entrada):
+                return entrada.valor
+            utilizavel = self.servir_invalidadas or entrada.versao == self.versao
+            if utilizavel and time.monotonic() - entrada.criado_em < self.stale_max:
+                self._agendar_atualizacao(chave, calcular)
+                return entrada.valor
+
+        lock = self._locks.setdefault(chave, asyncio.Lock())
+        try:
+            async with lock:
+                # Outra requisição pode ter calculado enquanto aguardávamos
+                entrada = self._entradas.get(chave)
+                if entrada is not None and self._fresca(entrada):
+                    return entrada.valor
+
+                versao = self.versao
+                valor = await calcular(db)
+                self._guardar(chave, valor, versao)
+                return valor
+        finally:
+            # Locks só para chaves com entrada (cálculo com erro não guarda)
+            if chave not in self._entradas and self._locks.get(chave) is lock:
+                del self._locks[chave]
+
+    def _agendar_atualizacao(
+        self, chave: Hashable, calcular: Callable[[AsyncSession], Awaitable[Any]]
+    ):
+        if chave in self._atualizando:
+            return
+
+        async def _atualizar():
+            try:
+                versao = self.versao
+                async with AsyncSessionLocal() as sessao:
+                    valor = await calcular(sessao)
+                self._guardar(chave, valor, versao)
+            except Exception:
+                logger.exception("Erro ao atualizar cache %s (%s)", self.nome, chave)
+            finally:
+                self._atualizando.pop(chave, None)
+
+        self._atualizando[chave] = asyncio.create_task(_atualizar())
+
+    def invalidar(self):
+        """Marca todas as entradas como desatualizadas"""
+        self.versao += 1
+
+    def limpar(self):
+        self._entradas.clear()
+        self._locks.clear()
+        self.invalidar()
+
+
+_caches: List[Any] = []
+
+
+def registrar_dependente(dependente: Any):
+    """
+    Inscreve na invalidação por commit outro objeto com `tabelas` e
+    `invalidar()` (ex.: índices de busca em memória)
+    """
+    _caches.append(dependente)
+
+
+def invalidar_tabelas(tabelas: Iterable[str]):
+    """Invalida os caches que dependem de alguma das tabelas informadas"""
+    alteradas = {t.upper() for t in tabelas}
+    for cache in _caches:
+        if cache.tabelas & alteradas:
+            cache.invalidar()
+
+
+# === Eventos de sessão: coletam as tabelas alteradas e invalidam no commit ===
+
+
+def _tabelas_alteradas(session: Session) -> Set[str]:
+    return session.info.setdefault("tabelas_alteradas", set())
+
+
+def _registrar_colunas(tabelas: Set[str], tabela: str, colunas: Iterable[str]):
+    tabelas.add(tabela)
+    tabelas.update(f"{tabela}.{coluna}" for coluna in colunas)
+
+
+@event.listens_for(Session, "after_flush")
+def _registrar_flush(session, flush_context):
+    tabelas = _tabelas_alteradas(session)
+    for obj in chain(session.new, session.deleted):
+        tabela = getattr(obj, "__tablename__", None)
+        if tabela:
+            _registrar_colunas(tabelas, tabela, inspect(obj).mapper.columns.keys())
+
+    for obj in session.dirty:
+        tabela = getattr(obj, "__tablename__", None)
+        if tabela:
+            estado = inspect(obj)
+            _registrar_colunas(
+                tabelas,
+                tabela,
+                (
+                    atributo.key
+                    for atributo in estado.attrs
+                    if atributo.history.has_changes()
+                ),
+            )
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _registrar_dml(orm_execute_state):
+    # update()/delete()/insert() em massa não passam pelo flush
+    if (
+        orm_execute_state.is_update
+        or orm_execute_state.is_delete
+        or orm_execute_state.is_insert
+    ):
+        statement = orm_execute_state.statement
+        tabela = getattr(statement, "table", None)
+        if tabela is None:
+            return
+        # As colunas do SET não são expostas pela API pública do statement:
+        # DML em massa invalida a tabela inteira (todas as colunas)
+        _registrar_colunas(
+            _tabelas_alteradas(orm_execute_state.session),
+            tabela.name,
+            tabela.columns.keys(),
+        )
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidar_no_commit(session):
+    tabelas = session.info.pop("tabelas_alteradas", None)
+    if tabelas:
+        invalidar_tabelas(tabelas)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_no_rollback(session):
+    session.info.pop("tabelas_alteradas", None)
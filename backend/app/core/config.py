@@ -3,6 +3,17 @@ from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     DATABASE_URL: str
+    ASYNC_DATABASE_URL: str | None = None
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_QUERY_WARN_THRESHOLD: int = 30
+    DB_QUERY_STRICT: bool = False
+    DASHBOARD_CACHE_TTL: int = 60
+    GENEALOGIA_CACHE_TTL: int = 600
+    BUSCA_INDICE_TTL: int = 900
+    UPLOAD_FOTO_MAX_MB: int = 10
+    UPLOAD_LAUDO_MAX_MB: int = 20
+    IMAGEM_WORKERS: int = 2
     MAIL_MAILER: str
     MAIL_HOST: str
     MAIL_PORT: int
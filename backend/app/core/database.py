@@ -1,5 +1,7 @@
 from app.core.config import settings
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 # Configuração adicional para o Oracle
@@ -7,9 +9,41 @@ engine = create_engine(settings.DATABASE_URL, pool_recycle=3600, pool_pre_ping=T
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+def _async_database_url() -> str:
+    """URL do driver assíncrono do oracledb (modo thin)"""
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+    url = make_url(settings.DATABASE_URL)
+    return url.set(drivername="oracle+oracledb_async").render_as_string(
+        hide_password=False
+    )
+
+
+# Engine assíncrono usado pelos routers (não bloqueia o event loop)
+async_engine = create_async_engine(
+    _async_database_url(),
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_recycle=3600,
+    pool_pre_ping=True,
+)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    # Evita lazy-load implícito (I/O síncrono) ao acessar atributos após o commit
+    expire_on_commit=False,
+)
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
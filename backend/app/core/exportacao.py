@@ -0,0 +1,111 @@
+"""
+Exportação de tabelas grandes em CSV ou NDJSON (streaming).
+
+A consulta é executada com cursor do lado do servidor (`yield_per`) e as
+linhas são serializadas em blocos direto na resposta, sem montar objetos
+ORM/Pydantic nem a lista completa em memória: o consumo é constante
+qualquer que seja o número de linhas.
+
+As consultas de exportação selecionam colunas (não entidades); o nome de
+cada coluna (ou o `label`) vira o cabeçalho do CSV / a chave do JSON.
+
+A sessão é aberta pelo próprio gerador: a sessão da dependência
+`get_async_db` é fechada antes de o corpo da resposta começar a ser enviado.
+"""
+
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Any, AsyncIterator, List, Optional, Sequence
+
+from app.core.database import AsyncSessionLocal
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select
+
+TAMANHO_LOTE_EXPORTACAO = 1000
+
+
+class FormatoExportacao(str, Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+
+_TIPOS_MIDIA = {
+    FormatoExportacao.CSV: "text/csv; charset=utf-8",
+    FormatoExportacao.NDJSON: "application/x-ndjson",
+}
+
+
+def colunas(modelo, exceto: Sequence[str] = ()) -> List[Any]:
+    """Todas as colunas mapeadas do modelo, na ordem da tabela"""
+    return [
+        getattr(modelo, coluna.key)
+        for coluna in modelo.__table__.columns
+        if coluna.key not in exceto
+    ]
+
+
+def _valor(valor: Any) -> Any:
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, Enum):
+        return valor.value
+    if isinstance(valor, Decimal):
+        return float(valor)
+    return valor
+
+
+def _bloco_csv(linhas, cabecalho: Optional[List[str]] = None) -> str:
+    saida = io.StringIO()
+    escritor = csv.writer(saida, lineterminator="\n")
+    if cabecalho:
+        escritor.writerow(cabecalho)
+    escritor.writerows([_valor(v) for v in linha] for linha in linhas)
+    return saida.getvalue()
+
+
+def _bloco_ndjson(linhas, chaves: List[str]) -> str:
+    return "".join(
+        json.dumps(
+            {chave: _valor(v) for chave, v in zip(chaves, linha)},
+            ensure_ascii=False,
+        )
+        + "\n"
+        for linha in linhas
+    )
+
+
+async def _gerar(query: Select, formato: FormatoExportacao) -> AsyncIterator[bytes]:
+    async with AsyncSessionLocal() as db:
+        resultado = await db.stream(
+            query.execution_options(yield_per=TAMANHO_LOTE_EXPORTACAO)
+        )
+        chaves = list(resultado.keys())
+
+        if formato == FormatoExportacao.CSV:
+            # BOM para o Excel reconhecer UTF-8 (acentos)
+            yield ("\ufeff" + _bloco_csv([], chaves)).encode()
+
+        async for linhas in resultado.partitions():
+            if formato == FormatoExportacao.CSV:
+                yield _bloco_csv(linhas).encode()
+            else:
+                yield _bloco_ndjson(linhas, chaves).encode()
+
+
+def resposta_exportacao(
+    query: Select, formato: FormatoExportacao, nome_arquivo: str
+) -> StreamingResponse:
+    """StreamingResponse com as linhas de `query` no formato pedido"""
+    return StreamingResponse(
+        _gerar(query, formato),
+        media_type=_TIPOS_MIDIA[formato],
+        headers={
+            "Content-Disposition": (
+                f'attachment; filename="{nome_arquivo}.{formato.value}"'
+            )
+        },
+    )
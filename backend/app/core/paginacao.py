@@ -0,0 +1,218 @@
+"""
+Paginação das listagens: page/limit (OFFSET) ou cursor (keyset).
+
+No modo cursor a próxima página é buscada a partir da última linha vista,
+comparando (colunas de ordenação..., ID) em vez de pular `offset` linhas;
+o custo por página não cresce com a profundidade. O total exato (COUNT) é
+opcional em ambos os modos.
+
+Uso nos endpoints:
+
+    paginacao: ParametrosPaginacao = Depends()
+    ...
+    pagina = await paginar(
+        db, query, [(Modelo.DATA, True)], Modelo.ID, page, limit, paginacao
+    )
+    return {"itens": pagina.itens, **pagina.metadados(page, limit)}
+
+Colunas de ordenação anuláveis são ordenadas com NULLS LAST nos dois
+sentidos para que o cursor tenha uma ordem total bem definida.
+"""
+
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Any, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Query, status
+from sqlalchemy import and_, false, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+class ParametrosPaginacao:
+    """Parâmetros de cursor comuns às listagens (dependência do FastAPI)"""
+
+    def __init__(
+        self,
+        cursor: Optional[str] = Query(
+            None, description="Cursor da próxima página (ignora page)"
+        ),
+        contar_total: bool = Query(
+            True, description="Calcular o total exato de registros"
+        ),
+    ):
+        self.cursor = cursor
+        self.contar_total = contar_total
+
+
+@dataclass
+class Pagina:
+    itens: list
+    total: Optional[int]
+    proximo_cursor: Optional[str]
+    tem_mais: bool
+
+    def metadados(self, page: int, limit: int) -> dict:
+        total_pages = (
+            (self.total + limit - 1) // limit if self.total is not None else None
+        )
+        return {
+            "total": self.total,
+            "page": page,
+            "limit": limit,
+            "total_pages": total_pages,
+            "proximo_cursor": self.proximo_cursor,
+            "tem_mais": self.tem_mais,
+        }
+
+
+# === Codificação do cursor ===
+
+
+def _serializar(valor: Any) -> Any:
+    if isinstance(valor, datetime):
+        return {"dt": valor.isoformat()}
+    if isinstance(valor, date):
+        return {"d": valor.isoformat()}
+    if isinstance(valor, Enum):
+        return valor.value
+    if isinstance(valor, Decimal):
+        return float(valor)
+    return valor
+
+
+def _desserializar(valor: Any) -> Any:
+    if isinstance(valor, dict):
+        if "dt" in valor:
+            return datetime.fromisoformat(valor["dt"])
+        if "d" in valor:
+            return date.fromisoformat(valor["d"])
+    return valor
+
+
+def _assinatura(colunas: Sequence[Any], descendentes: Sequence[bool]) -> str:
+    return ",".join(
+        f"{coluna.key}:{'d' if desc else 'a'}"
+        for coluna, desc in zip(colunas, descendentes)
+    )
+
+
+def codificar_cursor(assinatura: str, valores: Sequence[Any]) -> str:
+    conteudo = json.dumps({"o": assinatura, "v": [_serializar(v) for v in valores]})
+    return base64.urlsafe_b64encode(conteudo.encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: str, assinatura: str, quantidade: int) -> List[Any]:
+    try:
+        preenchido = cursor + "=" * (-len(cursor) % 4)
+        conteudo = json.loads(base64.urlsafe_b64decode(preenchido.encode()))
+        valores = [_desserializar(v) for v in conteudo["v"]]
+        valido = conteudo["o"] == assinatura and len(valores) == quantidade
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        valido = False
+
+    # Cursor de outra ordenação (ou adulterado) não pode ser reaproveitado
+    if not valido:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor inválido"
+        )
+    return valores
+
+
+# === Consulta ===
+
+
+def _anulavel(coluna) -> bool:
+    return getattr(getattr(coluna, "expression", coluna), "nullable", True)
+
+
+def _depois_de(colunas, descendentes, valores):
+    """Condição "linha vem depois do cursor" na ordem (colunas..., NULLS LAST)"""
+    condicoes = []
+    iguais = []
+    for coluna, desc, valor in zip(colunas, descendentes, valores):
+        if valor is None:
+            # Nulos ficam por último: nada vem estritamente depois nesta coluna
+            posterior = false()
+            igual = coluna.is_(None)
+        else:
+            posterior = coluna < valor if desc else coluna > valor
+            if _anulavel(coluna):
+                posterior = or_(posterior, coluna.is_(None))
+            igual = coluna == valor
+        condicoes.append(and_(*iguais, posterior))
+        iguais.append(igual)
+    return or_(*condicoes)
+
+
+async def paginar(
+    db: AsyncSession,
+    query,
+    ordenacao: Sequence[Tuple[Any, bool]],
+    coluna_id,
+    page: int,
+    limit: int,
+    parametros: ParametrosPaginacao,
+    escalar: bool = True,
+    offset: Optional[int] = None,
+) -> Pagina:
+    """
+    Executa `query` paginada. `ordenacao` é uma lista de (coluna, descendente);
+    `coluna_id` desempata (no sentido da última coluna). Com `escalar` as
+    linhas são entidades; senão tuplas cuja primeira posição é a entidade.
+    `offset` substitui o cálculo a partir de `page` nos endpoints que já o
+    recebiam diretamente.
+    """
+    if limit < 1:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="O limite por página deve ser maior que zero",
+        )
+    ordenacao = list(ordenacao)
+    if not ordenacao or ordenacao[-1][0] is not coluna_id:
+        desc_id = ordenacao[-1][1] if ordenacao else False
+        ordenacao.append((coluna_id, desc_id))
+    colunas = [coluna for coluna, _ in ordenacao]
+    descendentes = [desc for _, desc in ordenacao]
+    assinatura = _assinatura(colunas, descendentes)
+
+    total = None
+    if parametros.contar_total:
+        total = await db.scalar(select(func.count()).select_from(query.subquery()))
+
+    criterios = []
+    for coluna, desc in zip(colunas, descendentes):
+        criterio = coluna.desc() if desc else coluna.asc()
+        if coluna is not coluna_id and _anulavel(coluna):
+            criterio = criterio.nulls_last()
+        criterios.append(criterio)
+    query = query.order_by(None).order_by(*criterios)
+
+    if parametros.cursor:
+        valores = decodificar_cursor(parametros.cursor, assinatura, len(colunas))
+        query = query.filter(_depois_de(colunas, descendentes, valores))
+    else:
+        query = query.offset(offset if offset is not None else (page - 1) * limit)
+
+    # Uma linha a mais indica se existe próxima página
+    query = query.limit(limit + 1)
+    if escalar:
+        linhas = (await db.scalars(query)).all()
+    else:
+        linhas = (await db.execute(query)).all()
+
+    tem_mais = len(linhas) > limit
+    linhas = linhas[:limit]
+
+    proximo_cursor = None
+    if tem_mais:
+        ultima = linhas[-1] if escalar else linhas[-1][0]
+        proximo_cursor = codificar_cursor(
+            assinatura, [getattr(ultima, coluna.key) for coluna in colunas]
+        )
+
+    return Pagina(list(linhas), total, proximo_cursor, tem_mais)
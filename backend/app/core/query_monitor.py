@@ -0,0 +1,181 @@
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
+
+from app.core.config import settings
+from app.core.database import async_engine, engine
+from sqlalchemy import event
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class EstatisticasQueries:
+    """Contadores de SQL emitidos durante uma requisição"""
+
+    total: int = 0
+    tempo_ms: float = 0.0
+    orcamento: Optional[int] = None
+
+    @property
+    def excedeu_orcamento(self) -> bool:
+        return self.orcamento is not None and self.total > self.orcamento
+
+
+class OrcamentoQueriesExcedido(AssertionError):
+    """Endpoint executou mais queries do que o orçamento permitido"""
+
+
+_estatisticas: ContextVar[Optional[EstatisticasQueries]] = ContextVar(
+    "estatisticas_queries", default=None
+)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_inicio", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    inicio = conn.info["query_inicio"].pop()
+    stats = _estatisticas.get()
+    if stats is not None:
+        stats.total += 1
+        stats.tempo_ms += (time.perf_counter() - inicio) * 1000
+
+
+def _registrar_eventos():
+    # O engine assíncrono emite os eventos pelo engine síncrono subjacente
+    for alvo in (engine, async_engine.sync_engine):
+        if not event.contains(alvo, "before_cursor_execute", _before_cursor_execute):
+            event.listen(alvo, "before_cursor_execute", _before_cursor_execute)
+            event.listen(alvo, "after_cursor_execute", _after_cursor_execute)
+
+
+_registrar_eventos()
+
+
+def orcamento_queries(maximo: int):
+    """
+    Dependência que define o orçamento de queries de um endpoint.
+    Ex.: dependencies=[Depends(orcamento_queries(5))]
+    """
+
+    async def _definir_orcamento():
+        stats = _estatisticas.get()
+        if stats is not None:
+            stats.orcamento = maximo
+
+    return _definir_orcamento
+
+
+@contextmanager
+def contar_queries(maximo: Optional[int] = None):
+    """
+    Conta as queries executadas no bloco (uso em testes/scripts).
+    Levanta OrcamentoQueriesExcedido se `maximo` for ultrapassado.
+    """
+    stats = EstatisticasQueries(orcamento=maximo)
+    token = _estatisticas.set(stats)
+    try:
+        yield stats
+    finally:
+        _estatisticas.reset(token)
+    if stats.excedeu_orcamento:
+        raise OrcamentoQueriesExcedido(
+            f"{stats.total} queries executadas (orçamento: {stats.orcamento})"
+        )
+
+
+class QueryMonitorMiddleware:
+    """
+    Conta as queries e o tempo de banco de cada requisição, expondo os valores
+    nos headers Server-Timing e X-DB-Queries. Acima do limite configurado
+    registra um aviso; em modo estrito a requisição falha com 500.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        limite_aviso: Optional[int] = None,
+        estrito: Optional[bool] = None,
+    ):
+        self.app = app
+        self.limite_aviso = (
+            settings.DB_QUERY_WARN_THRESHOLD if limite_aviso is None else limite_aviso
+        )
+        self.estrito = settings.DB_QUERY_STRICT if estrito is None else estrito
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = EstatisticasQueries()
+        token = _estatisticas.set(stats)
+        rota = f"{scope['method']} {scope['path']}"
+        descartar_corpo = False
+
+        async def send_com_headers(message: Message):
+            nonlocal descartar_corpo
+
+            if message["type"] == "http.response.start":
+                orcamento = stats.orcamento
+                if orcamento is None:
+                    orcamento = self.limite_aviso
+
+                if stats.total > orcamento:
+                    logger.warning(
+                        "%s executou %d queries (orçamento %d, %.1f ms de banco)",
+                        rota,
+                        stats.total,
+                        orcamento,
+                        stats.tempo_ms,
+                    )
+                    if self.estrito:
+                        # Substitui a resposta do endpoint por um erro
+                        descartar_corpo = True
+                        resposta = JSONResponse(
+                            status_code=500,
+                            content={
+                                "detail": f"Orçamento de queries excedido em "
+                                f"{rota}: {stats.total} > {orcamento}"
+                            },
+                        )
+                        await send(
+                            {
+                                "type": "http.response.start",
+                                "status": resposta.status_code,
+                                "headers": resposta.raw_headers + self._headers(stats),
+                            }
+                        )
+                        await send(
+                            {"type": "http.response.body", "body": resposta.body}
+                        )
+                        return
+
+                message["headers"] = list(message.get("headers", [])) + self._headers(
+                    stats
+                )
+
+            elif message["type"] == "http.response.body" and descartar_corpo:
+                return
+
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_com_headers)
+        finally:
+            _estatisticas.reset(token)
+
+    @staticmethod
+    def _headers(stats: EstatisticasQueries):
+        server_timing = f'db;dur={stats.tempo_ms:.1f};desc="{stats.total} queries"'
+        return [
+            (b"x-db-queries", str(stats.total).encode()),
+            (b"server-timing", server_timing.encode()),
+        ]
@@ -2,14 +2,15 @@ import uuid
 from datetime import datetime, timedelta
 
 from app.core.config import settings
-from app.core.database import get_db
+from app.core.database import get_async_db
 from app.models.sessao import Sessao
 from app.models.user import User
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
@@ -42,7 +43,7 @@ def generate_reset_token() -> str:
 
 
 async def get_current_user(
-    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
+    token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)
 ):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -62,13 +63,15 @@ async def get_current_user(
         print(f"Erro JWT: {str(e)}")
         raise credentials_exception from e
 
-    user = db.query(User).filter(User.ID == int(user_id), User.ATIVO == "S").first()
+    user = await db.scalar(
+        select(User).filter(User.ID == int(user_id), User.ATIVO == "S")
+    )
     if user is None:
         raise credentials_exception
     return user
 
 
-async def validate_refresh_token(token: str, db: Session = Depends(get_db)):
+async def validate_refresh_token(token: str, db: AsyncSession = Depends(get_async_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Refresh token inválido",
@@ -86,26 +89,26 @@ async def validate_refresh_token(token: str, db: Session = Depends(get_db)):
     except JWTError as e:
         raise credentials_exception from e
 
-    sessao = (
-        db.query(Sessao)
-        .filter(
+    sessao = await db.scalar(
+        select(Sessao).filter(
             Sessao.TOKEN_SESSAO == token,
             Sessao.ID_USUARIO == int(user_id),
             Sessao.ATIVA == "S",
             Sessao.DATA_EXPIRACAO > datetime.utcnow(),
         )
-        .first()
     )
 
     if not sessao:
         raise credentials_exception
 
-    user = db.query(User).filter(User.ID == int(user_id), User.ATIVO == "S").first()
+    user = await db.scalar(
+        select(User).filter(User.ID == int(user_id), User.ATIVO == "S")
+    )
     if not user:
         raise credentials_exception
 
     # Atualizar data de último acesso
     sessao.DATA_ULTIMO_ACESSO = datetime.utcnow()
-    db.commit()
+    await db.commit()
 
     return user
@@ -0,0 +1,97 @@
+"""
+Gravação e entrega de arquivos enviados (UploadFile).
+
+O conteúdo é copiado em blocos sem bloquear o event loop: a leitura usa a
+API assíncrona do UploadFile e a escrita em disco (com o SHA-256 calculado
+no caminho) roda no threadpool. O limite de tamanho é verificado antes da
+cópia (quando o tamanho é conhecido) e a cada bloco; ao excedê-lo o arquivo
+parcial é removido.
+
+Arquivos nomeados pelo hash do conteúdo (ver app.services.armazenamento)
+nunca mudam: são servidos com ETag igual ao hash e Cache-Control imutável.
+"""
+
+import hashlib
+import os
+import re
+from pathlib import Path
+from typing import Tuple
+
+from fastapi import HTTPException, UploadFile, status
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+TAMANHO_BLOCO = 1024 * 1024
+
+
+def _limite_excedido(limite_bytes: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Arquivo excede o limite de {limite_bytes // (1024 * 1024)} MB",
+    )
+
+
+def _gravar_bloco(saida, resumo, bloco: bytes):
+    resumo.update(bloco)
+    saida.write(bloco)
+
+
+async def salvar_upload(
+    arquivo: UploadFile, destino: Path, limite_bytes: int
+) -> Tuple[int, str]:
+    """Grava o upload em `destino`; retorna (bytes gravados, SHA-256 hex)"""
+    if arquivo.size is not None and arquivo.size > limite_bytes:
+        raise _limite_excedido(limite_bytes)
+
+    total = 0
+    resumo = hashlib.sha256()
+    saida = await run_in_threadpool(open, destino, "wb")
+    try:
+        while bloco := await arquivo.read(TAMANHO_BLOCO):
+            total += len(bloco)
+            if total > limite_bytes:
+                raise _limite_excedido(limite_bytes)
+            await run_in_threadpool(_gravar_bloco, saida, resumo, bloco)
+    except BaseException:
+        await run_in_threadpool(saida.close)
+        destino.unlink(missing_ok=True)
+        raise
+
+    await run_in_threadpool(saida.close)
+    return total, resumo.hexdigest()
+
+
+# Nome de arquivo endereçado por conteúdo: <sha256>[_variante].<ext>
+_NOME_POR_HASH = re.compile(r"^([0-9a-f]{64})(_[a-z]+)?\.[a-z0-9]+$")
+
+CACHE_IMUTAVEL = "public, max-age=31536000, immutable"
+
+
+class ArquivosUpload(StaticFiles):
+    """
+    StaticFiles para /uploads: arquivos endereçados por conteúdo recebem
+    ETag forte derivado do nome e cache imutável; os demais (nomes antigos
+    com timestamp) mantêm o comportamento padrão.
+    """
+
+    def file_response(
+        self,
+        full_path: os.PathLike,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        response = FileResponse(
+            full_path, status_code=status_code, stat_result=stat_result
+        )
+        nome = _NOME_POR_HASH.match(os.path.basename(full_path))
+        if nome:
+            response.headers["etag"] = f'"{nome.group(1)}{nome.group(2) or ""}"'
+            response.headers["cache-control"] = CACHE_IMUTAVEL
+
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -0,0 +1,26 @@
+"""
+Nomes e URLs das variantes redimensionadas das fotos de animais.
+
+Só manipula caminhos: schemas e serviços usam estes helpers sem importar o
+processamento de imagens (app.services.imagens).
+"""
+
+from pathlib import Path
+from typing import Optional
+
+# Fotos antigas (nome com timestamp) e do armazenamento por conteúdo
+PREFIXOS_URL_FOTOS = ("/uploads/animais/", "/uploads/objetos/")
+
+# Nome da variante -> maior lado em pixels
+VARIANTES = {"thumb": 200, "media": 800}
+
+
+def caminho_variante(original: Path, variante: str) -> Path:
+    return original.with_name(f"{original.stem}_{variante}.webp")
+
+
+def url_variante(url_foto: Optional[str], variante: str) -> Optional[str]:
+    """URL da variante de uma foto enviada pelo upload (None para outras URLs)"""
+    if not url_foto or not url_foto.startswith(PREFIXOS_URL_FOTOS):
+        return None
+    return f"{url_foto.rsplit('.', 1)[0]}_{variante}.webp"
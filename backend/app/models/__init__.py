@@ -1,6 +1,11 @@
 # backend/app/models/__init__.py
 from .animal import Animal
 from .crescimento import HistoricoCrescimento
+from .custos import (
+    CategoriaCustoEnum,
+    CustoCategoriaMensal,
+    CustoProprietarioDiario,
+)
 from .ferrageamento import (  # NOVO MODELO
     FerrageamentoAnimais,
     FerrageamentoMixin,
@@ -14,7 +19,7 @@ from .manejo import (
 )
 from .medicamento import Medicamento, MovimentacaoMedicamento
 from .mfa import MFAConfig
-from .movimentacao import MovimentacaoAnimais
+from .movimentacao import LocalizacaoAtualAnimal, MovimentacaoAnimais
 from .racao import (
     FornecimentoRacaoAnimal,
     ItemPlanoAlimentar,
@@ -43,6 +48,7 @@ __all__ = [
     "FerrageamentoMixin",
     "FerrageamentoResumo",
     "MovimentacaoAnimais",
+    "LocalizacaoAtualAnimal",
     "Reproducao",
     "ProdutoManejo",
     "MovimentacaoProdutoManejo",
@@ -53,4 +59,7 @@ __all__ = [
     "PlanoAlimentar",
     "ItemPlanoAlimentar",
     "FornecimentoRacaoAnimal",
+    "CategoriaCustoEnum",
+    "CustoProprietarioDiario",
+    "CustoCategoriaMensal",
 ]
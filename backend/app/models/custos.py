@@ -0,0 +1,45 @@
+import enum
+
+from sqlalchemy import Column, Date, DateTime, Float, ForeignKey, Integer, String
+from sqlalchemy.sql import func
+
+from .base import Base
+
+
+class CategoriaCustoEnum(str, enum.Enum):
+    MEDICAMENTOS = "MEDICAMENTOS"
+    RACAO = "RACAO"
+    MANEJO = "MANEJO"
+
+
+class CustoProprietarioDiario(Base):
+    """
+    Consolidado de custos por (proprietário, animal, categoria, dia).
+    Mantido incrementalmente por app.services.custos; não editar manualmente.
+    """
+
+    __tablename__ = "CUSTOS_PROPRIETARIO_DIARIO"
+
+    ID = Column(Integer, primary_key=True, autoincrement=True)
+    PROPRIETARIO = Column(String(200))  # Nulo: custo de manejo sem animais alocados
+    ID_ANIMAL = Column(Integer, ForeignKey("ANIMAIS.ID"))
+    CATEGORIA = Column(String(20), nullable=False)
+    DATA_REFERENCIA = Column(Date, nullable=False)
+    VALOR = Column(Float, nullable=False, default=0)
+    QUANTIDADE_REGISTROS = Column(Integer, nullable=False, default=0)
+    DATA_ATUALIZACAO = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class CustoCategoriaMensal(Base):
+    """
+    Série mensal de custos por categoria (soma de CUSTOS_PROPRIETARIO_DIARIO).
+    Mantida junto com o consolidado diário por app.services.custos.
+    """
+
+    __tablename__ = "CUSTOS_CATEGORIA_MENSAL"
+
+    MES = Column(Date, primary_key=True)  # Primeiro dia do mês
+    CATEGORIA = Column(String(20), primary_key=True)
+    VALOR = Column(Float, nullable=False, default=0)
+    QUANTIDADE_REGISTROS = Column(Integer, nullable=False, default=0)
+    DATA_ATUALIZACAO = Column(DateTime(timezone=True), server_default=func.now())
@@ -21,3 +21,21 @@ class MovimentacaoAnimais(Base):
     OBSERVACOES = Column(CLOB)
     ID_USUARIO_REGISTRO = Column(Integer, ForeignKey("USUARIOS.ID"))
     DATA_REGISTRO = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class LocalizacaoAtualAnimal(Base):
+    """
+    Localização atual de cada animal (destino da última movimentação).
+    Mantida incrementalmente por app.services.ocupacao; não editar manualmente.
+    """
+
+    __tablename__ = "LOCALIZACAO_ATUAL_ANIMAIS"
+
+    ID_ANIMAL = Column(Integer, ForeignKey("ANIMAIS.ID"), primary_key=True)
+    ID_MOVIMENTACAO = Column(
+        Integer, ForeignKey("MOVIMENTACOES_ANIMAIS.ID"), nullable=False
+    )
+    ID_TERRENO = Column(Integer, ForeignKey("TERRENOS.ID"), index=True)
+    LOCAL_EXTERNO = Column(String(100))  # Destino fora da fazenda
+    TIPO_MOVIMENTACAO = Column(String(50), nullable=False)
+    DATA_MOVIMENTACAO = Column(DateTime, nullable=False)
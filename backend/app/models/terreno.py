@@ -1,10 +1,25 @@
+import json
+
 from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, String
 from sqlalchemy.sql import func
-from sqlalchemy.types import CLOB
+from sqlalchemy.types import CLOB, TypeDecorator
 
 from .base import Base
 
 
+class PoligonoJSON(TypeDecorator):
+    """Lista de vértices [latitude, longitude] gravada como JSON em CLOB"""
+
+    impl = CLOB
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return json.dumps(value) if value else None
+
+    def process_result_value(self, value, dialect):
+        return json.loads(value) if value else None
+
+
 class Terreno(Base):
     __tablename__ = "TERRENOS"
     ID = Column(Integer, primary_key=True, autoincrement=True)
@@ -18,5 +33,6 @@ class Terreno(Base):
     LONGITUDE = Column(Float, nullable=False)  # NUMBER(9,6)
     STATUS_TERRENO = Column(String(20), default="DISPONIVEL")
     OBSERVACOES = Column(CLOB)
+    LIMITES = Column(PoligonoJSON)  # Contorno opcional do terreno
     ID_USUARIO_CADASTRO = Column(Integer, ForeignKey("USUARIOS.ID"), nullable=False)
     DATA_CADASTRO = Column(DateTime(timezone=True), server_default=func.now())
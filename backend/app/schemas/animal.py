@@ -1,8 +1,15 @@
 from datetime import datetime
 from enum import Enum
-from typing import Optional
+from typing import Dict, List, Optional
 
-from pydantic import BaseModel, Field, field_serializer, field_validator
+from app.core.variantes import url_variante
+from pydantic import (
+    BaseModel,
+    Field,
+    computed_field,
+    field_serializer,
+    field_validator,
+)
 
 
 class SexoEnum(str, Enum):
@@ -103,6 +110,17 @@ class AnimalResponse(AnimalBase):
     def serialize_dt(self, dt: datetime | None, _info):
         return dt.strftime("%d/%m/%Y") if dt else None
 
+    # Variantes WebP da foto (listagens devem usar a miniatura)
+    @computed_field
+    @property
+    def FOTO_THUMB(self) -> Optional[str]:
+        return url_variante(self.FOTO_PRINCIPAL, "thumb")
+
+    @computed_field
+    @property
+    def FOTO_MEDIA(self) -> Optional[str]:
+        return url_variante(self.FOTO_PRINCIPAL, "media")
+
     class Config:
         from_attributes = True
 
@@ -116,10 +134,48 @@ class AnimalGenealogia(BaseModel):
         from_attributes = True
 
 
+class DescendenteResponse(AnimalResponse):
+    GERACAO: int = 1  # 1 = filhos, 2 = netos, ...
+
+
 # Upload de foto
 
 
 class FotoUploadResponse(BaseModel):
     filename: str
     url: str
+    variantes: Dict[str, str] = {}
     message: str
+
+
+# Importação em lote
+
+
+class AnimalImportacao(AnimalCreate):
+    """Linha da importação (CSV/JSON): aceita datas dd/mm/aaaa e decimais com vírgula"""
+
+    @field_validator("DATA_NASCIMENTO", mode="before")
+    @classmethod
+    def parse_data_br(cls, v):
+        if isinstance(v, str) and "/" in v:
+            return datetime.strptime(v.strip(), "%d/%m/%Y")
+        return v
+
+    @field_validator("PESO_ATUAL", mode="before")
+    @classmethod
+    def parse_decimal_br(cls, v):
+        if isinstance(v, str):
+            return v.strip().replace(",", ".")
+        return v
+
+
+class ErroImportacao(BaseModel):
+    linha: int
+    campo: Optional[str] = None
+    mensagem: str
+
+
+class ImportacaoAnimaisResponse(BaseModel):
+    total: int
+    importados: int
+    erros: List[ErroImportacao]
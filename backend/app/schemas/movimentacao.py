@@ -1,6 +1,6 @@
 from datetime import datetime
 from enum import Enum
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import BaseModel, Field, field_serializer, field_validator
 
@@ -26,42 +26,92 @@ class MovimentacaoBase(BaseModel):
     OBSERVACOES: Optional[str] = None
 
 
+# Regras comuns à movimentação individual e à em lote
+def _validar_data_movimentacao(v):
+    if v > datetime.now():
+        raise ValueError("Data de movimentação não pode ser no futuro")
+    return v
+
+
+def _validar_origem(v, info):
+    tipo = info.data.get("TIPO_MOVIMENTACAO")
+    # Origem não obrigatória para ENTRADA
+    if (
+        tipo in ["SAIDA", "TRANSFERENCIA", "VENDA", "EMPRESTIMO"]
+        and not v
+        and not info.data.get("ORIGEM_EXTERNA")
+    ):
+        raise ValueError("Origem é obrigatória para este tipo de movimentação")
+    return v
+
+
+def _validar_destino(v, info):
+    tipo = info.data.get("TIPO_MOVIMENTACAO")
+    # Destino não obrigatório para SAIDA
+    if (
+        tipo in ["ENTRADA", "TRANSFERENCIA", "RETORNO"]
+        and not v
+        and not info.data.get("DESTINO_EXTERNO")
+    ):
+        raise ValueError("Destino é obrigatório para este tipo de movimentação")
+    return v
+
+
 class MovimentacaoCreate(MovimentacaoBase):
     ID_USUARIO_REGISTRO: int
 
     @field_validator("DATA_MOVIMENTACAO")
     @classmethod
     def validate_data_movimentacao(cls, v):
-        if v > datetime.now():
-            raise ValueError("Data de movimentação não pode ser no futuro")
-        return v
+        return _validar_data_movimentacao(v)
 
     @field_validator("ID_TERRENO_ORIGEM")
     @classmethod
     def validate_origem_required(cls, v, info):
-        tipo = info.data.get("TIPO_MOVIMENTACAO")
-        # Origem não obrigatória para ENTRADA
-        if (
-            tipo in ["SAIDA", "TRANSFERENCIA", "VENDA", "EMPRESTIMO"]
-            and not v
-            and not info.data.get("ORIGEM_EXTERNA")
-        ):
-            raise ValueError("Origem é obrigatória para este tipo de movimentação")
-        return v
+        return _validar_origem(v, info)
 
     @field_validator("ID_TERRENO_DESTINO")
     @classmethod
     def validate_destino_required(cls, v, info):
-        tipo = info.data.get("TIPO_MOVIMENTACAO")
-        # Destino não obrigatório para SAIDA
-        if (
-            tipo in ["ENTRADA", "TRANSFERENCIA", "RETORNO"]
-            and not v
-            and not info.data.get("DESTINO_EXTERNO")
-        ):
-            raise ValueError("Destino é obrigatório para este tipo de movimentação")
+        return _validar_destino(v, info)
+
+
+class MovimentacaoLoteCreate(BaseModel):
+    """Mesma movimentação aplicada a um grupo de animais"""
+
+    ID_ANIMAIS: List[int] = Field(..., min_length=1, max_length=1000)
+    TIPO_MOVIMENTACAO: TipoMovimentacaoEnum = TipoMovimentacaoEnum.TRANSFERENCIA
+    DATA_MOVIMENTACAO: datetime
+    ORIGEM_EXTERNA: Optional[str] = Field(None, max_length=100)
+    DESTINO_EXTERNO: Optional[str] = Field(None, max_length=100)
+    ID_TERRENO_ORIGEM: Optional[int] = None
+    ID_TERRENO_DESTINO: Optional[int] = None
+    MOTIVO: Optional[str] = Field(None, max_length=200)
+    OBSERVACOES: Optional[str] = None
+    ID_USUARIO_REGISTRO: int
+
+    @field_validator("ID_ANIMAIS")
+    @classmethod
+    def validate_animais(cls, v):
+        if len(v) != len(set(v)):
+            raise ValueError("Animal repetido na lista")
         return v
 
+    @field_validator("DATA_MOVIMENTACAO")
+    @classmethod
+    def validate_data_movimentacao(cls, v):
+        return _validar_data_movimentacao(v)
+
+    @field_validator("ID_TERRENO_ORIGEM")
+    @classmethod
+    def validate_origem_required(cls, v, info):
+        return _validar_origem(v, info)
+
+    @field_validator("ID_TERRENO_DESTINO")
+    @classmethod
+    def validate_destino_required(cls, v, info):
+        return _validar_destino(v, info)
+
 
 class MovimentacaoUpdate(BaseModel):
     TIPO_MOVIMENTACAO: Optional[TipoMovimentacaoEnum] = None
@@ -112,3 +162,49 @@ class LocalizacaoAtual(BaseModel):
 class HistoricoMovimentacao(BaseModel):
     movimentacoes: list[MovimentacaoResponse]
     localizacao_atual: Optional[str] = None
+
+
+# Schemas do histórico de permanências (consultas por data)
+class PermanenciaAnimal(BaseModel):
+    animal_id: int
+    animal_nome: Optional[str] = None
+    terreno_id: Optional[int] = None
+    terreno_nome: Optional[str] = None
+    local_externo: Optional[str] = None
+    inicio: datetime
+    fim: Optional[datetime] = None  # None: animal ainda no local
+    id_movimentacao: int
+
+    @field_serializer("inicio", "fim")
+    def serialize_dt(self, dt: datetime | None, _info):
+        return dt.strftime("%d/%m/%Y %H:%M:%S") if dt else None
+
+
+class EncontroTerreno(BaseModel):
+    terreno_id: int
+    terreno_nome: Optional[str] = None
+    inicio: datetime
+    fim: datetime
+
+    @field_serializer("inicio", "fim")
+    def serialize_dt(self, dt: datetime | None, _info):
+        return dt.strftime("%d/%m/%Y %H:%M:%S") if dt else None
+
+
+class ContatoAnimal(BaseModel):
+    animal_id: int
+    animal_nome: Optional[str] = None
+    horas_contato: float
+    encontros: List[EncontroTerreno]
+
+
+class ContatosAnimal(BaseModel):
+    animal_id: int
+    animal_nome: Optional[str] = None
+    inicio: datetime
+    fim: datetime
+    contatos: List[ContatoAnimal]
+
+    @field_serializer("inicio", "fim")
+    def serialize_dt(self, dt: datetime | None, _info):
+        return dt.strftime("%d/%m/%Y %H:%M:%S") if dt else None
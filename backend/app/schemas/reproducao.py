@@ -143,3 +143,18 @@ class HistoricoEgua(BaseModel):
     total_coberturas: int
     partos_realizados: int
     taxa_sucesso: float
+
+
+class CandidatoGaranhao(BaseModel):
+    garanhao_id: int
+    garanhao_nome: str
+    consanguinidade_potro: float  # Coeficiente de Wright do potro (0 a 1)
+    consanguinidade_garanhao: float
+
+
+class RankingGaranhoes(BaseModel):
+    egua_id: int
+    egua_nome: str
+    consanguinidade_egua: float
+    total_avaliados: int
+    candidatos: list[CandidatoGaranhao]
@@ -1,6 +1,20 @@
-from pydantic import BaseModel, Field, field_serializer
-from typing import Optional
-from datetime import datetime
+from pydantic import BaseModel, Field, field_serializer, field_validator
+from typing import List, Optional, Tuple
+from datetime import date, datetime
+
+
+def _validar_limites(v):
+    """Contorno: ao menos 3 vértices [latitude, longitude], sem repetir o primeiro"""
+    if not v:
+        return None
+    if len(v) > 1 and v[0] == v[-1]:
+        v = v[:-1]
+    if len(v) < 3:
+        raise ValueError("O contorno deve ter ao menos 3 vértices")
+    for lat, lon in v:
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            raise ValueError("Vértice fora dos limites de latitude/longitude")
+    return v
 
 
 class TerrenoBase(BaseModel):
@@ -14,6 +28,12 @@ class TerrenoBase(BaseModel):
     LONGITUDE: float = Field(..., ge=-180, le=180)
     STATUS_TERRENO: str = Field("DISPONIVEL", max_length=20)
     OBSERVACOES: Optional[str] = None
+    LIMITES: Optional[List[Tuple[float, float]]] = None
+
+    @field_validator("LIMITES")
+    @classmethod
+    def validate_limites(cls, v):
+        return _validar_limites(v)
 
 
 class TerrenoCreate(TerrenoBase):
@@ -31,6 +51,12 @@ class TerrenoUpdate(BaseModel):
     LONGITUDE: Optional[float] = Field(None, ge=-180, le=180)
     STATUS_TERRENO: Optional[str] = Field(None, max_length=20)
     OBSERVACOES: Optional[str] = None
+    LIMITES: Optional[List[Tuple[float, float]]] = None
+
+    @field_validator("LIMITES")
+    @classmethod
+    def validate_limites(cls, v):
+        return _validar_limites(v)
 
 
 class TerrenoResponse(TerrenoBase):
@@ -44,3 +70,95 @@ class TerrenoResponse(TerrenoBase):
 
     class Config:
         from_attributes = True
+
+
+class TerrenoProximidade(BaseModel):
+    ID: int
+    NOME: str
+    LATITUDE: float
+    LONGITUDE: float
+    STATUS_TERRENO: Optional[str] = None
+    CAPACIDADE_ANIMAIS: Optional[int] = None
+    AREA_HECTARES: float
+    area_poligono_hectares: Optional[float] = None
+    distancia_m: Optional[float] = None
+
+
+class OcupacaoTerreno(BaseModel):
+    terreno_id: int
+    terreno_nome: str
+    status_terreno: Optional[str] = None
+    capacidade_animais: Optional[int] = None
+    animais_atuais: int
+    taxa_ocupacao: Optional[float] = None
+
+
+# === Rotação de pastagem ===
+
+
+class GrupoRotacaoEntrada(BaseModel):
+    nome: str = Field(..., max_length=100)
+    animais: List[int] = Field(..., min_length=1)
+
+
+class PlanoRotacaoRequest(BaseModel):
+    data_inicio: Optional[date] = None  # padrão: hoje
+    semanas: int = Field(12, ge=1, le=52)
+    dias_ocupacao_maxima: int = Field(14, ge=7, le=365)
+    dias_descanso_minimo: int = Field(28, ge=0, le=365)
+    # Capacidade estimada (animais/ha) dos terrenos sem CAPACIDADE_ANIMAIS
+    lotacao_por_hectare: float = Field(1.0, gt=0, le=100)
+    terrenos: Optional[List[int]] = None  # padrão: DISPONIVEL e OCUPADO
+    # Padrão: animais ativos agrupados pelo terreno atual
+    grupos: Optional[List[GrupoRotacaoEntrada]] = None
+
+    @field_validator("grupos")
+    @classmethod
+    def validate_grupos(cls, v):
+        if v:
+            animais = [a for grupo in v for a in grupo.animais]
+            if len(animais) != len(set(animais)):
+                raise ValueError("Um animal não pode estar em mais de um grupo")
+        return v
+
+
+class GrupoRotacao(BaseModel):
+    nome: str
+    animais: List[int]
+    terreno_atual_id: Optional[int] = None
+
+
+class AlocacaoRotacao(BaseModel):
+    grupo: str
+    terreno_id: Optional[int] = None
+    terreno_nome: Optional[str] = None
+    animais: int
+    capacidade: Optional[int] = None
+    taxa_ocupacao: Optional[float] = None
+    permanece: bool
+    alerta: Optional[str] = None
+
+
+class SemanaRotacao(BaseModel):
+    semana: int
+    data_inicio: date
+    data_fim: date
+    alocacoes: List[AlocacaoRotacao]
+
+
+class MovimentacaoRotacao(BaseModel):
+    semana: int
+    data: date
+    grupo: str
+    id_terreno_origem: Optional[int] = None
+    id_terreno_destino: int
+    animais: List[int]
+
+
+class PlanoRotacaoResponse(BaseModel):
+    data_inicio: date
+    semanas: int
+    grupos: List[GrupoRotacao]
+    periodos: List[SemanaRotacao]
+    movimentacoes: List[MovimentacaoRotacao]
+    alertas: List[str]
@@ -0,0 +1,186 @@
+"""
+Armazenamento de uploads endereçado por conteúdo (fotos de animais e laudos).
+
+Cada arquivo é gravado como `uploads/objetos/<hh>/<sha256>.<ext>`, onde
+`hh` são os dois primeiros caracteres do hash. Uploads idênticos resultam
+no mesmo arquivo (o segundo é descartado após o commit do registro) e um
+arquivo nunca é sobrescrito com outro conteúdo, o que permite servi-lo com
+cache imutável (ver app.core.uploads.ArquivosUpload).
+
+Como um mesmo arquivo pode ser referenciado por vários registros, a exclusão
+passa por `remover_se_orfao`, que só apaga arquivos sem referências.
+
+Um upload que reaproveita um arquivo existente só grava a referência no
+commit; até lá outra requisição pode considerar o arquivo órfão. Para isso:
+- o reaproveitamento deixa uma marca, e `remover_se_orfao` poupa arquivos
+  marcados há menos de CARENCIA_REUSO segundos;
+- a cópia enviada é mantida até `confirmar_upload`, chamado após o commit,
+  que regrava o arquivo se ele tiver sido removido mesmo assim.
+"""
+
+import os
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Optional
+
+from app.core.uploads import salvar_upload
+from app.core.variantes import VARIANTES, caminho_variante
+from app.models.animal import Animal
+from app.models.manejo import AnalisesSolo
+from fastapi import HTTPException, UploadFile, status
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+DIRETORIO_UPLOADS = Path("uploads")
+DIRETORIO_OBJETOS = DIRETORIO_UPLOADS / "objetos"
+# Arquivos em gravação; no mesmo sistema de arquivos para o rename atômico
+DIRETORIO_PARCIAIS = DIRETORIO_UPLOADS / "parciais"
+
+# Extensões equivalentes gravadas com o mesmo nome
+_EXTENSOES_EQUIVALENTES = {"jpeg": "jpg"}
+
+# Segundos em que um arquivo reaproveitado não é removido como órfão
+CARENCIA_REUSO = 600
+
+
+@dataclass
+class ArquivoArmazenado:
+    hash: str
+    caminho: Path
+    tamanho: int
+    novo: bool  # False: conteúdo idêntico já existia
+    # Cópia enviada de um conteúdo reaproveitado, até `confirmar_upload`
+    parcial: Optional[Path] = None
+
+    @property
+    def url(self) -> str:
+        return "/" + self.caminho.as_posix()
+
+
+def _extensao(nome_arquivo: str, permitidas: Iterable[str]) -> str:
+    extensao = os.path.splitext(nome_arquivo or "")[1].lstrip(".").lower()
+    if extensao not in permitidas:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Tipo de arquivo não permitido",
+        )
+    return _EXTENSOES_EQUIVALENTES.get(extensao, extensao)
+
+
+def _marca_reuso(caminho: Path) -> Path:
+    return DIRETORIO_PARCIAIS / f"{caminho.name}.reuso"
+
+
+def _mover(origem: Path, destino: Path) -> bool:
+    """
+    Move o arquivo gravado para o destino; False se já existia (a origem é
+    mantida para `confirmar_upload`)
+    """
+    if destino.exists():
+        # Marca antes de conferir de novo: uma remoção concorrente ou vê a
+        # marca ou termina antes da conferência
+        _marca_reuso(destino).touch()
+        if destino.exists():
+            return False
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(origem, destino)
+    return True
+
+
+async def armazenar_upload(
+    arquivo: UploadFile, extensoes: Iterable[str], limite_bytes: int
+) -> ArquivoArmazenado:
+    """Grava o upload no armazenamento por conteúdo (com deduplicação)"""
+    extensao = _extensao(arquivo.filename, extensoes)
+
+    DIRETORIO_PARCIAIS.mkdir(parents=True, exist_ok=True)
+    parcial = DIRETORIO_PARCIAIS / uuid.uuid4().hex
+    tamanho, hash = await salvar_upload(arquivo, parcial, limite_bytes)
+
+    destino = DIRETORIO_OBJETOS / hash[:2] / f"{hash}.{extensao}"
+    try:
+        novo = await run_in_threadpool(_mover, parcial, destino)
+    except BaseException:
+        parcial.unlink(missing_ok=True)
+        raise
+    return ArquivoArmazenado(hash, destino, tamanho, novo, None if novo else parcial)
+
+
+def _restaurar(parcial: Path, destino: Path) -> bool:
+    if destino.exists():
+        parcial.unlink(missing_ok=True)
+        return False
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(parcial, destino)
+    return True
+
+
+async def confirmar_upload(arquivo: ArquivoArmazenado) -> bool:
+    """
+    Chamado após o commit da referência: garante que o arquivo reaproveitado
+    ainda existe, regravando-o a partir da cópia enviada. Retorna True se o
+    arquivo foi regravado (variantes precisam ser refeitas).
+    """
+    if arquivo.parcial is None:
+        return False
+    parcial, arquivo.parcial = arquivo.parcial, None
+    return await run_in_threadpool(_restaurar, parcial, arquivo.caminho)
+
+
+def descartar_upload(arquivo: ArquivoArmazenado):
+    """Apaga a cópia mantida de um upload não confirmado"""
+    if arquivo.parcial is not None:
+        arquivo.parcial.unlink(missing_ok=True)
+        arquivo.parcial = None
+
+
+def e_objeto(caminho: Path) -> bool:
+    """Indica se o caminho pertence ao armazenamento por conteúdo"""
+    try:
+        caminho.resolve().relative_to(DIRETORIO_OBJETOS.resolve())
+        return True
+    except ValueError:
+        return False
+
+
+async def remover_se_orfao(db: AsyncSession, caminho: Path) -> bool:
+    """
+    Remove o arquivo (e variantes) se nenhum animal ou análise o referencia.
+    Deve ser chamado após o commit da alteração/exclusão do registro.
+    Arquivos reaproveitados há menos de CARENCIA_REUSO segundos são poupados
+    (o upload que os reaproveitou pode não ter feito commit). Arquivos
+    antigos, com nome único por registro, são removidos diretamente.
+    """
+    if not caminho.exists():
+        return False
+    if e_objeto(caminho):
+        url = "/" + caminho.as_posix()
+        referencias = await db.scalar(
+            select(func.count())
+            .select_from(Animal)
+            .filter(Animal.FOTO_PRINCIPAL == url)
+        ) + await db.scalar(
+            select(func.count())
+            .select_from(AnalisesSolo)
+            .filter(AnalisesSolo.ARQUIVO_LAUDO == caminho.as_posix())
+        )
+        if referencias:
+            return False
+
+        # Sem await daqui até a remoção
+        marca = _marca_reuso(caminho)
+        try:
+            reusado_ha = time.time() - marca.stat().st_mtime
+        except FileNotFoundError:
+            reusado_ha = None
+        if reusado_ha is not None:
+            if reusado_ha < CARENCIA_REUSO:
+                return False
+            marca.unlink(missing_ok=True)
+
+    for arquivo in [caminho, *(caminho_variante(caminho, v) for v in VARIANTES)]:
+        arquivo.unlink(missing_ok=True)
+    return True
@@ -0,0 +1,76 @@
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Oracle limita a lista do IN a 1000 expressões
+TAMANHO_LOTE_IN = 1000
+
+
+def _lotes(valores: List[Any], tamanho: int = TAMANHO_LOTE_IN):
+    for i in range(0, len(valores), tamanho):
+        yield valores[i : i + tamanho]
+
+
+class BatchResolver:
+    """
+    Resolve registros relacionados de uma página inteira com uma query IN
+    por tabela, evitando um SELECT por linha nos helpers `_enrich_*`.
+
+    Uso:
+        resolver = BatchResolver(db)
+        await resolver.carregar(Animal, [m.ID_ANIMAL for m in movimentacoes])
+        animal = await resolver.obter(Animal, mov.ID_ANIMAL)  # sem nova query
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self._cache: Dict[type, Dict[Any, Any]] = defaultdict(dict)
+
+    async def carregar(self, model, ids: Iterable[Any]) -> Dict[Any, Any]:
+        """Carrega (uma query por lote) os IDs ainda não resolvidos do model"""
+        cache = self._cache[model]
+        pendentes = sorted({i for i in ids if i is not None and i not in cache})
+
+        for lote in _lotes(pendentes):
+            registros = (
+                await self.db.scalars(select(model).filter(model.ID.in_(lote)))
+            ).all()
+            for registro in registros:
+                cache[registro.ID] = registro
+
+        # IDs inexistentes ficam marcados para não serem buscados novamente
+        for i in pendentes:
+            cache.setdefault(i, None)
+
+        return cache
+
+    def registrar(self, *registros) -> None:
+        """Adiciona ao cache registros já carregados pelo chamador"""
+        for registro in registros:
+            self._cache[type(registro)][registro.ID] = registro
+
+    async def obter(self, model, id: Any) -> Optional[Any]:
+        """Retorna o registro do cache, buscando-o apenas se ainda não carregado"""
+        if id is None:
+            return None
+        if id not in self._cache[model]:
+            await self.carregar(model, [id])
+        return self._cache[model][id]
+
+    async def agrupar(
+        self, model, coluna, valores: Iterable[Any], *filtros
+    ) -> Dict[Any, List[Any]]:
+        """Busca registros filhos de vários pais de uma vez, agrupados pela FK"""
+        chaves = sorted({v for v in valores if v is not None})
+        grupos: Dict[Any, List[Any]] = {v: [] for v in chaves}
+
+        for lote in _lotes(chaves):
+            registros = (
+                await self.db.scalars(select(model).filter(coluna.in_(lote), *filtros))
+            ).all()
+            for registro in registros:
+                grupos[getattr(registro, coluna.key)].append(registro)
+
+        return grupos
@@ -0,0 +1,460 @@
+"""
+Índices de busca em memória (por processo) para autocomplete e filtros
+textuais.
+
+Os textos indexados (nome, número de registro, chip) são normalizados para
+minúsculas e sem acentos ("Pêssego" casa com "pess") e quebrados em
+trigramas. Um termo com 3 ou mais caracteres é resolvido pela interseção
+das listas de seus trigramas e confirmado por substring; termos menores
+varrem os textos normalizados em memória. Nenhum dos casos vai ao banco.
+Filtros de listagem (`condicao`) só usam o índice para termos seletivos;
+os demais comparam no banco o texto normalizado da mesma forma.
+
+Os resultados são ordenados por relevância: texto igual ao termo, texto que
+começa com o termo, palavra que começa com o termo e, por fim, termo no
+meio da palavra; empates pelo primeiro campo.
+
+Manutenção do índice:
+- inclusões, alterações e exclusões via ORM da própria tabela são aplicadas
+  no commit a partir do estado já carregado dos objetos;
+- INSERT/UPDATE/DELETE em massa na tabela e commits nas `tabelas` de
+  dependência (ex.: movimentações cujos triggers alteram o estoque) marcam
+  o índice como desatualizado, e ele é recarregado com uma query na
+  próxima busca;
+- o TTL recarrega o índice periodicamente para refletir escritas feitas
+  por outros processos.
+"""
+
+import asyncio
+import heapq
+import logging
+import time
+import unicodedata
+from collections import defaultdict
+from itertools import chain
+from types import SimpleNamespace
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+from app.core.cache import registrar_dependente
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.animal import Animal
+from app.models.manejo import ProdutoManejo
+from app.models.medicamento import Medicamento
+from app.models.racao import ProdutoRacao
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Marca de alteração que não pode ser aplicada incrementalmente
+_RECARREGAR = object()
+
+# Acima disto `condicao` filtra pelo texto no banco em vez da lista de IDs
+MAX_IDS_CONDICAO = 200
+
+# Letras acentuadas (já em minúsculas) -> sem acento, para `_normalizar_sql`
+_ACENTUADAS = "áàâãäåéèêëíìîïóòôõöúùûüçñýÿ"
+_SEM_ACENTO = "aaaaaaeeeeiiiiooooouuuucnyy"
+
+
+def normalizar(texto: Optional[str]) -> str:
+    """Minúsculas, sem acentos e com espaços simples"""
+    if not texto:
+        return ""
+    decomposto = unicodedata.normalize("NFKD", str(texto))
+    sem_acentos = "".join(c for c in decomposto if not unicodedata.combining(c))
+    return " ".join(sem_acentos.casefold().split())
+
+
+def _normalizar_sql(coluna):
+    """Expressão SQL equivalente a `normalizar` aplicada à coluna"""
+    minusculas = func.lower(func.regexp_replace(func.trim(coluna), r"\s+", " "))
+    return func.translate(minusculas, _ACENTUADAS, _SEM_ACENTO)
+
+
+def _contem_sql(coluna, termo: str):
+    """`coluna` contém o termo, sem acentos e sem caixa (termo normalizado)"""
+    escapado = termo.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return _normalizar_sql(coluna).like(f"%{escapado}%", escape="\\")
+
+
+def _trigramas(texto: str) -> Set[str]:
+    return {texto[i : i + 3] for i in range(len(texto) - 2)}
+
+
+def _relevancia(texto: str, termo: str) -> int:
+    if texto == termo:
+        return 0
+    if texto.startswith(termo):
+        return 1
+    if f" {termo}" in texto:
+        return 2
+    return 3
+
+
+class _Estrutura:
+    """Registros e listas invertidas de trigramas de uma carga do índice"""
+
+    def __init__(self, campos: Sequence[str]):
+        self.campos = campos
+        self.registros: Dict[int, SimpleNamespace] = {}
+        self.textos: Dict[str, Dict[int, str]] = {campo: {} for campo in campos}
+        self.trigramas: Dict[str, Dict[str, Set[int]]] = {
+            campo: defaultdict(set) for campo in campos
+        }
+
+    def remover(self, id: int):
+        if self.registros.pop(id, None) is None:
+            return
+        for campo in self.campos:
+            texto = self.textos[campo].pop(id, None)
+            if not texto:
+                continue
+            listas = self.trigramas[campo]
+            for trigrama in _trigramas(texto):
+                ids = listas.get(trigrama)
+                if ids is not None:
+                    ids.discard(id)
+                    if not ids:
+                        del listas[trigrama]
+
+    def gravar(self, registro: SimpleNamespace):
+        self.remover(registro.ID)
+        self.registros[registro.ID] = registro
+        for campo in self.campos:
+            texto = normalizar(getattr(registro, campo))
+            if not texto:
+                continue
+            self.textos[campo][registro.ID] = texto
+            listas = self.trigramas[campo]
+            for trigrama in _trigramas(texto):
+                listas[trigrama].add(registro.ID)
+
+    def candidatos(self, termo: str, campo: str) -> Iterable[int]:
+        """IDs cujo texto do campo contém o termo (já normalizado)"""
+        textos = self.textos[campo]
+        if len(termo) < 3:
+            return (id for id, texto in textos.items() if termo in texto)
+
+        listas = []
+        for trigrama in _trigramas(termo):
+            ids = self.trigramas[campo].get(trigrama)
+            if not ids:
+                return ()
+            listas.append(ids)
+        listas.sort(key=len)
+        ids = listas[0].intersection(*listas[1:])
+        return (id for id in ids if termo in textos[id])
+
+
+class IndiceBusca:
+    """
+    Índice de busca textual de uma tabela. `campos` são as colunas
+    pesquisáveis (a primeira também ordena os empates) e `colunas` os demais
+    dados guardados por registro e devolvidos nas buscas.
+    """
+
+    def __init__(
+        self,
+        nome: str,
+        modelo,
+        campos: Sequence[str],
+        colunas: Sequence[str] = (),
+        tabelas: Iterable[str] = (),
+        ttl: Optional[float] = None,
+    ):
+        self.nome = nome
+        self.modelo = modelo
+        self.tabela = modelo.__tablename__
+        self.campos = tuple(campos)
+        self.colunas = tuple(dict.fromkeys(("ID", *campos, *colunas)))
+        self.tabelas: Set[str] = {t.upper() for t in tabelas}
+        self.ttl = ttl if ttl is not None else settings.BUSCA_INDICE_TTL
+        self._estrutura = _Estrutura(self.campos)
+        self._carregado_em: Optional[float] = None
+        self._versao = 0
+        # Incrementada a cada mudança no conteúdo (carga ou alteração aplicada)
+        self.revisao = 0
+        self._visoes: Dict[Hashable, Tuple[int, Any]] = {}
+        self._lock = asyncio.Lock()
+        # Alterações confirmadas durante uma recarga, reaplicadas ao final
+        self._durante_recarga: Optional[list] = None
+        _indices[self.tabela].append(self)
+        registrar_dependente(self)
+
+    def invalidar(self):
+        """Marca o índice para recarga na próxima busca"""
+        self._versao += 1
+        self._carregado_em = None
+
+    def _atual(self) -> bool:
+        return (
+            self._carregado_em is not None
+            and time.monotonic() - self._carregado_em < self.ttl
+        )
+
+    async def carregar(self, db: AsyncSession):
+        """Recarrega o índice inteiro com uma query"""
+        self._durante_recarga = []
+        versao = self._versao
+        try:
+            inicio = time.monotonic()
+            linhas = await db.execute(
+                select(*(getattr(self.modelo, coluna) for coluna in self.colunas))
+            )
+            estrutura = _Estrutura(self.campos)
+            for linha in linhas:
+                estrutura.gravar(SimpleNamespace(**linha._asdict()))
+            for id, registro in self._durante_recarga:
+                if registro is None:
+                    estrutura.remover(id)
+                else:
+                    estrutura.gravar(registro)
+            self._estrutura = estrutura
+            self.revisao += 1
+            # Invalidado durante a carga: a leitura pode não refletir a escrita
+            if versao == self._versao:
+                self._carregado_em = inicio
+        finally:
+            self._durante_recarga = None
+
+    async def _garantir(self, db: AsyncSession) -> _Estrutura:
+        if not self._atual():
+            async with self._lock:
+                if not self._atual():
+                    await self.carregar(db)
+        return self._estrutura
+
+    def _aplicar(self, id: int, registro):
+        if registro is _RECARREGAR:
+            self.invalidar()
+            return
+        if self._durante_recarga is not None:
+            self._durante_recarga.append((id, registro))
+        self.revisao += 1
+        if registro is None:
+            self._estrutura.remover(id)
+        else:
+            self._estrutura.gravar(registro)
+
+    def _instantaneo(self, obj, novo: bool):
+        """Dados do objeto para o índice, sem disparar carga de atributos"""
+        estado = inspect(obj)
+        carregados = estado.dict
+        # Expiradas (ex.: defaults do servidor) só o banco conhece; ausentes
+        # em objetos novos não foram informadas, logo são nulas
+        for coluna in self.colunas:
+            if coluna in estado.expired_attributes or (
+                not novo and coluna not in carregados
+            ):
+                return _RECARREGAR
+        return SimpleNamespace(
+            **{coluna: carregados.get(coluna) for coluna in self.colunas}
+        )
+
+    async def buscar(
+        self,
+        db: AsyncSession,
+        termo: Optional[str],
+        limite: int = 20,
+        campos: Optional[Sequence[str]] = None,
+        filtro: Optional[Callable[[SimpleNamespace], bool]] = None,
+    ) -> List[SimpleNamespace]:
+        """
+        Registros que contêm o termo em algum dos `campos`, por relevância.
+        Termo vazio retorna todos (ordenados pelo primeiro campo).
+        """
+        estrutura = await self._garantir(db)
+        termo = normalizar(termo)
+        campos = campos or self.campos
+        principal = estrutura.textos[self.campos[0]]
+
+        relevancia: Dict[int, int] = {}
+        if termo:
+            for campo in campos:
+                textos = estrutura.textos[campo]
+                for id in estrutura.candidatos(termo, campo):
+                    nivel = _relevancia(textos[id], termo)
+                    if nivel < relevancia.get(id, 4):
+                        relevancia[id] = nivel
+        else:
+            relevancia = dict.fromkeys(estrutura.registros, 0)
+
+        registros = (
+            (id, estrutura.registros[id])
+            for id in relevancia
+            if filtro is None or filtro(estrutura.registros[id])
+        )
+        melhores = heapq.nsmallest(
+            limite,
+            registros,
+            key=lambda item: (relevancia[item[0]], principal.get(item[0], ""), item[0]),
+        )
+        return [registro for _, registro in melhores]
+
+    async def visao(
+        self,
+        db: AsyncSession,
+        chave: Hashable,
+        montar: Callable[[Iterable[SimpleNamespace]], Any],
+    ) -> Any:
+        """
+        Resultado de `montar(registros)` memoizado por chave até a próxima
+        mudança do índice (ex.: listas completas de opções)
+        """
+        estrutura = await self._garantir(db)
+        memo = self._visoes.get(chave)
+        if memo is None or memo[0] != self.revisao:
+            memo = (self.revisao, montar(estrutura.registros.values()))
+            self._visoes[chave] = memo
+        return memo[1]
+
+    async def ids(self, db: AsyncSession, termo: str, campo: str) -> Set[int]:
+        """IDs de todos os registros cujo `campo` contém o termo"""
+        estrutura = await self._garantir(db)
+        return set(estrutura.candidatos(normalizar(termo), campo))
+
+    async def condicao(self, db: AsyncSession, termo: str, campo: str):
+        """
+        Filtro SQL equivalente a `campo ILIKE '%termo%'` (sem acentos),
+        resolvido pelo índice em uma lista de até MAX_IDS_CONDICAO IDs.
+        Termos curtos ou que casam com mais registros comparam o texto
+        normalizado no próprio banco (mesma semântica, sem milhares de
+        binds).
+        """
+        normalizado = normalizar(termo)
+        coluna = getattr(self.modelo, campo)
+        if len(normalizado) < 3:
+            return _contem_sql(coluna, normalizado)
+        ids = await self.ids(db, termo, campo)
+        if len(ids) > MAX_IDS_CONDICAO:
+            return _contem_sql(coluna, normalizado)
+        return self.modelo.ID.in_(sorted(ids))
+
+
+_indices: Dict[str, List[IndiceBusca]] = defaultdict(list)
+
+
+# === Índices da aplicação ===
+
+indice_animais = IndiceBusca(
+    "animais",
+    Animal,
+    campos=["NOME", "NUMERO_REGISTRO", "CHIP_IDENTIFICACAO"],
+    colunas=["STATUS_ANIMAL", "SEXO"],
+)
+
+# Triggers das movimentações, aplicações e fornecimentos alteram o estoque
+indice_produtos_manejo = IndiceBusca(
+    "produtos_manejo",
+    ProdutoManejo,
+    campos=["NOME"],
+    colunas=[
+        "ATIVO",
+        "TIPO_PRODUTO",
+        "ESTOQUE_ATUAL",
+        "ESTOQUE_MINIMO",
+        "UNIDADE_MEDIDA",
+        "DATA_VALIDADE",
+        "DOSE_RECOMENDADA",
+    ],
+    tabelas=["MOVIMENTACAO_PRODUTOS_MANEJO", "MANEJO_TERRENOS"],
+)
+
+indice_produtos_racao = IndiceBusca(
+    "produtos_racao",
+    ProdutoRacao,
+    campos=["NOME"],
+    colunas=[
+        "ATIVO",
+        "TIPO_ALIMENTO",
+        "ESTOQUE_ATUAL",
+        "ESTOQUE_MINIMO",
+        "UNIDADE_MEDIDA",
+        "DATA_VALIDADE",
+    ],
+    tabelas=["MOVIMENTACAO_PRODUTOS_RACAO", "FORNECIMENTO_RACAO_ANIMAL"],
+)
+
+indice_medicamentos = IndiceBusca(
+    "medicamentos",
+    Medicamento,
+    campos=["NOME"],
+    colunas=[
+        "ATIVO",
+        "ESTOQUE_ATUAL",
+        "UNIDADE_MEDIDA",
+        "FORMA_FARMACEUTICA",
+        "PERIODO_CARENCIA",
+    ],
+    tabelas=["MOVIMENTACAO_MEDICAMENTOS", "SAUDE_ANIMAIS"],
+)
+
+
+async def carregar_indices_busca():
+    """Carga inicial de todos os índices (startup da aplicação)"""
+    async with AsyncSessionLocal() as sessao:
+        for indice in chain.from_iterable(_indices.values()):
+            try:
+                await indice.carregar(sessao)
+            except Exception:
+                # Sem a carga inicial o índice é carregado na primeira busca
+                logger.exception("Erro ao carregar índice de busca %s", indice.nome)
+
+
+# === Eventos de sessão: alterações aplicadas aos índices no commit ===
+
+
+def _pendentes(session: Session) -> list:
+    return session.info.setdefault("busca_pendentes", [])
+
+
+@event.listens_for(Session, "after_flush")
+def _registrar_flush(session, flush_context):
+    for obj in chain(session.new, session.dirty, session.deleted):
+        indices = _indices.get(getattr(obj, "__tablename__", None))
+        if not indices:
+            continue
+        excluido = obj in session.deleted
+        novo = obj in session.new
+        id = inspect(obj).dict.get("ID")
+        for indice in indices:
+            registro = None if excluido else indice._instantaneo(obj, novo)
+            _pendentes(session).append((indice, id, registro))
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _registrar_dml(orm_execute_state):
+    # DML em massa não passa pelo flush nem informa as linhas: recarga
+    if (
+        orm_execute_state.is_update
+        or orm_execute_state.is_delete
+        or orm_execute_state.is_insert
+    ):
+        tabela = getattr(orm_execute_state.statement, "table", None)
+        for indice in _indices.get(getattr(tabela, "name", None), ()):
+            _pendentes(orm_execute_state.session).append((indice, None, _RECARREGAR))
+
+
+@event.listens_for(Session, "after_commit")
+def _aplicar_no_commit(session):
+    for indice, id, registro in session.info.pop("busca_pendentes", ()):
+        indice._aplicar(id, registro)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_no_rollback(session):
+    session.info.pop("busca_pendentes", None)
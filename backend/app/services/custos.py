@@ -0,0 +1,453 @@
+"""
+Manutenção do consolidado CUSTOS_PROPRIETARIO_DIARIO e da série mensal
+CUSTOS_CATEGORIA_MENSAL (soma do diário por mês e categoria).
+
+Cada fornecimento de ração, registro de saúde com custo/medicamento e aplicação
+de manejo em terreno gera lançamentos (proprietário, animal, categoria, dia)
+gravados em CUSTOS_LANCAMENTOS com o ID do registro de origem e aplicados via
+MERGE na mesma transação da escrita (evento after_flush). Alterações e
+exclusões estornam exatamente os lançamentos gravados para o registro (e não
+um recálculo com preço, proprietário ou alocação atuais) antes de lançar os
+novos valores.
+
+Custos de manejo são rateados entre os animais que estavam no terreno na data
+da aplicação; sem animais alocados o valor fica sem proprietário.
+
+Reconstrução completa (ou a partir de uma data) para cargas retroativas:
+
+    python -m app.services.custos --desde 2024-01-01
+"""
+
+import argparse
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+from app.models.manejo import ManejoTerrenos
+from app.models.racao import FornecimentoRacaoAnimal
+from app.models.saude import SaudeAnimais
+from sqlalchemy import event, inspect, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+_MERGE = """
+MERGE INTO CUSTOS_PROPRIETARIO_DIARIO c
+USING ({origem}) o
+ON (
+    c.CATEGORIA = o.CATEGORIA
+    AND c.DATA_REFERENCIA = o.DATA_REFERENCIA
+    AND DECODE(c.PROPRIETARIO, o.PROPRIETARIO, 1, 0) = 1
+    AND DECODE(c.ID_ANIMAL, o.ID_ANIMAL, 1, 0) = 1
+)
+WHEN MATCHED THEN UPDATE SET
+    c.VALOR = c.VALOR + o.VALOR,
+    c.QUANTIDADE_REGISTROS = c.QUANTIDADE_REGISTROS + o.REGISTROS,
+    c.DATA_ATUALIZACAO = SYSDATE
+WHEN NOT MATCHED THEN INSERT (
+    PROPRIETARIO, ID_ANIMAL, CATEGORIA, DATA_REFERENCIA, VALOR, QUANTIDADE_REGISTROS
+) VALUES (
+    o.PROPRIETARIO, o.ID_ANIMAL, o.CATEGORIA, o.DATA_REFERENCIA, o.VALOR, o.REGISTROS
+)
+"""
+
+_MERGE_MENSAL = """
+MERGE INTO CUSTOS_CATEGORIA_MENSAL c
+USING (
+    SELECT TRUNC(o.DATA_REFERENCIA, 'MM') AS MES, o.CATEGORIA,
+           SUM(o.VALOR) AS VALOR, SUM(o.REGISTROS) AS REGISTROS
+    FROM ({origem}) o
+    GROUP BY TRUNC(o.DATA_REFERENCIA, 'MM'), o.CATEGORIA
+) o
+ON (c.MES = o.MES AND c.CATEGORIA = o.CATEGORIA)
+WHEN MATCHED THEN UPDATE SET
+    c.VALOR = c.VALOR + o.VALOR,
+    c.QUANTIDADE_REGISTROS = c.QUANTIDADE_REGISTROS + o.REGISTROS,
+    c.DATA_ATUALIZACAO = SYSDATE
+WHEN NOT MATCHED THEN INSERT (MES, CATEGORIA, VALOR, QUANTIDADE_REGISTROS)
+VALUES (o.MES, o.CATEGORIA, o.VALOR, o.REGISTROS)
+"""
+
+# Animais cuja última movimentação até {data} teve {terreno} como destino
+_ANIMAIS_NO_TERRENO = """
+SELECT u.ID_ANIMAL
+FROM (
+    SELECT m.ID_ANIMAL, m.ID_TERRENO_DESTINO,
+           ROW_NUMBER() OVER (
+               PARTITION BY m.ID_ANIMAL
+               ORDER BY m.DATA_MOVIMENTACAO DESC, m.ID DESC
+           ) AS ORDEM
+    FROM MOVIMENTACOES_ANIMAIS m
+    WHERE m.DATA_MOVIMENTACAO <= {data}
+    AND m.ID_ANIMAL IN (
+        SELECT y.ID_ANIMAL FROM MOVIMENTACOES_ANIMAIS y
+        WHERE y.ID_TERRENO_DESTINO = {terreno}
+    )
+) u
+WHERE u.ORDEM = 1 AND u.ID_TERRENO_DESTINO = {terreno}
+"""
+
+_ORIGEM_RACAO = """
+SELECT a.PROPRIETARIO, a.ID AS ID_ANIMAL, 'RACAO' AS CATEGORIA,
+       TRUNC(:data) AS DATA_REFERENCIA,
+       :quantidade * NVL(p.PRECO_UNITARIO, 0) AS VALOR
+FROM ANIMAIS a CROSS JOIN PRODUTOS_RACAO p
+WHERE a.ID = :id_animal AND p.ID = :id_produto
+"""
+
+_ORIGEM_MEDICAMENTOS = """
+SELECT a.PROPRIETARIO, a.ID AS ID_ANIMAL, 'MEDICAMENTOS' AS CATEGORIA,
+       TRUNC(:data) AS DATA_REFERENCIA,
+       COALESCE(
+           CAST(:custo AS NUMBER),
+           CAST(:quantidade AS NUMBER) * (
+               SELECT m.PRECO_UNITARIO FROM MEDICAMENTOS m
+               WHERE m.ID = :id_medicamento
+           ),
+           0
+       ) AS VALOR
+FROM ANIMAIS a
+WHERE a.ID = :id_animal
+"""
+
+_ORIGEM_MANEJO = (
+    """
+WITH alocados AS (
+    SELECT a.PROPRIETARIO, a.ID AS ID_ANIMAL
+    FROM ANIMAIS a
+    WHERE a.ID IN ("""
+    + _ANIMAIS_NO_TERRENO.format(terreno=":id_terreno", data=":data")
+    + """)
+), custo AS (
+    SELECT COALESCE(
+        CAST(:custo AS NUMBER),
+        CAST(:quantidade AS NUMBER) * (
+            SELECT pm.PRECO_UNITARIO FROM PRODUTOS_MANEJO pm
+            WHERE pm.ID = :id_produto
+        ),
+        0
+    ) AS TOTAL
+    FROM DUAL
+)
+SELECT al.PROPRIETARIO, al.ID_ANIMAL, 'MANEJO' AS CATEGORIA,
+       TRUNC(:data) AS DATA_REFERENCIA,
+       cu.TOTAL / (SELECT COUNT(*) FROM alocados) AS VALOR
+FROM alocados al CROSS JOIN custo cu
+UNION ALL
+SELECT NULL, NULL, 'MANEJO', TRUNC(:data), cu.TOTAL
+FROM custo cu
+WHERE NOT EXISTS (SELECT 1 FROM alocados)
+"""
+)
+
+
+# Lançamentos calculados para um registro de origem, gravados com seu ID
+_LANCAR = """
+INSERT INTO CUSTOS_LANCAMENTOS (
+    CATEGORIA, ID_ORIGEM, PROPRIETARIO, ID_ANIMAL, DATA_REFERENCIA, VALOR
+)
+SELECT o.CATEGORIA, :id_origem, o.PROPRIETARIO, o.ID_ANIMAL, o.DATA_REFERENCIA,
+       ROUND(o.VALOR, 2)
+FROM ({origem}) o
+"""
+
+# Lançamentos gravados de um registro, com sinal (+1 aplica, -1 estorna)
+_LANCADOS = """
+SELECT PROPRIETARIO, ID_ANIMAL, CATEGORIA, DATA_REFERENCIA,
+       :sinal * VALOR AS VALOR, :sinal AS REGISTROS
+FROM CUSTOS_LANCAMENTOS
+WHERE CATEGORIA = :categoria AND ID_ORIGEM = :id_origem
+"""
+
+_APAGAR_LANCADOS = """
+DELETE FROM CUSTOS_LANCAMENTOS
+WHERE CATEGORIA = :categoria AND ID_ORIGEM = :id_origem
+"""
+
+
+def _params_racao(v: Dict) -> Optional[Dict]:
+    return {
+        "id_animal": v["ID_ANIMAL"],
+        "id_produto": v["ID_PRODUTO"],
+        "data": v["DATA_FORNECIMENTO"],
+        "quantidade": v["QUANTIDADE_FORNECIDA"] or 0,
+    }
+
+
+def _params_medicamentos(v: Dict) -> Optional[Dict]:
+    # Registros de saúde sem custo nem medicamento do estoque não geram custo
+    tem_medicamento = v["ID_MEDICAMENTO"] and v["QUANTIDADE_APLICADA"]
+    if v["CUSTO"] is None and not tem_medicamento:
+        return None
+    return {
+        "id_animal": v["ID_ANIMAL"],
+        "data": v["DATA_OCORRENCIA"],
+        "custo": v["CUSTO"],
+        "quantidade": v["QUANTIDADE_APLICADA"],
+        "id_medicamento": v["ID_MEDICAMENTO"],
+    }
+
+
+def _params_manejo(v: Dict) -> Optional[Dict]:
+    custo = v["CUSTO_TOTAL"]
+    if custo is None and (
+        v["CUSTO_PRODUTO"] is not None or v["CUSTO_APLICACAO"] is not None
+    ):
+        custo = (v["CUSTO_PRODUTO"] or 0) + (v["CUSTO_APLICACAO"] or 0)
+    return {
+        "id_terreno": v["ID_TERRENO"],
+        "id_produto": v["ID_PRODUTO"],
+        "data": v["DATA_APLICACAO"],
+        "custo": custo,
+        "quantidade": v["QUANTIDADE"],
+    }
+
+
+# model -> (categoria, origem dos lançamentos, colunas relevantes, parâmetros)
+_FONTES = {
+    FornecimentoRacaoAnimal: (
+        "RACAO",
+        _ORIGEM_RACAO,
+        ("ID_ANIMAL", "ID_PRODUTO", "DATA_FORNECIMENTO", "QUANTIDADE_FORNECIDA"),
+        _params_racao,
+    ),
+    SaudeAnimais: (
+        "MEDICAMENTOS",
+        _ORIGEM_MEDICAMENTOS,
+        (
+            "ID_ANIMAL",
+            "DATA_OCORRENCIA",
+            "CUSTO",
+            "ID_MEDICAMENTO",
+            "QUANTIDADE_APLICADA",
+        ),
+        _params_medicamentos,
+    ),
+    ManejoTerrenos: (
+        "MANEJO",
+        _ORIGEM_MANEJO,
+        (
+            "ID_TERRENO",
+            "ID_PRODUTO",
+            "DATA_APLICACAO",
+            "QUANTIDADE",
+            "CUSTO_TOTAL",
+            "CUSTO_PRODUTO",
+            "CUSTO_APLICACAO",
+        ),
+        _params_manejo,
+    ),
+}
+
+
+def _lancamentos(session: Session) -> List[Tuple[str, Dict]]:
+    lancamentos = []
+
+    def _aplicar(categoria: str, id_origem: int, sinal: int):
+        params = {"categoria": categoria, "id_origem": id_origem, "sinal": sinal}
+        lancamentos.append((_MERGE.format(origem=_LANCADOS), params))
+        lancamentos.append((_MERGE_MENSAL.format(origem=_LANCADOS), params))
+
+    def _lancar(obj):
+        categoria, origem, colunas, montar = _FONTES[type(obj)]
+        params = montar({coluna: getattr(obj, coluna) for coluna in colunas})
+        if params is not None:
+            params["id_origem"] = obj.ID
+            lancamentos.append((_LANCAR.format(origem=origem), params))
+            _aplicar(categoria, obj.ID, 1)
+
+    def _estornar(obj):
+        categoria = _FONTES[type(obj)][0]
+        _aplicar(categoria, obj.ID, -1)
+        lancamentos.append(
+            (_APAGAR_LANCADOS, {"categoria": categoria, "id_origem": obj.ID})
+        )
+
+    for obj in session.new:
+        if type(obj) in _FONTES:
+            _lancar(obj)
+
+    for obj in session.deleted:
+        if type(obj) in _FONTES:
+            _estornar(obj)
+
+    for obj in session.dirty:
+        if type(obj) not in _FONTES:
+            continue
+        colunas = _FONTES[type(obj)][2]
+        estado = inspect(obj)
+        if any(estado.attrs[c].history.has_changes() for c in colunas):
+            _estornar(obj)
+            _lancar(obj)
+
+    return lancamentos
+
+
+def _executar(conexao, sql: str, params: Dict):
+    try:
+        conexao.execute(text(sql), params)
+    except IntegrityError:
+        # Primeira escrita concorrente da mesma chave: a outra transação
+        # inseriu a linha antes (ORA-00001 na chave única). O Oracle desfaz
+        # só a instrução; repetida, ela encontra a linha e cai no UPDATE.
+        conexao.execute(text(sql), params)
+
+
+def _atualizar_custos(session: Session, flush_context):
+    lancamentos = _lancamentos(session)
+    if not lancamentos:
+        return
+    conexao = session.connection()
+    for sql, params in lancamentos:
+        _executar(conexao, sql, params)
+
+
+def registrar_manutencao_custos():
+    """Liga a manutenção incremental do consolidado às sessões do ORM"""
+    if not event.contains(Session, "after_flush", _atualizar_custos):
+        event.listen(Session, "after_flush", _atualizar_custos)
+
+
+# === RECONSTRUÇÃO ===
+
+_RECONSTRUIR = """
+INSERT INTO CUSTOS_LANCAMENTOS (
+    CATEGORIA, ID_ORIGEM, PROPRIETARIO, ID_ANIMAL, DATA_REFERENCIA, VALOR
+)
+WITH manejo AS (
+    SELECT mt.ID, mt.ID_TERRENO, mt.DATA_APLICACAO,
+           COALESCE(
+               mt.CUSTO_TOTAL,
+               CASE
+                   WHEN mt.CUSTO_PRODUTO IS NOT NULL OR mt.CUSTO_APLICACAO IS NOT NULL
+                   THEN NVL(mt.CUSTO_PRODUTO, 0) + NVL(mt.CUSTO_APLICACAO, 0)
+               END,
+               mt.QUANTIDADE * pm.PRECO_UNITARIO,
+               0
+           ) AS TOTAL
+    FROM MANEJO_TERRENOS mt
+    LEFT JOIN PRODUTOS_MANEJO pm ON pm.ID = mt.ID_PRODUTO
+    WHERE mt.DATA_APLICACAO >= :desde
+), alocacao AS (
+    SELECT u.ID_MANEJO, u.ID_ANIMAL
+    FROM (
+        SELECT mn.ID AS ID_MANEJO, mn.ID_TERRENO, m.ID_ANIMAL, m.ID_TERRENO_DESTINO,
+               ROW_NUMBER() OVER (
+                   PARTITION BY mn.ID, m.ID_ANIMAL
+                   ORDER BY m.DATA_MOVIMENTACAO DESC, m.ID DESC
+               ) AS ORDEM
+        FROM manejo mn
+        JOIN (
+            SELECT DISTINCT ID_ANIMAL, ID_TERRENO_DESTINO FROM MOVIMENTACOES_ANIMAIS
+        ) c ON c.ID_TERRENO_DESTINO = mn.ID_TERRENO
+        JOIN MOVIMENTACOES_ANIMAIS m
+          ON m.ID_ANIMAL = c.ID_ANIMAL AND m.DATA_MOVIMENTACAO <= mn.DATA_APLICACAO
+    ) u
+    WHERE u.ORDEM = 1 AND u.ID_TERRENO_DESTINO = u.ID_TERRENO
+), lancamentos AS (
+    SELECT f.ID AS ID_ORIGEM, a.PROPRIETARIO, f.ID_ANIMAL, 'RACAO' AS CATEGORIA,
+           TRUNC(f.DATA_FORNECIMENTO) AS DATA_REFERENCIA,
+           f.QUANTIDADE_FORNECIDA * NVL(p.PRECO_UNITARIO, 0) AS VALOR
+    FROM FORNECIMENTO_RACAO_ANIMAL f
+    JOIN ANIMAIS a ON a.ID = f.ID_ANIMAL
+    JOIN PRODUTOS_RACAO p ON p.ID = f.ID_PRODUTO
+    WHERE f.DATA_FORNECIMENTO >= :desde
+
+    UNION ALL
+
+    SELECT s.ID, a.PROPRIETARIO, s.ID_ANIMAL, 'MEDICAMENTOS',
+           TRUNC(s.DATA_OCORRENCIA),
+           COALESCE(s.CUSTO, s.QUANTIDADE_APLICADA * m.PRECO_UNITARIO, 0)
+    FROM SAUDE_ANIMAIS s
+    JOIN ANIMAIS a ON a.ID = s.ID_ANIMAL
+    LEFT JOIN MEDICAMENTOS m ON m.ID = s.ID_MEDICAMENTO
+    WHERE s.DATA_OCORRENCIA >= :desde
+    AND (
+        s.CUSTO IS NOT NULL
+        OR (s.ID_MEDICAMENTO IS NOT NULL AND s.QUANTIDADE_APLICADA IS NOT NULL)
+    )
+
+    UNION ALL
+
+    SELECT mn.ID, a.PROPRIETARIO, al.ID_ANIMAL, 'MANEJO',
+           TRUNC(mn.DATA_APLICACAO),
+           mn.TOTAL / COUNT(*) OVER (PARTITION BY mn.ID)
+    FROM manejo mn
+    JOIN alocacao al ON al.ID_MANEJO = mn.ID
+    JOIN ANIMAIS a ON a.ID = al.ID_ANIMAL
+
+    UNION ALL
+
+    SELECT mn.ID, NULL, NULL, 'MANEJO', TRUNC(mn.DATA_APLICACAO), mn.TOTAL
+    FROM manejo mn
+    WHERE NOT EXISTS (SELECT 1 FROM alocacao al WHERE al.ID_MANEJO = mn.ID)
+)
+SELECT CATEGORIA, ID_ORIGEM, PROPRIETARIO, ID_ANIMAL, DATA_REFERENCIA,
+       ROUND(VALOR, 2)
+FROM lancamentos
+"""
+
+_RECONSTRUIR_DIARIO = """
+INSERT INTO CUSTOS_PROPRIETARIO_DIARIO (
+    PROPRIETARIO, ID_ANIMAL, CATEGORIA, DATA_REFERENCIA, VALOR, QUANTIDADE_REGISTROS
+)
+SELECT PROPRIETARIO, ID_ANIMAL, CATEGORIA, DATA_REFERENCIA, SUM(VALOR), COUNT(*)
+FROM CUSTOS_LANCAMENTOS
+WHERE DATA_REFERENCIA >= :desde
+GROUP BY PROPRIETARIO, ID_ANIMAL, CATEGORIA, DATA_REFERENCIA
+"""
+
+_RECONSTRUIR_MENSAL = """
+INSERT INTO CUSTOS_CATEGORIA_MENSAL (MES, CATEGORIA, VALOR, QUANTIDADE_REGISTROS)
+SELECT TRUNC(DATA_REFERENCIA, 'MM'), CATEGORIA,
+       SUM(VALOR), SUM(QUANTIDADE_REGISTROS)
+FROM CUSTOS_PROPRIETARIO_DIARIO
+WHERE DATA_REFERENCIA >= TRUNC(:desde, 'MM')
+GROUP BY TRUNC(DATA_REFERENCIA, 'MM'), CATEGORIA
+"""
+
+
+def reconstruir_custos(db: Session, desde: Optional[date] = None) -> int:
+    """
+    Recalcula os lançamentos e o consolidado a partir das tabelas de origem
+    (todo o histórico ou a partir de `desde`), junto com a série mensal.
+    Retorna a quantidade de linhas diárias geradas.
+    """
+    inicio = datetime.combine(desde or date(1900, 1, 1), datetime.min.time())
+
+    db.execute(
+        text("DELETE FROM CUSTOS_LANCAMENTOS WHERE DATA_REFERENCIA >= :desde"),
+        {"desde": inicio},
+    )
+    db.execute(text(_RECONSTRUIR), {"desde": inicio})
+    db.execute(
+        text("DELETE FROM CUSTOS_PROPRIETARIO_DIARIO WHERE DATA_REFERENCIA >= :desde"),
+        {"desde": inicio},
+    )
+    resultado = db.execute(text(_RECONSTRUIR_DIARIO), {"desde": inicio})
+
+    # Meses a partir de `desde` são refeitos inteiros a partir do diário
+    db.execute(
+        text("DELETE FROM CUSTOS_CATEGORIA_MENSAL WHERE MES >= TRUNC(:desde, 'MM')"),
+        {"desde": inicio},
+    )
+    db.execute(text(_RECONSTRUIR_MENSAL), {"desde": inicio})
+    db.commit()
+
+    return resultado.rowcount
+
+
+if __name__ == "__main__":
+    from app.core.database import SessionLocal
+
+    parser = argparse.ArgumentParser(
+        description="Reconstrói o consolidado de custos por proprietário"
+    )
+    parser.add_argument(
+        "--desde",
+        type=date.fromisoformat,
+        help="Reconstruir apenas a partir desta data (YYYY-MM-DD)",
+    )
+    args = parser.parse_args()
+
+    with SessionLocal() as sessao:
+        linhas = reconstruir_custos(sessao, args.desde)
+    print(f"Consolidado de custos reconstruído: {linhas} linhas")
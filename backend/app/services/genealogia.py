@@ -0,0 +1,177 @@
+"""
+Consultas de genealogia (ancestrais e descendentes) com uma única query
+hierárquica cada.
+
+A árvore de um animal é buscada com um CTE recursivo limitado a `geracoes`
+níveis, o que também impede recursão infinita em cadastros com ciclo
+(ex.: animal informado como pai de si mesmo). Na montagem da árvore um
+ancestral que já aparece no próprio ramo não é expandido novamente.
+"""
+
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.core.cache import CacheTTL
+from app.core.config import settings
+from app.models.animal import Animal
+from app.schemas.animal import AnimalResponse
+from sqlalchemy import case, func, literal_column, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+MAX_GERACOES = 10
+
+# Árvores por (animal, gerações); invalidadas quando muda a filiação de
+# algum animal. Demais dados exibidos se atualizam pelo TTL.
+genealogia_cache = CacheTTL(
+    "genealogia",
+    ttl=settings.GENEALOGIA_CACHE_TTL,
+    tabelas=["ANIMAIS.ID_PAI", "ANIMAIS.ID_MAE"],
+)
+
+
+def _ancestrais_cte(animal_id: int, geracoes: int):
+    """CTE recursivo com o animal (NIVEL 0) e seus ancestrais até `geracoes`"""
+    ancestrais = (
+        select(
+            Animal.ID, Animal.ID_PAI, Animal.ID_MAE, literal_column("0").label("NIVEL")
+        )
+        .filter(Animal.ID == animal_id)
+        .cte("ancestrais", recursive=True)
+    )
+
+    pais = aliased(Animal)
+    return ancestrais.union_all(
+        select(pais.ID, pais.ID_PAI, pais.ID_MAE, ancestrais.c.NIVEL + 1)
+        .join(
+            ancestrais,
+            or_(pais.ID == ancestrais.c.ID_PAI, pais.ID == ancestrais.c.ID_MAE),
+        )
+        .filter(ancestrais.c.NIVEL < geracoes)
+    )
+
+
+async def carregar_ancestrais(
+    db: AsyncSession, animal_id: int, geracoes: int
+) -> Dict[int, Animal]:
+    """Animal e ancestrais até `geracoes`, por ID, em uma única query"""
+    ancestrais = _ancestrais_cte(animal_id, geracoes)
+    animais = await db.scalars(
+        select(Animal).filter(Animal.ID.in_(select(ancestrais.c.ID)))
+    )
+    return {animal.ID: animal for animal in animais}
+
+
+def montar_arvore(
+    animais: Dict[int, Animal],
+    animal_id: Optional[int],
+    geracoes: int,
+    _ramo: Optional[Set[int]] = None,
+) -> Optional[dict]:
+    """Monta a árvore no formato de AnimalGenealogia a partir do dicionário"""
+    ramo = _ramo or set()
+    animal = animais.get(animal_id) if animal_id else None
+    if animal is None or animal.ID in ramo:
+        return None
+
+    arvore = {"animal": AnimalResponse.model_validate(animal), "pai": None, "mae": None}
+    if geracoes > 0:
+        ramo = ramo | {animal.ID}
+        arvore["pai"] = montar_arvore(animais, animal.ID_PAI, geracoes - 1, ramo)
+        arvore["mae"] = montar_arvore(animais, animal.ID_MAE, geracoes - 1, ramo)
+    return arvore
+
+
+async def obter_genealogia(
+    db: AsyncSession, animal_id: int, geracoes: int
+) -> Optional[dict]:
+    """Árvore genealógica do animal (em cache), ou None se não existir"""
+
+    async def _calcular(sessao: AsyncSession):
+        animais = await carregar_ancestrais(sessao, animal_id, geracoes)
+        return montar_arvore(animais, animal_id, geracoes)
+
+    return await genealogia_cache.obter((animal_id, geracoes), _calcular, db)
+
+
+# === DESCENDENTES ===
+
+
+def _descendentes_cte(animal_id: int, geracoes: int):
+    """
+    Descendentes até `geracoes` com a menor geração em que cada um aparece
+    (um animal pode ser alcançado por mais de um caminho)
+    """
+    caminhos = (
+        select(Animal.ID, literal_column("0").label("GERACAO"))
+        .filter(Animal.ID == animal_id)
+        .cte("caminhos_descendentes", recursive=True)
+    )
+
+    filhos = aliased(Animal)
+    caminhos = caminhos.union_all(
+        select(filhos.ID, caminhos.c.GERACAO + 1)
+        .join(
+            caminhos,
+            or_(filhos.ID_PAI == caminhos.c.ID, filhos.ID_MAE == caminhos.c.ID),
+        )
+        .filter(caminhos.c.GERACAO < geracoes)
+    )
+
+    return (
+        select(caminhos.c.ID, func.min(caminhos.c.GERACAO).label("GERACAO"))
+        .filter(caminhos.c.GERACAO > 0, caminhos.c.ID != animal_id)
+        .group_by(caminhos.c.ID)
+        .cte("descendentes")
+    )
+
+
+async def buscar_descendentes(
+    db: AsyncSession,
+    animal_id: int,
+    geracoes: int,
+    filtros: list,
+    offset: int,
+    limit: int,
+) -> Tuple[List[Tuple[Animal, int]], List[dict]]:
+    """
+    Página de descendentes (animal, geração) e contagens por geração, já com
+    os `filtros` de Animal aplicados
+    """
+    descendentes = _descendentes_cte(animal_id, geracoes)
+
+    contagens = await db.execute(
+        select(
+            descendentes.c.GERACAO,
+            func.count().label("total"),
+            func.count(case((Animal.SEXO == "M", Animal.ID))).label("machos"),
+            func.count(case((Animal.SEXO == "F", Animal.ID))).label("femeas"),
+            func.count(case((Animal.STATUS_ANIMAL == "ATIVO", Animal.ID))).label(
+                "ativos"
+            ),
+        )
+        .join(Animal, Animal.ID == descendentes.c.ID)
+        .filter(*filtros)
+        .group_by(descendentes.c.GERACAO)
+        .order_by(descendentes.c.GERACAO)
+    )
+    por_geracao = [
+        {
+            "geracao": row.GERACAO,
+            "total": row.total,
+            "machos": row.machos,
+            "femeas": row.femeas,
+            "ativos": row.ativos,
+        }
+        for row in contagens
+    ]
+
+    pagina = await db.execute(
+        select(Animal, descendentes.c.GERACAO)
+        .join(descendentes, Animal.ID == descendentes.c.ID)
+        .filter(*filtros)
+        .order_by(descendentes.c.GERACAO, Animal.NOME, Animal.ID)
+        .offset(offset)
+        .limit(limit)
+    )
+
+    return [(animal, geracao) for animal, geracao in pagina], por_geracao
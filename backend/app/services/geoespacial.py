@@ -0,0 +1,385 @@
+"""
+Índice espacial em memória (por processo) dos terrenos.
+
+Os terrenos são distribuídos em uma grade regular de células de
+`TAMANHO_CELULA` graus: o ponto (LATITUDE/LONGITUDE) ocupa uma célula e,
+quando há contorno (LIMITES), o terreno é registrado em todas as células
+cobertas pelo retângulo envolvente do polígono. As consultas só examinam
+as células que podem conter resultados:
+
+- raio: células do retângulo que envolve o círculo;
+- mais próximos: anéis de células ao redor do ponto, até que nenhum anel
+  ainda não visitado possa conter terreno mais próximo que o k-ésimo;
+- retângulo e contenção: células do retângulo / do ponto.
+
+Distâncias usam a fórmula de haversine até o ponto do terreno, ou até a
+borda do contorno quando ele existe (zero para pontos dentro dele). Área e
+distância à borda são calculadas em uma projeção equiretangular local, com
+erro desprezível na escala de uma fazenda.
+
+O índice é recarregado (uma query) na primeira consulta após um commit que
+altere TERRENOS (ver app.core.cache.registrar_dependente) ou após o TTL.
+"""
+
+import asyncio
+import heapq
+import math
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from app.core.cache import registrar_dependente
+from app.core.config import settings
+from app.models.terreno import Terreno
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+RAIO_TERRA_M = 6371008.8
+METROS_POR_GRAU = math.pi * RAIO_TERRA_M / 180
+# ~550 m de lado na latitude; terrenos maiores ocupam várias células
+TAMANHO_CELULA = 0.005
+
+Celula = Tuple[int, int]
+Vertice = Tuple[float, float]
+
+
+def distancia_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Distância em metros entre dois pontos (haversine)"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = (
+        math.sin(dphi / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    )
+    return 2 * RAIO_TERRA_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _projetar(lat: float, lon: float, lat_ref: float) -> Tuple[float, float]:
+    """(x, y) em metros na projeção equiretangular centrada em `lat_ref`"""
+    return (
+        lon * METROS_POR_GRAU * math.cos(math.radians(lat_ref)),
+        lat * METROS_POR_GRAU,
+    )
+
+
+def area_hectares(vertices: Sequence[Vertice]) -> float:
+    """Área do polígono (fórmula do laço) em hectares"""
+    lat_ref = sum(lat for lat, _ in vertices) / len(vertices)
+    pontos = [_projetar(lat, lon, lat_ref) for lat, lon in vertices]
+    dobro = sum(
+        x1 * y2 - x2 * y1 for (x1, y1), (x2, y2) in zip(pontos, pontos[1:] + pontos[:1])
+    )
+    return abs(dobro) / 2 / 10000
+
+
+def contem(vertices: Sequence[Vertice], lat: float, lon: float) -> bool:
+    """Ponto dentro do polígono (ray casting)"""
+    dentro = False
+    for (lat1, lon1), (lat2, lon2) in zip(vertices, vertices[-1:] + vertices[:-1]):
+        if (lat1 > lat) != (lat2 > lat):
+            lon_cruzamento = lon1 + (lat - lat1) * (lon2 - lon1) / (lat2 - lat1)
+            if lon < lon_cruzamento:
+                dentro = not dentro
+    return dentro
+
+
+def _distancia_segmento(p, a, b) -> float:
+    (px, py), (ax, ay), (bx, by) = p, a, b
+    dx, dy = bx - ax, by - ay
+    comprimento = dx * dx + dy * dy
+    t = 0.0
+    if comprimento:
+        t = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / comprimento))
+    return math.hypot(px - (ax + t * dx), py - (ay + t * dy))
+
+
+def distancia_poligono_m(vertices: Sequence[Vertice], lat: float, lon: float) -> float:
+    """Distância em metros do ponto até a borda do polígono (0 se dentro)"""
+    if contem(vertices, lat, lon):
+        return 0.0
+    p = _projetar(lat, lon, lat)
+    pontos = [_projetar(v_lat, v_lon, lat) for v_lat, v_lon in vertices]
+    return min(
+        _distancia_segmento(p, a, b) for a, b in zip(pontos, pontos[1:] + pontos[:1])
+    )
+
+
+@dataclass
+class TerrenoGeo:
+    ID: int
+    NOME: str
+    LATITUDE: float
+    LONGITUDE: float
+    STATUS_TERRENO: Optional[str]
+    CAPACIDADE_ANIMAIS: Optional[int]
+    AREA_HECTARES: float
+    LIMITES: Optional[List[Vertice]]
+    area_poligono_hectares: Optional[float] = None
+    distancia_m: Optional[float] = None
+
+    def distancia(self, lat: float, lon: float) -> float:
+        if self.LIMITES:
+            return distancia_poligono_m(self.LIMITES, lat, lon)
+        return distancia_m(lat, lon, self.LATITUDE, self.LONGITUDE)
+
+    def envolvente(self) -> Tuple[float, float, float, float]:
+        """(lat_min, lat_max, lon_min, lon_max)"""
+        lats = [self.LATITUDE] + [lat for lat, _ in self.LIMITES or ()]
+        lons = [self.LONGITUDE] + [lon for _, lon in self.LIMITES or ()]
+        return min(lats), max(lats), min(lons), max(lons)
+
+
+def _celula(lat: float, lon: float) -> Celula:
+    return math.floor(lat / TAMANHO_CELULA), math.floor(lon / TAMANHO_CELULA)
+
+
+def _celulas_retangulo(lat_min, lat_max, lon_min, lon_max) -> Iterable[Celula]:
+    (i_min, j_min), (i_max, j_max) = _celula(lat_min, lon_min), _celula(
+        lat_max, lon_max
+    )
+    for i in range(i_min, i_max + 1):
+        for j in range(j_min, j_max + 1):
+            yield i, j
+
+
+def _lado_minimo_m(lat: float, aneis: int) -> float:
+    """Menor lado (em metros) das células até `aneis` anéis de distância"""
+    lat_extrema = min(abs(lat) + (aneis + 1) * TAMANHO_CELULA, 89.9)
+    return TAMANHO_CELULA * METROS_POR_GRAU * math.cos(math.radians(lat_extrema))
+
+
+class _Grade:
+    def __init__(self, terrenos: Iterable[TerrenoGeo]):
+        self.terrenos: Dict[int, TerrenoGeo] = {}
+        self.celulas: Dict[Celula, List[int]] = defaultdict(list)
+        for terreno in terrenos:
+            self.terrenos[terreno.ID] = terreno
+            for celula in _celulas_retangulo(*terreno.envolvente()):
+                self.celulas[celula].append(terreno.ID)
+        if self.celulas:
+            self.limites = (
+                min(i for i, _ in self.celulas),
+                max(i for i, _ in self.celulas),
+                min(j for _, j in self.celulas),
+                max(j for _, j in self.celulas),
+            )
+
+    def candidatos(self, celulas: Iterable[Celula]) -> Set[int]:
+        ids: Set[int] = set()
+        for celula in celulas:
+            ids.update(self.celulas.get(celula, ()))
+        return ids
+
+    def candidatos_retangulo(self, lat_min, lat_max, lon_min, lon_max) -> Set[int]:
+        (i_min, j_min), (i_max, j_max) = _celula(lat_min, lon_min), _celula(
+            lat_max, lon_max
+        )
+        # Retângulo com mais células que as ocupadas: percorre as ocupadas
+        if (i_max - i_min + 1) * (j_max - j_min + 1) > len(self.celulas):
+            return self.candidatos(
+                (i, j)
+                for i, j in self.celulas
+                if i_min <= i <= i_max and j_min <= j <= j_max
+            )
+        return self.candidatos(_celulas_retangulo(lat_min, lat_max, lon_min, lon_max))
+
+    def anel(self, centro: Celula, raio: int) -> Iterable[Celula]:
+        """Células à distância (Chebyshev) exatamente `raio` do centro"""
+        i0, j0 = centro
+        if raio == 0:
+            yield centro
+            return
+        for j in range(j0 - raio, j0 + raio + 1):
+            yield i0 - raio, j
+            yield i0 + raio, j
+        for i in range(i0 - raio + 1, i0 + raio):
+            yield i, j0 - raio
+            yield i, j0 + raio
+
+    def aneis_necessarios(self, centro: Celula) -> int:
+        """Anéis até cobrir todas as células ocupadas"""
+        i_min, i_max, j_min, j_max = self.limites
+        i0, j0 = centro
+        return max(i0 - i_min, i_max - i0, j0 - j_min, j_max - j0, 0)
+
+
+class IndiceTerrenos:
+    tabelas = {"TERRENOS"}
+
+    def __init__(self, ttl: Optional[float] = None):
+        self.ttl = ttl if ttl is not None else settings.BUSCA_INDICE_TTL
+        self._grade = _Grade(())
+        self._carregado_em: Optional[float] = None
+        self._versao = 0
+        self._lock = asyncio.Lock()
+        registrar_dependente(self)
+
+    def invalidar(self):
+        """Marca o índice para recarga na próxima consulta"""
+        self._versao += 1
+        self._carregado_em = None
+
+    def _atual(self) -> bool:
+        return (
+            self._carregado_em is not None
+            and time.monotonic() - self._carregado_em < self.ttl
+        )
+
+    async def carregar(self, db: AsyncSession):
+        versao = self._versao
+        inicio = time.monotonic()
+        linhas = await db.execute(
+            select(
+                Terreno.ID,
+                Terreno.NOME,
+                Terreno.LATITUDE,
+                Terreno.LONGITUDE,
+                Terreno.STATUS_TERRENO,
+                Terreno.CAPACIDADE_ANIMAIS,
+                Terreno.AREA_HECTARES,
+                Terreno.LIMITES,
+            )
+        )
+        terrenos = []
+        for linha in linhas:
+            terreno = TerrenoGeo(**linha._asdict())
+            if terreno.LIMITES:
+                terreno.LIMITES = [tuple(v) for v in terreno.LIMITES]
+                terreno.area_poligono_hectares = round(
+                    area_hectares(terreno.LIMITES), 4
+                )
+            terrenos.append(terreno)
+        self._grade = _Grade(terrenos)
+        # Invalidado durante a carga: a leitura pode não refletir a escrita
+        if versao == self._versao:
+            self._carregado_em = inicio
+
+    async def _garantir(self, db: AsyncSession) -> _Grade:
+        if not self._atual():
+            async with self._lock:
+                if not self._atual():
+                    await self.carregar(db)
+        return self._grade
+
+    @staticmethod
+    def _resultado(terreno: TerrenoGeo, distancia: Optional[float]) -> TerrenoGeo:
+        # Cópia: a distância depende da consulta
+        return TerrenoGeo(**{**terreno.__dict__, "distancia_m": distancia})
+
+    async def no_raio(
+        self,
+        db: AsyncSession,
+        lat: float,
+        lon: float,
+        raio_m: float,
+        filtro: Optional[Callable[[TerrenoGeo], bool]] = None,
+    ) -> List[TerrenoGeo]:
+        """Terrenos a até `raio_m` metros do ponto, do mais próximo ao mais distante"""
+        grade = await self._garantir(db)
+        dlat = raio_m / METROS_POR_GRAU
+        dlon = raio_m / (METROS_POR_GRAU * max(math.cos(math.radians(lat)), 1e-6))
+        encontrados = []
+        for id in grade.candidatos_retangulo(
+            lat - dlat, lat + dlat, lon - dlon, lon + dlon
+        ):
+            terreno = grade.terrenos[id]
+            if filtro and not filtro(terreno):
+                continue
+            distancia = terreno.distancia(lat, lon)
+            if distancia <= raio_m:
+                encontrados.append((distancia, id))
+        return [
+            self._resultado(grade.terrenos[id], round(distancia, 1))
+            for distancia, id in sorted(encontrados)
+        ]
+
+    async def mais_proximos(
+        self,
+        db: AsyncSession,
+        lat: float,
+        lon: float,
+        k: int,
+        filtro: Optional[Callable[[TerrenoGeo], bool]] = None,
+    ) -> List[TerrenoGeo]:
+        """Os `k` terrenos mais próximos do ponto (que atendem ao filtro)"""
+        grade = await self._garantir(db)
+        if not grade.terrenos:
+            return []
+
+        centro = _celula(lat, lon)
+        aneis = grade.aneis_necessarios(centro)
+        # Ponto longe da grade: mais barato avaliar todos os terrenos
+        if (2 * aneis + 1) ** 2 > 4 * len(grade.celulas):
+            ids_por_anel: Iterable[Set[int]] = [set(grade.terrenos)]
+        else:
+            ids_por_anel = (
+                grade.candidatos(grade.anel(centro, raio)) for raio in range(aneis + 1)
+            )
+
+        vistos: Set[int] = set()
+        melhores: List[Tuple[float, int]] = []  # heap máximo (-dist, -id)
+        for raio, ids in enumerate(ids_por_anel):
+            for id in ids - vistos:
+                vistos.add(id)
+                terreno = grade.terrenos[id]
+                if filtro and not filtro(terreno):
+                    continue
+                item = (-terreno.distancia(lat, lon), -id)
+                if len(melhores) < k:
+                    heapq.heappush(melhores, item)
+                elif item > melhores[0]:
+                    heapq.heapreplace(melhores, item)
+            # Terrenos ainda não vistos estão a ao menos `raio` células
+            if len(melhores) == k and -melhores[0][0] <= raio * _lado_minimo_m(
+                lat, raio
+            ):
+                break
+
+        return [
+            self._resultado(grade.terrenos[-id], round(-distancia, 1))
+            for distancia, id in sorted(melhores, reverse=True)
+        ]
+
+    async def no_retangulo(
+        self,
+        db: AsyncSession,
+        lat_min: float,
+        lat_max: float,
+        lon_min: float,
+        lon_max: float,
+    ) -> List[TerrenoGeo]:
+        """Terrenos cujo retângulo envolvente intercepta o retângulo informado"""
+        grade = await self._garantir(db)
+        resultados = []
+        for id in grade.candidatos_retangulo(lat_min, lat_max, lon_min, lon_max):
+            terreno = grade.terrenos[id]
+            t_lat_min, t_lat_max, t_lon_min, t_lon_max = terreno.envolvente()
+            if (
+                t_lat_min <= lat_max
+                and t_lat_max >= lat_min
+                and t_lon_min <= lon_max
+                and t_lon_max >= lon_min
+            ):
+                resultados.append(self._resultado(terreno, None))
+        resultados.sort(key=lambda t: t.ID)
+        return resultados
+
+    async def contendo(
+        self, db: AsyncSession, lat: float, lon: float
+    ) -> List[TerrenoGeo]:
+        """Terrenos com contorno que contém o ponto"""
+        grade = await self._garantir(db)
+        return sorted(
+            (
+                self._resultado(grade.terrenos[id], 0.0)
+                for id in grade.candidatos([_celula(lat, lon)])
+                if grade.terrenos[id].LIMITES
+                and contem(grade.terrenos[id].LIMITES, lat, lon)
+            ),
+            key=lambda t: t.ID,
+        )
+
+
+indice_terrenos = IndiceTerrenos()
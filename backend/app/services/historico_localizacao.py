@@ -0,0 +1,287 @@
+"""
+Índice em memória (por processo) das permanências dos animais, derivado do
+histórico de MOVIMENTACOES_ANIMAIS.
+
+Cada movimentação abre uma permanência [DATA_MOVIMENTACAO, próxima
+movimentação do animal) no destino (terreno ou local externo); a última fica
+em aberto. As permanências ficam organizadas:
+
+- por animal, ordenadas pelo início: "onde estava o animal na data T" é uma
+  busca binária;
+- por terreno, em uma árvore de intervalos centrada: "quem estava no terreno
+  na data T / no período" visita só os nós que podem conter o instante.
+
+O conjunto de contatos de um animal (animais que dividiram terreno com ele
+em um período) combina as duas estruturas: para cada permanência do animal
+em terreno, as permanências sobrepostas naquele terreno.
+
+O índice é recarregado (uma query) na primeira consulta após um commit que
+altere MOVIMENTACOES_ANIMAIS (ver app.core.cache.registrar_dependente) ou
+após o TTL.
+"""
+
+import asyncio
+import bisect
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from app.core.cache import registrar_dependente
+from app.core.config import settings
+from app.models.movimentacao import MovimentacaoAnimais
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Fim das permanências em aberto (animal ainda no local)
+EM_ABERTO = datetime.max
+
+
+@dataclass(frozen=True)
+class Permanencia:
+    ID_ANIMAL: int
+    ID_MOVIMENTACAO: int
+    ID_TERRENO: Optional[int]
+    LOCAL_EXTERNO: Optional[str]
+    inicio: datetime
+    fim: datetime  # exclusivo; EM_ABERTO enquanto o animal permanece
+
+    @property
+    def em_aberto(self) -> bool:
+        return self.fim == EM_ABERTO
+
+
+class _ArvoreIntervalos:
+    """
+    Árvore de intervalos centrada (estática). O centro de cada nó é a
+    mediana dos inícios, então cada nó guarda ao menos um intervalo e cada
+    subárvore no máximo metade dos restantes.
+    """
+
+    __slots__ = ("centro", "por_inicio", "por_fim", "esquerda", "direita")
+
+    def __init__(self, intervalos: List[Permanencia]):
+        inicios = sorted(p.inicio for p in intervalos)
+        self.centro = inicios[len(inicios) // 2]
+        aqui, esquerda, direita = [], [], []
+        for p in intervalos:
+            if p.fim <= self.centro:
+                esquerda.append(p)
+            elif p.inicio > self.centro:
+                direita.append(p)
+            else:
+                aqui.append(p)
+        self.por_inicio = sorted(aqui, key=lambda p: p.inicio)
+        self.por_fim = sorted(aqui, key=lambda p: p.fim, reverse=True)
+        self.esquerda = _ArvoreIntervalos(esquerda) if esquerda else None
+        self.direita = _ArvoreIntervalos(direita) if direita else None
+
+    def sobrepostos(self, de: datetime, ate: datetime) -> List[Permanencia]:
+        """Intervalos com inicio <= ate e fim > de (de == ate: instante)"""
+        encontrados = []
+        pilha = [self]
+        while pilha:
+            no = pilha.pop()
+            if ate < no.centro:
+                for p in no.por_inicio:
+                    if p.inicio > ate:
+                        break
+                    encontrados.append(p)
+                if no.esquerda:
+                    pilha.append(no.esquerda)
+            elif de >= no.centro:
+                for p in no.por_fim:
+                    if p.fim <= de:
+                        break
+                    encontrados.append(p)
+                if no.direita:
+                    pilha.append(no.direita)
+            else:
+                encontrados.extend(no.por_inicio)
+                if no.esquerda:
+                    pilha.append(no.esquerda)
+                if no.direita:
+                    pilha.append(no.direita)
+        return encontrados
+
+
+class _Permanencias:
+    def __init__(self, linhas):
+        self.por_animal: Dict[int, List[Permanencia]] = {}
+        self.inicios: Dict[int, List[datetime]] = {}
+        por_terreno: Dict[int, List[Permanencia]] = defaultdict(list)
+
+        # Linhas ordenadas por animal, data e ID
+        movimentos = defaultdict(list)
+        for linha in linhas:
+            movimentos[linha.ID_ANIMAL].append(linha)
+        for id_animal, lista in movimentos.items():
+            permanencias = []
+            for atual, proxima in zip(lista, lista[1:] + [None]):
+                fim = proxima.DATA_MOVIMENTACAO if proxima else EM_ABERTO
+                # Movimentações no mesmo instante: vale a de maior ID
+                if fim <= atual.DATA_MOVIMENTACAO:
+                    continue
+                if atual.ID_TERRENO_DESTINO is None and not atual.DESTINO_EXTERNO:
+                    continue
+                permanencia = Permanencia(
+                    ID_ANIMAL=id_animal,
+                    ID_MOVIMENTACAO=atual.ID,
+                    ID_TERRENO=atual.ID_TERRENO_DESTINO,
+                    LOCAL_EXTERNO=atual.DESTINO_EXTERNO,
+                    inicio=atual.DATA_MOVIMENTACAO,
+                    fim=fim,
+                )
+                permanencias.append(permanencia)
+                if permanencia.ID_TERRENO is not None:
+                    por_terreno[permanencia.ID_TERRENO].append(permanencia)
+            self.por_animal[id_animal] = permanencias
+            self.inicios[id_animal] = [p.inicio for p in permanencias]
+
+        self.por_terreno: Dict[int, _ArvoreIntervalos] = {
+            id_terreno: _ArvoreIntervalos(lista)
+            for id_terreno, lista in por_terreno.items()
+        }
+
+    def do_animal(
+        self, id_animal: int, de: datetime, ate: datetime
+    ) -> List[Permanencia]:
+        permanencias = self.por_animal.get(id_animal, [])
+        # Primeira candidata: a que começou por último até `de`
+        i = max(bisect.bisect_right(self.inicios.get(id_animal, []), de) - 1, 0)
+        resultado = []
+        for p in permanencias[i:]:
+            if p.inicio > ate:
+                break
+            if p.fim > de:
+                resultado.append(p)
+        return resultado
+
+    def no_terreno(
+        self, id_terreno: int, de: datetime, ate: datetime
+    ) -> List[Permanencia]:
+        arvore = self.por_terreno.get(id_terreno)
+        if arvore is None:
+            return []
+        return sorted(
+            arvore.sobrepostos(de, ate), key=lambda p: (p.inicio, p.ID_ANIMAL)
+        )
+
+
+def sem_fuso(data: datetime) -> datetime:
+    """Converte para horário local sem fuso, como DATA_MOVIMENTACAO é gravada"""
+    if data.tzinfo is not None:
+        return data.astimezone().replace(tzinfo=None)
+    return data
+
+
+class IndicePermanencias:
+    tabelas = {"MOVIMENTACOES_ANIMAIS"}
+
+    def __init__(self, ttl: Optional[float] = None):
+        self.ttl = ttl if ttl is not None else settings.BUSCA_INDICE_TTL
+        self._dados = _Permanencias(())
+        self._carregado_em: Optional[float] = None
+        self._versao = 0
+        self._lock = asyncio.Lock()
+        registrar_dependente(self)
+
+    def invalidar(self):
+        """Marca o índice para recarga na próxima consulta"""
+        self._versao += 1
+        self._carregado_em = None
+
+    def _atual(self) -> bool:
+        return (
+            self._carregado_em is not None
+            and time.monotonic() - self._carregado_em < self.ttl
+        )
+
+    async def carregar(self, db: AsyncSession):
+        versao = self._versao
+        inicio = time.monotonic()
+        linhas = await db.execute(
+            select(
+                MovimentacaoAnimais.ID,
+                MovimentacaoAnimais.ID_ANIMAL,
+                MovimentacaoAnimais.ID_TERRENO_DESTINO,
+                MovimentacaoAnimais.DESTINO_EXTERNO,
+                MovimentacaoAnimais.DATA_MOVIMENTACAO,
+            ).order_by(
+                MovimentacaoAnimais.ID_ANIMAL,
+                MovimentacaoAnimais.DATA_MOVIMENTACAO,
+                MovimentacaoAnimais.ID,
+            )
+        )
+        self._dados = _Permanencias(linhas)
+        # Invalidado durante a carga: a leitura pode não refletir a escrita
+        if versao == self._versao:
+            self._carregado_em = inicio
+
+    async def _garantir(self, db: AsyncSession) -> _Permanencias:
+        if not self._atual():
+            async with self._lock:
+                if not self._atual():
+                    await self.carregar(db)
+        return self._dados
+
+    async def localizacao_em(
+        self, db: AsyncSession, id_animal: int, data: datetime
+    ) -> Optional[Permanencia]:
+        """Permanência do animal que contém o instante (None: desconhecida)"""
+        data = sem_fuso(data)
+        dados = await self._garantir(db)
+        encontradas = dados.do_animal(id_animal, data, data)
+        return encontradas[0] if encontradas else None
+
+    async def no_terreno(
+        self,
+        db: AsyncSession,
+        id_terreno: int,
+        de: datetime,
+        ate: Optional[datetime] = None,
+    ) -> List[Permanencia]:
+        """Permanências no terreno no instante `de` ou no período [de, ate]"""
+        de = sem_fuso(de)
+        ate = sem_fuso(ate) if ate else de
+        dados = await self._garantir(db)
+        return dados.no_terreno(id_terreno, de, ate)
+
+    async def contatos(
+        self,
+        db: AsyncSession,
+        id_animal: int,
+        de: datetime,
+        ate: datetime,
+        id_terreno: Optional[int] = None,
+    ) -> Dict[int, List[Tuple[int, datetime, datetime]]]:
+        """
+        Animais que dividiram terreno com `id_animal` no período [de, ate):
+        {animal: [(terreno, início, fim) de cada sobreposição]}.
+        """
+        de, ate = sem_fuso(de), sem_fuso(ate)
+        dados = await self._garantir(db)
+        encontros = defaultdict(list)
+        for propria in dados.do_animal(id_animal, de, ate):
+            if propria.ID_TERRENO is None:
+                continue
+            if id_terreno is not None and propria.ID_TERRENO != id_terreno:
+                continue
+            janela_inicio = max(propria.inicio, de)
+            janela_fim = min(propria.fim, ate)
+            if janela_inicio >= janela_fim:
+                continue
+            for outra in dados.no_terreno(
+                propria.ID_TERRENO, janela_inicio, janela_fim
+            ):
+                if outra.ID_ANIMAL == id_animal:
+                    continue
+                inicio = max(janela_inicio, outra.inicio)
+                fim = min(janela_fim, outra.fim)
+                if inicio < fim:
+                    encontros[outra.ID_ANIMAL].append((propria.ID_TERRENO, inicio, fim))
+        return encontros
+
+
+indice_permanencias = IndicePermanencias()
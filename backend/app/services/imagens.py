@@ -0,0 +1,117 @@
+"""
+Variantes redimensionadas (WebP) das fotos de animais.
+
+Para cada foto original `<nome>.jpg` são geradas, ao lado dela,
+`<nome>_thumb.webp` (listagens) e `<nome>_media.webp` (telas de detalhe).
+Decodificar e redimensionar imagens é trabalho de CPU, então roda em um
+pool de processos fora do event loop. Nomes e URLs das variantes ficam em
+app.core.variantes.
+
+Fotos enviadas antes das variantes existirem podem ser processadas com:
+
+    python -m app.services.imagens
+"""
+
+import argparse
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional
+
+from app.core.config import settings
+from app.core.variantes import VARIANTES, caminho_variante
+from fastapi import HTTPException, status
+from PIL import Image, ImageOps
+
+DIRETORIO_FOTOS = Path("uploads/animais")
+QUALIDADE_WEBP = 80
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def gerar_variantes(caminho: str) -> Dict[str, str]:
+    """
+    Valida a imagem e grava suas variantes (executado no pool de processos).
+    Retorna nome da variante -> nome do arquivo gerado.
+    """
+    original = Path(caminho)
+    with Image.open(original) as imagem:
+        imagem.verify()
+
+    # verify() invalida o objeto: a imagem é reaberta para o processamento
+    with Image.open(original) as imagem:
+        imagem = ImageOps.exif_transpose(imagem)
+        if imagem.mode not in ("RGB", "RGBA"):
+            transparente = imagem.mode in ("LA", "PA") or "transparency" in imagem.info
+            imagem = imagem.convert("RGBA" if transparente else "RGB")
+
+        gerados = {}
+        for variante, lado in VARIANTES.items():
+            copia = imagem.copy()
+            copia.thumbnail((lado, lado), Image.Resampling.LANCZOS)
+            destino = caminho_variante(original, variante)
+            copia.save(destino, "WEBP", quality=QUALIDADE_WEBP, method=4)
+            gerados[variante] = destino.name
+        return gerados
+
+
+def _obter_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=settings.IMAGEM_WORKERS)
+    return _pool
+
+
+async def processar_foto(original: Path, reaproveitar: bool = False) -> Dict[str, str]:
+    """
+    Gera as variantes no pool; imagem inválida resulta em 400. Com
+    `reaproveitar` (arquivo já existente) variantes prontas não são refeitas.
+    """
+    if reaproveitar:
+        prontas = {v: caminho_variante(original, v) for v in VARIANTES}
+        if all(caminho.exists() for caminho in prontas.values()):
+            return {v: caminho.name for v, caminho in prontas.items()}
+
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(_obter_pool(), gerar_variantes, str(original))
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Arquivo não é uma imagem válida",
+        ) from e
+
+
+def encerrar_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Gera as variantes WebP das fotos de animais já enviadas"
+    )
+    parser.add_argument(
+        "--todas",
+        action="store_true",
+        help="Regerar também as fotos que já possuem variantes",
+    )
+    args = parser.parse_args()
+
+    sufixos = tuple(f"_{variante}.webp" for variante in VARIANTES)
+    processadas = 0
+    for original in sorted(DIRETORIO_FOTOS.iterdir()):
+        if not original.is_file() or original.name.endswith(sufixos):
+            continue
+        if not args.todas and all(
+            caminho_variante(original, v).exists() for v in VARIANTES
+        ):
+            continue
+        try:
+            gerar_variantes(str(original))
+            processadas += 1
+        except Exception as e:
+            print(f"Ignorando {original.name}: {e}")
+    print(f"Variantes geradas para {processadas} fotos")
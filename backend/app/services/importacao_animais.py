@@ -0,0 +1,224 @@
+"""
+Importação de animais em lote (CSV ou array JSON).
+
+Cada linha é validada pelo schema `AnimalImportacao`; em seguida são feitas
+as verificações que dependem do conjunto e do banco:
+
+- NUMERO_REGISTRO e CHIP_IDENTIFICACAO repetidos dentro do próprio arquivo
+  (a primeira ocorrência é mantida);
+- os mesmos campos já cadastrados, com uma consulta IN por campo;
+- ID_PAI/ID_MAE inexistentes, com uma única consulta IN.
+
+As linhas válidas são inseridas com INSERT em lote (executemany / array DML)
+e um único commit. Os erros são devolvidos por linha; com `tudo_ou_nada`
+qualquer erro impede a gravação de todo o lote.
+"""
+
+import csv
+import io
+from typing import Any, Dict, Iterable, List, Tuple
+
+from app.models.animal import Animal
+from app.schemas.animal import (
+    AnimalImportacao,
+    ErroImportacao,
+    ImportacaoAnimaisResponse,
+)
+from app.services.batch_resolver import _lotes
+from fastapi import HTTPException, status
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+MAX_LINHAS_IMPORTACAO = 5000
+MAX_BYTES_IMPORTACAO = 5 * 1024 * 1024
+TAMANHO_LOTE_INSERT = 1000
+# Linha 1 do arquivo é o cabeçalho
+PRIMEIRA_LINHA_CSV = 2
+
+CAMPOS_UNICOS = {
+    "NUMERO_REGISTRO": "Número de registro",
+    "CHIP_IDENTIFICACAO": "Chip de identificação",
+}
+
+# Cabeçalho/chave normalizado (maiúsculo) -> campo do schema
+_CAMPOS = {campo.upper(): campo for campo in AnimalImportacao.model_fields}
+
+
+def _erro_requisicao(detalhe: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detalhe)
+
+
+def _decodificar(conteudo: bytes) -> str:
+    # Planilhas exportadas no Windows costumam vir em latin-1
+    try:
+        return conteudo.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return conteudo.decode("latin-1")
+
+
+def ler_csv(conteudo: bytes) -> List[Dict[str, Any]]:
+    """Converte o CSV (separador ',' ou ';') em registros por cabeçalho"""
+    if len(conteudo) > MAX_BYTES_IMPORTACAO:
+        raise _erro_requisicao(
+            f"Arquivo excede o limite de {MAX_BYTES_IMPORTACAO // (1024 * 1024)} MB"
+        )
+    texto = _decodificar(conteudo)
+    if not texto.strip():
+        raise _erro_requisicao("Arquivo vazio")
+
+    try:
+        dialeto = csv.Sniffer().sniff(texto[:4096], delimiters=",;")
+    except csv.Error:
+        dialeto = csv.excel
+
+    leitor = csv.DictReader(io.StringIO(texto), dialect=dialeto)
+    if not leitor.fieldnames or "NOME" not in {
+        (c or "").strip().upper() for c in leitor.fieldnames
+    }:
+        raise _erro_requisicao("Cabeçalho do CSV deve conter a coluna NOME")
+    return list(leitor)
+
+
+def _normalizar(registro: Any) -> Dict[str, Any]:
+    """Mapeia as chaves para os campos do schema; texto vazio vira None"""
+    if not isinstance(registro, dict):
+        raise ValueError("Registro deve ser um objeto")
+    normalizado = {}
+    for chave, valor in registro.items():
+        campo = _CAMPOS.get(str(chave or "").strip().upper())
+        if campo is None:
+            continue
+        if isinstance(valor, str):
+            valor = valor.strip() or None
+        normalizado[campo] = valor
+    return normalizado
+
+
+def validar_registros(
+    registros: List[Any], id_usuario: int, primeira_linha: int
+) -> Tuple[List[Tuple[int, AnimalImportacao]], List[ErroImportacao]]:
+    """Validação de cada linha e de unicidade dentro do próprio conjunto"""
+    if len(registros) > MAX_LINHAS_IMPORTACAO:
+        raise _erro_requisicao(
+            f"Importação limitada a {MAX_LINHAS_IMPORTACAO} registros por vez"
+        )
+
+    validos = []
+    erros = []
+    vistos = {campo: {} for campo in CAMPOS_UNICOS}
+    for posicao, registro in enumerate(registros):
+        linha = posicao + primeira_linha
+        try:
+            dados = _normalizar(registro)
+            dados["ID_USUARIO_CADASTRO"] = id_usuario
+            animal = AnimalImportacao.model_validate(dados)
+        except ValidationError as e:
+            for erro in e.errors():
+                campo = erro["loc"][0] if erro["loc"] else None
+                erros.append(
+                    ErroImportacao(
+                        linha=linha,
+                        campo=str(campo) if campo is not None else None,
+                        mensagem=erro["msg"],
+                    )
+                )
+            continue
+        except ValueError as e:
+            erros.append(ErroImportacao(linha=linha, mensagem=str(e)))
+            continue
+
+        duplicado = False
+        for campo, descricao in CAMPOS_UNICOS.items():
+            valor = getattr(animal, campo)
+            if valor is None:
+                continue
+            if valor in vistos[campo]:
+                erros.append(
+                    ErroImportacao(
+                        linha=linha,
+                        campo=campo,
+                        mensagem=f"{descricao} repetido no arquivo "
+                        f"(linha {vistos[campo][valor]})",
+                    )
+                )
+                duplicado = True
+        if duplicado:
+            continue
+        for campo in CAMPOS_UNICOS:
+            valor = getattr(animal, campo)
+            if valor is not None:
+                vistos[campo][valor] = linha
+        validos.append((linha, animal))
+
+    return validos, erros
+
+
+async def _existentes(db: AsyncSession, coluna, valores: Iterable[Any]) -> set:
+    """Valores de `coluna` já presentes no banco (IN em lotes)"""
+    valores = list(valores)
+    encontrados = set()
+    for lote in _lotes(valores):
+        encontrados.update(await db.scalars(select(coluna).filter(coluna.in_(lote))))
+    return encontrados
+
+
+async def importar_animais(
+    db: AsyncSession,
+    registros: List[Any],
+    id_usuario: int,
+    primeira_linha: int = 1,
+    tudo_ou_nada: bool = False,
+) -> ImportacaoAnimaisResponse:
+    validos, erros = validar_registros(registros, id_usuario, primeira_linha)
+
+    # Unicidade contra o banco: uma consulta por campo
+    cadastrados = {
+        campo: await _existentes(
+            db,
+            getattr(Animal, campo),
+            {getattr(a, campo) for _, a in validos if getattr(a, campo) is not None},
+        )
+        for campo in CAMPOS_UNICOS
+    }
+    pais = {
+        id_pai
+        for _, animal in validos
+        for id_pai in (animal.ID_PAI, animal.ID_MAE)
+        if id_pai is not None
+    }
+    pais_existentes = await _existentes(db, Animal.ID, pais)
+
+    inserir = []
+    for linha, animal in validos:
+        erros_linha = [
+            ErroImportacao(linha=linha, campo=campo, mensagem=f"{descricao} já existe")
+            for campo, descricao in CAMPOS_UNICOS.items()
+            if getattr(animal, campo) in cadastrados[campo]
+        ] + [
+            ErroImportacao(linha=linha, campo=campo, mensagem="Animal não encontrado")
+            for campo in ("ID_PAI", "ID_MAE")
+            if getattr(animal, campo) is not None
+            and getattr(animal, campo) not in pais_existentes
+        ]
+        if erros_linha:
+            erros.extend(erros_linha)
+        else:
+            inserir.append(animal.model_dump())
+
+    erros.sort(key=lambda erro: erro.linha)
+    if erros and tudo_ou_nada:
+        inserir = []
+
+    if inserir:
+        try:
+            for lote in _lotes(inserir, TAMANHO_LOTE_INSERT):
+                await db.execute(insert(Animal), lote)
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+
+    return ImportacaoAnimaisResponse(
+        total=len(registros), importados=len(inserir), erros=erros
+    )
@@ -0,0 +1,236 @@
+"""
+Manutenção de LOCALIZACAO_ATUAL_ANIMAIS: uma linha por animal com o destino
+(terreno ou local externo) da sua última movimentação.
+
+Inclusões, alterações e exclusões de MovimentacaoAnimais via ORM recalculam,
+na mesma transação da escrita (evento after_flush), a localização dos
+animais afetados a partir do histórico. Recalcular pelo histórico (e não
+aplicar só a movimentação nova) cobre lançamentos retroativos e a exclusão
+da última movimentação, que devolve o animal ao local anterior.
+
+INSERT/UPDATE/DELETE em massa em MOVIMENTACOES_ANIMAIS não passam pelo flush:
+quem os executa deve chamar `atualizar_localizacoes` com os animais afetados.
+
+Com isso "quem está no terreno X" e a ocupação dos terrenos viram consultas
+pelo índice de LOCALIZACAO_ATUAL_ANIMAIS.ID_TERRENO.
+
+Verificação e reconstrução completa:
+
+    python -m app.services.ocupacao [--verificar]
+"""
+
+import argparse
+from typing import Iterable, List, Optional, Set
+
+from app.models.animal import Animal
+from app.models.movimentacao import LocalizacaoAtualAnimal, MovimentacaoAnimais
+from app.models.terreno import Terreno
+from app.schemas.movimentacao import LocalizacaoAtual
+from app.services.batch_resolver import _lotes
+from sqlalchemy import delete, desc, event, func, inspect, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+_COLUNAS = [
+    LocalizacaoAtualAnimal.ID_ANIMAL,
+    LocalizacaoAtualAnimal.ID_MOVIMENTACAO,
+    LocalizacaoAtualAnimal.ID_TERRENO,
+    LocalizacaoAtualAnimal.LOCAL_EXTERNO,
+    LocalizacaoAtualAnimal.TIPO_MOVIMENTACAO,
+    LocalizacaoAtualAnimal.DATA_MOVIMENTACAO,
+]
+
+
+def _ultimas_movimentacoes(ids_animais: Optional[Iterable[int]] = None):
+    """SELECT da última movimentação por animal, nas colunas da tabela"""
+    ordenadas = select(
+        MovimentacaoAnimais.ID_ANIMAL,
+        MovimentacaoAnimais.ID,
+        MovimentacaoAnimais.ID_TERRENO_DESTINO,
+        MovimentacaoAnimais.DESTINO_EXTERNO,
+        MovimentacaoAnimais.TIPO_MOVIMENTACAO,
+        MovimentacaoAnimais.DATA_MOVIMENTACAO,
+        func.row_number()
+        .over(
+            partition_by=MovimentacaoAnimais.ID_ANIMAL,
+            order_by=(
+                desc(MovimentacaoAnimais.DATA_MOVIMENTACAO),
+                desc(MovimentacaoAnimais.ID),
+            ),
+        )
+        .label("ordem"),
+    )
+    if ids_animais is not None:
+        ordenadas = ordenadas.filter(MovimentacaoAnimais.ID_ANIMAL.in_(ids_animais))
+    ordenadas = ordenadas.subquery()
+    return select(
+        ordenadas.c.ID_ANIMAL,
+        ordenadas.c.ID,
+        ordenadas.c.ID_TERRENO_DESTINO,
+        ordenadas.c.DESTINO_EXTERNO,
+        ordenadas.c.TIPO_MOVIMENTACAO,
+        ordenadas.c.DATA_MOVIMENTACAO,
+    ).filter(ordenadas.c.ordem == 1)
+
+
+def atualizar_localizacoes(conexao, ids_animais: Iterable[int]):
+    """
+    Recalcula a localização atual dos animais informados (DELETE + INSERT
+    a partir do histórico). `conexao` é uma Connection ou Session síncrona.
+    """
+    for lote in _lotes(sorted(set(ids_animais))):
+        conexao.execute(
+            delete(LocalizacaoAtualAnimal).where(
+                LocalizacaoAtualAnimal.ID_ANIMAL.in_(lote)
+            )
+        )
+        conexao.execute(
+            insert(LocalizacaoAtualAnimal).from_select(
+                [coluna.key for coluna in _COLUNAS], _ultimas_movimentacoes(lote)
+            )
+        )
+
+
+def _animais_afetados(session: Session) -> Set[int]:
+    ids = set()
+    for obj in session.new:
+        if isinstance(obj, MovimentacaoAnimais):
+            ids.add(obj.ID_ANIMAL)
+
+    for obj in session.deleted:
+        if isinstance(obj, MovimentacaoAnimais):
+            historico = inspect(obj).attrs.ID_ANIMAL.history
+            ids.update(historico.deleted or historico.unchanged)
+
+    for obj in session.dirty:
+        if not isinstance(obj, MovimentacaoAnimais):
+            continue
+        estado = inspect(obj)
+        relevantes = (
+            "ID_ANIMAL",
+            "DATA_MOVIMENTACAO",
+            "ID_TERRENO_DESTINO",
+            "DESTINO_EXTERNO",
+            "TIPO_MOVIMENTACAO",
+        )
+        if any(estado.attrs[c].history.has_changes() for c in relevantes):
+            # Trocar o animal de uma movimentação afeta o antigo e o novo
+            historico = estado.attrs.ID_ANIMAL.history
+            ids.update(historico.deleted)
+            ids.add(obj.ID_ANIMAL)
+
+    ids.discard(None)
+    return ids
+
+
+def _atualizar_ocupacao(session: Session, flush_context):
+    ids = _animais_afetados(session)
+    if ids:
+        atualizar_localizacoes(session.connection(), ids)
+
+
+def registrar_manutencao_ocupacao():
+    """Liga a manutenção incremental das localizações às sessões do ORM"""
+    if not event.contains(Session, "after_flush", _atualizar_ocupacao):
+        event.listen(Session, "after_flush", _atualizar_ocupacao)
+
+
+# === CONSULTAS ===
+
+
+async def consultar_localizacoes(
+    db: AsyncSession, *filtros, apenas_ativos: bool = False
+) -> List[LocalizacaoAtual]:
+    """Localizações atuais com nome do animal e do terreno (uma consulta)"""
+    query = (
+        select(LocalizacaoAtualAnimal, Animal.NOME, Terreno.NOME)
+        .join(Animal, Animal.ID == LocalizacaoAtualAnimal.ID_ANIMAL)
+        .outerjoin(Terreno, Terreno.ID == LocalizacaoAtualAnimal.ID_TERRENO)
+        .filter(*filtros)
+        .order_by(Animal.NOME)
+    )
+    if apenas_ativos:
+        query = query.filter(Animal.STATUS_ANIMAL == "ATIVO")
+
+    resultado = []
+    for loc, animal_nome, terreno_nome in (await db.execute(query)).all():
+        if loc.ID_TERRENO:
+            terreno_atual = terreno_nome or f"Terreno #{loc.ID_TERRENO}"
+            localizacao_tipo, localizacao = "terreno", terreno_atual
+        elif loc.LOCAL_EXTERNO:
+            terreno_atual = None
+            localizacao_tipo, localizacao = "externo", loc.LOCAL_EXTERNO
+        else:
+            terreno_atual = localizacao_tipo = localizacao = None
+
+        resultado.append(
+            LocalizacaoAtual(
+                animal_id=loc.ID_ANIMAL,
+                animal_nome=animal_nome,
+                terreno_atual=terreno_atual,
+                local_externo=loc.LOCAL_EXTERNO,
+                data_ultima_movimentacao=loc.DATA_MOVIMENTACAO,
+                tipo_ultima_movimentacao=loc.TIPO_MOVIMENTACAO,
+                localizacao_tipo=localizacao_tipo,
+                localizacao=localizacao,
+            )
+        )
+    return resultado
+
+
+def ocupacao_por_terreno(*filtros_terreno):
+    """SELECT de (ID_TERRENO, quantidade de animais ativos) por terreno"""
+    return (
+        select(LocalizacaoAtualAnimal.ID_TERRENO, func.count())
+        .join(Animal, Animal.ID == LocalizacaoAtualAnimal.ID_ANIMAL)
+        .filter(
+            LocalizacaoAtualAnimal.ID_TERRENO.isnot(None),
+            Animal.STATUS_ANIMAL == "ATIVO",
+            *filtros_terreno,
+        )
+        .group_by(LocalizacaoAtualAnimal.ID_TERRENO)
+    )
+
+
+# === VERIFICAÇÃO / RECONSTRUÇÃO ===
+
+
+def verificar_localizacoes(db: Session) -> int:
+    """Quantidade de animais cuja linha diverge do histórico de movimentações"""
+    esperadas = {tuple(linha) for linha in db.execute(_ultimas_movimentacoes())}
+    atuais = {tuple(linha) for linha in db.execute(select(*_COLUNAS))}
+    divergentes = {linha[0] for linha in esperadas ^ atuais}
+    return len(divergentes)
+
+
+def reconstruir_localizacoes(db: Session) -> int:
+    """Recria a tabela inteira a partir do histórico; retorna as linhas geradas"""
+    db.execute(delete(LocalizacaoAtualAnimal))
+    resultado = db.execute(
+        insert(LocalizacaoAtualAnimal).from_select(
+            [coluna.key for coluna in _COLUNAS], _ultimas_movimentacoes()
+        )
+    )
+    db.commit()
+    return resultado.rowcount
+
+
+if __name__ == "__main__":
+    from app.core.database import SessionLocal
+
+    parser = argparse.ArgumentParser(
+        description="Verifica/reconstrói a localização atual dos animais"
+    )
+    parser.add_argument(
+        "--verificar",
+        action="store_true",
+        help="Apenas contar divergências, sem alterar a tabela",
+    )
+    args = parser.parse_args()
+
+    with SessionLocal() as sessao:
+        divergencias = verificar_localizacoes(sessao)
+        print(f"Animais com localização divergente: {divergencias}")
+        if not args.verificar:
+            linhas = reconstruir_localizacoes(sessao)
+            print(f"Localizações reconstruídas: {linhas} linhas")
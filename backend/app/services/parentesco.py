@@ -0,0 +1,221 @@
+"""
+Coeficientes de parentesco (kinship) e de consanguinidade de Wright.
+
+O pedigree do rebanho inteiro (ID, ID_PAI, ID_MAE) é carregado com uma query
+e indexado em arrays em ordem topológica (pais antes dos filhos). Sobre essa
+estrutura:
+
+- a consanguinidade F de cada animal é calculada sob demanda pelo algoritmo
+  de Meuwissen & Luo (1992) e memoizada enquanto o pedigree não muda;
+- o parentesco de um animal com todo o rebanho (uma linha da matriz de
+  parentesco) sai em tempo linear pelo método de Colleau (2002), usando a
+  decomposição A = T·D·T' da matriz de parentesco aditivo.
+
+Assim a ordenação dos garanhões para uma égua custa uma passada pelo
+rebanho, e não uma recursão por par. A consanguinidade de um potro é o
+parentesco entre a égua e o garanhão.
+
+Filiações que formariam ciclo são desconsideradas na indexação.
+"""
+
+import heapq
+import math
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.core.cache import CacheTTL
+from app.core.config import settings
+from app.models.animal import Animal
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+SEM_PAI = -1
+
+
+class Pedigree:
+    """Pedigree do rebanho em arrays indexados por ordem topológica"""
+
+    def __init__(self, registros: Iterable[Tuple[int, Optional[int], Optional[int]]]):
+        filiacao = {id: (pai, mae) for id, pai, mae in registros}
+        ordem = _ordem_topologica(filiacao)
+
+        self.indice: Dict[int, int] = {id: i for i, id in enumerate(ordem)}
+        self.ids = array("q", ordem)
+        self.pai = array("i", [SEM_PAI]) * len(ordem)
+        self.mae = array("i", [SEM_PAI]) * len(ordem)
+
+        for i, id in enumerate(ordem):
+            pai, mae = filiacao[id]
+            # Pais sempre têm índice menor; o contrário indica ciclo
+            self.pai[i] = self._indice_pai(pai, i)
+            self.mae[i] = self._indice_pai(mae, i)
+
+        # Consanguinidade memoizada (NaN = ainda não calculada)
+        self._f = array("d", [math.nan]) * len(ordem)
+
+    def _indice_pai(self, id_pai: Optional[int], i: int) -> int:
+        indice = self.indice.get(id_pai, SEM_PAI) if id_pai else SEM_PAI
+        return indice if indice < i else SEM_PAI
+
+    def __len__(self):
+        return len(self.ids)
+
+    # === Consanguinidade (Meuwissen & Luo) ===
+
+    def _ancestrais(self, i: int) -> List[int]:
+        """Índices do animal e de todos os seus ancestrais, em ordem crescente"""
+        vistos = {i}
+        pilha = [i]
+        while pilha:
+            j = pilha.pop()
+            for p in (self.pai[j], self.mae[j]):
+                if p != SEM_PAI and p not in vistos:
+                    vistos.add(p)
+                    pilha.append(p)
+        return sorted(vistos)
+
+    def _d(self, j: int) -> float:
+        """Variância mendeliana de j (diagonal de D); pai desconhecido vale F=-1"""
+        f_pai = self._f[self.pai[j]] if self.pai[j] != SEM_PAI else -1.0
+        f_mae = self._f[self.mae[j]] if self.mae[j] != SEM_PAI else -1.0
+        return 0.5 - 0.25 * (f_pai + f_mae)
+
+    def _calcular_f(self, i: int) -> float:
+        # A[i,i] = soma de L[j]² · d[j] sobre i e seus ancestrais, com L = linha
+        # i de T; percorrer do mais novo ao mais velho fecha cada L[j] antes do uso
+        contribuicao = {i: 1.0}
+        fila = [-i]
+        diagonal = 0.0
+        while fila:
+            j = -heapq.heappop(fila)
+            l_j = contribuicao[j]
+            diagonal += l_j * l_j * self._d(j)
+            for p in (self.pai[j], self.mae[j]):
+                if p == SEM_PAI:
+                    continue
+                if p not in contribuicao:
+                    contribuicao[p] = 0.0
+                    heapq.heappush(fila, -p)
+                contribuicao[p] += 0.5 * l_j
+        return diagonal - 1.0
+
+    def _garantir_f(self, i: int):
+        """Calcula F de i e de todos os seus ancestrais que ainda não têm"""
+        if not math.isnan(self._f[i]):
+            return
+        for j in self._ancestrais(i):
+            if math.isnan(self._f[j]):
+                self._f[j] = self._calcular_f(j)
+
+    def consanguinidade(self, id: int) -> float:
+        """Coeficiente de consanguinidade (Wright) do animal"""
+        i = self.indice.get(id)
+        if i is None:
+            return 0.0
+        self._garantir_f(i)
+        return self._f[i]
+
+    # === Parentesco (Colleau) ===
+
+    def _linha(self, i: int) -> array:
+        """Parentesco aditivo A[i, x] de i com todos os animais (x = índice)"""
+        self._garantir_f(i)
+
+        # u = T'·e_i: contribuição de cada ancestral (do mais novo ao mais velho)
+        u: Dict[int, float] = {}
+        for j in reversed(self._ancestrais(i)):
+            u[j] = u.get(j, 0.0) + (1.0 if j == i else 0.0)
+            for p in (self.pai[j], self.mae[j]):
+                if p != SEM_PAI:
+                    u[p] = u.get(p, 0.0) + 0.5 * u[j]
+
+        # w = T·(D·u): propaga dos mais velhos para os mais novos
+        n = len(self.ids)
+        w = array("d", bytes(8 * n))
+        inicio = min(u)
+        for x in range(inicio, n):
+            valor = u[x] * self._d(x) if x in u else 0.0
+            p, m = self.pai[x], self.mae[x]
+            if p != SEM_PAI:
+                valor += 0.5 * w[p]
+            if m != SEM_PAI:
+                valor += 0.5 * w[m]
+            w[x] = valor
+        return w
+
+    def parentesco_com_todos(self, id: int) -> Dict[int, float]:
+        """Coeficiente de parentesco do animal com cada animal do rebanho"""
+        i = self.indice.get(id)
+        if i is None:
+            return {}
+        linha = self._linha(i)
+        return {self.ids[x]: linha[x] / 2 for x in range(len(linha)) if linha[x]}
+
+    def parentesco(self, id_a: int, id_b: int) -> float:
+        """Coeficiente de parentesco entre dois animais (0 se desconhecidos)"""
+        i, j = self.indice.get(id_a), self.indice.get(id_b)
+        if i is None or j is None:
+            return 0.0
+        # A linha do mais novo só percorre o rebanho a partir de seus ancestrais
+        return self._linha(max(i, j))[min(i, j)] / 2
+
+    def matriz(
+        self, eguas: Iterable[int], garanhoes: Iterable[int]
+    ) -> Dict[Tuple[int, int], float]:
+        """Consanguinidade do potro para todos os pares égua × garanhão"""
+        garanhoes = list(garanhoes)
+        resultado = {}
+        for egua in eguas:
+            i = self.indice.get(egua)
+            linha = self._linha(i) if i is not None else None
+            for garanhao in garanhoes:
+                j = self.indice.get(garanhao)
+                resultado[(egua, garanhao)] = (
+                    linha[j] / 2 if linha is not None and j is not None else 0.0
+                )
+        return resultado
+
+
+def _ordem_topologica(
+    filiacao: Dict[int, Tuple[Optional[int], Optional[int]]]
+) -> List[int]:
+    """IDs com os pais antes dos filhos (DFS pós-ordem iterativa)"""
+    ordem: List[int] = []
+    visitados = set()
+    for raiz in filiacao:
+        pilha = [(raiz, False)]
+        while pilha:
+            id, expandido = pilha.pop()
+            if expandido:
+                ordem.append(id)
+                continue
+            if id in visitados:
+                continue
+            visitados.add(id)
+            pilha.append((id, True))
+            for pai in filiacao[id]:
+                if pai in filiacao and pai not in visitados:
+                    pilha.append((pai, False))
+    return ordem
+
+
+# Pedigree do rebanho; recarregado quando alguma filiação muda ou animais
+# são incluídos/excluídos. Após uma alteração a consulta aguarda a recarga
+# (coeficientes não podem refletir a filiação antiga)
+pedigree_cache = CacheTTL(
+    "pedigree",
+    ttl=settings.GENEALOGIA_CACHE_TTL,
+    tabelas=["ANIMAIS.ID_PAI", "ANIMAIS.ID_MAE"],
+    max_entradas=1,
+    servir_invalidadas=False,
+)
+
+
+async def _carregar(db: AsyncSession) -> Pedigree:
+    registros = await db.execute(select(Animal.ID, Animal.ID_PAI, Animal.ID_MAE))
+    return Pedigree(registros.all())
+
+
+async def obter_pedigree(db: AsyncSession) -> Pedigree:
+    """Pedigree do rebanho inteiro (em cache)"""
+    return await pedigree_cache.obter("rebanho", _carregar, db)
@@ -0,0 +1,428 @@
+"""
+Planejamento de rotação de pastagem.
+
+Distribui os grupos de animais pelos piquetes, semana a semana, ao longo do
+horizonte pedido, respeitando:
+
+- capacidade: CAPACIDADE_ANIMAIS do terreno ou, na falta dela,
+  AREA_HECTARES x lotação por hectare; um grupo por piquete;
+- carência: nenhum animal no piquete entre DATA_APLICACAO e DATA_LIBERACAO
+  de MANEJO_TERRENOS (inclusive aplicações já programadas);
+- ocupação máxima: o grupo deixa o piquete após `dias_ocupacao_maxima`;
+- descanso: o piquete só recebe outro grupo `dias_descanso_minimo` dias após
+  a última saída.
+
+A cada semana os grupos são alocados do mais restrito (menos piquetes
+possíveis) para o menos restrito. Permanecer no piquete atual, quando
+permitido, não gera movimentação; ao mudar, o piquete escolhido é o de
+melhor aproveitamento da capacidade, mais tempo de descanso e mais próximo
+do atual. Quando nenhuma opção atende às regras, o grupo permanece onde está
+e a alocação sai com alerta.
+
+Os dados vêm de quatro consultas (terrenos, carências, localização atual e
+última saída de cada terreno); o planejamento em si é feito em memória.
+As movimentações do plano saem agrupadas por semana, origem e destino.
+"""
+
+import math
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from app.models.animal import Animal
+from app.models.manejo import ManejoTerrenos
+from app.models.movimentacao import LocalizacaoAtualAnimal, MovimentacaoAnimais
+from app.models.terreno import Terreno
+from app.schemas.terreno import (
+    AlocacaoRotacao,
+    GrupoRotacao,
+    MovimentacaoRotacao,
+    PlanoRotacaoRequest,
+    PlanoRotacaoResponse,
+    SemanaRotacao,
+)
+from app.services.geoespacial import distancia_m
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+DIAS_SEMANA = 7
+STATUS_ROTACAO = ("DISPONIVEL", "OCUPADO")
+# Descanso considerado para piquetes sem saída registrada
+DESCANSO_SEM_HISTORICO = 90
+
+
+@dataclass
+class Piquete:
+    id: int
+    nome: str
+    capacidade: int
+    latitude: float
+    longitude: float
+    # Intervalos [aplicação, liberação) sem animais
+    carencias: List[Tuple[date, date]] = field(default_factory=list)
+    ultima_saida: Optional[date] = None
+
+    def em_carencia(self, inicio: date, fim: date) -> bool:
+        return any(ap < fim and lib > inicio for ap, lib in self.carencias)
+
+    def descanso(self, dia: date) -> int:
+        if self.ultima_saida is None:
+            return DESCANSO_SEM_HISTORICO
+        return (dia - self.ultima_saida).days
+
+
+@dataclass
+class Grupo:
+    nome: str
+    # Animal -> terreno atual (None: fora de terreno / sem movimentação)
+    animais: Dict[int, Optional[int]]
+    # Terreno do grupo inteiro (None quando os animais estão espalhados)
+    terreno: Optional[int] = None
+    desde: Optional[date] = None
+
+    @property
+    def tamanho(self) -> int:
+        return len(self.animais)
+
+
+def _dia(valor) -> Optional[date]:
+    if valor is None:
+        return None
+    return valor.date() if isinstance(valor, datetime) else valor
+
+
+def _dividir_grupo(grupo: Grupo, limite: int) -> List[Grupo]:
+    """Divide o grupo maior que o maior piquete em partes equilibradas"""
+    partes = math.ceil(grupo.tamanho / limite)
+    ids = sorted(grupo.animais)
+    tamanho = math.ceil(len(ids) / partes)
+    return [
+        Grupo(
+            nome=f"{grupo.nome} ({i + 1}/{partes})",
+            animais={a: grupo.animais[a] for a in ids[i * tamanho : (i + 1) * tamanho]},
+            terreno=grupo.terreno,
+            desde=grupo.desde,
+        )
+        for i in range(partes)
+    ]
+
+
+def _custo(grupo: Grupo, piquete: Piquete, piquetes, dia: date) -> float:
+    if piquete.id == grupo.terreno:
+        return 0.0
+    custo = 1.0 + (piquete.capacidade - grupo.tamanho) / piquete.capacidade
+    custo -= min(piquete.descanso(dia), DESCANSO_SEM_HISTORICO) / (
+        2 * DESCANSO_SEM_HISTORICO
+    )
+    atual = piquetes.get(grupo.terreno)
+    if atual is not None:
+        custo += (
+            distancia_m(
+                atual.latitude, atual.longitude, piquete.latitude, piquete.longitude
+            )
+            / 10000
+        )
+    return custo
+
+
+def planejar_rotacao(
+    piquetes: Dict[int, Piquete],
+    grupos: List[Grupo],
+    data_inicio: date,
+    semanas: int,
+    dias_ocupacao_maxima: int,
+    dias_descanso_minimo: int,
+    ocupados_fora_do_plano: Optional[set] = None,
+    nomes_terrenos: Optional[Dict[int, str]] = None,
+) -> PlanoRotacaoResponse:
+    """Plano semanal (em memória) a partir dos piquetes e grupos informados"""
+    ocupados_fora_do_plano = ocupados_fora_do_plano or set()
+    nomes_terrenos = nomes_terrenos or {p.id: p.nome for p in piquetes.values()}
+    alertas = []
+
+    maior_capacidade = max((p.capacidade for p in piquetes.values()), default=0)
+    if maior_capacidade == 0:
+        alertas.append("Nenhum piquete com capacidade disponível para rotação")
+    divididos = []
+    for grupo in grupos:
+        if maior_capacidade and grupo.tamanho > maior_capacidade:
+            partes = _dividir_grupo(grupo, maior_capacidade)
+            alertas.append(
+                f"{grupo.nome}: {grupo.tamanho} animais excedem o maior piquete "
+                f"({maior_capacidade}); dividido em {len(partes)} grupos"
+            )
+            divididos.extend(partes)
+        else:
+            divididos.append(grupo)
+    grupos = divididos
+
+    resumo = [
+        GrupoRotacao(nome=g.nome, animais=sorted(g.animais), terreno_atual_id=g.terreno)
+        for g in grupos
+    ]
+    for grupo in grupos:
+        if grupo.desde is None:
+            grupo.desde = data_inicio
+
+    periodos = []
+    movimentacoes = []
+    for semana in range(1, semanas + 1):
+        inicio = data_inicio + timedelta(days=(semana - 1) * DIAS_SEMANA)
+        fim = inicio + timedelta(days=DIAS_SEMANA)
+        ocupados = ocupados_fora_do_plano | {g.terreno for g in grupos}
+
+        # Piquetes possíveis para cada grupo nesta semana
+        possiveis = {}
+        for indice, grupo in enumerate(grupos):
+            opcoes = []
+            for piquete in piquetes.values():
+                if piquete.capacidade < grupo.tamanho or piquete.em_carencia(
+                    inicio, fim
+                ):
+                    continue
+                if piquete.id == grupo.terreno:
+                    if (fim - grupo.desde).days <= dias_ocupacao_maxima:
+                        opcoes.append(piquete)
+                elif (
+                    piquete.id not in ocupados
+                    and piquete.descanso(inicio) >= dias_descanso_minimo
+                ):
+                    opcoes.append(piquete)
+            possiveis[indice] = opcoes
+
+        tomados = set()
+        alocacoes = {}
+        pendentes = set(range(len(grupos)))
+        while pendentes:
+            livres = {
+                i: [p for p in possiveis[i] if p.id not in tomados] for i in pendentes
+            }
+            indice = min(
+                pendentes,
+                key=lambda i: (len(livres[i]), -grupos[i].tamanho, grupos[i].nome),
+            )
+            pendentes.discard(indice)
+            grupo = grupos[indice]
+
+            alerta = None
+            if livres[indice]:
+                escolhido = min(
+                    livres[indice],
+                    key=lambda p: (_custo(grupo, p, piquetes, inicio), p.id),
+                )
+                destino = escolhido.id
+            else:
+                destino = grupo.terreno
+                atual = piquetes.get(grupo.terreno)
+                if destino is None:
+                    alerta = "Nenhum piquete disponível; grupo sem alocação"
+                elif atual is not None and atual.em_carencia(inicio, fim):
+                    alerta = (
+                        "Nenhum piquete disponível; permanece em terreno em carência"
+                    )
+                else:
+                    alerta = "Nenhum piquete descansado disponível; ocupação prolongada"
+            if destino is not None:
+                tomados.add(destino)
+            alocacoes[indice] = (destino, alerta)
+
+        linhas = []
+        for indice, grupo in enumerate(grupos):
+            destino, alerta = alocacoes[indice]
+            permanece = destino == grupo.terreno
+            if not permanece:
+                por_origem = defaultdict(list)
+                for animal, origem in grupo.animais.items():
+                    # Grupo dividido: animais já no destino não se movem
+                    if origem != destino:
+                        por_origem[origem].append(animal)
+                for origem, animais in sorted(
+                    por_origem.items(), key=lambda item: (item[0] is None, item[0])
+                ):
+                    movimentacoes.append(
+                        MovimentacaoRotacao(
+                            semana=semana,
+                            data=inicio,
+                            grupo=grupo.nome,
+                            id_terreno_origem=origem,
+                            id_terreno_destino=destino,
+                            animais=sorted(animais),
+                        )
+                    )
+                    if origem in piquetes:
+                        piquetes[origem].ultima_saida = inicio
+                grupo.animais = dict.fromkeys(grupo.animais, destino)
+                grupo.terreno = destino
+                grupo.desde = inicio
+
+            piquete = piquetes.get(destino)
+            linhas.append(
+                AlocacaoRotacao(
+                    grupo=grupo.nome,
+                    terreno_id=destino,
+                    terreno_nome=nomes_terrenos.get(destino),
+                    animais=grupo.tamanho,
+                    capacidade=piquete.capacidade if piquete else None,
+                    taxa_ocupacao=(
+                        round(grupo.tamanho / piquete.capacidade * 100, 1)
+                        if piquete
+                        else None
+                    ),
+                    permanece=permanece,
+                    alerta=alerta,
+                )
+            )
+
+        periodos.append(
+            SemanaRotacao(
+                semana=semana,
+                data_inicio=inicio,
+                data_fim=fim - timedelta(days=1),
+                alocacoes=linhas,
+            )
+        )
+
+    return PlanoRotacaoResponse(
+        data_inicio=data_inicio,
+        semanas=semanas,
+        grupos=resumo,
+        periodos=periodos,
+        movimentacoes=movimentacoes,
+        alertas=alertas,
+    )
+
+
+async def plano_rotacao(
+    db: AsyncSession, parametros: PlanoRotacaoRequest
+) -> PlanoRotacaoResponse:
+    """Carrega terrenos, carências e localizações e monta o plano"""
+    data_inicio = parametros.data_inicio or date.today()
+    inicio = datetime.combine(data_inicio, datetime.min.time())
+    fim = inicio + timedelta(days=parametros.semanas * DIAS_SEMANA)
+
+    terrenos = (await db.scalars(select(Terreno))).all()
+    nomes = {t.ID: t.NOME for t in terrenos}
+    piquetes = {}
+    for terreno in terrenos:
+        if parametros.terrenos is not None:
+            if terreno.ID not in parametros.terrenos:
+                continue
+        elif terreno.STATUS_TERRENO not in STATUS_ROTACAO:
+            continue
+        capacidade = terreno.CAPACIDADE_ANIMAIS or int(
+            terreno.AREA_HECTARES * parametros.lotacao_por_hectare
+        )
+        if capacidade > 0:
+            piquetes[terreno.ID] = Piquete(
+                id=terreno.ID,
+                nome=terreno.NOME,
+                capacidade=capacidade,
+                latitude=terreno.LATITUDE,
+                longitude=terreno.LONGITUDE,
+            )
+
+    carencias = await db.execute(
+        select(
+            ManejoTerrenos.ID_TERRENO,
+            ManejoTerrenos.DATA_APLICACAO,
+            ManejoTerrenos.DATA_LIBERACAO,
+        ).filter(
+            ManejoTerrenos.DATA_LIBERACAO > inicio,
+            ManejoTerrenos.DATA_APLICACAO < fim,
+        )
+    )
+    for id_terreno, aplicacao, liberacao in carencias:
+        if id_terreno in piquetes:
+            # Liberação com horário: o dia inteiro ainda é de carência
+            liberado = _dia(liberacao)
+            if liberacao.time() != datetime.min.time():
+                liberado += timedelta(days=1)
+            piquetes[id_terreno].carencias.append((_dia(aplicacao), liberado))
+
+    saidas = await db.execute(
+        select(
+            MovimentacaoAnimais.ID_TERRENO_ORIGEM,
+            func.max(MovimentacaoAnimais.DATA_MOVIMENTACAO),
+        )
+        .filter(MovimentacaoAnimais.ID_TERRENO_ORIGEM.isnot(None))
+        .group_by(MovimentacaoAnimais.ID_TERRENO_ORIGEM)
+    )
+    for id_terreno, data in saidas:
+        if id_terreno in piquetes:
+            piquetes[id_terreno].ultima_saida = _dia(data)
+
+    localizacoes = {
+        id_animal: (id_terreno, _dia(data))
+        for id_animal, id_terreno, data in await db.execute(
+            select(
+                LocalizacaoAtualAnimal.ID_ANIMAL,
+                LocalizacaoAtualAnimal.ID_TERRENO,
+                LocalizacaoAtualAnimal.DATA_MOVIMENTACAO,
+            )
+            .join(Animal, Animal.ID == LocalizacaoAtualAnimal.ID_ANIMAL)
+            .filter(Animal.STATUS_ANIMAL == "ATIVO")
+        )
+    }
+
+    alertas = []
+    if parametros.grupos:
+        grupos = []
+        for entrada in parametros.grupos:
+            animais = {}
+            for id_animal in entrada.animais:
+                if id_animal in localizacoes:
+                    animais[id_animal] = localizacoes[id_animal][0]
+                else:
+                    alertas.append(
+                        f"{entrada.nome}: animal {id_animal} inativo ou sem "
+                        "movimentação; fora do plano"
+                    )
+            if not animais:
+                continue
+            origens = set(animais.values())
+            datas = [localizacoes[a][1] for a in animais]
+            grupos.append(
+                Grupo(
+                    nome=entrada.nome,
+                    animais=animais,
+                    terreno=origens.pop() if len(origens) == 1 else None,
+                    desde=min(datas),
+                )
+            )
+        planejados = {a for g in grupos for a in g.animais}
+    else:
+        por_terreno = defaultdict(dict)
+        for id_animal, (id_terreno, _) in localizacoes.items():
+            if id_terreno is not None:
+                por_terreno[id_terreno][id_animal] = id_terreno
+        grupos = [
+            Grupo(
+                nome=f"Grupo {nomes.get(id_terreno, id_terreno)}",
+                animais=animais,
+                terreno=id_terreno,
+                desde=min(localizacoes[a][1] for a in animais),
+            )
+            for id_terreno, animais in sorted(por_terreno.items())
+        ]
+        planejados = set(localizacoes)
+
+    # Piquetes com animais que não entram no plano continuam ocupados
+    ocupados = {
+        id_terreno
+        for id_animal, (id_terreno, _) in localizacoes.items()
+        if id_terreno is not None and id_animal not in planejados
+    }
+
+    plano = planejar_rotacao(
+        piquetes,
+        grupos,
+        data_inicio,
+        parametros.semanas,
+        parametros.dias_ocupacao_maxima,
+        parametros.dias_descanso_minimo,
+        ocupados_fora_do_plano=ocupados,
+        nomes_terrenos=nomes,
+    )
+    plano.alertas = alertas + plano.alertas
+    return plano
@@ -0,0 +1,122 @@
+"""
+Benchmark de carga concorrente da API (tráfego misto de listagens e relatórios).
+
+Uso (comparar antes/depois subindo duas instâncias da API):
+
+    python benchmarks/carga_concorrente.py \\
+        --alvo antes=http://localhost:8000 \\
+        --alvo depois=http://localhost:8001 \\
+        --token <JWT> --concorrencia 32 --requisicoes 500
+
+O token pode ser informado também pela variável de ambiente HARAS_TOKEN.
+Usa apenas a biblioteca padrão para não depender do ambiente da API.
+"""
+
+import argparse
+import itertools
+import os
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+# Rotas de listagem (leves) e relatórios (pesados) intercaladas
+ROTAS_PADRAO = [
+    "/api/animais/?limit=50",
+    "/api/dashboard/",
+    "/api/terrenos/?limit=50",
+    "/api/saude/?limit=50",
+    "/api/racao/fornecimento?limit=50",
+    "/api/saude/estatisticas/geral",
+    "/api/movimentacoes/relatorio/localizacoes",
+    "/api/movimentacoes/?limit=50",
+    "/api/medicamentos/?limit=50",
+]
+
+
+def _requisitar(url: str, token: str, timeout: float):
+    """Executa um GET e retorna (latência em segundos, status HTTP)"""
+    req = urllib.request.Request(url, headers={"Authorization": f"Bearer {token}"})
+    inicio = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            resp.read()
+            status = resp.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except (urllib.error.URLError, TimeoutError):
+        status = 0
+    return time.perf_counter() - inicio, status
+
+
+def _percentil(valores, p: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    idx = min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[idx]
+
+
+def executar(base_url: str, token: str, rotas, concorrencia: int, total: int, timeout):
+    """Dispara `total` requisições com `concorrencia` clientes simultâneos"""
+    urls = [base_url.rstrip("/") + rota for rota in rotas]
+    ciclo = itertools.islice(itertools.cycle(urls), total)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concorrencia) as pool:
+        resultados = list(pool.map(lambda u: _requisitar(u, token, timeout), ciclo))
+    duracao = time.perf_counter() - inicio
+
+    latencias = [lat for lat, status in resultados if 200 <= status < 300]
+    erros = len(resultados) - len(latencias)
+
+    return {
+        "requisicoes": len(resultados),
+        "erros": erros,
+        "duracao": duracao,
+        "req_s": len(resultados) / duracao if duracao else 0.0,
+        "p50_ms": _percentil(latencias, 50) * 1000,
+        "p95_ms": _percentil(latencias, 95) * 1000,
+        "media_ms": (statistics.mean(latencias) * 1000) if latencias else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--alvo",
+        action="append",
+        required=True,
+        help="rotulo=url_base (pode ser repetido, ex.: antes=... depois=...)",
+    )
+    parser.add_argument("--token", default=os.environ.get("HARAS_TOKEN", ""))
+    parser.add_argument("--concorrencia", type=int, default=32)
+    parser.add_argument("--requisicoes", type=int, default=500)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument(
+        "--rota",
+        action="append",
+        help="Rota a incluir no tráfego (padrão: listagens + relatórios)",
+    )
+    args = parser.parse_args()
+
+    rotas = args.rota or ROTAS_PADRAO
+
+    print(
+        f"{'alvo':<10} {'req':>6} {'erros':>6} {'req/s':>8} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'média ms':>9}"
+    )
+    for alvo in args.alvo:
+        rotulo, _, url = alvo.partition("=") if "=" in alvo else (alvo, "", alvo)
+        r = executar(
+            url, args.token, rotas, args.concorrencia, args.requisicoes, args.timeout
+        )
+        print(
+            f"{rotulo:<10} {r['requisicoes']:>6} {r['erros']:>6} {r['req_s']:>8.1f} "
+            f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['media_ms']:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
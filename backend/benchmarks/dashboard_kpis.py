@@ -0,0 +1,99 @@
+"""
+Mede a latência do bloco de KPIs do dashboard: consultas seriais (uma por KPI,
+como era feito) versus o SELECT único de `_kpis_query`.
+
+Uso (a partir de backend/, com o .env apontando para o banco de teste):
+
+    python -m benchmarks.dashboard_kpis --iteracoes 50 \\
+        --seed-animais 5000 --usuario-id 1
+
+Com --seed-animais os registros sintéticos (animais e registros de saúde) são
+inseridos na mesma transação e descartados com rollback ao final.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from app.api.v1.dashboard import _kpis_query
+from app.core.database import AsyncSessionLocal
+from app.models.animal import Animal
+from app.models.saude import SaudeAnimais
+from sqlalchemy import insert, select
+
+
+async def _semear(db, quantidade: int, usuario_id: int):
+    agora = datetime.now()
+    await db.execute(
+        insert(Animal),
+        [
+            {
+                "NOME": f"BENCH-{i}",
+                "STATUS_ANIMAL": "ATIVO",
+                "PROPRIETARIO": f"Proprietário {i % 20}",
+                "ID_USUARIO_CADASTRO": usuario_id,
+            }
+            for i in range(quantidade)
+        ],
+    )
+    ids = (
+        await db.scalars(select(Animal.ID).filter(Animal.NOME.like("BENCH-%")))
+    ).all()
+    await db.execute(
+        insert(SaudeAnimais),
+        [
+            {
+                "ID_ANIMAL": animal_id,
+                "TIPO_REGISTRO": "VACINA",
+                "DATA_OCORRENCIA": agora - timedelta(days=i % 365),
+                "PROXIMA_APLICACAO": agora + timedelta(days=i % 30),
+            }
+            for i, animal_id in enumerate(ids)
+            for _ in range(3)
+        ],
+    )
+
+
+async def _serial(db):
+    # Reproduz o comportamento anterior: uma ida ao banco por KPI
+    return [await db.scalar(select(kpi)) for kpi in _kpis_query().selected_columns]
+
+
+async def _unico(db):
+    return (await db.execute(_kpis_query())).one()
+
+
+async def _medir(db, funcao, iteracoes: int):
+    await funcao(db)  # aquecimento
+    tempos = []
+    for _ in range(iteracoes):
+        inicio = time.perf_counter()
+        await funcao(db)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    tempos.sort()
+    return statistics.median(tempos), tempos[int(len(tempos) * 0.95) - 1]
+
+
+async def main(iteracoes: int, seed_animais: int, usuario_id: int):
+    async with AsyncSessionLocal() as db:
+        try:
+            if seed_animais:
+                await _semear(db, seed_animais, usuario_id)
+
+            for nome, funcao in (("serial", _serial), ("único", _unico)):
+                p50, p95 = await _medir(db, funcao, iteracoes)
+                print(f"{nome:<8} p50={p50:8.2f} ms  p95={p95:8.2f} ms")
+        finally:
+            await db.rollback()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latência dos KPIs do dashboard")
+    parser.add_argument("--iteracoes", type=int, default=50)
+    parser.add_argument("--seed-animais", type=int, default=0)
+    parser.add_argument("--usuario-id", type=int, default=1)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.iteracoes, args.seed_animais, args.usuario_id))
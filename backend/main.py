@@ -12,12 +12,35 @@ from app.api.v1.racao import router as racao_router
 from app.api.v1.reproducao import router as reproducao_router
 from app.api.v1.saude import router as saude_router
 from app.api.v1.terreno import router as terreno_router
+from app.core.query_monitor import QueryMonitorMiddleware
+from app.core.uploads import ArquivosUpload
+from app.services.busca import carregar_indices_busca
+from app.services.imagens import encerrar_pool
+from app.services.custos import registrar_manutencao_custos
+from app.services.ocupacao import registrar_manutencao_ocupacao
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 
 app = FastAPI(title="Haras System API")
 
+# Consolidado de custos atualizado a cada escrita de ração/saúde/manejo
+registrar_manutencao_custos()
+# Localização atual dos animais atualizada a cada movimentação
+registrar_manutencao_ocupacao()
+
+
+@app.on_event("startup")
+async def carregar_indices():
+    # Índices de autocomplete em memória (nomes, registros, chips)
+    await carregar_indices_busca()
+
+
+@app.on_event("shutdown")
+async def encerrar_workers():
+    # Pool de processos das variantes de fotos
+    encerrar_pool()
+
+
 # Configurar o CORS
 origins = ["http://localhost:9000"]
 
@@ -27,12 +50,23 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        "Server-Timing",
+        "X-DB-Queries",
+        "X-Proximo-Cursor",
+        "ETag",
+        "Content-Disposition",
+    ],
 )
 
-# Servir arquivos estáticos (uploads)
+# Contagem de queries/tempo de banco por requisição
+app.add_middleware(QueryMonitorMiddleware)
+
+# Servir arquivos estáticos (uploads); os endereçados por conteúdo com
+# cache imutável
 upload_dir = Path("uploads")
 upload_dir.mkdir(exist_ok=True)
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+app.mount("/uploads", ArquivosUpload(directory="uploads"), name="uploads")
 
 app.include_router(auth_router)
 app.include_router(terreno_router)
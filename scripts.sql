@@ -145,6 +145,9 @@ create table terrenos (
    data_cadastro       date default sysdate
 );
 
+-- Contorno do terreno (também para bancos existentes)
+alter table terrenos add limites clob check ( limites is json );
+
 
 create table historico_crescimento (
    id                      number
@@ -191,6 +194,22 @@ create table movimentacoes_animais (
           or destino_externo is not null )
 );
 
+-- Localização atual de cada animal (destino da última movimentação)
+-- (mantida pela aplicação - app/services/ocupacao.py)
+create table localizacao_atual_animais (
+   id_animal          number primary key
+      references animais ( id )
+         on delete cascade,
+   id_movimentacao    number not null
+      references movimentacoes_animais ( id )
+         on delete cascade,
+   id_terreno         number
+      references terrenos ( id ),
+   local_externo      varchar2(100),
+   tipo_movimentacao  varchar2(50) not null,
+   data_movimentacao  date not null
+);
+
 create table reproducao (
    id                    number
       generated always as identity
@@ -687,6 +706,53 @@ create table fornecimento_racao_animal (
    data_registro           date default sysdate
 );
 
+-- Consolidado de custos por proprietário/animal/categoria/dia
+-- (mantido pela aplicação - app/services/custos.py)
+create table custos_proprietario_diario (
+   id                   number
+      generated always as identity
+   primary key,
+   proprietario         varchar2(200), -- nulo: manejo sem animais no terreno
+   id_animal            number
+      references animais ( id ),
+   categoria            varchar2(20) not null check ( categoria in ( 'MEDICAMENTOS',
+                                                           'RACAO',
+                                                           'MANEJO' ) ),
+   data_referencia      date not null,
+   valor                number(14,2) default 0 not null,
+   quantidade_registros number default 0 not null,
+   data_atualizacao     date default sysdate
+);
+
+-- Lançamentos de custo por registro de origem (ração, saúde, manejo), base
+-- do consolidado: alterações/exclusões estornam exatamente o que foi lançado
+-- (bancos existentes: popular com python -m app.services.custos)
+create table custos_lancamentos (
+   categoria       varchar2(20) not null check ( categoria in ( 'MEDICAMENTOS',
+                                                      'RACAO',
+                                                      'MANEJO' ) ),
+   id_origem       number not null, -- ID em SAUDE_ANIMAIS / FORNECIMENTO_RACAO_ANIMAL / MANEJO_TERRENOS
+   proprietario    varchar2(200),
+   id_animal       number
+      references animais ( id ),
+   data_referencia date not null,
+   valor           number(14,2) not null
+);
+
+-- Série mensal de custos por categoria (gráfico do dashboard)
+-- (mantida pela aplicação junto com custos_proprietario_diario)
+create table custos_categoria_mensal (
+   mes                  date not null, -- primeiro dia do mês
+   categoria            varchar2(20) not null check ( categoria in ( 'MEDICAMENTOS',
+                                                           'RACAO',
+                                                           'MANEJO' ) ),
+   valor                number(14,2) default 0 not null,
+   quantidade_registros number default 0 not null,
+   data_atualizacao     date default sysdate,
+   constraint pk_custos_categoria_mensal primary key ( mes,
+                                                       categoria )
+);
+
 -- ========================================
 -- Comments
 -- ========================================
@@ -786,6 +852,16 @@ comment on column ferrageamento_animais.status_casco is
    'Condição geral do casco: BOM, REGULAR, RUIM, PROBLEMA';
 comment on column ferrageamento_animais.proxima_avaliacao is
    'Data recomendada para próxima avaliação do ferrageamento';
+comment on column terrenos.limites is
+   'Contorno do terreno: array JSON de vértices [latitude, longitude]';
+comment on table localizacao_atual_animais is
+   'Localização atual por animal (última movimentação), mantida incrementalmente para consultas de ocupação';
+comment on table custos_proprietario_diario is
+   'Consolidado incremental de custos (medicamentos, ração, manejo) por proprietário, animal e dia';
+comment on table custos_lancamentos is
+   'Lançamentos de custo por registro de origem, estornados na alteração/exclusão do registro';
+comment on table custos_categoria_mensal is
+   'Série mensal de custos por categoria, derivada de custos_proprietario_diario';
 comment on table saude_animais is
    'Registros de saúde dos animais (vacinas, medicamentos, consultas, exames, etc.)';
 comment on column saude_animais.tipo_registro is
@@ -857,11 +933,23 @@ create index idx_sessoes_usuario_ativa on
       id_usuario,
       ativa
    );
+create index idx_animais_pai on
+   animais (
+      id_pai
+   );
+create index idx_animais_mae on
+   animais (
+      id_mae
+   );
 create index idx_movimentacoes_animal_data on
    movimentacoes_animais (
       id_animal,
       data_movimentacao
    );
+create index idx_localizacao_atual_terreno on
+   localizacao_atual_animais (
+      id_terreno
+   );
 create index idx_historico_animal_data on
    historico_crescimento (
       id_animal,
@@ -876,6 +964,16 @@ create index idx_saude_animal_data on
       id_animal,
       data_ocorrencia
    );
+create index idx_saude_proxima_aplicacao on
+   saude_animais (
+      proxima_aplicacao
+   );
+create index idx_saude_animal_tipo_data on
+   saude_animais (
+      id_animal,
+      tipo_registro,
+      data_ocorrencia
+   );
 create index idx_audit_tabela_data on
    audit_log (
       tabela,
@@ -941,6 +1039,37 @@ create index idx_fornecimento_produto on
       data_fornecimento
    );
 
+-- Chave do consolidado (proprietário/animal nulos no manejo sem animais)
+create unique index uk_custos_proprietario_diario on
+   custos_proprietario_diario (
+      nvl(proprietario, '-'),
+      nvl(id_animal, 0),
+      categoria,
+      data_referencia
+   );
+create index idx_custos_lancamentos_origem on
+   custos_lancamentos (
+      categoria,
+      id_origem
+   );
+create index idx_custos_lancamentos_data on
+   custos_lancamentos ( data_referencia );
+create index idx_custos_data_categoria on
+   custos_proprietario_diario (
+      data_referencia,
+      categoria
+   );
+create index idx_custos_proprietario_data on
+   custos_proprietario_diario (
+      proprietario,
+      data_referencia
+   );
+create index idx_custos_animal_data on
+   custos_proprietario_diario (
+      id_animal,
+      data_referencia
+   );
+
 create index idx_ferrageamento_animal on
    ferrageamento_animais (
       id_animal,